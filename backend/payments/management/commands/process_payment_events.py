@@ -0,0 +1,46 @@
+"""
+Management command that applies stored payment provider events (Stripe webhooks, HyperPay results)
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from payments.webhooks import process_pending
+
+
+class Command(BaseCommand):
+    help = 'Apply due payment events in order (run continuously, or once with --once)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5.0,
+            help='Seconds to sleep when no event is due (default: 5)'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Apply the currently due events and exit'
+        )
+
+    def handle(self, *args, **options):
+        total_processed = total_failed = 0
+        try:
+            while True:
+                close_old_connections()
+                processed, failed = process_pending()
+                total_processed += processed
+                total_failed += failed
+                if processed or failed:
+                    self.stdout.write(f'{processed} applied, {failed} failed')
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Payment events processed: {total_processed} applied, {total_failed} failed')
+        )
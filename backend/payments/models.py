@@ -43,6 +43,13 @@ class Payment(models.Model):
     blank=True
     )
 
+    # The booking being paid for; its payment_status follows this payment
+    booking = models.ForeignKey(
+        "salon.Booking", null=True, blank=True, on_delete=models.SET_NULL, related_name="payments"
+    )
+    # Creation time of the last provider event applied (older redeliveries are skipped)
+    last_event_at = models.DateTimeField(null=True, blank=True)
+
 
     def __str__(self):
         return f"{self.order_id or self.pk} | {self.amount} {self.currency} | {self.status}"
@@ -51,10 +58,51 @@ class Payment(models.Model):
 # payment log 
 
 class PaymentLog(models.Model):
+    """A provider event (Stripe webhook, HyperPay result), applied by payments.webhooks."""
+
+    STATUS_RECEIVED = "received"
+    STATUS_PROCESSING = "processing"
+    STATUS_PROCESSED = "processed"
+    STATUS_IGNORED = "ignored"
+    STATUS_FAILED = "failed"
+
+    STATUS_CHOICES = [
+        (STATUS_RECEIVED, "Received"),
+        (STATUS_PROCESSING, "Processing"),
+        (STATUS_PROCESSED, "Processed"),
+        (STATUS_IGNORED, "Ignored"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    PROVIDER_STRIPE = "stripe"
+    PROVIDER_HYPERPAY = "hyperpay"
+
+    PROVIDER_CHOICES = [
+        (PROVIDER_STRIPE, "Stripe"),
+        (PROVIDER_HYPERPAY, "HyperPay"),
+    ]
+
     payment = models.ForeignKey(Payment, on_delete=models.SET_NULL, null=True, blank=True)
+    provider = models.CharField(max_length=20, choices=PROVIDER_CHOICES, blank=True)
+    # Provider event id; unique, so a redelivered event is stored (and applied) once
+    event_id = models.CharField(max_length=255, unique=True, null=True, blank=True)
+    event_type = models.CharField(max_length=100, blank=True)
     raw_data = models.JSONField()
-    status = models.CharField(max_length=50)
+    status = models.CharField(max_length=50, choices=STATUS_CHOICES, default=STATUS_RECEIVED)
+    # When the provider created the event; events are applied in this order
+    event_created = models.DateTimeField(default=timezone.now)
     received_at = models.DateTimeField(default=timezone.now)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            # The worker's queue: due events in provider order
+            models.Index(fields=["status", "event_created"], name="paymentlog_queue_idx"),
+        ]
 
     def __str__(self):
         return f"Log for {self.payment} at {self.received_at}"
@@ -1,6 +1,8 @@
-import requests
 from django.conf import settings
 
+from salon_backend import gateways
+
+
 def create_checkout(amount, currency, customer_email):
     url = f"{settings.HYPERPAY_BASE_URL}/v1/checkouts"
     headers = {
@@ -14,5 +16,5 @@ def create_checkout(amount, currency, customer_email):
         "customer.email": customer_email,
     }
 
-    response = requests.post(url, data=data, headers=headers)
+    response = gateways.session("hyperpay").post(url, data=data, headers=headers)
     return response.json()
@@ -1,3 +1,215 @@
+import hashlib
+import hmac
+import json
+import time as clock
+from datetime import time, timedelta
+
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from salon import outbox
+from salon.models import Address, Booking, Customer, OutboundMessage, Service
+from salon_backend import gateways
+
+from . import webhooks
+from .models import Payment, PaymentLog
+
+WEBHOOK_URL = '/api/payments/stripe/webhook/'
+SECRET = 'whsec_test'
+
+
+class StripeWebhookTests(TestCase):
+    """Webhooks are stored once per event id and applied in order by the worker."""
+
+    def setUp(self):
+        overrides = self.settings(STRIPE_WEBHOOK_SECRET=SECRET, PAYMENT_EVENTS_ASYNC=False)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        service = Service.objects.create(
+            name='قص الشعر', name_en='Hair cut', description='-', description_en='-', duration='60', price=80,
+        )
+        customer = Customer.objects.create(name='عميلة', email='client@example.com', phone='0500000000')
+        address = Address.objects.create(customer=customer, title='المنزل', address='الرياض')
+        self.booking = Booking.objects.create(
+            customer=customer, service=service, address=address, payment_method='cash',
+            booking_date=timezone.localdate() + timedelta(days=2), booking_time=time(10, 0),
+            price=80, final_price=80,
+        )
+        self.payment = Payment.objects.create(
+            user=User.objects.create(username='0500000000'), booking=self.booking,
+            stripe_payment_intent_id='pi_1', amount=80, currency='sar',
+        )
+
+    def post(self, event_id, event_type, created, intent='pi_1', secret=SECRET):
+        payload = json.dumps({
+            'id': event_id, 'object': 'event', 'type': event_type, 'created': created,
+            'data': {'object': {'id': intent, 'object': 'payment_intent', 'latest_charge': 'ch_1'}},
+        })
+        timestamp = int(clock.time())
+        signature = hmac.new(secret.encode(), f'{timestamp}.{payload}'.encode(), hashlib.sha256).hexdigest()
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                WEBHOOK_URL, payload, content_type='application/json',
+                HTTP_STRIPE_SIGNATURE=f't={timestamp},v1={signature}',
+            )
+
+    def test_event_updates_payment_and_booking(self):
+        response = self.post('evt_1', 'payment_intent.succeeded', 1000)
+        self.assertEqual(response.status_code, 200)
+
+        log = PaymentLog.objects.get(event_id='evt_1')
+        self.assertEqual(log.status, PaymentLog.STATUS_PROCESSED)
+        self.assertEqual(log.payment, self.payment)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, Payment.STATUS_PAID)
+        self.assertEqual(self.payment.stripe_charge_id, 'ch_1')
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.payment_status, 'paid')
+        self.assertEqual(self.booking.payment_reference, 'pi_1')
+        self.assertEqual(OutboundMessage.objects.filter(channel='whatsapp', event='payment_received').count(), 1)
+
+    def test_redelivery_is_applied_once(self):
+        self.post('evt_1', 'payment_intent.succeeded', 1000)
+        response = self.post('evt_1', 'payment_intent.succeeded', 1000)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(PaymentLog.objects.count(), 1)
+        self.assertEqual(OutboundMessage.objects.filter(channel='whatsapp').count(), 1)
+
+    def test_bad_signature_is_rejected(self):
+        response = self.post('evt_1', 'payment_intent.succeeded', 1000, secret='whsec_other')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(PaymentLog.objects.exists())
+
+    def test_older_event_does_not_undo_a_newer_one(self):
+        self.post('evt_2', 'payment_intent.succeeded', 2000)
+        self.post('evt_1', 'payment_intent.payment_failed', 1000)
+        self.assertEqual(PaymentLog.objects.get(event_id='evt_1').status, PaymentLog.STATUS_IGNORED)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, Payment.STATUS_PAID)
+
+    def test_event_for_unknown_payment_is_retried(self):
+        self.post('evt_1', 'payment_intent.succeeded', 1000, intent='pi_missing')
+        log = PaymentLog.objects.get(event_id='evt_1')
+        self.assertEqual(log.status, PaymentLog.STATUS_RECEIVED)
+        self.assertEqual(log.attempts, 1)
+        self.assertGreater(log.next_attempt_at, timezone.now())
+        self.assertIn('UnknownPayment', log.last_error)
+
+    def test_payment_that_does_not_cover_the_booking_leaves_it_unpaid(self):
+        Payment.objects.filter(pk=self.payment.pk).update(amount=1)
+        self.post('evt_1', 'payment_intent.succeeded', 1000)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, Payment.STATUS_PAID)
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.payment_status, 'pending')
+
+    def test_hyperpay_result_is_applied(self):
+        payment = Payment.objects.create(hyperpay_checkout_id='chk_1', booking=self.booking, amount=80)
+        result = {
+            'id': 'txn_1', 'ndc': 'chk_1', 'timestamp': '2026-01-01 10:00:00+0000',
+            'result': {'code': '000.100.110', 'description': 'Request successfully processed'},
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            webhooks.record_hyperpay_result(result)
+            webhooks.record_hyperpay_result(result)
+
+        self.assertEqual(PaymentLog.objects.get().event_id, 'hyperpay:txn_1')
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, Payment.STATUS_PAID)
+        self.assertEqual(payment.hyperpay_transaction_id, 'txn_1')
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.payment_status, 'paid')
+
+
+class GatewayClientTests(TestCase):
+    """HyperPay and Twilio go through pooled per-gateway sessions; the fake backend answers locally."""
+
+    def setUp(self):
+        overrides = self.settings(
+            GATEWAY_BACKEND='fake', HYPERPAY_BASE_URL='https://test.oppwa.com', HYPERPAY_ENTITY_ID='entity',
+            PAYMENT_EVENTS_ASYNC=False, TWILIO_PHONE_NUMBER='+15550000000',
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        gateways.fake_gateway.reset()
+        gateways.metrics.reset()
+
+    def test_checkout_and_result_through_the_fake_gateway(self):
+        response = self.client.post('/api/payments/create-checkout/', {'amount': '80.00'}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        checkout_id = response.json()['checkout_id']
+        payment = Payment.objects.get(hyperpay_checkout_id=checkout_id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.get(
+                '/api/payments/result/', {'resourcePath': f'/v1/checkouts/{checkout_id}/payment'}
+            )
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('payment-success', response['Location'])
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, Payment.STATUS_PAID)
+
+        self.assertEqual(len(gateways.fake_gateway.calls), 2)
+        self.assertEqual(gateways.metrics.snapshot()['hyperpay']['requests'], 2)
+
+    def test_checkout_is_only_linked_to_the_callers_booking(self):
+        owner = User.objects.create_user('owner', password='pass')
+        customer = Customer.objects.create(user=owner, name='عميلة', email='owner@example.com', phone='0511111111')
+        booking = Booking.objects.create(
+            customer=customer, address=Address.objects.create(customer=customer, title='المنزل', address='الرياض'),
+            service=Service.objects.create(
+                name='قص الشعر', name_en='Hair cut', description='-', description_en='-', duration='60', price=80,
+            ),
+            payment_method='cash', booking_date=timezone.localdate() + timedelta(days=2),
+            booking_time=time(10, 0), price=80, final_price=80,
+        )
+        client = APIClient()
+        body = {'amount': '1.00', 'booking_id': booking.pk}
+
+        self.assertEqual(client.post('/api/payments/create-checkout/', body, format='json').status_code, 404)
+        client.force_authenticate(User.objects.create_user('other', password='pass'))
+        self.assertEqual(client.post('/api/payments/create-checkout/', body, format='json').status_code, 404)
+        self.assertFalse(Payment.objects.exists())
+
+        client.force_authenticate(owner)
+        response = client.post('/api/payments/create-checkout/', body, format='json')
+        self.assertEqual(response.status_code, 200)
+        payment = Payment.objects.get()
+        self.assertEqual(payment.booking, booking)
+        self.assertEqual(payment.amount, 80)
+        self.assertIn('amount=80.00', gateways.fake_gateway.calls[-1].body)
+
+    def test_sessions_and_twilio_client_are_shared(self):
+        self.assertIs(gateways.session('hyperpay'), gateways.session('hyperpay'))
+        self.assertIs(gateways.twilio_client(), gateways.twilio_client())
+        self.assertIs(gateways.twilio_client().http_client.session, gateways.session('twilio'))
+
+    def test_sms_is_sent_with_the_shared_client(self):
+        message, _ = outbox.enqueue_sms('+966500000000', 'مرحبا', event='sms')
+        self.assertEqual(outbox.process_batch(), (1, 0))
+        message.refresh_from_db()
+        self.assertTrue(message.provider_id.startswith('SM'))
+        self.assertTrue(gateways.fake_gateway.calls[-1].url.endswith('/Messages.json'))
+        self.assertEqual(gateways.metrics.snapshot()['twilio']['errors'], 0)
+
+    def test_live_sessions_pool_and_only_retry_idempotent_requests(self):
+        with self.settings(GATEWAY_BACKEND='live', GATEWAY_CLIENTS={'hyperpay': {'pool_size': 4, 'retries': 3}}):
+            client = gateways.session('hyperpay')
+            adapter = client.get_adapter('https://test.oppwa.com/v1/checkouts')
+            self.assertEqual(adapter._pool_maxsize, 4)
+            self.assertEqual(adapter.max_retries.total, 3)
+            self.assertIn('GET', adapter.max_retries.allowed_methods)
+            self.assertNotIn('POST', adapter.max_retries.allowed_methods)
+            self.assertEqual(client.timeout, (5, 30))
 
-# Create your tests here.
+    def test_metrics_require_an_admin(self):
+        client = APIClient()
+        self.assertIn(client.get('/api/payments/gateways/metrics/').status_code, (401, 403))
+        client.force_authenticate(User.objects.create_superuser('admin', 'admin@example.com', 'pass'))
+        gateways.metrics.record('hyperpay', 0.25, True)
+        response = client.get('/api/payments/gateways/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['hyperpay']['p50_ms'], 250.0)
@@ -1,17 +1,43 @@
 # payments/views.py
-import requests
 from django.conf import settings
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 import uuid
-import requests
-import uuid
+from decimal import Decimal
 from django.conf import settings
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from django.shortcuts import redirect
+from rest_framework.permissions import IsAdminUser
+from salon.models import Booking
+from salon_backend import gateways
+from . import webhooks
+from .models import Payment
+
+
+def _owned_booking(request, value):
+    """
+    The caller's own, not yet paid booking with id ``value``, or None.
+    Only such a booking is linked to a payment (its payment_status follows
+    the payment), and the amount charged is then the booking's.
+    """
+    user = request.user
+    if not value or not user or not user.is_authenticated:
+        return None
+    try:
+        booking_id = int(value)
+    except (TypeError, ValueError):
+        return None
+    return (
+        Booking.objects.filter(pk=booking_id, customer__user=user)
+        .exclude(payment_status="paid")
+        .first()
+    )
+
+
+BOOKING_NOT_FOUND = {"error": "booking not found"}
 
 
 class CreateCheckoutView(APIView):
@@ -21,6 +47,13 @@ class CreateCheckoutView(APIView):
         body = request.data
         amount = body.get("amount")
         currency = body.get("currency", "SAR")
+        booking = None
+        if body.get("booking_id"):
+            booking = _owned_booking(request, body.get("booking_id"))
+            if booking is None:
+                return Response(BOOKING_NOT_FOUND, status=status.HTTP_404_NOT_FOUND)
+            # A booking is charged what it owes, whatever the client sent
+            amount, currency = booking.final_price, webhooks.BOOKING_CURRENCY
         customer_email = body.get("customer_email", "test@example.com")
         billing = body.get("billing", {})
         given_name = body.get("customer_givenName", "Test")
@@ -59,12 +92,22 @@ class CreateCheckoutView(APIView):
         }
 
         try:
-            resp = requests.post(url, data=data, headers=headers, timeout=30)
+            resp = gateways.session("hyperpay").post(url, data=data, headers=headers)
             result = resp.json()
         except Exception as e:
             return Response({"error": "Failed to contact HyperPay", "detail": str(e)}, status=502)
 
         checkout_id = result.get("id") or result.get("checkoutId")
+        if resp.ok and checkout_id:
+            # The HyperPay result is matched to this row by checkout id
+            Payment.objects.create(
+                order_id=merchant_txn,
+                hyperpay_checkout_id=checkout_id,
+                booking=booking,
+                amount=amount,
+                currency=currency,
+                raw_response=result,
+            )
         return Response({
             "raw": result,
             "checkout_id": checkout_id,
@@ -83,7 +126,7 @@ class PaymentResultView(APIView):
         url = f"{settings.HYPERPAY_BASE_URL.rstrip('/')}{resource_path}?entityId={settings.HYPERPAY_ENTITY_ID}"
         headers = {"Authorization": f"Bearer {settings.HYPERPAY_ACCESS_TOKEN}"}
 
-        resp = requests.get(url, headers=headers)
+        resp = gateways.session("hyperpay").get(url, headers=headers)
         result = resp.json()
         code = result.get("result", {}).get("code", "")
         desc = result.get("result", {}).get("description", "")
@@ -110,11 +153,14 @@ class PaymentResultView(APIView):
         }
 
         try:
-            resp = requests.get(url, headers=headers, timeout=30)
+            resp = gateways.session("hyperpay").get(url, headers=headers)
             data = resp.json()
         except Exception as e:
             return Response({"error": "Failed to fetch payment result", "detail": str(e)}, status=502)
 
+        # Fetched from HyperPay itself, so it is applied like a verified webhook
+        webhooks.record_hyperpay_result(data)
+
         result = data.get("result", {})
         code = result.get("code", "")
         description = result.get("description", "")
@@ -193,6 +239,13 @@ class CreateStripePaymentIntent(APIView):
     def post(self, request):
         try:
             amount = request.data.get("amount")
+            booking = None
+            if request.data.get("booking_id"):
+                booking = _owned_booking(request, request.data.get("booking_id"))
+                if booking is None:
+                    return Response(BOOKING_NOT_FOUND, status=status.HTTP_404_NOT_FOUND)
+                # A booking is charged what it owes, whatever the client sent
+                amount = booking.final_price
 
             if not amount:
                 return Response(
@@ -201,17 +254,19 @@ class CreateStripePaymentIntent(APIView):
                 )
 
             # تحويل المبلغ إلى هللات (Stripe يستخدم أصغر وحدة)
-            amount_in_halalas = int(float(amount) * 100)
+            amount_in_halalas = round(Decimal(str(amount)) * 100)
 
             payment_intent = stripe.PaymentIntent.create(
                 amount=amount_in_halalas,
                 currency=settings.STRIPE_CURRENCY,
                 automatic_payment_methods={"enabled": True},
+                metadata={"booking_id": str(booking.pk)} if booking else {},
             )
 
             # إنشاء سجل الدفع في قاعدة البيانات
             Payment.objects.create(
                 stripe_payment_intent_id=payment_intent.id,
+                booking=booking,
                 amount=amount,
                 currency=settings.STRIPE_CURRENCY,
                 status=Payment.STATUS_PENDING,
@@ -232,18 +287,16 @@ class CreateStripePaymentIntent(APIView):
             )
 
 
-import json
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.http import HttpResponse
 from rest_framework.views import APIView
-from .models import Payment
-from salon.utils import send_whatsapp_message  # استدعاء الدالة
 import stripe
 from django.conf import settings
 
 @method_decorator(csrf_exempt, name="dispatch")
 class StripeWebhookView(APIView):
+    """Verify and store the event, acknowledge; payments.webhooks applies it in the background."""
     permission_classes = []
 
     def post(self, request):
@@ -259,33 +312,14 @@ class StripeWebhookView(APIView):
         except Exception:
             return HttpResponse(status=400)
 
-        event_type = event["type"]
-        intent = event["data"]["object"]
-
-        payment = Payment.objects.filter(
-            stripe_payment_intent_id=intent["id"]
-        ).first()
-
-        if not payment:
-            return HttpResponse(status=200)
-
-        if event_type == "payment_intent.succeeded":
-            payment.status = Payment.STATUS_PAID
-            payment.stripe_charge_id = intent.get("latest_charge")
-            payment.raw_response = intent
-            payment.save()
-
-            # 🔹 إرسال رسالة WhatsApp تلقائية
-            if payment.user:
-                send_whatsapp_message(
-                    phone=payment.user.username,  # الرقم المخزن عندك
-                    code=f"تم استلام طلبك بنجاح! المبلغ: {payment.amount} {payment.currency} 💇‍♀️"
-                )
+        # A redelivered event is already stored; acknowledge it all the same
+        webhooks.record_stripe_event(event)
+        return HttpResponse(status=200)
 
-        elif event_type == "payment_intent.payment_failed":
-            payment.status = Payment.STATUS_FAILED
-            payment.raw_response = intent
-            payment.save()
 
-        return HttpResponse(status=200)
+class GatewayMetricsView(APIView):
+    """Request counts and latencies of the outbound gateways (this worker process)."""
+    permission_classes = [IsAdminUser]
 
+    def get(self, request):
+        return Response(gateways.metrics.snapshot())
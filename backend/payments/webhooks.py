@@ -0,0 +1,298 @@
+"""
+Payment provider events.
+
+Webhook handlers only verify and store: ``record_event()`` writes the raw
+event to ``PaymentLog`` under its provider event id (unique, so a redelivery
+is a no-op) and the view acknowledges at once.  Once the transaction
+commits, a single background worker thread applies the due events in the
+order the provider created them (``process_pending()``; the
+``process_payment_events`` management command does the same from cron or a
+supervisor):
+
+* the ``Payment`` status is updated, and the linked ``Booking.payment_status``
+  with it (whose signals create the admin notification and email);
+* the customer's WhatsApp confirmation goes through the outbox, deduplicated
+  per payment;
+* an event older than the last one applied to its payment is ignored, so a
+  late redelivery can never undo a newer state.
+
+Events that fail (e.g. their payment row is not committed yet) are retried
+with backoff and marked failed after ``PAYMENT_EVENT_MAX_ATTEMPTS``.
+"""
+import logging
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+
+from salon.outbox import enqueue_whatsapp
+
+from .models import Payment, PaymentLog
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = getattr(settings, 'PAYMENT_EVENT_MAX_ATTEMPTS', 5)
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 3600
+LOCK_TIMEOUT_SECONDS = 300
+
+# Stripe event type -> Payment status
+STRIPE_STATUSES = {
+    'payment_intent.succeeded': Payment.STATUS_PAID,
+    'payment_intent.payment_failed': Payment.STATUS_FAILED,
+    'payment_intent.processing': Payment.STATUS_PROCESSING,
+    'payment_intent.canceled': Payment.STATUS_CANCELLED,
+}
+
+# Payment status -> Booking.payment_status (other states leave the booking alone)
+BOOKING_PAYMENT_STATUSES = {
+    Payment.STATUS_PAID: 'paid',
+    Payment.STATUS_FAILED: 'failed',
+}
+
+# Currency bookings are priced in
+BOOKING_CURRENCY = 'SAR'
+
+# HyperPay result codes (https://hyperpay.docs.oppwa.com/reference/resultCodes)
+HYPERPAY_PAID = re.compile(r'^(000\.000\.|000\.100\.1|000\.[36])')
+HYPERPAY_REVIEW = re.compile(r'^(000\.400\.0[^3]|000\.400\.100)')
+HYPERPAY_PENDING = re.compile(r'^(000\.200)')
+
+
+class UnknownPayment(Exception):
+    """The event's payment is not (yet) in the database."""
+
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='payment-events')
+_lock = threading.Lock()
+
+
+# ---------------------------------------------------------------------------
+# Ingestion
+# ---------------------------------------------------------------------------
+
+def record_event(provider, event_id, event_type, payload, created=None):
+    """
+    Store a provider event and schedule its processing; returns
+    ``(log, created)``, ``created`` being False for a redelivery.
+    """
+    defaults = {
+        'provider': provider,
+        'event_type': event_type,
+        'raw_data': payload,
+        'event_created': created or timezone.now(),
+    }
+    try:
+        with transaction.atomic():
+            log, created = PaymentLog.objects.get_or_create(event_id=event_id, defaults=defaults)
+    except IntegrityError:
+        # The same event delivered concurrently
+        log, created = PaymentLog.objects.get(event_id=event_id), False
+    if created:
+        schedule()
+    return log, created
+
+
+def record_stripe_event(event):
+    """Store a verified ``stripe.Event``."""
+    payload = event.to_dict()
+    created = datetime.fromtimestamp(payload['created'], tz=dt_timezone.utc) if payload.get('created') else None
+    return record_event(PaymentLog.PROVIDER_STRIPE, payload['id'], payload['type'], payload, created)
+
+
+def record_hyperpay_result(result):
+    """
+    Store a payment result fetched from HyperPay (keyed by its transaction
+    id); returns ``(None, False)`` when the result carries no transaction.
+    """
+    if not result.get('id'):
+        return None, False
+    created = None
+    if result.get('timestamp'):
+        try:
+            created = datetime.strptime(result['timestamp'], '%Y-%m-%d %H:%M:%S%z')
+        except ValueError:
+            pass
+    return record_event(PaymentLog.PROVIDER_HYPERPAY, f"hyperpay:{result['id']}", 'payment.result', result, created)
+
+
+def schedule():
+    """Process due events in the background once the transaction commits."""
+    if getattr(settings, 'PAYMENT_EVENTS_ASYNC', True):
+        transaction.on_commit(lambda: _executor.submit(_run_in_thread))
+    else:
+        transaction.on_commit(process_pending)
+
+
+def _run_in_thread():
+    close_old_connections()
+    try:
+        process_pending()
+    except Exception:
+        logger.exception('Processing payment events failed')
+    finally:
+        close_old_connections()
+
+
+# ---------------------------------------------------------------------------
+# Applying events
+# ---------------------------------------------------------------------------
+
+def _stripe_update(log):
+    """``(payment queryset, status, fields to set)`` of a Stripe event, or None to ignore it."""
+    status = STRIPE_STATUSES.get(log.event_type)
+    if status is None:
+        return None
+    intent = log.raw_data['data']['object']
+    fields = {'raw_response': intent}
+    if status == Payment.STATUS_PAID:
+        fields['stripe_charge_id'] = intent.get('latest_charge')
+    return Payment.objects.filter(stripe_payment_intent_id=intent['id']), status, fields
+
+
+def _hyperpay_update(log):
+    result = log.raw_data
+    code = result.get('result', {}).get('code', '')
+    if HYPERPAY_PAID.match(code):
+        status = Payment.STATUS_PAID
+    elif HYPERPAY_REVIEW.match(code) or HYPERPAY_PENDING.match(code):
+        status = Payment.STATUS_PROCESSING
+    else:
+        status = Payment.STATUS_FAILED
+    fields = {'raw_response': result, 'hyperpay_transaction_id': result['id']}
+    # ``ndc`` is the checkout id the payment was created with
+    return Payment.objects.filter(hyperpay_checkout_id=result.get('ndc')), status, fields
+
+
+UPDATES = {
+    PaymentLog.PROVIDER_STRIPE: _stripe_update,
+    PaymentLog.PROVIDER_HYPERPAY: _hyperpay_update,
+}
+
+
+def covers(payment, booking):
+    """Whether a payment is for exactly what the booking owes."""
+    return (
+        (payment.currency or '').upper() == BOOKING_CURRENCY
+        and payment.amount == booking.final_price
+    )
+
+
+def _sync_booking(payment):
+    booking = payment.booking
+    payment_status = BOOKING_PAYMENT_STATUSES.get(payment.status)
+    if booking is None or payment_status is None or booking.payment_status == payment_status:
+        return
+    if payment_status == 'paid' and not covers(payment, booking):
+        logger.warning(
+            f'Payment {payment.pk} ({payment.amount} {payment.currency}) does not cover booking '
+            f'{booking.pk} ({booking.final_price} {BOOKING_CURRENCY}); booking left unpaid'
+        )
+        return
+    booking.payment_status = payment_status
+    update_fields = ['payment_status', 'updated_at']
+    if payment_status == 'paid':
+        booking.payment_date = timezone.now()
+        booking.payment_reference = (
+            payment.stripe_payment_intent_id or payment.hyperpay_transaction_id or str(payment.pk)
+        )[:100]
+        update_fields += ['payment_date', 'payment_reference']
+    booking.save(update_fields=update_fields)
+
+
+def _notify(payment):
+    if payment.status != Payment.STATUS_PAID or not payment.user:
+        return
+    enqueue_whatsapp(
+        payment.user.username,  # الرقم المخزن عندك
+        f"تم استلام طلبك بنجاح! المبلغ: {payment.amount} {payment.currency} 💇‍♀️",
+        event='payment_received',
+        booking=payment.booking,
+        dedup_key=f"whatsapp:payment_received:{payment.pk}",
+    )
+
+
+def apply_event(log):
+    """Apply one event; returns the resulting ``PaymentLog`` status."""
+    update = UPDATES[log.provider](log)
+    if update is None:
+        return PaymentLog.STATUS_IGNORED
+    payments, status, fields = update
+
+    with transaction.atomic():
+        payment = payments.select_for_update().select_related('booking', 'user').first()
+        if payment is None:
+            raise UnknownPayment(f'No payment for {log.provider} event {log.event_id}')
+        log.payment = payment
+        if payment.last_event_at and log.event_created < payment.last_event_at:
+            return PaymentLog.STATUS_IGNORED
+
+        changed = payment.status != status
+        payment.status = status
+        payment.last_event_at = log.event_created
+        for name, value in fields.items():
+            setattr(payment, name, value)
+        payment.save()
+        if changed:
+            _sync_booking(payment)
+            _notify(payment)
+    return PaymentLog.STATUS_PROCESSED
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=min(RETRY_BASE_SECONDS * (2 ** max(attempts - 1, 0)), RETRY_MAX_SECONDS))
+
+
+def _claim_next(now):
+    """Claim the oldest due event (a conditional UPDATE, so concurrent workers never share one)."""
+    PaymentLog.objects.filter(
+        status=PaymentLog.STATUS_PROCESSING, locked_at__lt=now - timedelta(seconds=LOCK_TIMEOUT_SECONDS)
+    ).update(status=PaymentLog.STATUS_RECEIVED, locked_at=None)
+    due = PaymentLog.objects.filter(status=PaymentLog.STATUS_RECEIVED, next_attempt_at__lte=now)
+    for pk in due.order_by('event_created', 'id').values_list('pk', flat=True)[:10]:
+        if PaymentLog.objects.filter(pk=pk, status=PaymentLog.STATUS_RECEIVED).update(
+            status=PaymentLog.STATUS_PROCESSING, locked_at=now
+        ):
+            return PaymentLog.objects.get(pk=pk)
+    return None
+
+
+def _record_result(log, status, error=''):
+    now = timezone.now()
+    log.attempts += 1
+    log.locked_at = None
+    log.last_error = error
+    if status is not None:
+        log.status = status
+        log.processed_at = now
+    elif log.attempts >= MAX_ATTEMPTS:
+        log.status = PaymentLog.STATUS_FAILED
+        logger.error(f'Payment event {log.event_id} failed permanently: {error}')
+    else:
+        log.status = PaymentLog.STATUS_RECEIVED
+        log.next_attempt_at = now + retry_delay(log.attempts)
+        logger.warning(f'Payment event {log.event_id} failed (attempt {log.attempts}), retrying: {error}')
+    log.save(update_fields=[
+        'payment', 'status', 'attempts', 'locked_at', 'last_error', 'processed_at', 'next_attempt_at',
+    ])
+
+
+def process_pending(limit=None):
+    """Apply due events one at a time, oldest first; returns ``(processed, failed)`` counts."""
+    processed = failed = 0
+    with _lock:
+        while limit is None or processed + failed < limit:
+            log = _claim_next(timezone.now())
+            if log is None:
+                break
+            try:
+                _record_result(log, apply_event(log))
+                processed += 1
+            except Exception as e:
+                _record_result(log, None, f'{type(e).__name__}: {e}')
+                failed += 1
+    return processed, failed
@@ -23,7 +23,7 @@ from .admin_configs.content import (
     BlogCommentAdmin, NewsletterSubscriberAdmin
 )
 from .admin_configs.notifications import (
-    NotificationAdmin, NotificationSettingsAdmin
+    NotificationAdmin, NotificationSettingsAdmin, OutboundMessageAdmin
 )
 
 # Import all models
@@ -3,9 +3,11 @@ from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
 from django.utils import timezone
-from django.core.mail import EmailMultiAlternatives
 from django.template.loader import render_to_string
-from django.utils.html import strip_tags
+from ..availability import invalidate_schedules
+from ..dashboard import invalidate_dashboard_stats
+from ..rollups import refresh_for_bookings
+from ..outbox import enqueue_email
 from ..models import (
     Booking, Config, WorkingHours, DayOff, AppointmentRequest, 
     AppointmentRescheduleHistory, PasswordResetToken, AdminSlotAvailability
@@ -363,37 +365,40 @@ class BookingAdmin(admin.ModelAdmin):
         # Render HTML email template
         html_content = render_to_string('emails/booking_status_update.html', context)
         
-        # Create plain text version
-        text_content = strip_tags(html_content)
-        
         # Create email with proper subject
         subject = config['subject']
         
-        email = EmailMultiAlternatives(
-            subject=subject,
-            body=text_content,
-            from_email='info@takweensoft.com',
-            to=[booking.customer.email]
-        )
-        email.attach_alternative(html_content, "text/html")
-        
-        # Send email
+        # Queue email (delivered by the process_outbox worker)
         try:
-            email.send()
-            print(f"✅ Status update email sent to {booking.customer.email} for booking #{booking.id}")
+            enqueue_email(
+                booking.customer.email, subject, html_content,
+                event=f'status_{booking.status}', booking=booking,
+                # updated_at marks this change, so a later change back to the same status emails again
+                dedup_key=(
+                    f'email:status_{booking.status}:{booking.id}:{booking.customer.email}:'
+                    f'{booking.updated_at.timestamp() if booking.updated_at else ""}'
+                ),
+            )
+            print(f"✅ Status update email queued for {booking.customer.email} for booking #{booking.id}")
         except Exception as e:
-            print(f"❌ Failed to send status update email: {e}")
+            print(f"❌ Failed to queue status update email: {e}")
 
     def mark_as_completed(self, request, queryset):
         """تحديث الحجوزات المحددة كمكتملة"""
         # Get bookings before update to send emails
         bookings_to_notify = list(queryset.filter(status__in=['pending', 'confirmed', 'in_progress']))
         
-        updated = queryset.update(status='completed')
+        now = timezone.now()
+        updated = queryset.update(status='completed', updated_at=now)
+        # Bulk updates bypass the Booking signals
+        invalidate_schedules()
+        refresh_for_bookings(queryset)
+        invalidate_dashboard_stats()
         
         # Send emails for status change
         for booking in bookings_to_notify:
             booking.status = 'completed'  # Update the instance for email
+            booking.updated_at = now
             self.send_status_update_email(booking, booking.status)
         
         self.message_user(request, f'تم تحديث {updated} حجز كمكتمل.')
@@ -401,7 +406,12 @@ class BookingAdmin(admin.ModelAdmin):
 
     def mark_as_pending(self, request, queryset):
         """تحديث الحجوزات المحددة كفي الانتظار"""
-        updated = queryset.update(status='pending')
+        now = timezone.now()
+        updated = queryset.update(status='pending', updated_at=now)
+        # Bulk updates bypass the Booking signals
+        invalidate_schedules()
+        refresh_for_bookings(queryset)
+        invalidate_dashboard_stats()
         self.message_user(request, f'تم تحديث {updated} حجز كفي الانتظار.')
     mark_as_pending.short_description = "تحديد كفي الانتظار"
 
@@ -410,11 +420,17 @@ class BookingAdmin(admin.ModelAdmin):
         # Get bookings before update to send emails
         bookings_to_notify = list(queryset.filter(status__in=['pending', 'confirmed', 'in_progress']))
         
-        updated = queryset.update(status='cancelled')
+        now = timezone.now()
+        updated = queryset.update(status='cancelled', updated_at=now)
+        # Bulk updates bypass the Booking signals
+        invalidate_schedules()
+        refresh_for_bookings(queryset)
+        invalidate_dashboard_stats()
         
         # Send emails for status change
         for booking in bookings_to_notify:
             booking.status = 'cancelled'  # Update the instance for email
+            booking.updated_at = now
             self.send_status_update_email(booking, booking.status)
         
         self.message_user(request, f'تم تحديث {updated} حجز كملغي.')
@@ -422,7 +438,12 @@ class BookingAdmin(admin.ModelAdmin):
 
     def mark_as_in_progress(self, request, queryset):
         """تحديث الحجوزات المحددة كجاري التنفيذ"""
-        updated = queryset.update(status='in_progress')
+        now = timezone.now()
+        updated = queryset.update(status='in_progress', updated_at=now)
+        # Bulk updates bypass the Booking signals
+        invalidate_schedules()
+        refresh_for_bookings(queryset)
+        invalidate_dashboard_stats()
         self.message_user(request, f'تم تحديث {updated} حجز كجاري التنفيذ.')
     mark_as_in_progress.short_description = "تحديد كجاري التنفيذ"
     
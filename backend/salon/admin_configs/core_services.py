@@ -3,6 +3,7 @@ from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
 from django.utils import timezone
+from .. import catalog_cache
 from ..models import (
     Category, Service, Staff, Customer, Address, Coupon, HeroImage,
     ServiceCategory, ServiceItem, Testimonial, ContactInfo, Contact, Offer
@@ -243,21 +244,26 @@ class TestimonialAdmin(admin.ModelAdmin):
     
     def mark_as_featured(self, request, queryset):
         updated = queryset.update(is_featured=True)
+        # Bulk updates bypass the signals that expire the cached catalog
+        catalog_cache.invalidate('testimonials')
         self.message_user(request, f'تم تمييز {updated} شهادة كمميزة.')
     mark_as_featured.short_description = "تمييز كشهادات مميزة"
     
     def mark_as_not_featured(self, request, queryset):
         updated = queryset.update(is_featured=False)
+        catalog_cache.invalidate('testimonials')
         self.message_user(request, f'تم إلغاء تمييز {updated} شهادة.')
     mark_as_not_featured.short_description = "إلغاء التمييز"
     
     def activate_testimonials(self, request, queryset):
         updated = queryset.update(is_active=True)
+        catalog_cache.invalidate('testimonials')
         self.message_user(request, f'تم تفعيل {updated} شهادة.')
     activate_testimonials.short_description = "تفعيل الشهادات"
     
     def deactivate_testimonials(self, request, queryset):
         updated = queryset.update(is_active=False)
+        catalog_cache.invalidate('testimonials')
         self.message_user(request, f'تم إلغاء تفعيل {updated} شهادة.')
     deactivate_testimonials.short_description = "إلغاء تفعيل الشهادات"
     
@@ -355,32 +361,39 @@ class OfferAdmin(admin.ModelAdmin):
     color_preview.short_description = "معاينة الألوان"
     
     def mark_as_featured(self, request, queryset):
-        updated = queryset.update(is_featured=True)
+        updated = queryset.update(is_featured=True, updated_at=timezone.now())
+        # Bulk updates bypass the signals that expire the cached catalog; updated_at keys the offer's fragment
+        catalog_cache.invalidate('offers')
         self.message_user(request, f'تم تمييز {updated} عرض كمميز.')
     mark_as_featured.short_description = "تمييز كعروض مميزة"
     
     def mark_as_not_featured(self, request, queryset):
-        updated = queryset.update(is_featured=False)
+        updated = queryset.update(is_featured=False, updated_at=timezone.now())
+        catalog_cache.invalidate('offers')
         self.message_user(request, f'تم إلغاء تمييز {updated} عرض.')
     mark_as_not_featured.short_description = "إلغاء التمييز"
     
     def activate_offers(self, request, queryset):
-        updated = queryset.update(is_active=True)
+        updated = queryset.update(is_active=True, updated_at=timezone.now())
+        catalog_cache.invalidate('offers')
         self.message_user(request, f'تم تفعيل {updated} عرض.')
     activate_offers.short_description = "تفعيل العروض"
     
     def deactivate_offers(self, request, queryset):
-        updated = queryset.update(is_active=False)
+        updated = queryset.update(is_active=False, updated_at=timezone.now())
+        catalog_cache.invalidate('offers')
         self.message_user(request, f'تم إلغاء تفعيل {updated} عرض.')
     deactivate_offers.short_description = "إلغاء تفعيل العروض"
     
     def mark_as_new(self, request, queryset):
-        updated = queryset.update(is_new=True)
+        updated = queryset.update(is_new=True, updated_at=timezone.now())
+        catalog_cache.invalidate('offers')
         self.message_user(request, f'تم تمييز {updated} عرض كجديد.')
     mark_as_new.short_description = "تمييز كعروض جديدة"
     
     def mark_as_not_new(self, request, queryset):
-        updated = queryset.update(is_new=False)
+        updated = queryset.update(is_new=False, updated_at=timezone.now())
+        catalog_cache.invalidate('offers')
         self.message_user(request, f'تم إلغاء تمييز {updated} عرض كجديد.')
     mark_as_not_new.short_description = "إلغاء التمييز كجديد"
     
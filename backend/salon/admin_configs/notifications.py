@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.utils.html import format_html
 from django.utils import timezone
-from ..models import Notification, NotificationSettings
+from ..models import Notification, NotificationSettings, OutboundMessage
 
 
 @admin.register(Notification)
@@ -131,3 +131,28 @@ class NotificationSettingsAdmin(admin.ModelAdmin):
         )
         self.message_user(request, f'تم إلغاء تفعيل جميع الإشعارات لـ {updated} مستخدم.')
     disable_all_notifications.short_description = 'إلغاء تفعيل جميع الإشعارات'
+
+
+@admin.register(OutboundMessage)
+class OutboundMessageAdmin(admin.ModelAdmin):
+    list_display = [
+        'event', 'channel', 'recipient', 'status', 'attempts',
+        'next_attempt_at', 'sent_at', 'created_at'
+    ]
+    list_filter = ['channel', 'status', 'event', 'created_at']
+    search_fields = ['recipient', 'subject', 'dedup_key', 'booking__id']
+    ordering = ['-created_at']
+    raw_id_fields = ['booking']
+    readonly_fields = [
+        'dedup_key', 'attempts', 'locked_at', 'last_error', 'provider_id',
+        'sent_at', 'created_at', 'updated_at'
+    ]
+
+    actions = ['retry_now']
+
+    def retry_now(self, request, queryset):
+        updated = queryset.exclude(status='sent').update(
+            status='pending', attempts=0, next_attempt_at=timezone.now(), locked_at=None
+        )
+        self.message_user(request, f'تمت إعادة جدولة {updated} رسالة للإرسال.')
+    retry_now.short_description = 'إعادة محاولة الإرسال الآن'
@@ -0,0 +1,128 @@
+"""
+In-process prefix index for type-ahead over service and category names.
+
+Every active service and category contributes one key per word of its
+Arabic and English names: the name from that word to the end, normalized
+(see ``salon.normalization``), so "قص" and "cut" both find "قص الشعر /
+Hair cut" and "hair c" narrows it down.  The keys sit in one sorted list; a
+lookup is two ``bisect`` calls and a walk over the matching range, without
+touching the database.
+
+The index is built on first use in each process and rebuilt when the
+catalog ``services`` or ``categories`` version moves (bumped by the model
+signals, see ``catalog_cache.py``).  Every lookup reads those versions from
+the cache all processes share (``settings.CACHES``), so a change saved by
+any process is seen by the next lookup in every other.  Writes that skip
+the signals (``QuerySet.update()``) must call ``catalog_cache.invalidate()``.
+"""
+import threading
+from bisect import bisect_left, bisect_right
+
+from . import catalog_cache
+from .normalization import normalize, strip_prefix
+
+SECTIONS = ('services', 'categories')
+MAX_RESULTS = 20
+
+# Sorts after every character a key can contain
+_KEY_END = '\U0010ffff'
+
+
+def _keys(*names):
+    """``(key, position)`` for every word start of the names; position 0 is the name's start."""
+    keys = set()
+    for name in names:
+        words = normalize(name).split()
+        for position in range(len(words)):
+            keys.add((' '.join(words[position:]), position))
+            # "الشعر" is also found by "شعر"
+            stripped = strip_prefix(words[position])
+            if stripped != words[position]:
+                keys.add((' '.join([stripped] + words[position + 1:]), position))
+    return keys
+
+
+class PrefixIndex:
+    """Sorted ``(key, position, entry number)`` tuples over a list of entries."""
+
+    def __init__(self, entries):
+        self.entries = entries
+        self.keys = sorted(
+            (key, position, number)
+            for number, entry in enumerate(entries)
+            for key, position in _keys(entry['name'], entry['name_en'])
+        )
+
+    def lookup(self, query, limit=10):
+        prefix = ' '.join(normalize(query).split())
+        if not prefix:
+            return []
+        start = bisect_left(self.keys, (prefix,))
+        end = bisect_right(self.keys, (prefix + _KEY_END,))
+
+        # Best match per entry: names starting with the query first, then
+        # the closest completion, then the catalog order
+        best = {}
+        for key, position, number in self.keys[start:end]:
+            score = (position, len(key))
+            best[number] = min(score, best.get(number, score))
+        ranked = sorted(best, key=lambda number: (best[number], self.entries[number]['order'], number))
+        return [self.entries[number]['result'] for number in ranked[:limit]]
+
+
+def build():
+    """A fresh index of the active services and categories (two queries)."""
+    from .models import Category, Service
+
+    entries = []
+    categories = Category.objects.filter(is_active=True).only('id', 'name', 'name_en', 'slug_en', 'order')
+    for category in categories:
+        entries.append({
+            'name': category.name,
+            'name_en': category.name_en,
+            'order': category.order,
+            'result': {
+                'type': 'category',
+                'id': category.id,
+                'name': category.name,
+                'name_en': category.name_en,
+                'slug_en': category.slug_en,
+            },
+        })
+    services = Service.objects.filter(is_active=True).only('id', 'name', 'name_en', 'price', 'duration', 'order')
+    for service in services:
+        entries.append({
+            'name': service.name,
+            'name_en': service.name_en,
+            'order': service.order,
+            'result': {
+                'type': 'service',
+                'id': service.id,
+                'name': service.name,
+                'name_en': service.name_en,
+                'price': float(service.price),
+                'duration': service.duration,
+            },
+        })
+    return PrefixIndex(entries)
+
+
+_lock = threading.Lock()
+# (catalog versions, index), replaced as a whole so readers never see a mix
+_current = (None, None)
+
+
+def get_index():
+    """The index for the current catalog versions, rebuilt when they moved."""
+    global _current
+    versions = catalog_cache.section_versions(SECTIONS)
+    if _current[0] != versions:
+        with _lock:
+            if _current[0] != versions:
+                _current = (versions, build())
+    return _current[1]
+
+
+def lookup(query, limit=10):
+    """Services and categories whose names have a word starting with ``query``."""
+    return get_index().lookup(query, max(1, min(limit, MAX_RESULTS)))
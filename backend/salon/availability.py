@@ -0,0 +1,520 @@
+"""
+Availability engine for the booking flow
+
+Staff working hours, days off, the salon Config and active bookings are
+compiled into per-staff, per-day bitmaps (one bit per TICK_MINUTES). Compiled
+days are kept in Django's cache, so answering "free slots for service X on
+date D" is a few integer operations instead of a Booking query and a list
+scan per slot. Every booking (and hold) blocks its span widened by the
+appointment buffer on both sides, so consecutive appointments are at least
+that far apart.
+
+Cached plans are never modified. Their keys carry a schedule version and a
+per-day version; a booking change bumps its day's version (``cache.incr``)
+and a schedule change bumps the schedule version, and the affected days are
+compiled again on next use. A version key that is missing (never set, or
+evicted) starts from a fresh value, so stale plans are never matched again.
+The cache is shared by every process (settings.CACHES), so they all see a
+bump at once; reservations.py still re-checks every slot in the database
+before booking it. Checkout slot holds expire on their own, so they are not
+compiled in: each request masks out the holds active at that moment (one
+query for the whole window).
+"""
+import datetime
+import re
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ACTIVE_BOOKING_STATUSES, Booking, Config, DayOff, Service, SlotHold, Staff, WorkingHours
+
+# Bitmap resolution: one bit per 5 minutes, 288 bits per day
+TICK_MINUTES = 5
+TICKS_PER_DAY = 24 * 60 // TICK_MINUTES
+
+# Used when neither the staff member nor Config define working hours
+DEFAULT_OPEN_TIME = datetime.time(10, 0)
+DEFAULT_CLOSE_TIME = datetime.time(22, 0)
+DEFAULT_SLOT_MINUTES = 60
+
+# Calendar key for the whole salon; it tracks every booking, and bookings
+# without an assigned staff member block all staff calendars
+SALON_CALENDAR = 'salon'
+
+CACHE_PREFIX = 'availability'
+CACHE_TIMEOUT = getattr(settings, 'AVAILABILITY_CACHE_TIMEOUT', 300)
+
+_ARABIC_DIGITS = str.maketrans('٠١٢٣٤٥٦٧٨٩', '0123456789')
+_NUMBER_RE = re.compile(r'\d+(?:\.\d+)?')
+
+
+def parse_duration_minutes(value, default=DEFAULT_SLOT_MINUTES):
+    """
+    Parse Service.duration free text such as "60 دقيقة", "1 ساعة" or
+    "60-90 دقيقة" into minutes. Ranges use the upper bound so a slot is
+    never offered when the longest version of the service would not fit.
+    """
+    text = str(value or '').translate(_ARABIC_DIGITS)
+    numbers = [float(number) for number in _NUMBER_RE.findall(text)]
+    if not numbers:
+        return default
+    minutes = max(numbers)
+    if 'ساع' in text or 'hour' in text.lower():
+        minutes *= 60
+    return int(minutes) or default
+
+
+def _to_tick(value):
+    """Convert a time to its tick index within the day (rounded down)"""
+    return (value.hour * 60 + value.minute) // TICK_MINUTES
+
+
+def _ticks_for(minutes):
+    """Number of ticks needed to cover a duration (rounded up)"""
+    return max(1, -(-int(minutes) // TICK_MINUTES))
+
+
+def _span_mask(start, length):
+    """Bitmap with `length` bits set starting at tick `start`"""
+    start = max(0, start)
+    end = min(TICKS_PER_DAY, start + length)
+    if end <= start:
+        return 0
+    return ((1 << (end - start)) - 1) << start
+
+
+def _padded(mask, ticks):
+    """`mask` with every run of set bits widened by `ticks` on both sides"""
+    padded = mask
+    for shift in range(1, ticks + 1):
+        padded |= (mask << shift) | (mask >> shift)
+    return padded & ((1 << TICKS_PER_DAY) - 1)
+
+
+def _run_starts(free_mask, length):
+    """
+    Bitmap of ticks where `length` consecutive free ticks begin.
+    Doubles the covered span on every step, so it costs O(log length).
+    """
+    runs = free_mask
+    span = 1
+    while span < length and runs:
+        shift = min(span, length - span)
+        runs &= runs >> shift
+        span += shift
+    return runs
+
+
+class DayPlan:
+    """Compiled calendar of one staff member (or the whole salon) for one day"""
+
+    def __init__(self, open_mask=0, shifts=((0, TICKS_PER_DAY),), step=1, buffer_minutes=0):
+        self.open_mask = open_mask
+        # (start tick, end tick) of every shift; slots are aligned to the shift they are in
+        self.shifts = tuple(shifts)
+        self.step = max(1, step)
+        self.buffer_minutes = buffer_minutes or 0
+        # booking id -> (start tick, length in ticks, staff id or None)
+        self.bookings = {}
+        self.busy_mask = 0
+        self.unassigned_mask = 0
+
+    def buffer_ticks(self):
+        return _ticks_for(self.buffer_minutes) if self.buffer_minutes else 0
+
+    def add_booking(self, booking_id, start, length, staff_id=None):
+        self.bookings[booking_id] = (start, length, staff_id)
+        # The buffer keeps the neighbouring slots clear on both sides
+        span = _padded(_span_mask(start, length), self.buffer_ticks())
+        self.busy_mask |= span
+        if staff_id is None:
+            self.unassigned_mask |= span
+
+    def slot_starts(self):
+        """Candidate slot start ticks, aligned to the start of each shift"""
+        starts = set()
+        for start, end in self.shifts:
+            starts.update(range(start, end, self.step))
+        return sorted(starts)
+
+
+def held_masks(first, last, now=None):
+    """
+    {date: {staff_id: mask}} of the unexpired slot holds in ``[first, last]``;
+    holds without a staff member are under ``None``
+    """
+    holds = SlotHold.objects.filter(
+        date__range=[first, last], expires_at__gt=now or timezone.now(),
+    ).order_by().values_list('date', 'staff_id', 'time', 'service__duration')
+    masks = {}
+    for day, staff_id, held_time, duration in holds:
+        day_masks = masks.setdefault(day, {})
+        span = _span_mask(_to_tick(held_time), _ticks_for(parse_duration_minutes(duration)))
+        day_masks[staff_id] = day_masks.get(staff_id, 0) | span
+    return masks
+
+
+def _cache_key(*parts):
+    return ':'.join([CACHE_PREFIX] + [str(part) for part in parts])
+
+
+def _fresh_version():
+    # Never equal to a value the key had before it went missing
+    return time.time_ns()
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, _fresh_version(), None)
+
+
+def schedule_version():
+    """Current schedule version; bumped whenever hours, days off or staff change"""
+    return cache.get_or_set(_cache_key('version'), _fresh_version, None)
+
+
+def invalidate_schedules():
+    """Drop every compiled plan by moving to a new schedule version"""
+    _bump(_cache_key('version'))
+
+
+def _day_version_key(day):
+    return _cache_key('day', day.isoformat())
+
+
+def _day_versions(days):
+    """{day: version} of several days, in one round trip when they are all set"""
+    keys = {day: _day_version_key(day) for day in days}
+    found = cache.get_many(list(keys.values()))
+    versions = {}
+    for day, key in keys.items():
+        if key not in found:
+            found[key] = cache.get_or_set(key, _fresh_version, None)
+        versions[day] = found[key]
+    return versions
+
+
+def invalidate_days(days):
+    """
+    Drop the compiled plans of the given days. Done at once and again when
+    the transaction commits, so a plan compiled in between from the not yet
+    committed state is dropped too.
+    """
+    days = {_as_date(day) for day in days if day}
+
+    def bump():
+        for day in days:
+            _bump(_day_version_key(day))
+
+    bump()
+    transaction.on_commit(bump)
+
+
+def _plan_key(version, day_version, calendar, day):
+    return _cache_key(version, day_version, 'plan', calendar, day.isoformat())
+
+
+def _config_snapshot():
+    config = Config.objects.first()
+    return {
+        'slot_duration': (config.slot_duration if config else None) or DEFAULT_SLOT_MINUTES,
+        'lead_time': (config.lead_time if config else None) or DEFAULT_OPEN_TIME,
+        'finish_time': (config.finish_time if config else None) or DEFAULT_CLOSE_TIME,
+        'buffer': (config.appointment_buffer_time if config else None) or 0,
+    }
+
+
+def _service_profile(version, service_id):
+    """
+    Duration and eligible staff of a service, cached per schedule version.
+    Returns None when the service does not exist.
+    """
+    key = _cache_key(version, 'service', service_id or 0)
+    profile = cache.get(key)
+    if profile is not None:
+        return profile
+
+    if service_id:
+        service = Service.objects.filter(pk=service_id).only('id', 'duration').first()
+        if service is None:
+            return None
+        duration = parse_duration_minutes(service.duration)
+        staff_ids = list(
+            Staff.objects.filter(is_active=True, services=service).values_list('id', flat=True)
+        )
+    else:
+        duration = None
+        staff_ids = []
+
+    profile = {'duration': duration, 'staff_ids': staff_ids}
+    cache.set(key, profile, CACHE_TIMEOUT)
+    return profile
+
+
+def _day_of_week(day):
+    """Map a date to the DAYS_OF_WEEK numbering (0 = Sunday)"""
+    return (day.weekday() + 1) % 7
+
+
+def _build_salon_plan(config):
+    start = _to_tick(config['lead_time'])
+    end = _to_tick(config['finish_time'])
+    return DayPlan(
+        open_mask=_span_mask(start, end - start),
+        shifts=[(start, end)],
+        step=_ticks_for(config['slot_duration']),
+        buffer_minutes=config['buffer'],
+    )
+
+
+def _build_staff_plan(staff, day, hours, days_off, config):
+    slot_minutes = staff.slot_duration or config['slot_duration']
+    buffer_minutes = staff.appointment_buffer_time or config['buffer']
+    closed = DayPlan(step=_ticks_for(slot_minutes), buffer_minutes=buffer_minutes)
+
+    if any(off.start_date <= day <= off.end_date for off in days_off):
+        return closed
+
+    dow = _day_of_week(day)
+    if hours:
+        # Explicit working hours are authoritative: no row for the day means off.
+        # Several rows for one day are split shifts
+        shifts = [(row.start_time, row.end_time) for row in hours if row.day_of_week == dow]
+        if not shifts:
+            return closed
+    else:
+        if not staff.is_working_day(dow):
+            return closed
+        shifts = [(staff.lead_time or config['lead_time'], staff.finish_time or config['finish_time'])]
+
+    ticks = [(_to_tick(start_time), _to_tick(end_time)) for start_time, end_time in sorted(shifts)]
+    open_mask = 0
+    for start, end in ticks:
+        open_mask |= _span_mask(start, end - start)
+    return DayPlan(
+        open_mask=open_mask,
+        shifts=ticks,
+        step=_ticks_for(slot_minutes),
+        buffer_minutes=buffer_minutes,
+    )
+
+
+def occupied_slots(first, last):
+    """``(id, date, staff_id, time, service duration)`` of the slot-occupying bookings in ``[first, last]``"""
+    return Booking.objects.filter(
+        booking_date__range=[first, last],
+        status__in=ACTIVE_BOOKING_STATUSES,
+    ).order_by().values_list('id', 'booking_date', 'staff_id', 'booking_time', 'service__duration')
+
+
+def _compile_days(days, staff_ids):
+    """
+    Build the salon plan and the requested staff plans for several days.
+    Bookings, working hours and days off are fetched once for the whole window.
+    """
+    config = _config_snapshot()
+    first, last = min(days), max(days)
+    plans = {day: {SALON_CALENDAR: _build_salon_plan(config)} for day in days}
+
+    if staff_ids:
+        hours_by_staff = {}
+        for row in WorkingHours.objects.filter(staff_id__in=staff_ids):
+            hours_by_staff.setdefault(row.staff_id, []).append(row)
+        days_off_by_staff = {}
+        for off in DayOff.objects.filter(staff_id__in=staff_ids, start_date__lte=last, end_date__gte=first):
+            days_off_by_staff.setdefault(off.staff_id, []).append(off)
+        for staff in Staff.objects.filter(pk__in=staff_ids):
+            for day in days:
+                plans[day][staff.pk] = _build_staff_plan(
+                    staff, day,
+                    hours_by_staff.get(staff.pk, []),
+                    days_off_by_staff.get(staff.pk, []),
+                    config,
+                )
+
+    # Unknown staff ids get a closed calendar rather than an error
+    for day in days:
+        for staff_id in staff_ids:
+            plans[day].setdefault(staff_id, DayPlan())
+
+    for booking_id, booking_date, staff_id, booking_time, duration in occupied_slots(first, last):
+        day_plans = plans.get(booking_date)
+        if day_plans is None:
+            continue
+        start = _to_tick(booking_time)
+        length = _ticks_for(parse_duration_minutes(duration))
+        day_plans[SALON_CALENDAR].add_booking(booking_id, start, length, staff_id)
+        if staff_id in day_plans:
+            day_plans[staff_id].add_booking(booking_id, start, length, staff_id)
+
+    return plans
+
+
+def _get_plans(days, calendars, version):
+    """
+    Fetch the plans of several days from the cache in one round trip and
+    compile every missing day in one batch. Returns {day: {calendar: plan}}.
+    """
+    day_versions = _day_versions(days)
+    keys = {
+        (day, calendar): _plan_key(version, day_versions[day], calendar, day)
+        for day in days for calendar in calendars
+    }
+    cached = cache.get_many(list(keys.values()))
+    plans = {day: {} for day in days}
+    for (day, calendar), key in keys.items():
+        if key in cached:
+            plans[day][calendar] = cached[key]
+
+    missing_days = [day for day in days if len(plans[day]) < len(calendars)]
+    if missing_days:
+        # Missing days are compiled for every calendar: the salon plan carries
+        # the unassigned bookings that every staff plan depends on
+        staff_ids = [calendar for calendar in calendars if calendar != SALON_CALENDAR]
+        compiled = _compile_days(missing_days, staff_ids)
+        cache.set_many({
+            _plan_key(version, day_versions[day], calendar, day): plan
+            for day, day_plans in compiled.items()
+            for calendar, plan in day_plans.items()
+        }, CACHE_TIMEOUT)
+        plans.update(compiled)
+    return plans
+
+
+def _earliest_tick(day, buffer_minutes, now):
+    """First tick a slot may start at on `day`; TICKS_PER_DAY means none"""
+    if day < now.date():
+        return TICKS_PER_DAY
+    if day > now.date():
+        return 0
+    limit = now.hour * 60 + now.minute + buffer_minutes
+    # Slots must start strictly after now (+ buffer)
+    return int(limit // TICK_MINUTES) + 1
+
+
+def _free_starts(plan, free_mask, length, earliest):
+    runs = _run_starts(free_mask, length)
+    return [tick for tick in plan.slot_starts() if tick >= earliest and (runs >> tick) & 1]
+
+
+def _format_tick(tick):
+    minutes = tick * TICK_MINUTES
+    return f'{minutes // 60:02d}:{minutes % 60:02d}'
+
+
+def _calendars_for(profile, staff_id):
+    if staff_id:
+        return [int(staff_id)]
+    return list(profile['staff_ids'])
+
+
+def _day_free_ticks(day, profile, calendars, plans, now, first_only=False, held=None):
+    """
+    Free slot start ticks of one day, merged over the given calendars.
+    `held` is the day's {staff_id: mask} of slot holds.
+    """
+    held = held or {}
+    salon = plans[SALON_CALENDAR]
+    if calendars:
+        sources = []
+        for calendar in calendars:
+            plan = plans[calendar]
+            # Holds are padded like the bookings they turn into
+            taken = _padded(held.get(calendar, 0) | held.get(None, 0), plan.buffer_ticks())
+            sources.append((plan, plan.open_mask & ~plan.busy_mask & ~salon.unassigned_mask & ~taken))
+    else:
+        all_held = 0
+        for mask in held.values():
+            all_held |= mask
+        sources = [(salon, salon.open_mask & ~salon.busy_mask & ~_padded(all_held, salon.buffer_ticks()))]
+
+    free = set()
+    for plan, free_mask in sources:
+        if not free_mask:
+            continue
+        length = _ticks_for(profile['duration'] or plan.step * TICK_MINUTES)
+        earliest = _earliest_tick(day, plan.buffer_minutes, now)
+        free.update(_free_starts(plan, free_mask, length, earliest))
+        if first_only and free:
+            break
+    return free
+
+
+def get_free_slots(day, service_id=None, staff_id=None):
+    """
+    Return the free slot start times ("HH:MM") for a service on a date.
+
+    With `staff_id` only that staff member's calendar is used; otherwise a
+    slot is free when any active staff member offering the service is free,
+    falling back to the salon calendar when no staff member is assigned to
+    the service. Returns None when the service does not exist.
+    """
+    slots = get_free_slots_range(day, day, service_id=service_id, staff_id=staff_id)
+    if slots is None:
+        return None
+    return slots[day]
+
+
+def get_free_slots_range(start, end, service_id=None, staff_id=None, summary=False):
+    """
+    Return {date: ["HH:MM", ...]} for every day from `start` to `end`
+    (inclusive), compiled from one batched fetch of the uncached days.
+
+    With `summary` each day maps to a bool telling whether it has any free
+    slot, which is enough to draw a month view. Returns None when the service
+    does not exist.
+    """
+    version = schedule_version()
+    profile = _service_profile(version, service_id)
+    if profile is None:
+        return None
+
+    days = [start + datetime.timedelta(days=offset) for offset in range((end - start).days + 1)]
+    calendars = _calendars_for(profile, staff_id)
+    plans = _get_plans(days, [SALON_CALENDAR] + calendars, version)
+    now = timezone.localtime()
+    held = held_masks(start, end, now)
+
+    result = {}
+    for day in days:
+        free = _day_free_ticks(day, profile, calendars, plans[day], now, first_only=summary, held=held.get(day))
+        if summary:
+            result[day] = bool(free)
+        else:
+            result[day] = [_format_tick(tick) for tick in sorted(free)]
+    return result
+
+
+def apply_booking_change(booking, previous=None):
+    """
+    Drop the cached plans a saved booking affects.
+
+    `previous` is a (date, staff_id, status) tuple describing the booking
+    before the save, or None for new bookings.
+    """
+    days = []
+    if previous is not None:
+        old_date, _old_staff_id, old_status = previous
+        if old_status in ACTIVE_BOOKING_STATUSES:
+            days.append(old_date)
+    if booking.status in ACTIVE_BOOKING_STATUSES:
+        days.append(booking.booking_date)
+    invalidate_days(days)
+
+
+def release_booking(booking):
+    """Drop the cached plans of a deleted booking's day"""
+    if booking.status in ACTIVE_BOOKING_STATUSES:
+        invalidate_days([booking.booking_date])
+
+
+def _as_date(value):
+    # reschedule_booking assigns the raw request strings before saving
+    if isinstance(value, str):
+        return datetime.date.fromisoformat(value)
+    return value
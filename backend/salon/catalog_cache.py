@@ -0,0 +1,203 @@
+"""
+Versioned response cache for the public catalog endpoints.
+
+Every cached endpoint belongs to one or more *sections* (``SECTIONS``).  Each
+section has a version stored in Django's cache: the millisecond timestamp of
+its last change, bumped from the model signals (see ``signals.py``).  The
+cache is shared by every process (``settings.CACHES``), so a bump from an
+admin save or a worker reaches every web process at once and they all hand
+out the same ETags.  A
+response is cached under a key derived from its sections' versions and the
+request's query string, so a bump orphans every stale payload at once and
+nothing has to be deleted.
+
+The same versions make the HTTP validators: the ETag is the cache key digest
+and Last-Modified the newest section version, so a conditional request is
+answered with a 304 from one cache lookup, before any query or serializer
+runs.
+"""
+import hashlib
+import time
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+CACHE_PREFIX = 'catalog'
+CACHE_TIMEOUT = getattr(settings, 'CATALOG_CACHE_TIMEOUT', 3600)
+# Browser/CDN freshness; 0 means "revalidate every time" (cheap 304s)
+CLIENT_MAX_AGE = getattr(settings, 'CATALOG_MAX_AGE', 0)
+# Sections whose payload also depends on the clock (offer validity): their
+# signature rolls over every N seconds even when nothing was saved
+TIME_BUCKETS = getattr(settings, 'CATALOG_TIME_BUCKETS', {'offers': 300})
+
+SECTIONS = (
+    'categories',
+    'services',
+    'staff',
+    'hero_images',
+    'offers',
+    'testimonials',
+    'service_categories',
+    'contact_info',
+    'config',
+)
+
+
+def _cache_key(*parts):
+    return ':'.join([CACHE_PREFIX] + [str(part) for part in parts])
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+def section_versions(sections):
+    """``{section: version}``; a section seen for the first time starts now."""
+    keys = {section: _cache_key('version', section) for section in sections}
+    found = cache.get_many(list(keys.values()))
+    versions = {}
+    for section, key in keys.items():
+        if key not in found:
+            cache.add(key, _now_ms(), None)
+            found[key] = cache.get(key, _now_ms())
+        versions[section] = found[key]
+    return versions
+
+
+def section_signature(sections):
+    """
+    ``(signature, last_modified)`` for a set of sections: a string that
+    changes whenever one of them does, and the newest change in seconds.
+    """
+    versions = section_versions(sections)
+    parts = []
+    last_modified = max(versions.values()) // 1000 if versions else 0
+    for section in sections:
+        parts.append(f'{section}={versions[section]}')
+        bucket = TIME_BUCKETS.get(section)
+        if bucket:
+            bucket_start = int(time.time()) // bucket * bucket
+            parts.append(f'@{bucket_start}')
+            last_modified = max(last_modified, bucket_start)
+    return '|'.join(parts), last_modified
+
+
+def invalidate(*sections):
+    """Move the given sections to a new version, orphaning their cached responses."""
+    for section in sections:
+        key = _cache_key('version', section)
+        cache.set(key, max(_now_ms(), (cache.get(key) or 0) + 1), None)
+
+
+def _variant(request):
+    # Host included: paginated payloads embed absolute next/previous links
+    params = sorted((name, sorted(values)) for name, values in request.GET.lists())
+    return f'{request.get_host()}?{urlencode(params, doseq=True)}'
+
+
+def set_validators(response, etag, last_modified=None):
+    """Add ETag / Last-Modified and a "revalidate before reuse" Cache-Control."""
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, public=True, max_age=CLIENT_MAX_AGE, must_revalidate=True)
+    return response
+
+
+def cached_response(request, sections, build):
+    """
+    Serve the DRF ``Response`` returned by ``build()`` through the catalog
+    cache.  Only successful GET/HEAD responses are cached.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return build()
+
+    signature, last_modified = section_signature(sections)
+    digest = hashlib.md5(f'{signature}|{_variant(request)}'.encode('utf-8')).hexdigest()
+    etag = quote_etag(digest)
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return set_validators(not_modified, etag, last_modified)
+
+    key = _cache_key('response', '+'.join(sections), digest)
+    data = cache.get(key)
+    if data is None:
+        response = build()
+        if response.status_code != 200:
+            return response
+        cache.set(key, response.data, CACHE_TIMEOUT)
+    else:
+        response = Response(data)
+    return set_validators(response, etag, last_modified)
+
+
+def cached_fragment(name, sections, build, variant=''):
+    """
+    ``build()``'s payload cached under the current versions of ``sections``,
+    for pieces shared between responses (see the bootstrap endpoint).
+    """
+    signature, _last_modified = section_signature(sections)
+    digest = hashlib.md5(f'{signature}|{variant}'.encode('utf-8')).hexdigest()
+    key = _cache_key('fragment', name, digest)
+    data = cache.get(key)
+    if data is None:
+        data = build()
+        cache.set(key, data, CACHE_TIMEOUT)
+    return data
+
+
+def cached_items(name, sections, items, identity, build):
+    """
+    Per-item fragments (e.g. one per offer) fetched in one cache round trip.
+
+    ``identity(item)`` must change whenever the item itself does; changes to
+    ``sections`` invalidate every item.  ``build(missing)`` returns the
+    payloads of the items that were not cached, in the same order.
+    """
+    signature, _last_modified = section_signature(sections)
+    keys = [
+        _cache_key('item', name, hashlib.md5(f'{signature}|{identity(item)}'.encode('utf-8')).hexdigest())
+        for item in items
+    ]
+    found = cache.get_many(keys)
+    missing = [index for index, key in enumerate(keys) if key not in found]
+    if missing:
+        built = build([items[index] for index in missing])
+        fresh = {keys[index]: data for index, data in zip(missing, built)}
+        cache.set_many(fresh, CACHE_TIMEOUT)
+        found.update(fresh)
+    return [found[key] for key in keys]
+
+
+def catalog_cached(*sections):
+    """
+    Decorator for function views, applied below ``@api_view``::
+
+        @api_view(['GET'])
+        @permission_classes([AllowAny])
+        @catalog_cached('offers')
+        def offers_api(request): ...
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            return cached_response(request, sections, lambda: view(request, *args, **kwargs))
+        return wrapped
+    return decorator
+
+
+class CatalogCacheMixin:
+    """Cache a ``ListAPIView``'s responses under ``catalog_sections``."""
+    catalog_sections = ()
+
+    def list(self, request, *args, **kwargs):
+        return cached_response(
+            request, self.catalog_sections,
+            lambda: super(CatalogCacheMixin, self).list(request, *args, **kwargs),
+        )
@@ -0,0 +1,73 @@
+"""
+Conditional GET support for DRF list and detail views.
+
+``ConditionalGetMixin`` computes a cheap validator *before* anything is
+serialized and answers ``If-None-Match`` / ``If-Modified-Since`` with a 304:
+
+* with ``etag_sections`` the ETag comes from the catalog cache versions (see
+  ``catalog_cache.py``), which costs no query at all;
+* otherwise it comes from one aggregate over the view's filtered queryset:
+  ``max(updated_at)``, ``count()`` (deletions) and the sums of any
+  ``etag_counters`` (counters such as likes that change without touching
+  ``updated_at``).
+
+The request path and query string are part of the ETag, so pages and
+filters of the same view never share one.
+"""
+import hashlib
+
+from django.db.models import Count, Max, Sum
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+
+from .catalog_cache import section_signature, set_validators
+
+
+class ConditionalGetMixin:
+    etag_sections = ()
+    etag_field = 'updated_at'
+    etag_counters = ()
+
+    def get_etag_queryset(self):
+        """The rows the response is built from (the looked-up object on detail views)."""
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        if lookup_url_kwarg in self.kwargs:
+            queryset = queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        return queryset
+
+    def get_validators(self):
+        """``(etag, last_modified)`` for the current request."""
+        if self.etag_sections:
+            state, last_modified = section_signature(self.etag_sections)
+        else:
+            aggregates = {'latest': Max(self.etag_field), 'count': Count('pk')}
+            aggregates.update({name: Sum(name) for name in self.etag_counters})
+            row = self.get_etag_queryset().order_by().aggregate(**aggregates)
+            state = '|'.join(f'{name}={row[name]}' for name in sorted(row))
+            last_modified = int(row['latest'].timestamp()) if row['latest'] else None
+
+        digest = hashlib.md5(f'{self.request.get_full_path()}|{state}'.encode('utf-8')).hexdigest()
+        return quote_etag(digest), last_modified
+
+    def conditional_response(self, request, respond):
+        """Return a 304 when the client's copy is current, else ``respond()`` with validators."""
+        if request.method not in ('GET', 'HEAD'):
+            return respond()
+        etag, last_modified = self.get_validators()
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = respond()
+            if response.status_code != 200:
+                return response
+        return set_validators(response, etag, last_modified)
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request, lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request, lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs)
+        )
@@ -0,0 +1,187 @@
+"""
+Write-coalescing counters (blog post views and likes).
+
+Bumping a counter column on every page view serializes the writes on the
+row (and on the whole database with SQLite), and ``obj.views += 1; save()``
+loses concurrent increments.  Instead ``increment()`` adds to a key in the
+``COUNTER_CACHE`` cache (``cache.incr``, atomic with Redis) and the page
+view touches no table at all.  ``flush()`` folds the pending counts into the
+table: it takes each key's value off with ``cache.decr`` and writes them per
+batch with one ``UPDATE ... SET views = views + CASE ...`` over just the
+rows that have counts.  Increments made while a flush runs stay in their
+key for the next one.
+
+The cache is shared by every process (``settings.CACHES``), so web workers
+and ``manage.py flush_counters`` see and flush the same counts.  Each key is
+listed once, when it is created, in a registry of numbered slots that
+``flush()`` walks instead of scanning the counted table.  A flush runs at
+most every ``COUNTER_FLUSH_INTERVAL`` seconds from the request that
+increments a counter; the command drains whatever is left.
+
+Reads go through ``apply_pending()``, which adds the pending counts to the
+loaded instances so the counts look live.
+"""
+import logging
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Case, F, IntegerField, Value, When
+
+logger = logging.getLogger(__name__)
+
+# model label -> buffered counter fields
+COUNTED_FIELDS = {
+    'salon.BlogPost': ('views', 'likes'),
+}
+
+FLUSH_INTERVAL = getattr(settings, 'COUNTER_FLUSH_INTERVAL', 60)
+# Rows updated per query
+FLUSH_BATCH_SIZE = 1000
+
+SLOT_COUNT_KEY = 'counter:slots'
+
+
+def _cache():
+    return caches[getattr(settings, 'COUNTER_CACHE', 'default')]
+
+
+def _check(model, fields):
+    allowed = COUNTED_FIELDS.get(model._meta.label, ())
+    for field in fields:
+        if field not in allowed:
+            raise ValueError(f'{model._meta.label}.{field} is not a buffered counter')
+
+
+def _key(label, pk, field):
+    return f'counter:{label}:{pk}:{field}'
+
+
+def _slot_key(number):
+    return f'counter:slot:{number}'
+
+
+def _register(label, pk, field):
+    """List a new key in the registry ``flush()`` walks."""
+    counter_cache = _cache()
+    try:
+        number = counter_cache.incr(SLOT_COUNT_KEY)
+    except ValueError:
+        counter_cache.add(SLOT_COUNT_KEY, 0, None)
+        number = counter_cache.incr(SLOT_COUNT_KEY)
+    counter_cache.set(_slot_key(number), (label, pk, field), None)
+
+
+def increment(model, pk, field, amount=1):
+    """Add ``amount`` to a counter; returns the pending (not yet flushed) count."""
+    _check(model, [field])
+    label = model._meta.label_lower
+    key = _key(label, pk, field)
+    counter_cache = _cache()
+    try:
+        value = counter_cache.incr(key, amount)
+    except ValueError:
+        if counter_cache.add(key, 0, None):
+            _register(label, pk, field)
+        value = counter_cache.incr(key, amount)
+    maybe_flush()
+    return value
+
+
+def pending(model, pks, fields):
+    """``{pk: {field: count}}`` of the counts not yet written, for the given rows."""
+    _check(model, fields)
+    label = model._meta.label_lower
+    keys = {_key(label, pk, field): (pk, field) for pk in pks for field in fields}
+    counts = {}
+    for key, value in _cache().get_many(list(keys)).items():
+        if value:
+            pk, field = keys[key]
+            counts.setdefault(pk, {})[field] = value
+    return counts
+
+
+def apply_pending(instances, fields=None):
+    """Add the pending counts to already loaded instances (one cache read)."""
+    instances = [instance for instance in instances if instance.pk is not None]
+    if not instances:
+        return instances
+    model = type(instances[0])
+    fields = fields or COUNTED_FIELDS[model._meta.label]
+    counts = pending(model, [instance.pk for instance in instances], fields)
+    for instance in instances:
+        for field, count in counts.get(instance.pk, {}).items():
+            setattr(instance, field, getattr(instance, field) + count)
+    return instances
+
+
+def _registered():
+    """``{label: {(pk, field), ...}}`` of every key in the registry."""
+    counter_cache = _cache()
+    count = counter_cache.get(SLOT_COUNT_KEY) or 0
+    slots = counter_cache.get_many([_slot_key(number) for number in range(1, count + 1)])
+    registered = {}
+    for label, pk, field in slots.values():
+        registered.setdefault(label, set()).add((pk, field))
+    return registered
+
+
+def _flush_batch(model, entries):
+    """Write the pending counts of ``(pk, field)`` entries to ``model``; returns the rows updated."""
+    counter_cache = _cache()
+    label = model._meta.label_lower
+    keys = {_key(label, pk, field): (pk, field) for pk, field in entries}
+    taken = {}
+    for key, value in counter_cache.get_many(list(keys)).items():
+        if not value:
+            continue
+        try:
+            counter_cache.decr(key, value)
+        except ValueError:
+            # Evicted since the read
+            continue
+        taken[key] = value
+    if not taken:
+        return 0
+
+    updates = {}
+    for field in COUNTED_FIELDS[model._meta.label]:
+        whens = [When(pk=keys[key][0], then=Value(value)) for key, value in taken.items() if keys[key][1] == field]
+        if whens:
+            updates[field] = F(field) + Case(*whens, default=Value(0), output_field=IntegerField())
+    object_ids = {keys[key][0] for key in taken}
+    try:
+        model._default_manager.filter(pk__in=object_ids).update(**updates)
+    except Exception:
+        # Give the counts back to the next flush
+        for key, value in taken.items():
+            counter_cache.incr(key, value)
+        raise
+    return len(object_ids)
+
+
+def flush():
+    """Write every pending count to the database; returns the number of rows updated."""
+    written = 0
+    registered = _registered()
+    for label, fields in COUNTED_FIELDS.items():
+        model = apps.get_model(label)
+        entries = sorted(
+            (pk, field) for pk, field in registered.get(model._meta.label_lower, ()) if field in fields
+        )
+        # One row per batch can hold several fields, so batches are cut by row
+        pks = sorted({pk for pk, _field in entries})
+        for start in range(0, len(pks), FLUSH_BATCH_SIZE):
+            batch = set(pks[start:start + FLUSH_BATCH_SIZE])
+            written += _flush_batch(model, [(pk, field) for pk, field in entries if pk in batch])
+    return written
+
+
+def maybe_flush():
+    """Flush when no process has flushed in the last ``FLUSH_INTERVAL`` seconds."""
+    if not _cache().add('counter:flush-lock', True, FLUSH_INTERVAL):
+        return
+    try:
+        flush()
+    except Exception:
+        logger.exception('Flushing buffered counters failed')
@@ -0,0 +1,137 @@
+"""
+Dashboard statistics.
+
+All booking counters, status breakdowns and revenue figures come from a single
+conditional-aggregation query over the ``DailyStats`` rollup (one row per
+day, service and staff member, see ``rollups.py``) rather than over every
+booking; the other tables contribute one aggregate each.  The assembled
+payload is cached for a short TTL and dropped by the model signals (see
+``signals.py``) whenever bookings, customers, services, staff, coupons or
+payments change.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, DecimalField, IntegerField, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from payments.models import Payment
+from payments.serializers import PaymentSerializer
+
+from .models import Booking, Coupon, Customer, DailyStats, Service, Staff
+from .rollups import PAYMENT_STATUS_COUNT_FIELDS, STATUS_COUNT_FIELDS
+
+CACHE_PREFIX = 'dashboard:stats'
+CACHE_TIMEOUT = getattr(settings, 'DASHBOARD_STATS_CACHE_TIMEOUT', 60)
+LATEST_PAYMENTS = 5
+
+
+def _cache_key(day):
+    # Keyed by date so "today"/"week"/"month" counters roll over at midnight
+    return f'{CACHE_PREFIX}:{day.isoformat()}'
+
+
+def _money(field, condition=None):
+    return Coalesce(
+        Sum(field, filter=condition),
+        Value(0),
+        output_field=DecimalField(max_digits=12, decimal_places=2),
+    )
+
+
+def _total(field, condition=None):
+    return Coalesce(Sum(field, filter=condition), Value(0), output_field=IntegerField())
+
+
+def _booking_aggregates(today):
+    week_ago = today - timedelta(days=7)
+    month_ago = today - timedelta(days=30)
+
+    aggregates = {
+        'total_bookings': _total('bookings_count'),
+        'today_bookings': _total('bookings_count', Q(date=today)),
+        'week_bookings': _total('bookings_count', Q(date__gte=week_ago)),
+        'month_bookings': _total('bookings_count', Q(date__gte=month_ago)),
+        'revenue_total': _money('paid_revenue'),
+        'revenue_today': _money('paid_revenue', Q(date=today)),
+        'revenue_week': _money('paid_revenue', Q(date__gte=week_ago)),
+        'revenue_month': _money('paid_revenue', Q(date__gte=month_ago)),
+        'revenue_pending': _money('pending_revenue'),
+        'revenue_refunded': _money('refunded_amount'),
+    }
+    for value, field in STATUS_COUNT_FIELDS.items():
+        aggregates[f'status__{value}'] = _total(field)
+    for value, field in PAYMENT_STATUS_COUNT_FIELDS.items():
+        aggregates[f'payment_status__{value}'] = _total(field)
+
+    return DailyStats.objects.order_by().aggregate(**aggregates)
+
+
+def compute_dashboard_stats(today=None):
+    """Build the dashboard payload straight from the database (uncached)."""
+    today = today or timezone.localdate()
+    row = _booking_aggregates(today)
+
+    status_breakdown = {
+        value: row[f'status__{value}'] for value, _label in Booking.STATUS_CHOICES
+    }
+    payment_status_breakdown = {
+        value: row[f'payment_status__{value}']
+        for value, _label in Booking._meta.get_field('payment_status').choices
+    }
+
+    payment_totals = Payment.objects.order_by().aggregate(
+        paid_total=_money('amount', Q(status=Payment.STATUS_PAID)),
+        paid_count=Count('id', filter=Q(status=Payment.STATUS_PAID)),
+        failed_count=Count('id', filter=Q(status=Payment.STATUS_FAILED)),
+    )
+
+    stats = {
+        'total_bookings': row['total_bookings'],
+        'pending_bookings': status_breakdown['pending'],
+        'today_bookings': row['today_bookings'],
+        'week_bookings': row['week_bookings'],
+        'month_bookings': row['month_bookings'],
+        'total_customers': Customer.objects.count(),
+        'active_services': Service.objects.filter(is_active=True).count(),
+        'active_staff': Staff.objects.filter(is_active=True).count(),
+        'active_coupons': Coupon.objects.filter(is_active=True).count(),
+    }
+    revenue = {
+        'total': float(row['revenue_total']),
+        'today': float(row['revenue_today']),
+        'week': float(row['revenue_week']),
+        'month': float(row['revenue_month']),
+        'pending': float(row['revenue_pending']),
+        'refunded': float(row['revenue_refunded']),
+        'online_payments_total': float(payment_totals['paid_total']),
+        'online_payments_count': payment_totals['paid_count'],
+        'online_payments_failed': payment_totals['failed_count'],
+    }
+
+    latest_payments = Payment.objects.order_by('-created_at')[:LATEST_PAYMENTS]
+    return {
+        'stats': stats,
+        'status_breakdown': status_breakdown,
+        'payment_status_breakdown': payment_status_breakdown,
+        'revenue': revenue,
+        'latest_payments': list(PaymentSerializer(latest_payments, many=True).data),
+        'generated_at': timezone.now().isoformat(),
+    }
+
+
+def get_dashboard_stats():
+    """Cached dashboard payload (``DASHBOARD_STATS_CACHE_TIMEOUT`` seconds)."""
+    today = timezone.localdate()
+    key = _cache_key(today)
+    payload = cache.get(key)
+    if payload is None:
+        payload = compute_dashboard_stats(today)
+        cache.set(key, payload, CACHE_TIMEOUT)
+    return payload
+
+
+def invalidate_dashboard_stats():
+    cache.delete(_cache_key(timezone.localdate()))
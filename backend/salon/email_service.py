@@ -3,16 +3,14 @@ Email notification service for salon bookings
 Based on Django Appointment System features
 """
 import os
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Optional
 
 from django.conf import settings
-from django.core.mail import send_mail, EmailMultiAlternatives
 from django.template.loader import render_to_string
-from django.utils import timezone
-from django.utils.html import strip_tags
 
 from .models import Booking, Customer, Service
+from .outbox import enqueue_email
 
 
 class EmailNotificationService:
@@ -22,7 +20,18 @@ class EmailNotificationService:
         self.from_email = getattr(settings, 'DEFAULT_FROM_EMAIL', 'noreply@salon.com')
         self.website_name = getattr(settings, 'SALON_WEBSITE_NAME', 'صالون الجمال')
     
-    def send_booking_confirmation(self, booking: Booking, cart_items=None) -> bool:
+    def _queue(self, recipient, subject, html_content, event, booking, dedup_suffix=''):
+        """Queue the email on the outbox; one message per booking, event and recipient"""
+        dedup_key = f'email:{event}:{booking.id}:{recipient}'
+        if dedup_suffix:
+            dedup_key = f'{dedup_key}:{dedup_suffix}'
+        message, created = enqueue_email(
+            recipient, subject, html_content, event,
+            booking=booking, dedup_key=dedup_key, from_email=self.from_email,
+        )
+        return created
+    
+    def send_booking_confirmation(self, booking: Booking, cart_items=None, event='booking_created') -> bool:
         """Send booking confirmation email to customer"""
         try:
             print(f"📧 Preparing to send booking confirmation email...")
@@ -65,29 +74,20 @@ class EmailNotificationService:
             print(f"📝 Rendering email template...")
             # Render HTML email template - use the final enhanced template
             html_content = render_to_string('emails/booking_confirmation_final.html', context)
-            text_content = strip_tags(html_content)
             
             # Create email
             subject = f'تأكيد حجزك في {self.website_name}'
             
-            print(f"📮 Creating email message...")
+            print(f"📮 Queueing email message...")
             print(f"   From: {self.from_email}")
             print(f"   To: {customer.email}")
             print(f"   Subject: {subject}")
             
-            email = EmailMultiAlternatives(
-                subject=subject,
-                body=text_content,
-                from_email=self.from_email,
-                to=[customer.email]
-            )
-            email.attach_alternative(html_content, "text/html")
-            
-            # Send email
-            print(f"📤 Sending email...")
-            email.send()
+            # A booking can be confirmed or paid again after a change back; updated_at tells the changes apart
+            suffix = '' if event == 'booking_created' or not booking.updated_at else booking.updated_at.timestamp()
+            self._queue(customer.email, subject, html_content, event, booking, dedup_suffix=suffix)
             
-            print(f"✅ Booking confirmation email sent successfully to {customer.email}")
+            print(f"✅ Booking confirmation email queued for {customer.email}")
             return True
             
         except Exception as e:
@@ -122,65 +122,57 @@ class EmailNotificationService:
             
             # Render HTML email template
             html_content = render_to_string('emails/admin_booking_notification.html', context)
-            text_content = strip_tags(html_content)
             
             # Create email
             subject = f'حجز جديد في {self.website_name}'
             
-            email = EmailMultiAlternatives(
-                subject=subject,
-                body=text_content,
-                from_email=self.from_email,
-                to=[admin_email]
-            )
-            email.attach_alternative(html_content, "text/html")
+            self._queue(admin_email, subject, html_content, 'admin_booking_created', booking)
             
-            # Send email
-            email.send()
-            
-            print(f"✅ Admin notification email sent to {admin_email}")
+            print(f"✅ Admin notification email queued for {admin_email}")
             return True
             
         except Exception as e:
             print(f"❌ Failed to send admin notification email: {e}")
             return False
     
-    def send_reminder_email(self, booking: Booking) -> bool:
-        """Send reminder email 24 hours before appointment"""
+    @staticmethod
+    def reminder_when_label(hours: int) -> str:
+        """Human label for how far ahead the appointment is ("غداً", "خلال ساعتين", ...)"""
+        if hours >= 24:
+            days = round(hours / 24)
+            return 'غداً' if days == 1 else f'بعد {days} أيام'
+        if hours == 1:
+            return 'خلال ساعة'
+        if hours == 2:
+            return 'خلال ساعتين'
+        return f'خلال {hours} ساعات'
+    
+    def reminder_subject(self, hours: int = 24) -> str:
+        return f'تذكير: موعدك {self.reminder_when_label(hours)} في {self.website_name}'
+    
+    def reminder_context(self, booking: Booking, hours: int = 24) -> dict:
+        return {
+            'customer_name': booking.customer.name,
+            'service_name': booking.service.name,
+            'booking_date': booking.booking_date,
+            'booking_time': booking.booking_time,
+            'website_name': self.website_name,
+            'booking_id': booking.id,
+            'special_requests': booking.special_requests or 'لا توجد طلبات خاصة',
+            'when_label': self.reminder_when_label(hours),
+        }
+    
+    def send_reminder_email(self, booking: Booking, hours: int = 24) -> bool:
+        """Send reminder email ``hours`` before the appointment (24 by default)"""
         try:
             customer = booking.customer
-            service = booking.service
-            
-            # Prepare email data
-            context = {
-                'customer_name': customer.name,
-                'service_name': service.name,
-                'booking_date': booking.booking_date,
-                'booking_time': booking.booking_time,
-                'website_name': self.website_name,
-                'booking_id': booking.id,
-                'special_requests': booking.special_requests or 'لا توجد طلبات خاصة',
-            }
             
             # Render HTML email template
-            html_content = render_to_string('emails/booking_reminder.html', context)
-            text_content = strip_tags(html_content)
-            
-            # Create email
-            subject = f'تذكير: موعدك غداً في {self.website_name}'
-            
-            email = EmailMultiAlternatives(
-                subject=subject,
-                body=text_content,
-                from_email=self.from_email,
-                to=[customer.email]
-            )
-            email.attach_alternative(html_content, "text/html")
+            html_content = render_to_string('emails/booking_reminder.html', self.reminder_context(booking, hours))
             
-            # Send email
-            email.send()
+            self._queue(customer.email, self.reminder_subject(hours), html_content, f'reminder_{hours}h', booking)
             
-            print(f"✅ Reminder email sent to {customer.email}")
+            print(f"✅ Reminder email queued for {customer.email}")
             return True
             
         except Exception as e:
@@ -207,23 +199,14 @@ class EmailNotificationService:
             
             # Render HTML email template
             html_content = render_to_string('emails/booking_reschedule.html', context)
-            text_content = strip_tags(html_content)
             
             # Create email
             subject = f'تم تغيير موعدك في {self.website_name}'
             
-            email = EmailMultiAlternatives(
-                subject=subject,
-                body=text_content,
-                from_email=self.from_email,
-                to=[customer.email]
-            )
-            email.attach_alternative(html_content, "text/html")
-            
-            # Send email
-            email.send()
+            self._queue(customer.email, subject, html_content, 'booking_rescheduled', booking,
+                        dedup_suffix=f'{booking.booking_date}T{booking.booking_time}')
             
-            print(f"✅ Reschedule notification email sent to {customer.email}")
+            print(f"✅ Reschedule notification email queued for {customer.email}")
             return True
             
         except Exception as e:
@@ -242,18 +225,10 @@ def send_booking_emails(booking: Booking, cart_items=None):
     email_service.send_admin_notification(booking)
 
 
-def send_reminder_emails():
-    """Send reminder emails for appointments tomorrow"""
-    email_service = EmailNotificationService()
-    tomorrow = timezone.now().date() + timedelta(days=1)
-    
-    # Get bookings for tomorrow
-    bookings = Booking.objects.filter(
-        booking_date=tomorrow,
-        status__in=['pending', 'confirmed']
-    )
-    
-    for booking in bookings:
-        email_service.send_reminder_email(booking)
+def send_reminder_emails(windows=None, send=True):
+    """Queue (and by default deliver) reminder emails for the configured windows"""
+    from .reminders import dispatch_reminders
     
-    print(f"✅ Sent {bookings.count()} reminder emails for tomorrow")
+    result = dispatch_reminders(windows=windows, send=send)
+    print(f"✅ Queued {sum(result['queued'].values())} reminder emails, sent {result['sent']}")
+    return result
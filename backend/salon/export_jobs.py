@@ -0,0 +1,252 @@
+"""
+Background export jobs.
+
+``request_export()`` records a pending ``ExportJob``; the HTTP request
+returns straight away and the client polls the job for ``progress``.  The
+``process_export_jobs`` worker claims pending jobs with a conditional UPDATE
+(as the outbox does) and generates them.  The generated file is stored under
+``MEDIA_ROOT/exports/`` and named after a SHA-256 hash of the export kind,
+format and filter parameters, so an identical request made within
+``EXPORT_JOB_FRESHNESS_SECONDS`` reuses the finished file instead of
+recomputing it.  Identical requests made while a job is still live join that
+job.
+
+A running job writes a heartbeat at least every ``HEARTBEAT_SECONDS``.  A
+running job without a heartbeat for ``EXPORT_JOB_HEARTBEAT_TIMEOUT``
+seconds, or a job still pending after ``EXPORT_JOB_STALE_SECONDS``, is
+marked failed (``fail_dead_jobs()``) and never joined.  Jobs and their files
+are deleted ``EXPORT_JOB_RETENTION_SECONDS`` after they were requested
+(``purge_expired()``): the files hold customer data.
+"""
+import hashlib
+import json
+import logging
+import secrets
+import tempfile
+import time
+from dataclasses import replace
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils import timezone
+
+from .exports import (
+    bookings_dataset, customers_dataset, services_dataset, revenue_dataset,
+    dashboard_export_data, write_xlsx, iter_csv,
+)
+from .models import ExportJob
+
+logger = logging.getLogger(__name__)
+
+FRESHNESS_SECONDS = getattr(settings, 'EXPORT_JOB_FRESHNESS_SECONDS', 600)
+# Pending jobs no worker started within this many seconds are failed
+STALE_SECONDS = getattr(settings, 'EXPORT_JOB_STALE_SECONDS', 900)
+# Running jobs without a heartbeat for this many seconds are failed
+HEARTBEAT_TIMEOUT = getattr(settings, 'EXPORT_JOB_HEARTBEAT_TIMEOUT', 120)
+HEARTBEAT_SECONDS = 15
+RETENTION_SECONDS = getattr(settings, 'EXPORT_JOB_RETENTION_SECONDS', 24 * 3600)
+PROGRESS_STEP = 5  # percent between progress writes
+
+# Formats each kind can be produced in (first one is the default)
+KIND_FORMATS = {
+    'bookings': ('xlsx', 'csv'),
+    'customers': ('xlsx', 'csv'),
+    'services': ('xlsx', 'csv'),
+    'revenue': ('xlsx', 'csv'),
+    'dashboard': ('json',),
+}
+# Filter parameters each kind understands
+KIND_PARAMS = {
+    'bookings': ('start_date', 'end_date', 'status', 'staff_id', 'service_id'),
+    'customers': (),
+    'services': (),
+    'revenue': ('start_date', 'end_date'),
+    'dashboard': ('start_date', 'end_date'),
+}
+
+
+def normalize_params(kind, params):
+    """Keep only the parameters ``kind`` understands, as strings, with resolved dates."""
+    normalized = {}
+    for name in KIND_PARAMS[kind]:
+        value = params.get(name)
+        if value not in (None, ''):
+            normalized[name] = value.isoformat() if isinstance(value, date) else str(value)
+    if 'start_date' in KIND_PARAMS[kind]:
+        # Pin the default 30 day window so the hash is stable for the day
+        today = timezone.now().date()
+        normalized.setdefault('start_date', (today - timedelta(days=30)).isoformat())
+        normalized.setdefault('end_date', today.isoformat())
+        for name in ('start_date', 'end_date'):
+            date.fromisoformat(normalized[name])  # ValueError on bad input
+    return normalized
+
+
+def params_hash(kind, export_format, params):
+    raw = json.dumps({'kind': kind, 'format': export_format, 'params': params}, sort_keys=True)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def request_export(kind, params=None, export_format=None, user=None):
+    """
+    Return ``(job, reused)``.  ``reused`` is True when a fresh finished file or
+    an in-flight job for the same parameters already exists.
+    """
+    if kind not in KIND_FORMATS:
+        raise ValueError(f'Unknown export kind: {kind}')
+    export_format = export_format or KIND_FORMATS[kind][0]
+    if export_format not in KIND_FORMATS[kind]:
+        raise ValueError(f'Unsupported format for {kind}: {export_format}')
+
+    params = normalize_params(kind, params or {})
+    digest = params_hash(kind, export_format, params)
+
+    now = timezone.now()
+    fail_dead_jobs(now)
+    candidates = ExportJob.objects.filter(params_hash=digest).filter(
+        Q(status__in=['pending', 'running'])
+        | Q(status='completed', finished_at__gte=now - timedelta(seconds=FRESHNESS_SECONDS))
+    )
+    for job in candidates.order_by('-created_at'):
+        if job.status != 'completed' or (job.file and job.file.storage.exists(job.file.name)):
+            return job, True
+
+    job = ExportJob.objects.create(
+        kind=kind,
+        export_format=export_format,
+        params=params,
+        params_hash=digest,
+        requested_by=user if user is not None and user.is_authenticated else None,
+    )
+    if not getattr(settings, 'EXPORT_JOBS_ASYNC', True):
+        run_job(job.pk)
+        job.refresh_from_db()
+    return job, False
+
+
+def fail_dead_jobs(now=None):
+    """Mark jobs whose worker died (or that no worker started) as failed; returns how many."""
+    now = now or timezone.now()
+    return ExportJob.objects.filter(
+        Q(status='running', heartbeat_at__lt=now - timedelta(seconds=HEARTBEAT_TIMEOUT))
+        | Q(status='pending', created_at__lt=now - timedelta(seconds=STALE_SECONDS))
+    ).update(status='failed', error='انقطع تنفيذ المهمة، يرجى طلب التصدير مرة أخرى', finished_at=now)
+
+
+def purge_expired(now=None):
+    """Delete the jobs requested more than ``RETENTION_SECONDS`` ago, and their files; returns how many."""
+    now = now or timezone.now()
+    expired = ExportJob.objects.filter(created_at__lt=now - timedelta(seconds=RETENTION_SECONDS)).exclude(
+        status__in=['pending', 'running']
+    )
+    deleted = 0
+    for job in expired.iterator():
+        if job.file:
+            job.file.delete(save=False)
+        job.delete()
+        deleted += 1
+    return deleted
+
+
+def _booking_filters(params):
+    filters = {'created_at__date__range': [params['start_date'], params['end_date']]}
+    for name, lookup in (('status', 'status'), ('staff_id', 'staff_id'), ('service_id', 'service_id')):
+        if name in params:
+            filters[lookup] = params[name]
+    return filters
+
+
+def _build_dataset(job):
+    params = job.params
+    if job.kind == 'bookings':
+        return bookings_dataset(_booking_filters(params))
+    if job.kind == 'customers':
+        return customers_dataset()
+    if job.kind == 'services':
+        return services_dataset()
+    if job.kind == 'revenue':
+        return revenue_dataset(date.fromisoformat(params['start_date']), date.fromisoformat(params['end_date']))
+    raise ValueError(f'{job.kind} is not a tabular export')
+
+
+def _with_progress(job, dataset):
+    """Wrap the dataset rows so progress is written every PROGRESS_STEP percent."""
+    total = max(dataset.total, 1)
+
+    def rows():
+        reported = 0
+        beat = time.monotonic()
+        for count, values in enumerate(dataset.rows(), 1):
+            yield values
+            percent = min(99, count * 100 // total)
+            if percent >= reported + PROGRESS_STEP or time.monotonic() - beat >= HEARTBEAT_SECONDS:
+                reported = max(reported, percent)
+                beat = time.monotonic()
+                ExportJob.objects.filter(pk=job.pk).update(progress=reported, heartbeat_at=timezone.now())
+
+    return replace(dataset, rows=rows)
+
+
+def _write_artifact(job, fileobj):
+    if job.kind == 'dashboard':
+        params = job.params
+        data = dashboard_export_data(date.fromisoformat(params['start_date']), date.fromisoformat(params['end_date']))
+        fileobj.write(json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False).encode('utf-8'))
+        return 0
+
+    dataset = _build_dataset(job)
+    ExportJob.objects.filter(pk=job.pk).update(total_rows=dataset.total)
+    dataset = _with_progress(job, dataset)
+    if job.export_format == 'xlsx':
+        write_xlsx(dataset, fileobj)
+    else:
+        for chunk in iter_csv(dataset):
+            fileobj.write(chunk.encode('utf-8'))
+    return dataset.total
+
+
+def run_job(job_id):
+    """Generate the file of one job (unless another worker claimed it)."""
+    now = timezone.now()
+    claimed = ExportJob.objects.filter(pk=job_id, status='pending').update(
+        status='running', started_at=now, heartbeat_at=now, progress=0
+    )
+    if not claimed:
+        return
+    job = ExportJob.objects.get(pk=job_id)
+    try:
+        with tempfile.TemporaryFile() as fileobj:
+            total_rows = _write_artifact(job, fileobj)
+            fileobj.seek(0)
+            # Random suffix: the hash alone is predictable from the filters
+            name = f'{job.kind}_{job.params_hash[:16]}_{secrets.token_hex(8)}.{job.export_format}'
+            job.file.save(name, File(fileobj), save=False)
+        # Only if still ours: a job failed as dead in the meantime stays failed
+        completed = ExportJob.objects.filter(pk=job_id, status='running').update(
+            file=job.file.name, status='completed', progress=100, total_rows=total_rows,
+            heartbeat_at=timezone.now(), finished_at=timezone.now(),
+        )
+        if not completed:
+            job.file.delete(save=False)
+    except Exception as e:
+        logger.exception(f'Export job {job_id} failed')
+        ExportJob.objects.filter(pk=job_id).update(
+            status='failed', error=str(e), finished_at=timezone.now()
+        )
+
+
+def process_pending(limit=None):
+    """Run pending jobs, oldest first; returns how many were run."""
+    run = 0
+    while limit is None or run < limit:
+        job_id = ExportJob.objects.filter(status='pending').order_by('created_at', 'id').values_list(
+            'pk', flat=True
+        ).first()
+        if job_id is None:
+            break
+        run_job(job_id)
+        run += 1
+    return run
@@ -1,25 +1,30 @@
-from django.http import HttpResponse, JsonResponse
+from django.http import JsonResponse, FileResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
-from django.db.models import Sum, Count
+from django.db.models import Count
 from django.contrib.auth.decorators import login_required
 from django.utils.decorators import method_decorator
 from django.views.decorators.http import require_http_methods
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
 from rest_framework import status
 import io
 import json
 from datetime import datetime, timedelta
 # PDF imports removed - keeping only Excel functionality
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.utils import get_column_letter
 from .models import (
-    Booking, Customer, Service, Staff, Category, Coupon, 
+    Staff, Category, Coupon, 
     Testimonial, Offer, ContactInfo
 )
+from django.urls import reverse
+from .export_jobs import fail_dead_jobs, request_export
+from . import reporting
+from .models import ExportJob
+from .exports import (
+    bookings_dataset, customers_dataset, services_dataset, revenue_dataset,
+    dashboard_export_data, xlsx_response, csv_response
+)
 
 
 class ExportMixin:
@@ -74,96 +79,24 @@ class ExportMixin:
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def export_bookings_excel(request):
-    """Export bookings to Excel"""
+    """Export bookings to Excel (streamed, constant memory)"""
     try:
-        # Get filters
         export_mixin = ExportMixin()
         filters = export_mixin.get_queryset_filters(request)
+        return xlsx_response(bookings_dataset(filters))
         
-        # Get bookings
-        bookings = Booking.objects.filter(**filters).select_related(
-            'customer', 'service', 'staff'
-        ).order_by('-created_at')
-        
-        # Create Excel workbook
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "تقرير الحجوزات"
-        
-        # Define styles
-        header_font = Font(bold=True, color="FFFFFF")
-        header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-        header_alignment = Alignment(horizontal="center", vertical="center")
-        
-        # Title
-        ws.merge_cells('A1:H1')
-        ws['A1'] = f"تقرير الحجوزات - صالون الجمال - {timezone.now().strftime('%Y-%m-%d %H:%M')}"
-        ws['A1'].font = Font(bold=True, size=16)
-        ws['A1'].alignment = Alignment(horizontal="center")
-        
-        # Summary statistics
-        total_bookings = bookings.count()
-        total_revenue = bookings.aggregate(total=Sum('final_price'))['total'] or 0
-        pending_bookings = bookings.filter(status='pending').count()
-        completed_bookings = bookings.filter(status='completed').count()
-        
-        ws['A3'] = "إجمالي الحجوزات:"
-        ws['B3'] = total_bookings
-        ws['A4'] = "إجمالي الإيرادات:"
-        ws['B4'] = f"{total_revenue:.2f} ريال"
-        ws['A5'] = "الحجوزات المعلقة:"
-        ws['B5'] = pending_bookings
-        ws['A6'] = "الحجوزات المكتملة:"
-        ws['B6'] = completed_bookings
-        
-        # Headers
-        headers = ['رقم الحجز', 'اسم العميل', 'البريد الإلكتروني', 'رقم الهاتف', 'الخدمة', 'الفئة', 'الموظف', 'التاريخ', 'الوقت', 'الحالة', 'السعر الأصلي', 'مبلغ الخصم', 'السعر النهائي', 'طريقة الدفع', 'تاريخ الإنشاء']
-        
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=8, column=col, value=header)
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = header_alignment
-        
-        # Data rows
-        for row, booking in enumerate(bookings, 9):
-            ws.cell(row=row, column=1, value=booking.id)
-            ws.cell(row=row, column=2, value=booking.customer.name)
-            ws.cell(row=row, column=3, value=booking.customer.email)
-            ws.cell(row=row, column=4, value=booking.customer.phone)
-            ws.cell(row=row, column=5, value=booking.service.name)
-            ws.cell(row=row, column=6, value=booking.service.category.name)
-            ws.cell(row=row, column=7, value=booking.staff.name if booking.staff else 'غير محدد')
-            ws.cell(row=row, column=8, value=booking.booking_date.strftime('%Y-%m-%d'))
-            ws.cell(row=row, column=9, value=booking.booking_time.strftime('%H:%M'))
-            ws.cell(row=row, column=10, value=booking.get_status_display())
-            ws.cell(row=row, column=11, value=float(booking.price))
-            ws.cell(row=row, column=12, value=float(booking.discount_amount))
-            ws.cell(row=row, column=13, value=float(booking.final_price))
-            ws.cell(row=row, column=14, value=booking.get_payment_method_display())
-            ws.cell(row=row, column=15, value=booking.created_at.strftime('%Y-%m-%d %H:%M'))
-        
-        # Auto-adjust column widths
-        for column in ws.columns:
-            max_length = 0
-            column_letter = get_column_letter(column[0].column)
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            ws.column_dimensions[column_letter].width = adjusted_width
-        
-        # Create response
-        response = HttpResponse(
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        response['Content-Disposition'] = f'attachment; filename="bookings_export_{timezone.now().strftime("%Y%m%d_%H%M%S")}.xlsx"'
-        
-        wb.save(response)
-        return response
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def export_bookings_csv(request):
+    """Export bookings to CSV (streamed)"""
+    try:
+        export_mixin = ExportMixin()
+        filters = export_mixin.get_queryset_filters(request)
+        return csv_response(bookings_dataset(filters))
         
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
@@ -175,78 +108,20 @@ def export_bookings_excel(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def export_customers_excel(request):
-    """Export customers to Excel"""
+    """Export customers to Excel (streamed, constant memory)"""
     try:
-        # Get customers
-        customers = Customer.objects.all().order_by('-created_at')
-        
-        # Create Excel workbook
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "تقرير العملاء"
-        
-        # Define styles
-        header_font = Font(bold=True, color="FFFFFF")
-        header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-        header_alignment = Alignment(horizontal="center", vertical="center")
-        
-        # Title
-        ws.merge_cells('A1:G1')
-        ws['A1'] = f"تقرير العملاء - صالون الجمال - {timezone.now().strftime('%Y-%m-%d %H:%M')}"
-        ws['A1'].font = Font(bold=True, size=16)
-        ws['A1'].alignment = Alignment(horizontal="center")
-        
-        # Summary statistics
-        total_customers = customers.count()
-        active_customers = customers.filter(is_active=True).count()
-        
-        ws['A3'] = "إجمالي العملاء:"
-        ws['B3'] = total_customers
-        ws['A4'] = "العملاء النشطون:"
-        ws['B4'] = active_customers
-        ws['A5'] = "العملاء غير النشطين:"
-        ws['B5'] = total_customers - active_customers
+        return xlsx_response(customers_dataset())
         
-        # Headers
-        headers = ['رقم العميل', 'الاسم', 'البريد الإلكتروني', 'رقم الهاتف', 'تاريخ الميلاد', 'الحالة', 'تاريخ التسجيل']
-        
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=7, column=col, value=header)
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = header_alignment
-        
-        # Data rows
-        for row, customer in enumerate(customers, 8):
-            ws.cell(row=row, column=1, value=customer.id)
-            ws.cell(row=row, column=2, value=customer.name)
-            ws.cell(row=row, column=3, value=customer.email)
-            ws.cell(row=row, column=4, value=customer.phone)
-            ws.cell(row=row, column=5, value=customer.date_of_birth.strftime('%Y-%m-%d') if customer.date_of_birth else 'غير محدد')
-            ws.cell(row=row, column=6, value='نشط' if customer.is_active else 'غير نشط')
-            ws.cell(row=row, column=7, value=customer.created_at.strftime('%Y-%m-%d'))
-        
-        # Auto-adjust column widths
-        for column in ws.columns:
-            max_length = 0
-            column_letter = get_column_letter(column[0].column)
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            ws.column_dimensions[column_letter].width = adjusted_width
-        
-        # Create response
-        response = HttpResponse(
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        response['Content-Disposition'] = f'attachment; filename="customers_export_{timezone.now().strftime("%Y%m%d_%H%M%S")}.xlsx"'
-        
-        wb.save(response)
-        return response
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def export_customers_csv(request):
+    """Export customers to CSV (streamed)"""
+    try:
+        return csv_response(customers_dataset())
         
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
@@ -258,79 +133,20 @@ def export_customers_excel(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def export_services_excel(request):
-    """Export services to Excel"""
+    """Export services to Excel (streamed, constant memory)"""
     try:
-        # Get services
-        services = Service.objects.filter(is_active=True).order_by('name')
-        
-        # Create Excel workbook
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "تقرير الخدمات"
+        return xlsx_response(services_dataset())
         
-        # Define styles
-        header_font = Font(bold=True, color="FFFFFF")
-        header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-        header_alignment = Alignment(horizontal="center", vertical="center")
-        
-        # Title
-        ws.merge_cells('A1:G1')
-        ws['A1'] = f"تقرير الخدمات - صالون الجمال - {timezone.now().strftime('%Y-%m-%d %H:%M')}"
-        ws['A1'].font = Font(bold=True, size=16)
-        ws['A1'].alignment = Alignment(horizontal="center")
-        
-        # Summary statistics
-        total_services = services.count()
-        featured_services = services.filter(is_featured=True).count()
-        
-        ws['A3'] = "إجمالي الخدمات:"
-        ws['B3'] = total_services
-        ws['A4'] = "الخدمات المميزة:"
-        ws['B4'] = featured_services
-        ws['A5'] = "الخدمات العادية:"
-        ws['B5'] = total_services - featured_services
-        
-        # Headers
-        headers = ['رقم الخدمة', 'اسم الخدمة', 'اسم الخدمة (إنجليزي)', 'الفئة', 'السعر', 'المدة', 'مميزة', 'تاريخ الإنشاء']
-        
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=7, column=col, value=header)
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = header_alignment
-        
-        # Data rows
-        for row, service in enumerate(services, 8):
-            ws.cell(row=row, column=1, value=service.id)
-            ws.cell(row=row, column=2, value=service.name)
-            ws.cell(row=row, column=3, value=service.name_en)
-            ws.cell(row=row, column=4, value=service.category.name)
-            ws.cell(row=row, column=5, value=float(service.price))
-            ws.cell(row=row, column=6, value=service.duration)
-            ws.cell(row=row, column=7, value='نعم' if service.is_featured else 'لا')
-            ws.cell(row=row, column=8, value=service.created_at.strftime('%Y-%m-%d'))
-        
-        # Auto-adjust column widths
-        for column in ws.columns:
-            max_length = 0
-            column_letter = get_column_letter(column[0].column)
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            ws.column_dimensions[column_letter].width = adjusted_width
-        
-        # Create response
-        response = HttpResponse(
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        response['Content-Disposition'] = f'attachment; filename="services_export_{timezone.now().strftime("%Y%m%d_%H%M%S")}.xlsx"'
-        
-        wb.save(response)
-        return response
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def export_services_csv(request):
+    """Export services to CSV (streamed)"""
+    try:
+        return csv_response(services_dataset())
         
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
@@ -344,102 +160,9 @@ def export_services_excel(request):
 def export_revenue_report_excel(request):
     """Export revenue report to Excel"""
     try:
-        # Get date range
         export_mixin = ExportMixin()
         start_date, end_date = export_mixin.get_date_range(request)
-        
-        # Get bookings in date range
-        bookings = Booking.objects.filter(
-            booking_date__range=[start_date, end_date]
-        ).select_related('service')
-        
-        # Calculate revenue statistics
-        total_revenue = bookings.aggregate(total=Sum('final_price'))['total'] or 0
-        total_discounts = bookings.aggregate(total=Sum('discount_amount'))['total'] or 0
-        total_bookings = bookings.count()
-        avg_booking_value = total_revenue / total_bookings if total_bookings > 0 else 0
-        
-        # Revenue by service category
-        revenue_by_category = {}
-        for booking in bookings:
-            category_name = booking.service.category.name
-            if category_name not in revenue_by_category:
-                revenue_by_category[category_name] = 0
-            revenue_by_category[category_name] += float(booking.final_price)
-        
-        # Create Excel workbook
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "تقرير الإيرادات"
-        
-        # Define styles
-        header_font = Font(bold=True, color="FFFFFF")
-        header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-        header_alignment = Alignment(horizontal="center", vertical="center")
-        
-        # Title
-        ws.merge_cells('A1:B1')
-        ws['A1'] = f"تقرير الإيرادات - صالون الجمال - {start_date} إلى {end_date}"
-        ws['A1'].font = Font(bold=True, size=16)
-        ws['A1'].alignment = Alignment(horizontal="center")
-        
-        # Summary statistics
-        ws['A3'] = "إجمالي الإيرادات:"
-        ws['B3'] = f"{total_revenue:.2f} ريال"
-        ws['A4'] = "إجمالي الخصومات:"
-        ws['B4'] = f"{total_discounts:.2f} ريال"
-        ws['A5'] = "عدد الحجوزات:"
-        ws['B5'] = total_bookings
-        ws['A6'] = "متوسط قيمة الحجز:"
-        ws['B6'] = f"{avg_booking_value:.2f} ريال"
-        
-        # Revenue by category
-        if revenue_by_category:
-            ws['A8'] = "الإيرادات حسب الفئة:"
-            ws['A8'].font = Font(bold=True, size=14)
-            
-            # Headers
-            ws['A9'] = "الفئة"
-            ws['B9'] = "الإيرادات"
-            
-            for col in [9]:
-                cell = ws.cell(row=col, column=1)
-                cell.font = header_font
-                cell.fill = header_fill
-                cell.alignment = header_alignment
-                cell = ws.cell(row=col, column=2)
-                cell.font = header_font
-                cell.fill = header_fill
-                cell.alignment = header_alignment
-            
-            # Data
-            row = 10
-            for category, revenue in revenue_by_category.items():
-                ws.cell(row=row, column=1, value=category)
-                ws.cell(row=row, column=2, value=f"{revenue:.2f} ريال")
-                row += 1
-        
-        # Auto-adjust column widths
-        for column in ws.columns:
-            max_length = 0
-            column_letter = get_column_letter(column[0].column)
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            ws.column_dimensions[column_letter].width = adjusted_width
-        
-        # Create response
-        response = HttpResponse(
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        response['Content-Disposition'] = f'attachment; filename="revenue_report_{timezone.now().strftime("%Y%m%d_%H%M%S")}.xlsx"'
-        
-        wb.save(response)
-        return response
+        return xlsx_response(revenue_dataset(start_date, end_date))
         
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
@@ -450,74 +173,114 @@ def export_revenue_report_excel(request):
 def export_dashboard_data(request):
     """Export comprehensive dashboard data"""
     try:
-        # Get date range
         export_mixin = ExportMixin()
         start_date, end_date = export_mixin.get_date_range(request)
-        
-        # Get comprehensive data
-        bookings = Booking.objects.filter(
-            booking_date__range=[start_date, end_date]
-        ).select_related('customer', 'service', 'staff')
-        
-        customers = Customer.objects.filter(
-            created_at__date__range=[start_date, end_date]
-        )
-        
-        # Calculate statistics
-        stats = {
-            'total_bookings': bookings.count(),
-            'total_revenue': bookings.aggregate(total=Sum('final_price'))['total'] or 0,
-            'total_customers': customers.count(),
-            'avg_booking_value': 0,
-            'bookings_by_status': {},
-            'revenue_by_category': {},
-            'bookings_by_staff': {},
-            'daily_revenue': {}
-        }
-        
-        # Calculate average booking value
-        if stats['total_bookings'] > 0:
-            stats['avg_booking_value'] = stats['total_revenue'] / stats['total_bookings']
-        
-        # Bookings by status
-        for status_choice in Booking.STATUS_CHOICES:
-            status_code = status_choice[0]
-            count = bookings.filter(status=status_code).count()
-            stats['bookings_by_status'][status_choice[1]] = count
-        
-        # Revenue by category
-        for booking in bookings:
-            category_name = booking.service.category.name
-            if category_name not in stats['revenue_by_category']:
-                stats['revenue_by_category'][category_name] = 0
-            stats['revenue_by_category'][category_name] += float(booking.final_price)
-        
-        # Bookings by staff
-        for booking in bookings:
-            staff_name = booking.staff.name if booking.staff else 'غير محدد'
-            if staff_name not in stats['bookings_by_staff']:
-                stats['bookings_by_staff'][staff_name] = 0
-            stats['bookings_by_staff'][staff_name] += 1
-        
-        # Daily revenue
-        current_date = start_date
-        while current_date <= end_date:
-            daily_bookings = bookings.filter(booking_date=current_date)
-            daily_revenue = daily_bookings.aggregate(total=Sum('final_price'))['total'] or 0
-            stats['daily_revenue'][current_date.strftime('%Y-%m-%d')] = {
-                'bookings': daily_bookings.count(),
-                'revenue': float(daily_revenue)
-            }
-            current_date += timedelta(days=1)
-        
-        return JsonResponse({
-            'success': True,
-            'data': stats,
-            'date_range': {
-                'start_date': start_date.strftime('%Y-%m-%d'),
-                'end_date': end_date.strftime('%Y-%m-%d')
-            }
-        })
+        return JsonResponse(dashboard_export_data(start_date, end_date))
         
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def revenue_report_api(request):
+    """
+    Revenue report as JSON.
+    Query params: start_date, end_date (YYYY-MM-DD, default last 30 days),
+    group_by (comma separated: category,service,staff,day,week - default all),
+    status, staff_id, service_id.
+    """
+    try:
+        export_mixin = ExportMixin()
+        start_date, end_date = export_mixin.get_date_range(request)
+    except ValueError:
+        return Response({'error': 'صيغة التاريخ غير صحيحة، استخدم YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+    if start_date > end_date:
+        return Response({'error': 'تاريخ البداية يجب أن يكون قبل تاريخ النهاية'}, status=status.HTTP_400_BAD_REQUEST)
+
+    group_by = request.GET.get('group_by')
+    group_by = [name.strip() for name in group_by.split(',') if name.strip()] if group_by else list(reporting.GROUPINGS)
+    unknown = [name for name in group_by if name not in reporting.GROUPINGS]
+    if unknown:
+        return Response({
+            'error': f"group_by غير مدعوم: {', '.join(unknown)}",
+            'allowed': list(reporting.GROUPINGS),
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    report = reporting.revenue_report(
+        start_date, end_date, group_by,
+        status=request.GET.get('status'),
+        staff_id=request.GET.get('staff_id'),
+        service_id=request.GET.get('service_id'),
+    )
+    return Response(report)
+
+
+# ============================
+# Background export jobs
+# ============================
+
+def _export_job_data(request, job):
+    """Serialize an export job for the polling endpoints"""
+    data = {
+        'id': job.id,
+        'kind': job.kind,
+        'format': job.export_format,
+        'params': job.params,
+        'status': job.status,
+        'progress': job.progress,
+        'total_rows': job.total_rows,
+        'error': job.error,
+        'created_at': job.created_at,
+        'finished_at': job.finished_at,
+        'status_url': request.build_absolute_uri(reverse('salon:export-job-detail', args=[job.id])),
+        'download_url': None,
+    }
+    if job.status == 'completed':
+        data['download_url'] = request.build_absolute_uri(reverse('salon:export-job-download', args=[job.id]))
+    return data
+
+
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def export_job_create(request):
+    """
+    Start (or reuse) a background export.
+    Body: kind (bookings|customers|services|revenue|dashboard), format (xlsx|csv|json)
+    and the same filters as the synchronous exports (start_date, end_date, status, staff_id, service_id).
+    """
+    kind = request.data.get('kind')
+    params = {key: request.data.get(key) for key in ('start_date', 'end_date', 'status', 'staff_id', 'service_id')}
+    try:
+        job, reused = request_export(kind, params, request.data.get('format'), request.user)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    data = _export_job_data(request, job)
+    data['reused'] = reused
+    code = status.HTTP_200_OK if job.status == 'completed' else status.HTTP_202_ACCEPTED
+    return Response(data, status=code)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def export_job_detail(request, job_id):
+    """Poll the status / progress of an export job"""
+    fail_dead_jobs()
+    job = get_object_or_404(ExportJob, pk=job_id)
+    return Response(_export_job_data(request, job))
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def export_job_download(request, job_id):
+    """Download the file of a completed export job"""
+    job = get_object_or_404(ExportJob, pk=job_id)
+    if job.status != 'completed' or not job.file:
+        return Response({'error': 'الملف غير جاهز بعد'}, status=status.HTTP_409_CONFLICT)
+    try:
+        fileobj = job.file.open('rb')
+    except FileNotFoundError:
+        return Response({'error': 'الملف لم يعد متاحاً'}, status=status.HTTP_410_GONE)
+    filename = f'{job.kind}_export_{job.finished_at.strftime("%Y%m%d_%H%M%S")}.{job.export_format}'
+    return FileResponse(fileobj, as_attachment=True, filename=filename)
@@ -0,0 +1,342 @@
+"""
+Streaming export engine used by export_views.
+
+Rows are read with ``values()`` + ``.iterator(chunk_size=...)`` so a queryset
+is never materialised as model instances, and written out as they arrive:
+
+* xlsx through xlsxwriter in ``constant_memory`` mode (each row is flushed to
+  disk once the next one starts) into a temporary file that is then streamed
+  to the client with ``FileResponse``;
+* CSV through a ``StreamingHttpResponse`` generator.
+
+Column widths are tracked while rows are written, so there is no second pass
+over the sheet.
+"""
+import csv
+import tempfile
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, List, Sequence, Tuple
+
+import xlsxwriter
+from django.conf import settings
+from django.db.models import Count, Q, Sum
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+
+from . import reporting
+from .models import Booking, Category, Customer, Service
+
+EXPORT_CHUNK_SIZE = getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+MAX_COLUMN_WIDTH = 50
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+@dataclass
+class Dataset:
+    """A titled table: summary lines on top, then a header row and data rows."""
+    name: str
+    sheet_title: str
+    title: str
+    headers: Sequence[str]
+    rows: Callable[[], Iterable[Sequence]]
+    summary: List[Tuple[str, object]] = field(default_factory=list)
+    # Expected number of data rows (used for progress reporting)
+    total: int = 0
+
+    def filename(self, extension):
+        return f'{self.name}_{timezone.now().strftime("%Y%m%d_%H%M%S")}.{extension}'
+
+
+class ColumnWidths:
+    """Running maximum of the rendered width of every column."""
+
+    def __init__(self):
+        self.widths = {}
+
+    def update(self, values):
+        for col, value in enumerate(values):
+            length = len(str(value)) if value is not None else 0
+            if length > self.widths.get(col, 0):
+                self.widths[col] = length
+
+    def apply(self, worksheet):
+        for col, length in self.widths.items():
+            worksheet.set_column(col, col, min(length + 2, MAX_COLUMN_WIDTH))
+
+
+def write_xlsx(dataset, fileobj):
+    """Write ``dataset`` as a single-sheet workbook into ``fileobj``."""
+    workbook = xlsxwriter.Workbook(fileobj, {'constant_memory': True, 'in_memory': False})
+    try:
+        worksheet = workbook.add_worksheet(dataset.sheet_title[:31])
+        title_format = workbook.add_format({'bold': True, 'font_size': 16, 'align': 'center'})
+        header_format = workbook.add_format({
+            'bold': True, 'font_color': '#FFFFFF', 'bg_color': '#366092',
+            'align': 'center', 'valign': 'vcenter',
+        })
+        widths = ColumnWidths()
+
+        # Rows must be written top to bottom in constant_memory mode
+        worksheet.merge_range(0, 0, 0, max(len(dataset.headers) - 1, 1), dataset.title, title_format)
+        row = 2
+        for label, value in dataset.summary:
+            worksheet.write_row(row, 0, (label, value))
+            widths.update((label, value))
+            row += 1
+
+        row += 1
+        worksheet.write_row(row, 0, dataset.headers, header_format)
+        widths.update(dataset.headers)
+
+        for values in dataset.rows():
+            row += 1
+            worksheet.write_row(row, 0, values)
+            widths.update(values)
+
+        widths.apply(worksheet)
+    finally:
+        workbook.close()
+
+
+def xlsx_response(dataset):
+    """Build the workbook in a temporary file and stream it back in chunks."""
+    fileobj = tempfile.TemporaryFile()
+    try:
+        write_xlsx(dataset, fileobj)
+    except Exception:
+        fileobj.close()
+        raise
+    fileobj.seek(0)
+    return FileResponse(
+        fileobj,
+        as_attachment=True,
+        filename=dataset.filename('xlsx'),
+        content_type=XLSX_CONTENT_TYPE,
+    )
+
+
+class _Echo:
+    """File-like object whose write() just hands the line back to csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(dataset):
+    writer = csv.writer(_Echo())
+    # BOM so Excel opens the Arabic text as UTF-8
+    yield '\ufeff'
+    yield writer.writerow(dataset.headers)
+    for values in dataset.rows():
+        yield writer.writerow(values)
+
+
+def csv_response(dataset):
+    response = StreamingHttpResponse(iter_csv(dataset), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{dataset.filename("csv")}"'
+    return response
+
+
+def _format_date(value, fmt='%Y-%m-%d'):
+    return value.strftime(fmt) if value else 'غير محدد'
+
+
+def service_category_names():
+    """``{service_id: first category name}`` in one query (Service.category is a per-row query)."""
+    through = Service.categories.through
+    ordering = [f'category__{name}' for name in Category._meta.ordering]
+    names = {}
+    for service_id, category_name in (
+        through.objects.order_by('service_id', *ordering).values_list('service_id', 'category__name')
+    ):
+        names.setdefault(service_id, category_name)
+    return names
+
+
+# ---------------------------------------------------------------------------
+# Datasets
+# ---------------------------------------------------------------------------
+
+def bookings_dataset(filters):
+    bookings = Booking.objects.filter(**filters)
+    summary = bookings.order_by().aggregate(
+        total=Count('id'),
+        revenue=Sum('final_price'),
+        pending=Count('id', filter=Q(status='pending')),
+        completed=Count('id', filter=Q(status='completed')),
+    )
+    status_labels = dict(Booking.STATUS_CHOICES)
+    payment_labels = dict(Booking.PAYMENT_METHODS)
+
+    def rows():
+        categories = service_category_names()
+        values = bookings.order_by('-created_at').values_list(
+            'id', 'customer__name', 'customer__email', 'customer__phone',
+            'service_id', 'service__name', 'staff__name', 'booking_date', 'booking_time',
+            'status', 'price', 'discount_amount', 'final_price', 'payment_method', 'created_at',
+        )
+        for (pk, customer_name, email, phone, service_id, service_name, staff_name, booking_date,
+             booking_time, status, price, discount, final_price, payment_method, created_at) in (
+            values.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        ):
+            yield (
+                pk, customer_name, email, phone, service_name,
+                categories.get(service_id, 'بدون فئة'),
+                staff_name or 'غير محدد',
+                booking_date.strftime('%Y-%m-%d'),
+                booking_time.strftime('%H:%M'),
+                status_labels.get(status, status),
+                float(price), float(discount), float(final_price),
+                payment_labels.get(payment_method, payment_method),
+                created_at.strftime('%Y-%m-%d %H:%M'),
+            )
+
+    return Dataset(
+        name='bookings_export',
+        sheet_title='تقرير الحجوزات',
+        title=f"تقرير الحجوزات - صالون الجمال - {timezone.now().strftime('%Y-%m-%d %H:%M')}",
+        summary=[
+            ('إجمالي الحجوزات:', summary['total']),
+            ('إجمالي الإيرادات:', f"{summary['revenue'] or 0:.2f} ريال"),
+            ('الحجوزات المعلقة:', summary['pending']),
+            ('الحجوزات المكتملة:', summary['completed']),
+        ],
+        total=summary['total'],
+        headers=[
+            'رقم الحجز', 'اسم العميل', 'البريد الإلكتروني', 'رقم الهاتف', 'الخدمة', 'الفئة',
+            'الموظف', 'التاريخ', 'الوقت', 'الحالة', 'السعر الأصلي', 'مبلغ الخصم',
+            'السعر النهائي', 'طريقة الدفع', 'تاريخ الإنشاء',
+        ],
+        rows=rows,
+    )
+
+
+def customers_dataset():
+    customers = Customer.objects.all()
+    summary = customers.order_by().aggregate(
+        total=Count('id'),
+        active=Count('id', filter=Q(is_active=True)),
+    )
+
+    def rows():
+        values = customers.order_by('-created_at').values_list(
+            'id', 'name', 'email', 'phone', 'date_of_birth', 'is_active', 'created_at',
+        )
+        for pk, name, email, phone, date_of_birth, is_active, created_at in values.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            yield (
+                pk, name, email, phone,
+                _format_date(date_of_birth),
+                'نشط' if is_active else 'غير نشط',
+                created_at.strftime('%Y-%m-%d'),
+            )
+
+    return Dataset(
+        name='customers_export',
+        sheet_title='تقرير العملاء',
+        title=f"تقرير العملاء - صالون الجمال - {timezone.now().strftime('%Y-%m-%d %H:%M')}",
+        summary=[
+            ('إجمالي العملاء:', summary['total']),
+            ('العملاء النشطون:', summary['active']),
+            ('العملاء غير النشطين:', summary['total'] - summary['active']),
+        ],
+        total=summary['total'],
+        headers=['رقم العميل', 'الاسم', 'البريد الإلكتروني', 'رقم الهاتف', 'تاريخ الميلاد', 'الحالة', 'تاريخ التسجيل'],
+        rows=rows,
+    )
+
+
+def services_dataset():
+    services = Service.objects.filter(is_active=True)
+    summary = services.order_by().aggregate(
+        total=Count('id'),
+        featured=Count('id', filter=Q(is_featured=True)),
+    )
+
+    def rows():
+        categories = service_category_names()
+        values = services.order_by('name').values_list(
+            'id', 'name', 'name_en', 'price', 'duration', 'is_featured', 'created_at',
+        )
+        for pk, name, name_en, price, duration, is_featured, created_at in values.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            yield (
+                pk, name, name_en,
+                categories.get(pk, 'بدون فئة'),
+                float(price), duration,
+                'نعم' if is_featured else 'لا',
+                created_at.strftime('%Y-%m-%d'),
+            )
+
+    return Dataset(
+        name='services_export',
+        sheet_title='تقرير الخدمات',
+        title=f"تقرير الخدمات - صالون الجمال - {timezone.now().strftime('%Y-%m-%d %H:%M')}",
+        summary=[
+            ('إجمالي الخدمات:', summary['total']),
+            ('الخدمات المميزة:', summary['featured']),
+            ('الخدمات العادية:', summary['total'] - summary['featured']),
+        ],
+        total=summary['total'],
+        headers=['رقم الخدمة', 'اسم الخدمة', 'اسم الخدمة (إنجليزي)', 'الفئة', 'السعر', 'المدة', 'مميزة', 'تاريخ الإنشاء'],
+        rows=rows,
+    )
+
+
+def revenue_dataset(start_date, end_date):
+    bookings = reporting.bookings_in_range(start_date, end_date)
+    totals = reporting.summary(bookings)
+    by_category = reporting.revenue_by_category(bookings)
+
+    def rows():
+        for row in by_category:
+            yield (row['name'], f"{row['revenue']:.2f} ريال")
+
+    return Dataset(
+        name='revenue_report',
+        sheet_title='تقرير الإيرادات',
+        title=f"تقرير الإيرادات - صالون الجمال - {start_date} إلى {end_date}",
+        summary=[
+            ('إجمالي الإيرادات:', f"{totals['revenue']:.2f} ريال"),
+            ('إجمالي الخصومات:', f"{totals['discounts']:.2f} ريال"),
+            ('عدد الحجوزات:', totals['bookings']),
+            ('متوسط قيمة الحجز:', f"{totals['avg_booking_value']:.2f} ريال"),
+        ],
+        headers=['الفئة', 'الإيرادات'],
+        rows=rows,
+        total=len(by_category),
+    )
+
+
+def dashboard_export_data(start_date, end_date):
+    """Comprehensive dashboard figures for a date range (JSON export)"""
+    bookings = reporting.bookings_in_range(start_date, end_date)
+    totals = reporting.summary(bookings)
+    status_labels = dict(Booking.STATUS_CHOICES)
+
+    stats = {
+        'total_bookings': totals['bookings'],
+        'total_revenue': totals['revenue'],
+        'total_customers': Customer.objects.filter(created_at__date__range=[start_date, end_date]).count(),
+        'avg_booking_value': totals['avg_booking_value'],
+        'bookings_by_status': {
+            status_labels[code]: count for code, count in reporting.bookings_by_status(bookings).items()
+        },
+        'revenue_by_category': {
+            row['name']: row['revenue'] for row in reporting.revenue_by_category(bookings)
+        },
+        'bookings_by_staff': {
+            row['name']: row['bookings'] for row in reporting.revenue_by_staff(bookings)
+        },
+        'daily_revenue': {
+            row['date']: {'bookings': row['bookings'], 'revenue': row['revenue']}
+            for row in reporting.revenue_by_day(bookings, start_date, end_date)
+        },
+    }
+
+    return {
+        'success': True,
+        'data': stats,
+        'date_range': {
+            'start_date': start_date.strftime('%Y-%m-%d'),
+            'end_date': end_date.strftime('%Y-%m-%d')
+        }
+    }
@@ -0,0 +1,229 @@
+"""
+Responsive image variants of uploaded media.
+
+Uploads are served at their original size, often multi-MB photos.  After an
+image field is saved, its resized WebP variants (``IMAGE_VARIANT_WIDTHS``,
+never wider than the original) are generated in a small thread pool once
+the transaction commits, and stored next to the original:
+
+    services/facial.jpg  ->  services/facial.w320.webp, services/facial.w640.webp, ...
+
+``srcset()`` turns a field file into a ``srcset`` attribute value (the
+variants plus the original); the serializers expose it as
+``<field>_srcset``.  Which variants exist is kept in Django's cache per file
+name (checked against the storage on a miss), so serializing costs no
+storage access.  When a row's variants are written its ``updated_at`` is
+touched and its catalog sections invalidated, so cached responses pick up
+the new ``srcset``.
+
+Existing media is backfilled with ``manage.py generate_image_variants``.
+"""
+import io
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from . import catalog_cache
+
+logger = logging.getLogger(__name__)
+
+# model label -> image fields with variants
+IMAGE_FIELDS = {
+    'salon.HeroImage': ('image',),
+    'salon.Service': ('image',),
+    'salon.Staff': ('image',),
+    'salon.Offer': ('image', 'thumbnail'),
+    'salon.Testimonial': ('customer_image',),
+    'salon.BlogPost': ('featured_image',),
+}
+
+# model label -> catalog sections whose cached payloads carry its images
+CATALOG_SECTIONS = {
+    'salon.HeroImage': ('hero_images',),
+    'salon.Service': ('services', 'categories', 'staff'),
+    'salon.Staff': ('staff',),
+    'salon.Offer': ('offers',),
+    'salon.Testimonial': ('testimonials',),
+    'salon.BlogPost': (),
+}
+
+WIDTHS = tuple(sorted(getattr(settings, 'IMAGE_VARIANT_WIDTHS', (320, 640, 960, 1280, 1920))))
+QUALITY = getattr(settings, 'IMAGE_VARIANT_QUALITY', 80)
+
+# Manifest lifetime while variants are still missing (being generated or
+# failed); complete manifests are kept until evicted
+PENDING_MANIFEST_TIMEOUT = 300
+
+_VARIANT_NAME = re.compile(r'\.w\d+\.webp$')
+
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'IMAGE_VARIANT_WORKERS', 2),
+    thread_name_prefix='image-variants',
+)
+
+
+def variant_name(name, width):
+    """Storage name of a variant: ``hero/banner.jpg`` -> ``hero/banner.w640.webp``."""
+    root, _extension = os.path.splitext(name)
+    return f'{root}.w{width}.webp'
+
+
+def is_variant(name):
+    return bool(_VARIANT_NAME.search(name))
+
+
+def _manifest_key(name):
+    return f'image-variants:{name}'
+
+
+def _widths_for(original_width):
+    return [width for width in WIDTHS if width < original_width]
+
+
+def _store_manifest(name, original_width, widths):
+    info = {'width': original_width, 'variants': widths}
+    complete = len(widths) == len(_widths_for(original_width))
+    cache.set(_manifest_key(name), info, None if complete else PENDING_MANIFEST_TIMEOUT)
+    return info
+
+
+def manifest(field_file):
+    """``{'width': original width, 'variants': [widths]}`` of a field file, or None."""
+    if not field_file or is_variant(field_file.name):
+        return None
+    cached = cache.get(_manifest_key(field_file.name))
+    if cached is not None:
+        return cached
+    storage = field_file.storage
+    try:
+        original_width = field_file.width
+    except (OSError, ValueError, TypeError):
+        return None
+    if not original_width:
+        return None
+    widths = [width for width in _widths_for(original_width)
+              if storage.exists(variant_name(field_file.name, width))]
+    return _store_manifest(field_file.name, original_width, widths)
+
+
+def srcset(field_file, request=None):
+    """``srcset`` value for a field file (``None`` when there is no image)."""
+    info = manifest(field_file)
+    if info is None:
+        return None
+    storage = field_file.storage
+    candidates = [(storage.url(variant_name(field_file.name, width)), width) for width in info['variants']]
+    candidates.append((field_file.url, info['width']))
+    if request is not None:
+        candidates = [(request.build_absolute_uri(url), width) for url, width in candidates]
+    return ', '.join(f'{url} {width}w' for url, width in candidates)
+
+
+def _encode(image, width):
+    height = max(1, round(image.height * width / image.width))
+    resized = image.resize((width, height), Image.Resampling.LANCZOS)
+    output = io.BytesIO()
+    resized.save(output, format='WEBP', quality=QUALITY, method=4)
+    return output.getvalue()
+
+
+def generate(field_file, force=False):
+    """
+    Write the missing variants of one field file (all of them with
+    ``force``); returns the number written.
+    """
+    if not field_file or is_variant(field_file.name):
+        return 0
+    if not force:
+        info = cache.get(_manifest_key(field_file.name))
+        if info is not None and len(info['variants']) == len(_widths_for(info['width'])):
+            return 0
+    storage = field_file.storage
+    with storage.open(field_file.name, 'rb') as source:
+        with Image.open(source) as opened:
+            image = ImageOps.exif_transpose(opened)
+            image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+
+    widths = _widths_for(image.width)
+    written = 0
+    for width in widths:
+        name = variant_name(field_file.name, width)
+        if storage.exists(name):
+            if not force:
+                continue
+            storage.delete(name)
+        saved = storage.save(name, ContentFile(_encode(image, width)))
+        if saved != name:
+            # Lost a race with another worker writing the same variant
+            storage.delete(saved)
+        written += 1
+    _store_manifest(field_file.name, image.width, widths)
+    return written
+
+
+def generate_for_instance(instance, fields=None, force=False):
+    """Generate the variants of an instance's image fields; returns the number written."""
+    label = instance._meta.label
+    written = 0
+    for field in fields or IMAGE_FIELDS[label]:
+        try:
+            written += generate(getattr(instance, field), force=force)
+        except Exception:
+            logger.exception(f'Generating image variants of {label} {instance.pk}.{field} failed')
+    if written:
+        # Expire what was cached with the old (variant-less) srcset
+        model = type(instance)
+        if any(field.name == 'updated_at' for field in model._meta.concrete_fields):
+            model._default_manager.filter(pk=instance.pk).update(updated_at=timezone.now())
+        catalog_cache.invalidate(*CATALOG_SECTIONS[label])
+    return written
+
+
+def _run(label, pk, fields):
+    model = apps.get_model(label)
+    instance = model._default_manager.filter(pk=pk).first()
+    if instance is not None:
+        generate_for_instance(instance, fields)
+
+
+def _run_in_thread(label, pk, fields):
+    # Worker threads get their own DB connection; drop it when done
+    close_old_connections()
+    try:
+        _run(label, pk, fields)
+    finally:
+        close_old_connections()
+
+
+def schedule(instance, fields=None):
+    """Generate an instance's variants in the background once the transaction commits."""
+    label = instance._meta.label
+    fields = [field for field in (fields or IMAGE_FIELDS[label]) if getattr(instance, field)]
+    if not fields:
+        return
+    if getattr(settings, 'IMAGE_VARIANTS_ASYNC', True):
+        transaction.on_commit(lambda: _executor.submit(_run_in_thread, label, instance.pk, fields))
+    else:
+        transaction.on_commit(lambda: _run(label, instance.pk, fields))
+
+
+def backfill(labels=None, force=False, batch_size=200):
+    """Generate the variants of every stored image; yields ``(label, instances, variants written)``."""
+    for label in labels or IMAGE_FIELDS:
+        fields = IMAGE_FIELDS[label]
+        model = apps.get_model(label)
+        queryset = model._default_manager.order_by('pk').only('pk', *fields)
+        instances = written = 0
+        for instance in queryset.iterator(chunk_size=batch_size):
+            instances += 1
+            written += generate_for_instance(instance, force=force)
+        yield label, instances, written
@@ -0,0 +1,43 @@
+"""
+Management command to (re)build the DailyStats rollup from the bookings
+"""
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from salon.dashboard import invalidate_dashboard_stats
+from salon.rollups import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily booking/revenue rollup (DailyStats) from the Booking table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--start-date',
+            help='First booking date to rebuild, YYYY-MM-DD (default: all dates)'
+        )
+        parser.add_argument(
+            '--end-date',
+            help='Last booking date to rebuild, YYYY-MM-DD (default: all dates)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows inserted per query (default: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            start_date = date.fromisoformat(options['start_date']) if options['start_date'] else None
+            end_date = date.fromisoformat(options['end_date']) if options['end_date'] else None
+        except ValueError:
+            raise CommandError('Dates must use the YYYY-MM-DD format')
+        if start_date and end_date and start_date > end_date:
+            raise CommandError('--start-date must not be after --end-date')
+
+        self.stdout.write('Rebuilding daily stats...')
+        written = rebuild(start_date, end_date, batch_size=options['batch_size'])
+        invalidate_dashboard_stats()
+        self.stdout.write(self.style.SUCCESS(f'Successfully rebuilt daily stats: {written} rows written'))
@@ -0,0 +1,37 @@
+"""
+Management command that EXPLAINs the Booking hot queries and fails on full table scans
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from salon.query_plans import full_scans
+
+
+class Command(BaseCommand):
+    help = 'Run EXPLAIN on the Booking hot queries and fail if any of them scans a whole table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--show-plans',
+            action='store_true',
+            help='Print every query plan, not only the failing ones'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            plans = full_scans()
+        except NotImplementedError as e:
+            raise CommandError(str(e))
+
+        failed = []
+        for name, (plan, tables) in plans.items():
+            if tables:
+                failed.append(name)
+                self.stdout.write(self.style.ERROR(f'FULL SCAN  {name}: {", ".join(tables)}'))
+            else:
+                self.stdout.write(f'ok         {name}')
+            if tables or options['show_plans']:
+                self.stdout.write('    ' + plan.replace('\n', '\n    '))
+
+        if failed:
+            raise CommandError(f'{len(failed)} hot quer{"y" if len(failed) == 1 else "ies"} scan a whole table')
+        self.stdout.write(self.style.SUCCESS(f'All {len(plans)} hot queries use an index'))
@@ -0,0 +1,14 @@
+"""
+Management command that writes the buffered blog view/like counters to the database
+"""
+from django.core.management.base import BaseCommand
+
+from salon.counters import flush
+
+
+class Command(BaseCommand):
+    help = 'Write pending buffered counters (blog post views and likes) to the database'
+
+    def handle(self, *args, **options):
+        written = flush()
+        self.stdout.write(self.style.SUCCESS(f'Flushed counters: {written} rows updated'))
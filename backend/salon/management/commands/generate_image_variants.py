@@ -0,0 +1,41 @@
+"""
+Management command that generates the responsive WebP variants of existing uploaded images
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from salon.image_variants import IMAGE_FIELDS, backfill
+
+
+class Command(BaseCommand):
+    help = 'Generate the resized WebP variants of uploaded images (missing ones only unless --force)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model',
+            action='append',
+            dest='models',
+            help=f'Only this model (repeatable): {", ".join(IMAGE_FIELDS)}'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Regenerate variants that already exist'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Rows loaded per query (default: 200)'
+        )
+
+    def handle(self, *args, **options):
+        labels = options['models']
+        unknown = sorted(set(labels or ()) - set(IMAGE_FIELDS))
+        if unknown:
+            raise CommandError(f'Unknown model(s): {", ".join(unknown)}')
+
+        total = 0
+        for label, instances, written in backfill(labels, options['force'], options['batch_size']):
+            total += written
+            self.stdout.write(f'{label}: {instances} rows, {written} variants written')
+        self.stdout.write(self.style.SUCCESS(f'Done: {total} variants written'))
@@ -0,0 +1,49 @@
+"""
+Management command that runs requested export jobs and cleans up old ones
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from salon.export_jobs import fail_dead_jobs, process_pending, purge_expired
+
+
+class Command(BaseCommand):
+    help = 'Run pending export jobs and delete expired ones (run continuously, or once with --once)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5.0,
+            help='Seconds to sleep when no job is pending (default: 5)'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run the currently pending jobs and exit'
+        )
+
+    def handle(self, *args, **options):
+        total_run = total_purged = 0
+        try:
+            while True:
+                close_old_connections()
+                dead = fail_dead_jobs()
+                if dead:
+                    self.stdout.write(f'{dead} dead jobs marked failed')
+                total_purged += purge_expired()
+                run = process_pending()
+                total_run += run
+                if run:
+                    self.stdout.write(f'{run} jobs run')
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Export jobs processed: {total_run} run, {total_purged} expired jobs deleted')
+        )
@@ -0,0 +1,63 @@
+"""
+Management command that delivers queued outbound messages (email / WhatsApp / SMS)
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from salon.outbox import process_batch
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued outbound notifications (run continuously, or once with --once)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Number of delivery threads (default: 4)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help='Messages claimed per batch (default: 50)'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5.0,
+            help='Seconds to sleep when the queue is empty (default: 5)'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Drain the currently due messages and exit'
+        )
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        batch_size = options['batch_size']
+        self.stdout.write(f'Processing outbox with {workers} workers...')
+
+        total_sent = total_failed = 0
+        try:
+            while True:
+                close_old_connections()
+                sent, failed = process_batch(batch_size=batch_size, workers=workers)
+                total_sent += sent
+                total_failed += failed
+                if sent or failed:
+                    self.stdout.write(f'Batch done: {sent} sent, {failed} failed')
+                if sent + failed < batch_size:
+                    if options['once']:
+                        break
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Outbox processed: {total_sent} sent, {total_failed} failed')
+        )
@@ -0,0 +1,14 @@
+"""
+Management command that deletes expired checkout slot holds
+"""
+from django.core.management.base import BaseCommand
+
+from salon.reservations import purge_expired_holds
+
+
+class Command(BaseCommand):
+    help = 'Delete expired slot holds (they no longer block anything, this only keeps the table small)'
+
+    def handle(self, *args, **options):
+        deleted = purge_expired_holds()
+        self.stdout.write(self.style.SUCCESS(f'Purged {deleted} expired slot holds'))
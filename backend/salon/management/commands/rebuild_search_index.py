@@ -0,0 +1,29 @@
+"""
+Management command to (re)build the full-text search index of blog posts and services
+"""
+from django.core.management.base import BaseCommand
+
+from salon.search_index import backend, rebuild
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index (published blog posts and active services)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Documents written per batch (default: 500)'
+        )
+
+    def handle(self, *args, **options):
+        if backend() is None:
+            self.stdout.write(self.style.WARNING(
+                'This database has no full-text index support; searches use icontains filters'
+            ))
+            return
+
+        self.stdout.write('Rebuilding search index...')
+        written = rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Successfully rebuilt search index: {written} documents'))
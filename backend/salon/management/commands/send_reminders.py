@@ -2,25 +2,65 @@
 Management command to send reminder emails for appointments
 Based on Django Appointment System features
 """
-from django.core.management.base import BaseCommand
-from django.utils import timezone
-from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
 
-from salon.email_service import send_reminder_emails
+from salon.reminders import default_windows, dispatch_reminders
 
 
 class Command(BaseCommand):
-    help = 'Send reminder emails for appointments tomorrow'
+    help = 'Send reminder emails for upcoming appointments (e.g. 24h and 2h before)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--windows',
+            default=','.join(str(h) for h in default_windows()),
+            help='Comma separated reminder windows in hours before the appointment (default: %(default)s)'
+        )
+        parser.add_argument(
+            '--queue-only',
+            action='store_true',
+            help='Only queue the reminders; leave delivery to the process_outbox worker'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Messages delivered per batch (default: 100)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Number of delivery threads (default: 4)'
+        )
 
     def handle(self, *args, **options):
+        try:
+            windows = [int(h) for h in options['windows'].split(',') if h.strip()]
+        except ValueError:
+            raise CommandError('--windows must be a comma separated list of hours, e.g. 24,2')
+        if not windows or any(h <= 0 for h in windows):
+            raise CommandError('--windows must contain positive hour values')
+
         self.stdout.write('Starting to send reminder emails...')
-        
+
         try:
-            send_reminder_emails()
-            self.stdout.write(
-                self.style.SUCCESS('Successfully sent reminder emails')
+            result = dispatch_reminders(
+                windows=windows,
+                send=not options['queue_only'],
+                batch_size=options['batch_size'],
+                workers=options['workers'],
             )
         except Exception as e:
             self.stdout.write(
                 self.style.ERROR(f'Error sending reminder emails: {e}')
             )
+            return
+
+        for hours, count in sorted(result['queued'].items(), reverse=True):
+            self.stdout.write(f'  {hours}h window: {count} reminders queued')
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Successfully processed reminder emails: {result['sent']} sent, {result['failed']} failed"
+            )
+        )
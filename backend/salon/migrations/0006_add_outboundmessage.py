@@ -0,0 +1,44 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:27
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salon', '0005_alter_address_customer_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboundMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('channel', models.CharField(choices=[('email', 'بريد إلكتروني'), ('whatsapp', 'واتساب'), ('sms', 'رسالة نصية')], max_length=10, verbose_name='القناة')),
+                ('event', models.CharField(max_length=50, verbose_name='الحدث')),
+                ('recipient', models.CharField(max_length=254, verbose_name='المستلم')),
+                ('subject', models.CharField(blank=True, max_length=255, verbose_name='الموضوع')),
+                ('payload', models.JSONField(blank=True, default=dict, verbose_name='محتوى الرسالة')),
+                ('dedup_key', models.CharField(blank=True, max_length=255, null=True, unique=True, verbose_name='مفتاح منع التكرار')),
+                ('status', models.CharField(choices=[('pending', 'في الانتظار'), ('sending', 'قيد الإرسال'), ('sent', 'مرسل'), ('failed', 'فشل')], default='pending', max_length=10, verbose_name='الحالة')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='عدد المحاولات')),
+                ('max_attempts', models.PositiveIntegerField(default=5, verbose_name='الحد الأقصى للمحاولات')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='موعد المحاولة التالية')),
+                ('locked_at', models.DateTimeField(blank=True, null=True, verbose_name='وقت الحجز للإرسال')),
+                ('last_error', models.TextField(blank=True, verbose_name='آخر خطأ')),
+                ('provider_id', models.CharField(blank=True, max_length=100, verbose_name='معرف مزود الخدمة')),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='تاريخ الإرسال')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='تاريخ التحديث')),
+                ('booking', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='outbound_messages', to='salon.booking', verbose_name='الحجز')),
+            ],
+            options={
+                'verbose_name': 'رسالة صادرة',
+                'verbose_name_plural': 'الرسائل الصادرة',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='salon_outbo_status_03be81_idx'), models.Index(fields=['channel', 'status'], name='salon_outbo_channel_87f828_idx')],
+            },
+        ),
+    ]
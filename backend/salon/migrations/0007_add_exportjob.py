@@ -0,0 +1,41 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salon', '0006_add_outboundmessage'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('bookings', 'الحجوزات'), ('customers', 'العملاء'), ('services', 'الخدمات'), ('revenue', 'تقرير الإيرادات'), ('dashboard', 'بيانات لوحة التحكم')], max_length=20, verbose_name='نوع التصدير')),
+                ('export_format', models.CharField(default='xlsx', max_length=10, verbose_name='صيغة الملف')),
+                ('params', models.JSONField(blank=True, default=dict, verbose_name='معايير التصفية')),
+                ('params_hash', models.CharField(db_index=True, max_length=64, verbose_name='بصمة المعايير')),
+                ('status', models.CharField(choices=[('pending', 'في الانتظار'), ('running', 'قيد التنفيذ'), ('completed', 'مكتمل'), ('failed', 'فشل')], default='pending', max_length=10, verbose_name='الحالة')),
+                ('progress', models.PositiveSmallIntegerField(default=0, verbose_name='نسبة التقدم')),
+                ('total_rows', models.PositiveIntegerField(default=0, verbose_name='عدد الصفوف')),
+                ('file', models.FileField(blank=True, upload_to='exports/', verbose_name='الملف')),
+                ('error', models.TextField(blank=True, verbose_name='الخطأ')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='بدء التنفيذ')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='انتهاء التنفيذ')),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='export_jobs', to=settings.AUTH_USER_MODEL, verbose_name='طلب بواسطة')),
+            ],
+            options={
+                'verbose_name': 'مهمة تصدير',
+                'verbose_name_plural': 'مهام التصدير',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['params_hash', 'status', 'finished_at'], name='salon_expor_params__6e1d38_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_daily_stats(apps, schema_editor):
+    # What `manage.py backfill_daily_stats` does, so the dashboard and the
+    # reports do not read an empty rollup after deploying
+    from salon.rollups import booking_aggregates
+    Booking = apps.get_model('salon', 'Booking')
+    DailyStats = apps.get_model('salon', 'DailyStats')
+    rows = (
+        Booking.objects.order_by()
+        .values('booking_date', 'service_id', 'staff_id')
+        .annotate(**booking_aggregates())
+    )
+    DailyStats.objects.bulk_create(
+        [DailyStats(date=row.pop('booking_date'), **row) for row in rows],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salon', '0007_add_exportjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='التاريخ')),
+                ('bookings_count', models.PositiveIntegerField(default=0, verbose_name='عدد الحجوزات')),
+                ('pending_payment_count', models.PositiveIntegerField(default=0, verbose_name='في انتظار الدفع')),
+                ('pending_count', models.PositiveIntegerField(default=0, verbose_name='في الانتظار')),
+                ('confirmed_count', models.PositiveIntegerField(default=0, verbose_name='مؤكد')),
+                ('in_progress_count', models.PositiveIntegerField(default=0, verbose_name='جاري التنفيذ')),
+                ('completed_count', models.PositiveIntegerField(default=0, verbose_name='مكتمل')),
+                ('cancelled_count', models.PositiveIntegerField(default=0, verbose_name='ملغي')),
+                ('payment_pending_count', models.PositiveIntegerField(default=0, verbose_name='دفع في الانتظار')),
+                ('payment_partial_count', models.PositiveIntegerField(default=0, verbose_name='دفع جزئي')),
+                ('payment_paid_count', models.PositiveIntegerField(default=0, verbose_name='مدفوع')),
+                ('payment_failed_count', models.PositiveIntegerField(default=0, verbose_name='فشل الدفع')),
+                ('payment_refunded_count', models.PositiveIntegerField(default=0, verbose_name='مسترد')),
+                ('gross_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='الإيرادات قبل الخصم')),
+                ('discount_total', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='إجمالي الخصومات')),
+                ('final_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='الإيرادات النهائية')),
+                ('paid_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='الإيرادات المدفوعة')),
+                ('pending_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='الإيرادات المعلقة')),
+                ('refunded_amount', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='المبالغ المستردة')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='آخر تحديث')),
+                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='salon.service', verbose_name='الخدمة')),
+                ('staff', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='salon.staff', verbose_name='الموظف')),
+            ],
+            options={
+                'verbose_name': 'إحصائية يومية',
+                'verbose_name_plural': 'الإحصائيات اليومية',
+                'ordering': ['-date'],
+                'constraints': [models.UniqueConstraint(fields=('date', 'service', 'staff'), name='unique_daily_stats_cell')],
+            },
+        ),
+        migrations.RunPython(backfill_daily_stats, migrations.RunPython.noop),
+    ]
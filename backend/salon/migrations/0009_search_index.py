@@ -0,0 +1,28 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    from salon.search_index import backend
+    index = backend(schema_editor.connection)
+    if index is not None:
+        with schema_editor.connection.cursor() as cursor:
+            index.create(cursor)
+
+
+def drop_search_index(apps, schema_editor):
+    from salon.search_index import backend
+    index = backend(schema_editor.connection)
+    if index is not None:
+        with schema_editor.connection.cursor() as cursor:
+            index.drop(cursor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salon', '0008_add_dailystats'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:54
+
+from django.db import migrations, models
+
+# The fields each shadow column is computed from (Model.search_fields)
+SEARCH_FIELDS = {
+    'Service': ('name', 'name_en', 'description', 'description_en'),
+    'Testimonial': ('customer_name', 'customer_name_en', 'testimonial_text', 'testimonial_text_en', 'service_used'),
+    'BlogPost': ('title', 'title_en', 'excerpt', 'excerpt_en', 'content', 'content_en', 'tags'),
+}
+
+
+def fill_search_text(apps, schema_editor):
+    from salon.normalization import search_text
+    for model_name, fields in SEARCH_FIELDS.items():
+        model = apps.get_model('salon', model_name)
+        rows = list(model.objects.only('pk', *fields))
+        for row in rows:
+            row.search_text = search_text(*(getattr(row, field) for field in fields))
+        model.objects.bulk_update(rows, ['search_text'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salon', '0009_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blogpost',
+            name='search_text',
+            field=models.TextField(blank=True, editable=False, verbose_name='نص البحث'),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='search_text',
+            field=models.TextField(blank=True, editable=False, verbose_name='نص البحث'),
+        ),
+        migrations.AddField(
+            model_name='testimonial',
+            name='search_text',
+            field=models.TextField(blank=True, editable=False, verbose_name='نص البحث'),
+        ),
+        migrations.RunPython(fill_search_text, migrations.RunPython.noop),
+    ]
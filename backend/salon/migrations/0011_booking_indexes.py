@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salon', '0010_search_text'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['booking_date', 'booking_time', 'status'], name='booking_date_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['customer', 'booking_date', 'booking_time'], name='booking_customer_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['booking_date', 'created_at'], name='booking_date_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('status__in', ('pending', 'confirmed', 'in_progress'))), fields=['booking_date', 'staff', 'booking_time'], name='booking_active_slots_idx'),
+        ),
+    ]
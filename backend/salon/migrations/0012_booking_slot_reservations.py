@@ -0,0 +1,76 @@
+# Generated by Django 5.2.4 on 2026-10-18 02:02
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+from django.db.models import Count
+
+ACTIVE_BOOKING_STATUSES = ('pending', 'confirmed', 'in_progress')
+
+
+def check_double_bookings(apps, schema_editor):
+    """Name the clashing bookings instead of failing on an opaque IntegrityError"""
+    Booking = apps.get_model('salon', 'Booking')
+    clashes = (
+        Booking.objects.filter(status__in=ACTIVE_BOOKING_STATUSES, staff__isnull=False)
+        .values('booking_date', 'staff_id', 'booking_time')
+        .annotate(count=Count('id'))
+        .filter(count__gt=1)
+    )
+    if clashes:
+        slots = ', '.join(
+            f"{clash['booking_date']} {clash['booking_time']} (staff {clash['staff_id']})" for clash in clashes
+        )
+        raise RuntimeError(
+            f'Active bookings share a staff member and slot: {slots}. '
+            'Cancel or move the duplicates, then run the migration again.'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salon', '0011_booking_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlotHold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.UUIDField(default=uuid.uuid4, editable=False, unique=True, verbose_name='رمز الحجز المؤقت')),
+                ('date', models.DateField(verbose_name='التاريخ')),
+                ('time', models.TimeField(verbose_name='الوقت')),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='ينتهي في')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')),
+            ],
+            options={
+                'verbose_name': 'حجز مؤقت',
+                'verbose_name_plural': 'الحجوزات المؤقتة',
+                'ordering': ['date', 'time'],
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name='booking',
+            name='booking_active_slots_idx',
+        ),
+        migrations.RunPython(check_double_bookings, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='booking',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ACTIVE_BOOKING_STATUSES)), fields=('booking_date', 'staff', 'booking_time'), name='booking_unique_active_slot'),
+        ),
+        migrations.AddField(
+            model_name='slothold',
+            name='service',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slot_holds', to='salon.service', verbose_name='الخدمة'),
+        ),
+        migrations.AddField(
+            model_name='slothold',
+            name='staff',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='slot_holds', to='salon.staff', verbose_name='الموظف'),
+        ),
+        migrations.AddConstraint(
+            model_name='slothold',
+            constraint=models.UniqueConstraint(fields=('date', 'staff', 'time'), name='slot_hold_unique_slot'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-18 02:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salon', '0012_booking_slot_reservations'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CounterDelta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=100, verbose_name='النموذج')),
+                ('object_id', models.PositiveIntegerField(verbose_name='معرف السجل')),
+                ('field', models.CharField(max_length=50, verbose_name='الحقل')),
+                ('amount', models.IntegerField(default=1, verbose_name='القيمة')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'زيادة عداد معلقة',
+                'verbose_name_plural': 'زيادات العدادات المعلقة',
+                'indexes': [models.Index(fields=['model', 'object_id'], name='counter_delta_object_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-18 02:23
+
+from django.db import migrations, models
+
+
+def drop_duplicate_cells(apps, schema_editor):
+    # Cells without staff could be created twice; both copies were updated
+    # together, so keeping one of them loses nothing
+    DailyStats = apps.get_model('salon', 'DailyStats')
+    kept = {}
+    duplicates = []
+    cells = DailyStats.objects.filter(staff__isnull=True).order_by('pk')
+    for pk, day, service_id in cells.values_list('pk', 'date', 'service_id'):
+        if (day, service_id) in kept:
+            duplicates.append(pk)
+        else:
+            kept[(day, service_id)] = pk
+    DailyStats.objects.filter(pk__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salon', '0013_counter_deltas'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_cells, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='dailystats',
+            constraint=models.UniqueConstraint(condition=models.Q(('staff__isnull', True)), fields=('date', 'service'), name='unique_daily_stats_cell_no_staff'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.4 on 2026-10-18 02:47
+
+from django.db import migrations
+from django.db.models import F, Sum
+
+
+def fold_pending_deltas(apps, schema_editor):
+    """Write the deltas still in the table to their rows; pending counts now live in the cache"""
+    CounterDelta = apps.get_model('salon', 'CounterDelta')
+    totals = (
+        CounterDelta.objects.values('model', 'object_id', 'field')
+        .annotate(total=Sum('amount'))
+        .order_by()
+    )
+    for row in totals:
+        app_label, model_name = row['model'].split('.')
+        model = apps.get_model(app_label, model_name)
+        model._default_manager.filter(pk=row['object_id']).update(**{row['field']: F(row['field']) + row['total']})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salon', '0016_export_job_heartbeat'),
+    ]
+
+    operations = [
+        migrations.RunPython(fold_pending_deltas, migrations.RunPython.noop),
+        migrations.DeleteModel(
+            name='CounterDelta',
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.4 on 2026-10-18 02:49
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+from django.utils import timezone
+
+ACTIVE_BOOKING_STATUSES = ('pending', 'confirmed', 'in_progress')
+
+
+def check_unassigned_double_bookings(apps, schema_editor):
+    """Name the clashing bookings instead of failing on an opaque IntegrityError"""
+    Booking = apps.get_model('salon', 'Booking')
+    clashes = (
+        Booking.objects.filter(status__in=ACTIVE_BOOKING_STATUSES, staff__isnull=True)
+        .values('booking_date', 'booking_time')
+        .annotate(count=Count('id'))
+        .filter(count__gt=1)
+    )
+    if clashes:
+        slots = ', '.join(f"{clash['booking_date']} {clash['booking_time']}" for clash in clashes)
+        raise RuntimeError(
+            f'Active bookings without a staff member share a slot: {slots}. '
+            'Assign, cancel or move the duplicates, then run the migration again.'
+        )
+
+
+def drop_duplicate_unassigned_holds(apps, schema_editor):
+    """Holds only live for minutes: drop the expired ones and all but the first of a slot"""
+    SlotHold = apps.get_model('salon', 'SlotHold')
+    SlotHold.objects.filter(expires_at__lte=timezone.now()).delete()
+    duplicates = (
+        SlotHold.objects.filter(staff__isnull=True)
+        .values('date', 'time')
+        .annotate(count=Count('id'), first=Min('id'))
+        .filter(count__gt=1)
+    )
+    for duplicate in duplicates:
+        SlotHold.objects.filter(
+            staff__isnull=True, date=duplicate['date'], time=duplicate['time'],
+        ).exclude(pk=duplicate['first']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salon', '0017_delete_counter_deltas'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_unassigned_double_bookings, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='booking',
+            constraint=models.UniqueConstraint(condition=models.Q(('staff__isnull', True), ('status__in', ACTIVE_BOOKING_STATUSES)), fields=('booking_date', 'booking_time'), name='booking_unique_active_unassigned_slot'),
+        ),
+        migrations.RunPython(drop_duplicate_unassigned_holds, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='slothold',
+            constraint=models.UniqueConstraint(condition=models.Q(('staff__isnull', True)), fields=('date', 'time'), name='slot_hold_unique_unassigned_slot'),
+        ),
+    ]
@@ -12,6 +12,23 @@ import uuid
 import random
 import string
 
+from .normalization import search_text
+
+
+class SearchTextMixin:
+    """
+    Keeps ``search_text`` - the normalized, lightly stemmed words of
+    ``search_fields`` (see salon.normalization) - in sync on every save.
+    """
+    search_fields = ()
+
+    def save(self, *args, **kwargs):
+        self.search_text = search_text(*(getattr(self, field) for field in self.search_fields))
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and set(update_fields) & set(self.search_fields):
+            kwargs['update_fields'] = {*update_fields, 'search_text'}
+        super().save(*args, **kwargs)
+
 
 class Customer(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, null=True, blank=True, verbose_name="المستخدم")
@@ -69,7 +86,7 @@ class Category(models.Model):
         return self.name
 
 
-class Service(models.Model):
+class Service(SearchTextMixin, models.Model):
     """Individual services offered by the salon"""
     categories = models.ManyToManyField(Category, related_name='services', verbose_name="الفئات", help_text="يمكن اختيار أكثر من فئة")
     name = models.CharField(max_length=200, verbose_name="اسم الخدمة")
@@ -82,9 +99,12 @@ class Service(models.Model):
     is_active = models.BooleanField(default=True, verbose_name="نشطة")
     is_featured = models.BooleanField(default=False, verbose_name="مميزة")
     order = models.PositiveIntegerField(default=0, verbose_name="ترتيب العرض")
+    search_text = models.TextField(blank=True, editable=False, verbose_name="نص البحث")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    search_fields = ('name', 'name_en', 'description', 'description_en')
+
     class Meta:
         verbose_name = "خدمة"
         verbose_name_plural = "الخدمات"
@@ -93,12 +113,14 @@ class Service(models.Model):
     @property
     def category(self):
         """Get the first category for backward compatibility"""
-        return self.categories.first()
+        # all() rather than first() so prefetched categories are reused
+        categories = list(self.categories.all())
+        return categories[0] if categories else None
     
     @property
     def category_name(self):
         """Get the name of the first category for backward compatibility"""
-        first_category = self.categories.first()
+        first_category = self.category
         return first_category.name if first_category else ""
 
     def __str__(self):
@@ -296,6 +318,10 @@ class Coupon(models.Model):
                 (self.usage_limit is None or self.used_count < self.usage_limit))
 
 
+# Booking statuses that occupy a slot (availability, the partial slot index)
+ACTIVE_BOOKING_STATUSES = ('pending', 'confirmed', 'in_progress')
+
+
 class Booking(models.Model):
     """Customer bookings"""
     STATUS_CHOICES = [
@@ -356,6 +382,31 @@ class Booking(models.Model):
         verbose_name = "حجز"
         verbose_name_plural = "الحجوزات"
         ordering = ['-booking_date', '-booking_time']
+        # Checked by `manage.py check_query_plans`
+        indexes = [
+            # Date range + status filters (reminders, reporting, rollups) and the default ordering
+            models.Index(fields=['booking_date', 'booking_time', 'status'], name='booking_date_time_idx'),
+            # A customer's bookings, newest first (BookingListCreateView)
+            models.Index(fields=['customer', 'booking_date', 'booking_time'], name='booking_customer_date_idx'),
+            # Admin changelist ordering
+            models.Index(fields=['booking_date', 'created_at'], name='booking_date_created_idx'),
+        ]
+        constraints = [
+            # One active booking per staff member and slot (salon.reservations turns the
+            # violation into a "slot taken" answer); also the occupied slots index of
+            # the availability engine
+            models.UniqueConstraint(
+                fields=['booking_date', 'staff', 'booking_time'],
+                condition=models.Q(status__in=ACTIVE_BOOKING_STATUSES),
+                name='booking_unique_active_slot',
+            ),
+            # NULL staff values never clash above; bookings without a staff member share one slot
+            models.UniqueConstraint(
+                fields=['booking_date', 'booking_time'],
+                condition=models.Q(status__in=ACTIVE_BOOKING_STATUSES, staff__isnull=True),
+                name='booking_unique_active_unassigned_slot',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.customer.name} - {self.service.name} - {self.booking_date}"
@@ -784,7 +835,7 @@ class ServiceItem(models.Model):
         return f"{self.category.name} - {self.title}"
 
 
-class Testimonial(models.Model):
+class Testimonial(SearchTextMixin, models.Model):
     """Customer testimonials and reviews"""
     
     RATING_CHOICES = [
@@ -805,9 +856,12 @@ class Testimonial(models.Model):
     is_featured = models.BooleanField(default=False, verbose_name="مميز")
     is_active = models.BooleanField(default=True, verbose_name="نشط")
     order = models.PositiveIntegerField(default=0, verbose_name="ترتيب العرض")
+    search_text = models.TextField(blank=True, editable=False, verbose_name="نص البحث")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    search_fields = ('customer_name', 'customer_name_en', 'testimonial_text', 'testimonial_text_en', 'service_used')
+
     class Meta:
         verbose_name = "شهادة عميل"
         verbose_name_plural = "شهادات العملاء"
@@ -1112,7 +1166,7 @@ class BlogCategory(models.Model):
         return self.name
 
 
-class BlogPost(models.Model):
+class BlogPost(SearchTextMixin, models.Model):
     """Blog posts"""
     STATUS_CHOICES = [
         ('draft', 'مسودة'),
@@ -1147,10 +1201,14 @@ class BlogPost(models.Model):
     meta_description = models.CharField(max_length=160, blank=True, verbose_name="وصف SEO")
     meta_keywords = models.CharField(max_length=500, blank=True, verbose_name="كلمات مفتاحية SEO")
     
+    search_text = models.TextField(blank=True, editable=False, verbose_name="نص البحث")
+    
     published_at = models.DateTimeField(null=True, blank=True, verbose_name="تاريخ النشر")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    search_fields = ('title', 'title_en', 'excerpt', 'excerpt_en', 'content', 'content_en', 'tags')
+
     class Meta:
         verbose_name = "مقال المدونة"
         verbose_name_plural = "مقالات المدونة"
@@ -1191,9 +1249,9 @@ class BlogPost(models.Model):
         return str(self.likes)
 
     def increment_views(self):
-        """Increment view count"""
-        self.views += 1
-        self.save(update_fields=['views'])
+        """Increment view count (buffered and written in batches, see salon.counters)"""
+        from .counters import increment
+        increment(BlogPost, self.pk, 'views')
 
 
 class BlogComment(models.Model):
@@ -1373,6 +1431,157 @@ class NotificationSettings(models.Model):
         return settings
 
 
+class OutboundMessage(models.Model):
+    """Outbound email / WhatsApp / SMS message waiting to be delivered by the outbox worker"""
+    CHANNEL_CHOICES = [
+        ('email', 'بريد إلكتروني'),
+        ('whatsapp', 'واتساب'),
+        ('sms', 'رسالة نصية'),
+    ]
+
+    STATUS_CHOICES = [
+        ('pending', 'في الانتظار'),
+        ('sending', 'قيد الإرسال'),
+        ('sent', 'مرسل'),
+        ('failed', 'فشل'),
+    ]
+
+    channel = models.CharField(max_length=10, choices=CHANNEL_CHOICES, verbose_name="القناة")
+    event = models.CharField(max_length=50, verbose_name="الحدث")
+    recipient = models.CharField(max_length=254, verbose_name="المستلم")
+    subject = models.CharField(max_length=255, blank=True, verbose_name="الموضوع")
+    payload = models.JSONField(default=dict, blank=True, verbose_name="محتوى الرسالة")
+    booking = models.ForeignKey(Booking, on_delete=models.SET_NULL, null=True, blank=True, related_name='outbound_messages', verbose_name="الحجز")
+    dedup_key = models.CharField(max_length=255, unique=True, null=True, blank=True, verbose_name="مفتاح منع التكرار")
+
+    # Delivery state
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending', verbose_name="الحالة")
+    attempts = models.PositiveIntegerField(default=0, verbose_name="عدد المحاولات")
+    max_attempts = models.PositiveIntegerField(default=5, verbose_name="الحد الأقصى للمحاولات")
+    next_attempt_at = models.DateTimeField(default=timezone.now, verbose_name="موعد المحاولة التالية")
+    locked_at = models.DateTimeField(null=True, blank=True, verbose_name="وقت الحجز للإرسال")
+    last_error = models.TextField(blank=True, verbose_name="آخر خطأ")
+    provider_id = models.CharField(max_length=100, blank=True, verbose_name="معرف مزود الخدمة")
+    sent_at = models.DateTimeField(null=True, blank=True, verbose_name="تاريخ الإرسال")
+
+    # Timestamps
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="تاريخ الإنشاء")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="تاريخ التحديث")
+
+    class Meta:
+        verbose_name = "رسالة صادرة"
+        verbose_name_plural = "الرسائل الصادرة"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+            models.Index(fields=['channel', 'status']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_channel_display()} - {self.event} - {self.recipient}"
+
+
+class ExportJob(models.Model):
+    """Background export (Excel / CSV / JSON) generated by salon.export_jobs"""
+    KIND_CHOICES = [
+        ('bookings', 'الحجوزات'),
+        ('customers', 'العملاء'),
+        ('services', 'الخدمات'),
+        ('revenue', 'تقرير الإيرادات'),
+        ('dashboard', 'بيانات لوحة التحكم'),
+    ]
+
+    STATUS_CHOICES = [
+        ('pending', 'في الانتظار'),
+        ('running', 'قيد التنفيذ'),
+        ('completed', 'مكتمل'),
+        ('failed', 'فشل'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, verbose_name="نوع التصدير")
+    export_format = models.CharField(max_length=10, default='xlsx', verbose_name="صيغة الملف")
+    params = models.JSONField(default=dict, blank=True, verbose_name="معايير التصفية")
+    params_hash = models.CharField(max_length=64, db_index=True, verbose_name="بصمة المعايير")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending', verbose_name="الحالة")
+    progress = models.PositiveSmallIntegerField(default=0, verbose_name="نسبة التقدم")
+    total_rows = models.PositiveIntegerField(default=0, verbose_name="عدد الصفوف")
+    file = models.FileField(upload_to='exports/', blank=True, verbose_name="الملف")
+    error = models.TextField(blank=True, verbose_name="الخطأ")
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='export_jobs', verbose_name="طلب بواسطة")
+
+    # Timestamps
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="تاريخ الإنشاء")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="بدء التنفيذ")
+    heartbeat_at = models.DateTimeField(null=True, blank=True, verbose_name="آخر نبضة")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="انتهاء التنفيذ")
+
+    class Meta:
+        verbose_name = "مهمة تصدير"
+        verbose_name_plural = "مهام التصدير"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['params_hash', 'status', 'finished_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} ({self.export_format}) - {self.get_status_display()}"
+
+
+class DailyStats(models.Model):
+    """
+    Booking rollup per (booking date, service, staff).
+
+    Maintained by the Booking signals (see ``rollups.py``) and rebuilt with
+    ``manage.py backfill_daily_stats``; dashboards and revenue reports sum
+    these rows instead of scanning every booking.
+    """
+    date = models.DateField(verbose_name="التاريخ")
+    service = models.ForeignKey(Service, on_delete=models.CASCADE, related_name='daily_stats', verbose_name="الخدمة")
+    staff = models.ForeignKey(Staff, on_delete=models.CASCADE, null=True, blank=True, related_name='daily_stats', verbose_name="الموظف")
+
+    bookings_count = models.PositiveIntegerField(default=0, verbose_name="عدد الحجوزات")
+    # Bookings per status
+    pending_payment_count = models.PositiveIntegerField(default=0, verbose_name="في انتظار الدفع")
+    pending_count = models.PositiveIntegerField(default=0, verbose_name="في الانتظار")
+    confirmed_count = models.PositiveIntegerField(default=0, verbose_name="مؤكد")
+    in_progress_count = models.PositiveIntegerField(default=0, verbose_name="جاري التنفيذ")
+    completed_count = models.PositiveIntegerField(default=0, verbose_name="مكتمل")
+    cancelled_count = models.PositiveIntegerField(default=0, verbose_name="ملغي")
+    # Bookings per payment status
+    payment_pending_count = models.PositiveIntegerField(default=0, verbose_name="دفع في الانتظار")
+    payment_partial_count = models.PositiveIntegerField(default=0, verbose_name="دفع جزئي")
+    payment_paid_count = models.PositiveIntegerField(default=0, verbose_name="مدفوع")
+    payment_failed_count = models.PositiveIntegerField(default=0, verbose_name="فشل الدفع")
+    payment_refunded_count = models.PositiveIntegerField(default=0, verbose_name="مسترد")
+
+    gross_revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name="الإيرادات قبل الخصم")
+    discount_total = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name="إجمالي الخصومات")
+    final_revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name="الإيرادات النهائية")
+    paid_revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name="الإيرادات المدفوعة")
+    pending_revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name="الإيرادات المعلقة")
+    refunded_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name="المبالغ المستردة")
+
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="آخر تحديث")
+
+    class Meta:
+        verbose_name = "إحصائية يومية"
+        verbose_name_plural = "الإحصائيات اليومية"
+        ordering = ['-date']
+        constraints = [
+            # Also the index behind date range scans
+            models.UniqueConstraint(fields=['date', 'service', 'staff'], name='unique_daily_stats_cell'),
+            # NULLs are distinct in the constraint above, so cells without a staff member need their own
+            models.UniqueConstraint(
+                fields=['date', 'service'],
+                condition=models.Q(staff__isnull=True),
+                name='unique_daily_stats_cell_no_staff',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.date} - {self.service} - {self.staff or '-'}"
+
+
 class AdminSlotAvailability(models.Model):
     """
     Admin-controlled availability slots for booking system.
@@ -1405,6 +1614,39 @@ class AdminSlotAvailability(models.Model):
         return self.is_available and self.current_bookings < self.max_bookings
 
 
+class SlotHold(models.Model):
+    """
+    A slot held for a customer during checkout (see salon.reservations).
+    Expired holds are ignored and purged; the booking consumes the hold.
+    """
+    token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False, verbose_name="رمز الحجز المؤقت")
+    service = models.ForeignKey(Service, on_delete=models.CASCADE, related_name='slot_holds', verbose_name="الخدمة")
+    staff = models.ForeignKey(Staff, on_delete=models.CASCADE, null=True, blank=True, related_name='slot_holds', verbose_name="الموظف")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='slot_holds', verbose_name="المستخدم")
+    date = models.DateField(verbose_name="التاريخ")
+    time = models.TimeField(verbose_name="الوقت")
+    expires_at = models.DateTimeField(db_index=True, verbose_name="ينتهي في")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="تاريخ الإنشاء")
+
+    class Meta:
+        verbose_name = "حجز مؤقت"
+        verbose_name_plural = "الحجوزات المؤقتة"
+        ordering = ['date', 'time']
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'staff', 'time'], name='slot_hold_unique_slot'),
+            models.UniqueConstraint(
+                fields=['date', 'time'], condition=models.Q(staff__isnull=True), name='slot_hold_unique_unassigned_slot',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.service.name} - {self.date} {self.time}"
+
+    @property
+    def is_expired(self):
+        return self.expires_at <= timezone.now()
+
+
 
 
 
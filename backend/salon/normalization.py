@@ -0,0 +1,131 @@
+"""
+Text normalization for search (Arabic and English).
+
+The same Arabic word is typed with or without diacritics, with any of the
+alef forms, with ta marbuta or ha, alif maqsura or ya.  ``normalize()``
+folds all of those (and case, tatweel and Arabic-Indic digits) so a search
+matches however the text was written; ``stem()`` additionally strips the
+common clitic prefixes (ال، بال، وال ...) and a light set of suffixes, so
+"الشعر" finds "بالشعر" and "شعرها".
+
+``search_text()`` builds the precomputed shadow columns (``search_text`` on
+Service, BlogPost and Testimonial) and the documents of the full-text index;
+``query_groups()`` turns what the user typed into terms matched against
+them.  ``highlight()`` / ``snippet()`` mark the matches in the original text.
+"""
+import html
+import re
+import unicodedata
+
+# Tashkeel, Quranic marks and superscript alef
+_DIACRITICS = re.compile('[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed]')
+_TATWEEL = '\u0640'
+_LETTERS = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ى': 'ي', 'ئ': 'ي',
+    'ؤ': 'و',
+    'ة': 'ه',
+    '٠': '0', '١': '1', '٢': '2', '٣': '3', '٤': '4',
+    '٥': '5', '٦': '6', '٧': '7', '٨': '8', '٩': '9',
+})
+
+# A word in raw text, diacritics and tatweel included
+_WORD = re.compile('[\\w\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]+')
+
+# Light stemming (after normalization), longest affix first; a stem keeps at
+# least three letters
+_PREFIXES = ('وال', 'بال', 'كال', 'فال', 'لل', 'ال', 'و')
+_SUFFIXES = ('ها', 'ان', 'ات', 'ون', 'ين', 'يه', 'ه', 'ي')
+_MIN_STEM = 3
+_ARABIC = re.compile('[\u0621-\u064a]')
+
+
+def normalize(text):
+    """Fold case, diacritics, letter variants, tatweel and digits."""
+    text = unicodedata.normalize('NFKC', str(text or '')).casefold()
+    text = _DIACRITICS.sub('', text).replace(_TATWEEL, '')
+    return text.translate(_LETTERS)
+
+
+def tokenize(text):
+    """The normalized words of ``text``."""
+    return re.findall(r'\w+', normalize(text))
+
+
+def strip_prefix(token):
+    for prefix in _PREFIXES:
+        # Two letters may remain after the article, three after a bare conjunction
+        remaining = _MIN_STEM if prefix == 'و' else _MIN_STEM - 1
+        if token.startswith(prefix) and len(token) - len(prefix) >= remaining:
+            return token[len(prefix):]
+    return token
+
+
+def stem(token):
+    """Light stem of a normalized token (Arabic only; other words are returned as is)."""
+    if not _ARABIC.match(token):
+        return token
+    token = strip_prefix(token)
+    for suffix in _SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= _MIN_STEM:
+            return token[:-len(suffix)]
+    return token
+
+
+def search_text(*values):
+    """Space separated stems of ``values``: the content of a shadow column."""
+    return ' '.join(stem(token) for value in values for token in tokenize(value))
+
+
+def query_groups(query):
+    """
+    What the user typed as a list of alternatives, one list per word, all
+    of which must match: ``[[(term, is_prefix), ...], ...]``.  The last word
+    may be incomplete, so it also matches as a prefix.
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return []
+    groups = [[(stem(token), False)] for token in tokens[:-1]]
+    last = tokens[-1]
+    alternatives = {(stem(last), False), (strip_prefix(last), True)}
+    groups.append(sorted(alternatives))
+    return groups
+
+
+def _matcher(groups):
+    exact = {term for group in groups for term, is_prefix in group if not is_prefix}
+    prefixes = tuple(term for group in groups for term, is_prefix in group if is_prefix)
+
+    def matches(word):
+        token = normalize(word)
+        return stem(token) in exact or (prefixes and strip_prefix(token).startswith(prefixes))
+    return matches
+
+
+def highlight(text, groups, start='<mark>', stop='</mark>'):
+    """HTML-escaped ``text`` with the words matching ``groups`` wrapped in ``start``/``stop``."""
+    text = str(text or '')
+    matches = _matcher(groups)
+    parts, position = [], 0
+    for word in _WORD.finditer(text):
+        if matches(word.group()):
+            parts.append(html.escape(text[position:word.start()]))
+            parts.append(f'{start}{html.escape(word.group())}{stop}')
+            position = word.end()
+    parts.append(html.escape(text[position:]))
+    return ''.join(parts)
+
+
+def snippet(text, groups, words=24, start='<mark>', stop='</mark>'):
+    """About ``words`` words of ``text`` around the first match, highlighted."""
+    text = str(text or '')
+    spans = list(_WORD.finditer(text))
+    if not spans:
+        return ''
+    matches = _matcher(groups)
+    first = next((index for index, word in enumerate(spans) if matches(word.group())), 0)
+    begin = max(0, first - words // 3)
+    end = min(len(spans), begin + words)
+    fragment = highlight(text[spans[begin].start():spans[end - 1].end()], groups, start, stop)
+    return ('… ' if begin > 0 else '') + fragment + (' …' if end < len(spans) else '')
@@ -0,0 +1,395 @@
+"""
+Outbound notification queue (email / WhatsApp / SMS).
+
+Request handlers and signals never talk to SMTP or Twilio directly: they call
+``enqueue()`` which stores an ``OutboundMessage`` row in the same transaction
+as the change that triggered it.  The ``process_outbox`` management command
+claims due rows and delivers them on a thread pool, retrying failures with
+exponential backoff.
+
+Delivery is done by transports configured per channel in
+``settings.OUTBOX_TRANSPORTS`` (dotted paths), so development and tests can
+swap SMTP/Twilio for ``ConsoleTransport`` or ``FileTransport``.
+
+OTP messages (``enqueue_otp()``) only reference their ``PhoneOTP`` row; the
+code is put into the message in memory when it is delivered, so it is never
+stored with the message nor shown in the admin.
+"""
+import json
+import logging
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import OutboundMessage, PhoneOTP
+
+logger = logging.getLogger(__name__)
+
+OTP_TEMPLATE = "رمز التحقق الخاص بك: {code}"
+
+DEFAULT_TRANSPORTS = {
+    'email': 'salon.outbox.EmailTransport',
+    'whatsapp': 'salon.outbox.TwilioWhatsAppTransport',
+    'sms': 'salon.outbox.TwilioSMSTransport',
+}
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+# ---------------------------------------------------------------------------
+# Transports
+# ---------------------------------------------------------------------------
+
+def _attempt(func, message):
+    try:
+        return True, func(message) or ''
+    except Exception as e:
+        return False, f"{type(e).__name__}: {e}"
+
+
+class BaseTransport:
+    """Delivers a single message; returns the provider id (or '') or raises."""
+
+    # Messages handed to one send_many() call by the worker
+    chunk_size = 1
+
+    def send(self, message):
+        raise NotImplementedError
+
+    def send_many(self, messages):
+        """Deliver several messages; returns one ``(ok, detail)`` per message, in order."""
+        return [_attempt(self.send, message) for message in messages]
+
+
+class EmailTransport(BaseTransport):
+    """Sends through the configured Django email backend."""
+
+    def __init__(self):
+        self.chunk_size = _setting('OUTBOX_EMAIL_CHUNK_SIZE', 25)
+
+    def _build(self, message, connection=None):
+        payload = message.payload
+        email = EmailMultiAlternatives(
+            subject=message.subject,
+            body=payload.get('text', ''),
+            from_email=payload.get('from_email') or settings.DEFAULT_FROM_EMAIL,
+            to=[message.recipient],
+            connection=connection,
+        )
+        if payload.get('html'):
+            email.attach_alternative(payload['html'], "text/html")
+        return email
+
+    def send(self, message, connection=None):
+        self._build(message, connection).send()
+        return ''
+
+    def send_many(self, messages):
+        # One SMTP session for the whole chunk instead of one per message
+        connection = get_connection()
+        try:
+            connection.open()
+        except Exception as e:
+            return [(False, f"{type(e).__name__}: {e}")] * len(messages)
+        try:
+            return [_attempt(lambda m: self.send(m, connection), m) for m in messages]
+        finally:
+            connection.close()
+
+
+class TwilioWhatsAppTransport(BaseTransport):
+    def send(self, message):
+        from .utils import send_whatsapp_message
+        return send_whatsapp_message(message.recipient, message.payload.get('body', ''))
+
+
+class TwilioSMSTransport(BaseTransport):
+    def send(self, message):
+        from salon_backend.gateways import twilio_client
+
+        sms = twilio_client().messages.create(
+            body=message.payload.get('body', ''),
+            from_=settings.TWILIO_PHONE_NUMBER,
+            to=message.recipient,
+        )
+        return sms.sid
+
+
+class ConsoleTransport(BaseTransport):
+    """Prints messages instead of sending them (development)."""
+
+    def send(self, message):
+        body = message.payload.get('text') or message.payload.get('body', '')
+        sys.stdout.write(
+            f"[outbox:{message.channel}] to={message.recipient} event={message.event}\n"
+            f"{message.subject}\n{body}\n\n"
+        )
+        sys.stdout.flush()
+        return ''
+
+
+class FileTransport(BaseTransport):
+    """Appends messages as JSON lines to ``settings.OUTBOX_FILE_PATH``."""
+
+    _lock = threading.Lock()
+
+    def send(self, message):
+        path = _setting('OUTBOX_FILE_PATH', settings.BASE_DIR / 'outbox.log')
+        line = json.dumps({
+            'id': message.pk,
+            'channel': message.channel,
+            'event': message.event,
+            'recipient': message.recipient,
+            'subject': message.subject,
+            'payload': message.payload,
+            'written_at': timezone.now().isoformat(),
+        }, ensure_ascii=False)
+        with self._lock, open(path, 'a', encoding='utf-8') as fh:
+            fh.write(line + '\n')
+        return ''
+
+
+_transports = {}
+
+
+def get_transport(channel):
+    """Return the (cached) transport instance configured for ``channel``."""
+    path = {**DEFAULT_TRANSPORTS, **_setting('OUTBOX_TRANSPORTS', {})}[channel]
+    transport = _transports.get(path)
+    if transport is None:
+        transport = _transports[path] = import_string(path)()
+    return transport
+
+
+# ---------------------------------------------------------------------------
+# Producer side
+# ---------------------------------------------------------------------------
+
+def enqueue(channel, recipient, event, payload=None, subject='', booking=None, dedup_key=None):
+    """
+    Queue a message for delivery.
+
+    ``dedup_key`` makes the call idempotent: a second enqueue with the same key
+    returns the existing row instead of creating a duplicate.  Returns
+    ``(message, created)``.
+    """
+    if not recipient:
+        raise ValueError(f"Missing recipient for {channel} message '{event}'")
+
+    fields = {
+        'channel': channel,
+        'recipient': recipient,
+        'event': event,
+        'subject': subject[:255],
+        'payload': payload or {},
+        'booking': booking,
+        'max_attempts': _setting('OUTBOX_MAX_ATTEMPTS', 5),
+    }
+    if dedup_key is None:
+        return OutboundMessage.objects.create(**fields), True
+
+    existing = OutboundMessage.objects.filter(dedup_key=dedup_key).first()
+    if existing:
+        return existing, False
+    try:
+        with transaction.atomic():
+            return OutboundMessage.objects.create(dedup_key=dedup_key, **fields), True
+    except IntegrityError:
+        # Lost a race with a concurrent enqueue of the same message
+        return OutboundMessage.objects.get(dedup_key=dedup_key), False
+
+
+def enqueue_many(messages, batch_size=500):
+    """
+    Bulk-queue unsaved ``OutboundMessage`` instances that all carry a
+    ``dedup_key``; keys that already exist are skipped.  Returns a queryset of
+    the queued rows (new and pre-existing).
+    """
+    max_attempts = _setting('OUTBOX_MAX_ATTEMPTS', 5)
+    for message in messages:
+        message.max_attempts = max_attempts
+    OutboundMessage.objects.bulk_create(messages, batch_size=batch_size, ignore_conflicts=True)
+    return OutboundMessage.objects.filter(dedup_key__in=[m.dedup_key for m in messages])
+
+
+def enqueue_email(recipient, subject, html, event, booking=None, dedup_key=None, from_email=None, text=None):
+    """Queue an HTML email; the plain-text part defaults to the stripped HTML."""
+    from django.utils.html import strip_tags
+
+    payload = {
+        'html': html,
+        'text': text if text is not None else strip_tags(html),
+        'from_email': from_email or '',
+    }
+    return enqueue('email', recipient, event, payload=payload, subject=subject,
+                   booking=booking, dedup_key=dedup_key)
+
+
+def enqueue_whatsapp(phone, body, event, booking=None, dedup_key=None):
+    return enqueue('whatsapp', phone, event, payload={'body': body},
+                   booking=booking, dedup_key=dedup_key)
+
+
+def enqueue_sms(phone, body, event, booking=None, dedup_key=None):
+    return enqueue('sms', phone, event, payload={'body': body},
+                   booking=booking, dedup_key=dedup_key)
+
+
+def enqueue_otp(otp):
+    """Queue the WhatsApp message of a ``PhoneOTP``; the payload holds its id, not the code."""
+    return enqueue('whatsapp', otp.phone_number, 'otp', payload={'otp_id': otp.pk})
+
+
+# ---------------------------------------------------------------------------
+# Worker side
+# ---------------------------------------------------------------------------
+
+def retry_delay(attempts):
+    """Exponential backoff: base * 2^(attempts-1), capped."""
+    base = _setting('OUTBOX_RETRY_BASE_SECONDS', 30)
+    cap = _setting('OUTBOX_RETRY_MAX_SECONDS', 3600)
+    return timedelta(seconds=min(base * (2 ** max(attempts - 1, 0)), cap))
+
+
+def release_stale_claims(now=None):
+    """Put back messages left in 'sending' by a worker that died mid-batch."""
+    now = now or timezone.now()
+    cutoff = now - timedelta(seconds=_setting('OUTBOX_LOCK_TIMEOUT', 300))
+    return OutboundMessage.objects.filter(status='sending', locked_at__lt=cutoff).update(
+        status='pending', locked_at=None, updated_at=now
+    )
+
+
+def claim_batch(limit, now=None, queryset=None):
+    """
+    Claim up to ``limit`` due messages (optionally restricted to ``queryset``).
+    Each row is claimed with a conditional UPDATE so concurrent workers never
+    deliver the same message twice.
+    """
+    now = now or timezone.now()
+    if queryset is None:
+        queryset = OutboundMessage.objects.all()
+    due_ids = list(
+        queryset.filter(status='pending', next_attempt_at__lte=now)
+        .order_by('next_attempt_at', 'id')
+        .values_list('id', flat=True)[:limit]
+    )
+    claimed = [
+        pk for pk in due_ids
+        if OutboundMessage.objects.filter(pk=pk, status='pending').update(
+            status='sending', locked_at=now, updated_at=now
+        )
+    ]
+    return list(OutboundMessage.objects.filter(pk__in=claimed).order_by('next_attempt_at', 'id'))
+
+
+def _chunks(messages):
+    """Group messages per channel, split by the transport's chunk size."""
+    by_channel = {}
+    for message in messages:
+        by_channel.setdefault(message.channel, []).append(message)
+    for channel, group in by_channel.items():
+        size = max(1, get_transport(channel).chunk_size)
+        for i in range(0, len(group), size):
+            yield channel, group[i:i + size]
+
+
+def _deliver_chunk(chunk):
+    channel, messages = chunk
+    return messages, get_transport(channel).send_many(messages)
+
+
+def _render_otps(messages):
+    """
+    Put the OTP codes into the OTP messages' payloads, in memory only (the
+    payload is not among the fields ``_record_result()`` saves).  Returns
+    the messages whose OTP is gone, used or expired.
+    """
+    otp_ids = [message.payload['otp_id'] for message in messages if message.payload.get('otp_id')]
+    if not otp_ids:
+        return []
+    otps = PhoneOTP.objects.in_bulk(otp_ids)
+    unusable = []
+    for message in messages:
+        if not message.payload.get('otp_id'):
+            continue
+        otp = otps.get(message.payload['otp_id'])
+        if otp is None or otp.is_used or otp.is_expired():
+            unusable.append(message)
+        else:
+            message.payload = {**message.payload, 'body': OTP_TEMPLATE.format(code=otp.otp_code)}
+    return unusable
+
+
+def _record_result(message, ok, detail, permanent=False):
+    now = timezone.now()
+    message.attempts += 1
+    message.locked_at = None
+    if ok:
+        message.status = 'sent'
+        message.sent_at = now
+        message.provider_id = detail[:100]
+        message.last_error = ''
+    elif permanent or message.attempts >= message.max_attempts:
+        message.status = 'failed'
+        message.last_error = detail
+        logger.error(f"Outbound message {message.pk} failed permanently: {detail}")
+    else:
+        message.status = 'pending'
+        message.next_attempt_at = now + retry_delay(message.attempts)
+        message.last_error = detail
+        logger.warning(f"Outbound message {message.pk} failed (attempt {message.attempts}), retrying: {detail}")
+    message.save(update_fields=[
+        'status', 'attempts', 'locked_at', 'sent_at', 'provider_id',
+        'last_error', 'next_attempt_at', 'updated_at',
+    ])
+
+
+def process_batch(batch_size=50, workers=4, queryset=None):
+    """
+    Deliver one batch of due messages.  Chunks of messages run on a thread
+    pool (transports are I/O bound and never touch the database); results are
+    written back from the calling thread.  Returns ``(sent, failed)`` counts.
+    """
+    release_stale_claims()
+    messages = claim_batch(batch_size, queryset=queryset)
+    if not messages:
+        return 0, 0
+
+    sent = failed = 0
+    unusable = _render_otps(messages)
+    for message in unusable:
+        _record_result(message, False, 'OTP expired or already used', permanent=True)
+        failed += 1
+    messages = [message for message in messages if message not in unusable]
+    if not messages:
+        return sent, failed
+
+    chunks = list(_chunks(messages))
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(chunks)))) as pool:
+        delivered = list(pool.map(_deliver_chunk, chunks))
+
+    for chunk_messages, results in delivered:
+        for message, (ok, detail) in zip(chunk_messages, results):
+            _record_result(message, ok, detail)
+            if ok:
+                sent += 1
+            else:
+                failed += 1
+    return sent, failed
+
+
+def deliver_now(message):
+    """Deliver one queued message from this process instead of waiting for the worker; returns it reloaded."""
+    process_batch(batch_size=1, workers=1, queryset=OutboundMessage.objects.filter(pk=message.pk))
+    message.refresh_from_db()
+    return message
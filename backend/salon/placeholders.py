@@ -0,0 +1,206 @@
+"""
+Placeholder images (``/api/placeholder/<width>/<height>/``).
+
+Rendering and encoding an image is the expensive part and the frontend asks
+for the same handful of sizes over and over, so:
+
+* dimensions are clamped to ``MIN_SIZE``..``MAX_SIZE`` and rounded to a
+  multiple of ``SIZE_STEP`` (a 20000x20000 request costs the same as
+  2000x2000, and near-identical sizes share one image);
+* fonts are loaded once per process and size (``_font``);
+* encoded images are kept in a per-process LRU of ``MEMORY_ITEMS`` entries,
+  keyed by size, text and format.  Images with the default text are also
+  stored under ``PLACEHOLDER_CACHE_DIR`` so a restarted worker does not
+  re-render them; custom texts are not (any client could fill the disk
+  with them).  The directory keeps at most ``PLACEHOLDER_CACHE_MAX_FILES``
+  images, dropping the least recently used;
+* the format follows the ``Accept`` header (AVIF, then WebP, then PNG) and
+  every image has a strong ETag (a hash of its bytes), so revalidations are
+  answered with a 304 without touching the image.
+"""
+import hashlib
+import io
+import logging
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from PIL import Image, ImageDraw, ImageFont, features
+
+logger = logging.getLogger(__name__)
+
+MIN_SIZE = 20
+MAX_SIZE = 2000
+SIZE_STEP = 20
+MAX_TEXT_LENGTH = 40
+DEFAULT_TEXT = "خدمة جميلة"
+
+BACKGROUND = '#f3e5d1'
+FOREGROUND = '#8a724c'
+
+# Bump when the drawing changes, so cached files are not reused
+RENDER_VERSION = 1
+
+MEMORY_ITEMS = 128
+DISK_ITEMS = getattr(settings, 'PLACEHOLDER_CACHE_MAX_FILES', 500)
+
+# (MIME type, Pillow format, file extension, save options), preferred first
+FORMATS = [
+    ('image/avif', 'AVIF', 'avif', {'quality': 60}),
+    ('image/webp', 'WEBP', 'webp', {'quality': 80, 'method': 4}),
+    ('image/png', 'PNG', 'png', {'optimize': True}),
+]
+_SUPPORTED = {'AVIF': features.check('avif'), 'WEBP': features.check('webp'), 'PNG': True}
+
+FONT_CANDIDATES = ('arial.ttf', 'DejaVuSans.ttf')
+
+
+def bucket(value):
+    """Clamp a requested dimension and round it to the nearest ``SIZE_STEP``."""
+    value = min(max(int(value), MIN_SIZE), MAX_SIZE)
+    return max(MIN_SIZE, round(value / SIZE_STEP) * SIZE_STEP)
+
+
+def clean_text(text):
+    text = ' '.join(str(text or '').split())[:MAX_TEXT_LENGTH]
+    return text or DEFAULT_TEXT
+
+
+def negotiate(accept):
+    """``(mime, pillow format, extension, options)`` of the best format the client accepts."""
+    accept = (accept or '').lower()
+    for entry in FORMATS:
+        mime, pillow_format = entry[0], entry[1]
+        if _SUPPORTED[pillow_format] and mime in accept:
+            return entry
+    return FORMATS[-1]
+
+
+@lru_cache(maxsize=32)
+def _font(size):
+    configured = getattr(settings, 'PLACEHOLDER_FONT', None)
+    for path in ([configured] if configured else []) + list(FONT_CANDIDATES):
+        try:
+            return ImageFont.truetype(path, size)
+        except OSError:
+            continue
+    try:
+        return ImageFont.load_default(size)
+    except (TypeError, ImportError):
+        # Bitmap font (Pillow without FreeType)
+        return ImageFont.load_default()
+
+
+def render(width, height, text, pillow_format, options):
+    """Encoded bytes of one placeholder image."""
+    image = Image.new('RGB', (width, height), color=BACKGROUND)
+    draw = ImageDraw.Draw(image)
+    font = _font(max(8, min(width, height) // 8))
+    left, top, right, bottom = draw.textbbox((0, 0), text, font=font)
+    position = ((width - (right - left)) // 2 - left, (height - (bottom - top)) // 2 - top)
+    draw.text(position, text, fill=FOREGROUND, font=font)
+
+    output = io.BytesIO()
+    image.save(output, format=pillow_format, **options)
+    return output.getvalue()
+
+
+class _LRU:
+    def __init__(self, size):
+        self.size = size
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.items.get(key)
+            if value is not None:
+                self.items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.items[key] = value
+            self.items.move_to_end(key)
+            while len(self.items) > self.size:
+                self.items.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+
+_memory = _LRU(MEMORY_ITEMS)
+
+
+def _cache_dir():
+    configured = getattr(settings, 'PLACEHOLDER_CACHE_DIR', None)
+    return Path(configured) if configured else None
+
+
+def _read_file(path):
+    try:
+        data = path.read_bytes()
+        # The modification time orders the files for eviction
+        path.touch()
+        return data
+    except OSError:
+        return None
+
+
+def _evict(directory):
+    """Delete the least recently used files beyond ``DISK_ITEMS``."""
+    try:
+        files = [(entry.stat().st_mtime, entry) for entry in directory.iterdir() if not entry.name.endswith('.tmp')]
+    except OSError:
+        return
+    files.sort()
+    for _mtime, path in files[:max(0, len(files) - DISK_ITEMS)]:
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+
+def _write_file(path, data):
+    # Write then rename, so concurrent workers never read a partial file
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_name(f'{path.name}.{threading.get_ident()}.tmp')
+        temporary.write_bytes(data)
+        temporary.replace(path)
+    except OSError as e:
+        logger.warning(f'Could not store placeholder {path.name}: {e}')
+        return
+    _evict(path.parent)
+
+
+def get_placeholder(width, height, text=None, accept=''):
+    """
+    ``(bytes, mime type, etag)`` of the placeholder for a request: from
+    memory, from disk, or rendered (and stored in memory, and on disk for
+    the default text).
+    """
+    width, height, text = bucket(width), bucket(height), clean_text(text)
+    mime, pillow_format, extension, options = negotiate(accept)
+    key = hashlib.sha256(
+        f'{RENDER_VERSION}|{width}x{height}|{pillow_format}|{text}'.encode('utf-8')
+    ).hexdigest()[:32]
+
+    cached = _memory.get(key)
+    if cached is not None:
+        return cached
+
+    directory = _cache_dir() if text == DEFAULT_TEXT else None
+    path = directory / f'{width}x{height}-{key}.{extension}' if directory else None
+    data = _read_file(path) if path else None
+    if data is None:
+        data = render(width, height, text, pillow_format, options)
+        if path:
+            _write_file(path, data)
+
+    entry = (data, mime, '"%s"' % hashlib.sha256(data).hexdigest()[:32])
+    _memory.set(key, entry)
+    return entry
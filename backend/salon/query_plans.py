@@ -0,0 +1,81 @@
+"""
+Query plans of the Booking hot paths.
+
+``hot_queries()`` builds each hot query the way the code issuing it does
+(availability, reminders, the bookings API, the admin changelist,
+reporting and the rollup refresh), and ``full_scans()`` runs ``EXPLAIN`` on
+them and reports every table read without an index.  ``manage.py
+check_query_plans`` fails when there is one, so a missing or unusable index
+(see ``Booking.Meta.indexes``) shows up before production traffic does.
+
+An ordered index scan feeding a ``LIMIT`` (``SCAN ... USING INDEX``) is
+fine; a plain table scan is not.  PostgreSQL prefers sequential scans on
+small tables whatever the indexes, so there the plans are taken with
+``enable_seqscan`` off: a sequential scan then means no index can serve the
+query.
+"""
+import re
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .availability import occupied_slots
+from .models import Booking
+from .reminders import reminder_candidates
+from .reporting import bookings_in_range
+
+# What a full table scan looks like in each backend's EXPLAIN output
+FULL_SCAN_PATTERNS = {
+    'sqlite': re.compile(r'\bSCAN (?!.*\bUSING\b.*\bINDEX\b)(\w+)'),
+    'postgresql': re.compile(r'\bSeq Scan on (\w+)'),
+}
+
+
+def hot_queries():
+    """``{name: queryset}`` with representative parameters."""
+    today = timezone.localdate()
+    now = timezone.now()
+    return {
+        'availability: occupied slots': occupied_slots(today, today + timedelta(days=13)),
+        'reminders: due bookings': reminder_candidates(24, now, now + timedelta(hours=24)),
+        "bookings API: a customer's bookings": (
+            Booking.objects.filter(customer_id=1, status='confirmed').order_by('-booking_date', '-booking_time')
+        ),
+        'bookings API: by date': (
+            Booking.objects.filter(booking_date=today).order_by('-booking_date', '-booking_time')
+        ),
+        'bookings API: latest page': Booking.objects.order_by('-booking_date', '-booking_time')[:20],
+        'admin: changelist': (
+            Booking.objects.select_related('customer', 'service', 'coupon')
+            .order_by('-booking_date', '-created_at')[:100]
+        ),
+        'reporting: bookings by status': (
+            bookings_in_range(today - timedelta(days=30), today, status='completed').values('pk')
+        ),
+        'rollups: one cell': (
+            Booking.objects.filter(booking_date=today, service_id=1, staff_id=1).order_by().values('pk')
+        ),
+    }
+
+
+def explain(queryset):
+    """The query plan of a queryset as text."""
+    if connection.vendor == 'postgresql':
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            return queryset.explain()
+    return queryset.explain()
+
+
+def full_scans():
+    """``{query name: (plan, [fully scanned tables])}`` for every hot query."""
+    pattern = FULL_SCAN_PATTERNS.get(connection.vendor)
+    if pattern is None:
+        raise NotImplementedError(f'No full scan detection for {connection.vendor}')
+    plans = {}
+    for name, queryset in hot_queries().items():
+        plan = explain(queryset)
+        plans[name] = (plan, pattern.findall(plan))
+    return plans
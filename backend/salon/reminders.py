@@ -0,0 +1,144 @@
+"""
+Batched appointment reminder dispatcher.
+
+For every configured window (e.g. 24h and 2h before the appointment) the
+dispatcher selects the active bookings that fall inside the window and have
+not been reminded for it yet, renders the reminder template once-compiled,
+bulk-queues the emails on the outbox and then delivers them in chunks that
+share one SMTP connection.
+
+Each reminder is an ``OutboundMessage`` with the event ``reminder_<hours>h``
+and a per booking/recipient dedup key, which is what makes re-runs skip
+bookings that were already reminded.
+"""
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.template.loader import get_template
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+from .email_service import EmailNotificationService
+from .models import Booking, OutboundMessage
+from .outbox import enqueue_many, process_batch
+
+REMINDER_TEMPLATE = 'emails/booking_reminder.html'
+REMINDER_STATUSES = ('pending', 'confirmed')
+
+
+def default_windows():
+    return tuple(getattr(settings, 'REMINDER_WINDOWS_HOURS', (24, 2)))
+
+
+def reminder_event(hours):
+    return f'reminder_{hours}h'
+
+
+def _booking_start(booking):
+    start = datetime.combine(booking.booking_date, booking.booking_time)
+    return timezone.make_aware(start) if settings.USE_TZ else start
+
+
+def _wants_reminders(customer):
+    if customer.user_id is None:
+        return True
+    try:
+        return customer.user.notification_settings.email_reminders
+    except ObjectDoesNotExist:
+        return True
+
+
+def due_bookings(hours, lower_hours, now):
+    """
+    Active bookings starting in ``(now + lower_hours, now + hours]`` that have
+    not had the ``hours`` reminder yet.  Customer, user, notification settings
+    and service are fetched in the same query.
+    """
+    window_start = now + timedelta(hours=lower_hours)
+    window_end = now + timedelta(hours=hours)
+    bookings = reminder_candidates(hours, window_start, window_end)
+    return [b for b in bookings if window_start < _booking_start(b) <= window_end]
+
+
+def reminder_candidates(hours, window_start, window_end):
+    """Bookings on the window's dates still owed the ``hours`` reminder (narrowed by time in Python)"""
+    return (
+        Booking.objects
+        .filter(
+            status__in=REMINDER_STATUSES,
+            booking_date__range=(
+                timezone.localtime(window_start).date(),
+                timezone.localtime(window_end).date(),
+            ),
+            customer__isnull=False,
+        )
+        .exclude(customer__email='')
+        .exclude(outbound_messages__event=reminder_event(hours))
+        .select_related('customer__user__notification_settings', 'service')
+        .order_by('booking_date', 'booking_time')
+    )
+
+
+def build_reminders(windows=None, now=None):
+    """Build (unsaved) reminder messages per window; returns ``{hours: [OutboundMessage]}``"""
+    now = now or timezone.now()
+    windows = sorted(set(windows or default_windows()), reverse=True)
+    email_service = EmailNotificationService()
+    template = get_template(REMINDER_TEMPLATE)
+
+    reminders = {}
+    for i, hours in enumerate(windows):
+        # Each booking only gets the reminder of the narrowest window it falls in
+        lower_hours = windows[i + 1] if i + 1 < len(windows) else 0
+        event = reminder_event(hours)
+        subject = email_service.reminder_subject(hours)
+        messages = []
+        for booking in due_bookings(hours, lower_hours, now):
+            if not _wants_reminders(booking.customer):
+                continue
+            recipient = booking.customer.email
+            html_content = template.render(email_service.reminder_context(booking, hours))
+            messages.append(OutboundMessage(
+                channel='email',
+                event=event,
+                recipient=recipient,
+                subject=subject,
+                payload={
+                    'html': html_content,
+                    'text': strip_tags(html_content),
+                    'from_email': email_service.from_email,
+                },
+                booking=booking,
+                dedup_key=f'email:{event}:{booking.id}:{recipient}',
+            ))
+        reminders[hours] = messages
+    return reminders
+
+
+def dispatch_reminders(windows=None, now=None, send=True, batch_size=100, workers=4):
+    """
+    Queue reminders for all windows and, unless ``send`` is False, deliver the
+    pending ones right away instead of waiting for the outbox worker.
+    Returns ``{'queued': {hours: count}, 'sent': n, 'failed': n}``.
+    """
+    reminders = build_reminders(windows, now)
+    queued = {}
+    for hours, messages in reminders.items():
+        if messages:
+            enqueue_many(messages)
+        queued[hours] = len(messages)
+
+    sent = failed = 0
+    if send:
+        pending = OutboundMessage.objects.filter(
+            event__in=[reminder_event(hours) for hours in reminders]
+        )
+        while True:
+            batch_sent, batch_failed = process_batch(batch_size=batch_size, workers=workers, queryset=pending)
+            sent += batch_sent
+            failed += batch_failed
+            if batch_sent + batch_failed < batch_size:
+                break
+
+    return {'queued': queued, 'sent': sent, 'failed': failed}
@@ -0,0 +1,194 @@
+"""
+Revenue reporting.
+
+Every breakdown is a single ``GROUP BY`` query; nothing is summed in Python.
+Reports read the ``DailyStats`` rollup (one row per day, service and staff
+member, see ``rollups.py``), so their cost grows with the number of days
+rather than bookings.  Filtering by booking status falls back to ``Booking``
+itself, which the rollup has no dimension for.
+
+A booking is attributed to its service's *primary* (first, in ``Category``
+ordering) category, looked up with a correlated subquery on the
+``Service.categories`` through table, so category totals add up to the
+overall revenue exactly like the per-row ``service.category`` did.
+
+Used by the Excel / JSON exports and by the ``/reports/revenue/`` API.
+"""
+from datetime import timedelta
+
+from django.db.models import Count, DecimalField, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, TruncWeek
+
+from .models import Booking, Category, DailyStats, Service
+from .rollups import STATUS_COUNT_FIELDS
+
+GROUPINGS = ('category', 'service', 'staff', 'day', 'week')
+UNCATEGORIZED = 'بدون فئة'
+UNASSIGNED_STAFF = 'غير محدد'
+
+
+def _money(field):
+    return Coalesce(Sum(field), Value(0), output_field=DecimalField(max_digits=12, decimal_places=2))
+
+
+def _metrics(rows):
+    if rows.model is DailyStats:
+        return {
+            'bookings': Coalesce(Sum('bookings_count'), Value(0), output_field=IntegerField()),
+            'revenue': _money('final_revenue'),
+            'discounts': _money('discount_total'),
+        }
+    return {
+        'bookings': Count('id'),
+        'revenue': _money('final_price'),
+        'discounts': _money('discount_amount'),
+    }
+
+
+def _date_field(rows):
+    return 'date' if rows.model is DailyStats else 'booking_date'
+
+
+def bookings_in_range(start_date, end_date, status=None, staff_id=None, service_id=None):
+    """
+    Rows a report is computed from: ``DailyStats`` cells, or the bookings
+    themselves when filtering by ``status``.
+    """
+    if status:
+        rows = Booking.objects.filter(booking_date__range=[start_date, end_date], status=status)
+    else:
+        rows = DailyStats.objects.filter(date__range=[start_date, end_date])
+    if staff_id:
+        rows = rows.filter(staff_id=staff_id)
+    if service_id:
+        rows = rows.filter(service_id=service_id)
+    return rows.order_by()
+
+
+def _primary_category(field):
+    through = Service.categories.through.objects.filter(service_id=OuterRef('service_id'))
+    ordering = [f'category__{name}' for name in Category._meta.ordering] + ['category_id']
+    return Subquery(through.order_by(*ordering).values(field)[:1])
+
+
+def _grouped(bookings, key, label=None):
+    """Bookings / revenue / discounts per ``key`` (and ``label``), highest revenue first."""
+    fields = [key] + ([label] if label else [])
+    return (
+        bookings.values(*fields)
+        .annotate(**_metrics(bookings))
+        .order_by('-revenue', key)
+    )
+
+
+def _rows(queryset, key, label, default_label=''):
+    return [
+        {
+            'id': row[key],
+            'name': row[label] if row[label] is not None else default_label,
+            'bookings': row['bookings'],
+            'revenue': float(row['revenue']),
+            'discounts': float(row['discounts']),
+        }
+        for row in queryset
+    ]
+
+
+def summary(bookings):
+    row = bookings.aggregate(**_metrics(bookings))
+    revenue = row['revenue']
+    return {
+        'bookings': row['bookings'],
+        'revenue': revenue,
+        'discounts': row['discounts'],
+        'avg_booking_value': revenue / row['bookings'] if row['bookings'] else 0,
+    }
+
+
+def revenue_by_category(bookings):
+    queryset = _grouped(
+        bookings.annotate(
+            category_id=_primary_category('category_id'),
+            category_name=_primary_category('category__name'),
+        ),
+        'category_id', 'category_name',
+    )
+    return _rows(queryset, 'category_id', 'category_name', UNCATEGORIZED)
+
+
+def revenue_by_service(bookings):
+    return _rows(_grouped(bookings, 'service_id', 'service__name'), 'service_id', 'service__name')
+
+
+def revenue_by_staff(bookings):
+    return _rows(_grouped(bookings, 'staff_id', 'staff__name'), 'staff_id', 'staff__name', UNASSIGNED_STAFF)
+
+
+def revenue_by_day(bookings, start_date=None, end_date=None):
+    """One row per day; with a date range, days without bookings are included as zeros."""
+    key = _date_field(bookings)
+    rows = {row[key]: row for row in _grouped(bookings, key).order_by(key)}
+    days = sorted(rows)
+    if start_date and end_date:
+        days = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+    return [
+        {
+            'date': day.isoformat(),
+            'bookings': rows[day]['bookings'] if day in rows else 0,
+            'revenue': float(rows[day]['revenue']) if day in rows else 0.0,
+            'discounts': float(rows[day]['discounts']) if day in rows else 0.0,
+        }
+        for day in days
+    ]
+
+
+def revenue_by_week(bookings):
+    queryset = _grouped(bookings.annotate(week=TruncWeek(_date_field(bookings))), 'week').order_by('week')
+    return [
+        {
+            'week_start': row['week'].isoformat() if row['week'] else None,
+            'bookings': row['bookings'],
+            'revenue': float(row['revenue']),
+            'discounts': float(row['discounts']),
+        }
+        for row in queryset
+    ]
+
+
+def bookings_by_status(bookings):
+    if bookings.model is DailyStats:
+        counts = bookings.aggregate(**{
+            value: Coalesce(Sum(field), Value(0), output_field=IntegerField())
+            for value, field in STATUS_COUNT_FIELDS.items()
+        })
+    else:
+        counts = dict(bookings.values('status').annotate(count=Count('id')).values_list('status', 'count'))
+    return {value: counts.get(value, 0) for value, _label in Booking.STATUS_CHOICES}
+
+
+def revenue_report(start_date, end_date, group_by=GROUPINGS, **filters):
+    """Summary plus the requested breakdowns (see ``GROUPINGS``) for a date range."""
+    bookings = bookings_in_range(start_date, end_date, **filters)
+    totals = summary(bookings)
+    report = {
+        'date_range': {
+            'start_date': start_date.isoformat(),
+            'end_date': end_date.isoformat(),
+        },
+        'summary': {
+            'bookings': totals['bookings'],
+            'revenue': float(totals['revenue']),
+            'discounts': float(totals['discounts']),
+            'avg_booking_value': float(totals['avg_booking_value']),
+        },
+    }
+    builders = {
+        'category': lambda: revenue_by_category(bookings),
+        'service': lambda: revenue_by_service(bookings),
+        'staff': lambda: revenue_by_staff(bookings),
+        'day': lambda: revenue_by_day(bookings, start_date, end_date),
+        'week': lambda: revenue_by_week(bookings),
+    }
+    for name in group_by:
+        report[f'by_{name}'] = builders[name]()
+    return report
@@ -0,0 +1,234 @@
+"""
+Slot reservations for the booking flow
+
+Two concurrent requests for the same staff member and time used to both
+succeed; the clash was only noticed by an admin later.  Now:
+
+* a booking or hold for a staff member first locks that staff row
+  (``select_for_update``), then refuses a slot whose span overlaps an
+  active booking or someone else's unexpired hold of that staff member, or
+  one without a staff member, so concurrent checks for one staff member run
+  one after the other and services of different lengths cannot overlap;
+* a booking or hold without a staff member (what the checkout sends) is
+  checked the way availability.py offers it: it blocks every staff
+  calendar, so it is refused when it overlaps another unassigned booking or
+  hold, or when every staff member offering the service (every booking,
+  when nobody offers it) is taken.  It locks all staff rows and the service
+  row, so it waits for the staff checks and for other unassigned checks;
+* ``Booking`` also has partial unique constraints on (date, staff, time)
+  and, for bookings without a staff member, on (date, time) over the active
+  statuses, so a write that skips these checks still cannot double-book a
+  start time (``SlotHold`` has the same pair);
+* ``hold_slot()`` reserves a slot for ``SLOT_HOLD_MINUTES`` while the
+  customer is in checkout (a ``SlotHold`` row, unique per slot).  A user
+  holds at most ``SLOT_HOLDS_PER_USER`` slots at a time.  Expired holds are
+  ignored and purged; booking with the hold's token consumes it;
+* where the admin manages the slot's capacity (``AdminSlotAvailability``),
+  ``current_bookings`` is bumped with a single guarded
+  ``UPDATE ... SET current_bookings = current_bookings + 1 WHERE
+  current_bookings < max_bookings``, and given back by the Booking signals
+  when the booking is cancelled, moved or deleted.
+"""
+from datetime import timedelta
+from itertools import chain
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .availability import parse_duration_minutes
+from .models import ACTIVE_BOOKING_STATUSES, AdminSlotAvailability, Booking, Service, SlotHold, Staff, User
+
+HOLD_MINUTES = getattr(settings, 'SLOT_HOLD_MINUTES', 10)
+HOLDS_PER_USER = getattr(settings, 'SLOT_HOLDS_PER_USER', 2)
+
+SLOT_TAKEN = 'هذا الموعد محجوز بالفعل، يرجى اختيار موعد آخر'
+SLOT_FULL = 'هذا الموعد مكتمل، يرجى اختيار موعد آخر'
+HOLD_EXPIRED = 'انتهت مدة حجز الموعد المؤقت، يرجى اختيار الموعد مرة أخرى'
+TOO_MANY_HOLDS = 'لديك مواعيد محجوزة مؤقتاً بالفعل، يرجى إكمال الحجز أو إلغاؤها أولاً'
+
+
+class SlotUnavailable(Exception):
+    """The slot is booked, held by someone else or at capacity."""
+
+
+class TooManyHolds(Exception):
+    """The user already holds ``HOLDS_PER_USER`` slots."""
+
+
+def _minutes(value):
+    if isinstance(value, str):
+        # reschedule_booking passes the raw request value ("HH:MM[:SS]")
+        hours, minutes = value.split(':')[:2]
+        return int(hours) * 60 + int(minutes)
+    return value.hour * 60 + value.minute
+
+
+def _lock(service_id, staff_id):
+    if staff_id is not None:
+        Staff.objects.select_for_update().filter(pk=staff_id).exists()
+        return
+    # Unassigned slots block every staff calendar, so they wait for all of them
+    list(Staff.objects.select_for_update().order_by('pk').values_list('pk', flat=True))
+    # Without staff rows, unassigned checks of one service still run one at a time
+    Service.objects.select_for_update(no_key=True).filter(pk=service_id).exists()
+
+
+def _check_slot(day, service_id, staff_id, time, duration, hold_token=None, booking_id=None):
+    """
+    Refuse a slot whose span is taken (see the module docstring) by active
+    bookings (other than ``booking_id``) or other people's holds; returns
+    the caller's own hold, if any.  Must run inside a transaction: the
+    locked rows stay locked until it commits.
+    """
+    _lock(service_id, staff_id)
+
+    holds = SlotHold.objects.filter(date=day, expires_at__gt=timezone.now())
+    own = None
+    if hold_token:
+        own = holds.filter(token=hold_token, staff_id=staff_id, time=time).first()
+        if own is None:
+            raise SlotUnavailable(HOLD_EXPIRED)
+        holds = holds.exclude(pk=own.pk)
+    bookings = Booking.objects.filter(booking_date=day, status__in=ACTIVE_BOOKING_STATUSES)
+    if staff_id is not None:
+        bookings = bookings.filter(Q(staff_id=staff_id) | Q(staff__isnull=True))
+        holds = holds.filter(Q(staff_id=staff_id) | Q(staff__isnull=True))
+    if booking_id is not None:
+        bookings = bookings.exclude(pk=booking_id)
+
+    start = _minutes(time)
+    end = start + parse_duration_minutes(duration)
+    taken = chain(
+        bookings.values_list('staff_id', 'booking_time', 'service__duration'),
+        holds.values_list('staff_id', 'time', 'service__duration'),
+    )
+    busy = set()
+    for other_staff_id, other_time, other_duration in taken:
+        other_start = _minutes(other_time)
+        if other_start < end and start < other_start + parse_duration_minutes(other_duration):
+            busy.add(other_staff_id)
+
+    if None in busy or staff_id in busy:
+        raise SlotUnavailable(SLOT_TAKEN)
+    if staff_id is None and busy:
+        eligible = set(
+            Staff.objects.filter(is_active=True, services=service_id).values_list('pk', flat=True)
+        )
+        if not eligible or eligible <= busy:
+            raise SlotUnavailable(SLOT_TAKEN)
+    return own
+
+
+def purge_expired_holds(now=None):
+    """Delete every expired hold; returns how many were removed."""
+    deleted, _ = SlotHold.objects.filter(expires_at__lte=now or timezone.now()).delete()
+    return deleted
+
+
+def hold_slot(service, staff, day, time, minutes=None, user=None):
+    """
+    Hold a slot for checkout; returns the ``SlotHold`` (its ``token`` is
+    passed back when booking).  Raises ``SlotUnavailable`` when the slot
+    overlaps a booking or someone else's hold, and ``TooManyHolds`` when
+    ``user`` already holds ``HOLDS_PER_USER`` slots.
+    """
+    service_id = getattr(service, 'pk', service)
+    staff_id = getattr(staff, 'pk', staff)
+    now = timezone.now()
+    with transaction.atomic():
+        SlotHold.objects.filter(date=day, staff_id=staff_id, time=time, expires_at__lte=now).delete()
+        if user is not None:
+            # Locked so that concurrent holds of one user are counted one after the other
+            User.objects.select_for_update().filter(pk=user.pk).exists()
+            if SlotHold.objects.filter(user=user, expires_at__gt=now).count() >= HOLDS_PER_USER:
+                raise TooManyHolds(TOO_MANY_HOLDS)
+        duration = Service.objects.filter(pk=service_id).values_list('duration', flat=True).first()
+        _check_slot(day, service_id, staff_id, time, duration)
+        try:
+            with transaction.atomic():
+                return SlotHold.objects.create(
+                    service_id=service_id,
+                    staff_id=staff_id,
+                    user=user,
+                    date=day,
+                    time=time,
+                    expires_at=now + timedelta(minutes=minutes or HOLD_MINUTES),
+                )
+        except IntegrityError:
+            raise SlotUnavailable(SLOT_TAKEN)
+
+
+def release_hold(token, user=None):
+    """Give a held slot back (only ``user``'s own, when given); returns whether a hold was removed."""
+    holds = SlotHold.objects.filter(token=token)
+    if user is not None:
+        holds = holds.filter(user=user)
+    deleted, _ = holds.delete()
+    return bool(deleted)
+
+
+def claim_capacity(service_id, day, time):
+    """
+    Take one place of an admin-managed slot.  Slots the admin does not
+    manage have no capacity limit; a managed slot that is closed or full
+    raises ``SlotUnavailable``.
+    """
+    slots = AdminSlotAvailability.objects.filter(service_id=service_id, date=day, time=time)
+    claimed = slots.filter(is_available=True, current_bookings__lt=F('max_bookings')).update(
+        current_bookings=F('current_bookings') + 1,
+    )
+    if not claimed and slots.exists():
+        raise SlotUnavailable(SLOT_FULL)
+
+
+def release_capacity(service_id, day, time):
+    """Give one place of an admin-managed slot back (no-op for unmanaged slots)."""
+    AdminSlotAvailability.objects.filter(
+        service_id=service_id, date=day, time=time, current_bookings__gt=0,
+    ).update(current_bookings=F('current_bookings') - 1)
+
+
+def create_booking(validated_data, hold_token=None):
+    """
+    Create a booking if its slot is free; raises ``SlotUnavailable``
+    otherwise.  The capacity claim, the insert and consuming the hold commit
+    together.
+    """
+    service = validated_data['service']
+    staff = validated_data.get('staff')
+    day, time = validated_data['booking_date'], validated_data['booking_time']
+    with transaction.atomic():
+        hold = _check_slot(day, service.pk, getattr(staff, 'pk', None), time, service.duration, hold_token)
+        claim_capacity(service.pk, day, time)
+        try:
+            with transaction.atomic():
+                booking = Booking.objects.create(**validated_data)
+        except IntegrityError:
+            raise SlotUnavailable(SLOT_TAKEN)
+        if hold is not None:
+            hold.delete()
+    return booking
+
+
+def move_booking(booking, new_date, new_time):
+    """
+    Move a booking to another slot, under the same rules as a new booking.
+    The old slot's capacity is given back by the Booking signals.
+    """
+    with transaction.atomic():
+        _check_slot(
+            new_date, booking.service_id, booking.staff_id, new_time, booking.service.duration,
+            booking_id=booking.pk,
+        )
+        if booking.status in ACTIVE_BOOKING_STATUSES:
+            claim_capacity(booking.service_id, new_date, new_time)
+        booking.booking_date = new_date
+        booking.booking_time = new_time
+        try:
+            with transaction.atomic():
+                booking.save()
+        except IntegrityError:
+            raise SlotUnavailable(SLOT_TAKEN)
+    return booking
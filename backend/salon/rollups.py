@@ -0,0 +1,113 @@
+"""
+``DailyStats`` rollup maintenance.
+
+One row per (booking date, service, staff) holds that cell's booking counts
+per status and payment status plus its revenue totals.  The Booking signals
+call ``refresh_cells()`` for the cell a booking is in (and was in, when its
+date, service or staff changed): the cell is re-aggregated from its own
+bookings, which keeps the rollup exact without replaying deltas.  Bulk
+``QuerySet.update()`` calls bypass the signals and must call
+``refresh_for_bookings()`` themselves.  ``rebuild()`` recomputes a whole date
+range in one ``GROUP BY`` (``manage.py backfill_daily_stats``).
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Booking, DailyStats
+
+STATUS_COUNT_FIELDS = {
+    value: f'{value}_count' for value, _label in Booking.STATUS_CHOICES
+}
+PAYMENT_STATUS_COUNT_FIELDS = {
+    value: f'payment_{value}_count'
+    for value, _label in Booking._meta.get_field('payment_status').choices
+}
+# Statuses whose unpaid bookings count as pending revenue
+OPEN_STATUSES = ['pending', 'confirmed', 'in_progress']
+
+
+def _money(field, condition=None):
+    return Coalesce(
+        Sum(field, filter=condition),
+        Value(0),
+        output_field=DecimalField(max_digits=12, decimal_places=2),
+    )
+
+
+def booking_aggregates():
+    """``DailyStats`` field name -> aggregate over the cell's bookings."""
+    paid = Q(payment_status='paid')
+    aggregates = {'bookings_count': Count('id')}
+    for value, field in STATUS_COUNT_FIELDS.items():
+        aggregates[field] = Count('id', filter=Q(status=value))
+    for value, field in PAYMENT_STATUS_COUNT_FIELDS.items():
+        aggregates[field] = Count('id', filter=Q(payment_status=value))
+    aggregates.update(
+        gross_revenue=_money('price'),
+        discount_total=_money('discount_amount'),
+        final_revenue=_money('final_price'),
+        paid_revenue=_money('final_price', paid),
+        pending_revenue=_money('final_price', ~paid & Q(status__in=OPEN_STATUSES)),
+        refunded_amount=_money('refund_amount', Q(payment_status='refunded')),
+    )
+    return aggregates
+
+
+def booking_key(booking):
+    return (booking.booking_date, booking.service_id, booking.staff_id)
+
+
+def refresh_cells(keys):
+    """Recompute the rollup rows for the given ``(date, service_id, staff_id)`` keys."""
+    aggregates = booking_aggregates()
+    with transaction.atomic():
+        for day, service_id, staff_id in set(keys):
+            if day is None or service_id is None:
+                continue
+            cell = DailyStats.objects.filter(date=day, service_id=service_id, staff_id=staff_id)
+            row = Booking.objects.filter(
+                booking_date=day, service_id=service_id, staff_id=staff_id
+            ).order_by().aggregate(**aggregates)
+
+            if not row['bookings_count']:
+                cell.delete()
+                continue
+            if cell.update(updated_at=timezone.now(), **row):
+                continue
+            try:
+                with transaction.atomic():
+                    DailyStats.objects.create(date=day, service_id=service_id, staff_id=staff_id, **row)
+            except IntegrityError:
+                # Created concurrently by another request
+                cell.update(updated_at=timezone.now(), **row)
+
+
+def refresh_for_bookings(bookings):
+    """Recompute the cells touched by a booking queryset (after a bulk update)."""
+    refresh_cells(bookings.order_by().values_list('booking_date', 'service_id', 'staff_id').distinct())
+
+
+def rebuild(start_date=None, end_date=None, batch_size=1000):
+    """
+    Replace the rollup rows in ``[start_date, end_date]`` (all dates when
+    omitted) with a fresh aggregation.  Returns the number of rows written.
+    """
+    bookings = Booking.objects.order_by()
+    stats = DailyStats.objects.all()
+    if start_date:
+        bookings = bookings.filter(booking_date__gte=start_date)
+        stats = stats.filter(date__gte=start_date)
+    if end_date:
+        bookings = bookings.filter(booking_date__lte=end_date)
+        stats = stats.filter(date__lte=end_date)
+
+    rows = bookings.values('booking_date', 'service_id', 'staff_id').annotate(**booking_aggregates())
+    with transaction.atomic():
+        stats.delete()
+        created = DailyStats.objects.bulk_create(
+            [DailyStats(date=row.pop('booking_date'), **row) for row in rows],
+            batch_size=batch_size,
+        )
+    return len(created)
@@ -0,0 +1,326 @@
+"""
+Full-text search over blog posts and services.
+
+Documents live in one index table, ``salon_search_index``:
+
+* SQLite: an FTS5 virtual table (``unicode61`` tokenizer), ranked with
+  ``bm25()``;
+* PostgreSQL: a regular table with a generated, weighted ``tsvector`` column
+  and a GIN index, ranked with ``ts_rank_cd()``.
+
+Documents and queries both go through ``salon.normalization`` (Arabic
+letter variants, diacritics, light stemming), so the index holds normalized
+stems and tokenization is language-neutral.  Titles and snippets of the hits
+are highlighted from the original text.  On any other database
+``backend()`` is ``None`` and searches filter the models' ``search_text``
+shadow columns instead.
+
+The index is kept in sync by the model signals (see ``signals.py``) and can
+be rebuilt from scratch with ``manage.py rebuild_search_index``.
+"""
+from django.apps import apps
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+
+from .normalization import highlight, query_groups, search_text, snippet
+
+TABLE = 'salon_search_index'
+
+# Index rows are addressed as pk * KIND_SLOTS + kind id, so an update or
+# delete is a primary key lookup (FTS5 cannot index the kind/object columns)
+KIND_SLOTS = 10
+
+# kind -> how its documents are built
+SOURCES = {
+    'blog': {
+        'id': 1,
+        'model': 'salon.BlogPost',
+        'indexed': {'status': 'published'},
+        'title': ('title', 'title_en'),
+        'body': ('excerpt', 'excerpt_en', 'content', 'content_en'),
+        'tags': ('tags',),
+        'link': lambda post: {'slug': post.slug},
+    },
+    'services': {
+        'id': 2,
+        'model': 'salon.Service',
+        'indexed': {'is_active': True},
+        'title': ('name', 'name_en'),
+        'body': ('description', 'description_en'),
+        'tags': (),
+        'link': lambda service: {'price': float(service.price)},
+    },
+}
+
+MAX_RESULTS = 50
+
+
+def _model(kind):
+    return apps.get_model(SOURCES[kind]['model'])
+
+
+def kind_of(model):
+    """The index kind of a model, or None if it is not searchable."""
+    for kind, source in SOURCES.items():
+        if source['model'] == model._meta.label:
+            return kind
+    return None
+
+
+def document(kind, instance):
+    """``{'title', 'body', 'tags'}`` to index for an instance (normalized stems)."""
+    source = SOURCES[kind]
+    return {
+        part: search_text(*(getattr(instance, field) for field in source[part]))
+        for part in ('title', 'body', 'tags')
+    }
+
+
+def _row_id(kind, pk):
+    return pk * KIND_SLOTS + SOURCES[kind]['id']
+
+
+class SQLiteBackend:
+    def create(self, cursor):
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5("
+            "kind UNINDEXED, object_id UNINDEXED, title, body, tags, "
+            "tokenize = 'unicode61 remove_diacritics 2')"
+        )
+
+    def drop(self, cursor):
+        cursor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+
+    def clear(self, cursor):
+        cursor.execute(f'DELETE FROM {TABLE}')
+
+    def delete(self, cursor, kind, pk):
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [_row_id(kind, pk)])
+
+    def upsert(self, cursor, rows):
+        cursor.executemany(f'DELETE FROM {TABLE} WHERE rowid = %s', [[row[0]] for row in rows])
+        cursor.executemany(
+            f'INSERT INTO {TABLE} (rowid, kind, object_id, title, body, tags) VALUES (%s, %s, %s, %s, %s, %s)',
+            rows,
+        )
+
+    def match_expression(self, groups):
+        return ' AND '.join(
+            '(' + ' OR '.join(f'"{term}"' + ('*' if is_prefix else '') for term, is_prefix in group) + ')'
+            for group in groups
+        )
+
+    def search(self, cursor, groups, kinds, limit):
+        placeholders = ', '.join(['%s'] * len(kinds))
+        cursor.execute(
+            f"SELECT kind, object_id, -bm25({TABLE}, 0, 0, 10.0, 1.0, 5.0) AS score "
+            f"FROM {TABLE} WHERE {TABLE} MATCH %s AND kind IN ({placeholders}) "
+            f"ORDER BY bm25({TABLE}, 0, 0, 10.0, 1.0, 5.0) LIMIT %s",
+            [self.match_expression(groups), *kinds, limit],
+        )
+        return cursor.fetchall()
+
+
+class PostgreSQLBackend:
+    config = 'simple'
+
+    def create(self, cursor):
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {TABLE} ("
+            "id bigint PRIMARY KEY, kind varchar(20) NOT NULL, object_id bigint NOT NULL, "
+            "title text NOT NULL, body text NOT NULL, tags text NOT NULL, "
+            "document tsvector GENERATED ALWAYS AS ("
+            f"setweight(to_tsvector('{self.config}', title), 'A') || "
+            f"setweight(to_tsvector('{self.config}', tags), 'B') || "
+            f"setweight(to_tsvector('{self.config}', body), 'C')) STORED)"
+        )
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS {TABLE}_document ON {TABLE} USING GIN (document)')
+
+    def drop(self, cursor):
+        cursor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+
+    def clear(self, cursor):
+        cursor.execute(f'TRUNCATE {TABLE}')
+
+    def delete(self, cursor, kind, pk):
+        cursor.execute(f'DELETE FROM {TABLE} WHERE id = %s', [_row_id(kind, pk)])
+
+    def upsert(self, cursor, rows):
+        cursor.executemany(
+            f'INSERT INTO {TABLE} (id, kind, object_id, title, body, tags) VALUES (%s, %s, %s, %s, %s, %s) '
+            'ON CONFLICT (id) DO UPDATE SET title = EXCLUDED.title, body = EXCLUDED.body, tags = EXCLUDED.tags',
+            rows,
+        )
+
+    def match_expression(self, groups):
+        return ' & '.join(
+            '(' + ' | '.join(term + (':*' if is_prefix else '') for term, is_prefix in group) + ')'
+            for group in groups
+        )
+
+    def search(self, cursor, groups, kinds, limit):
+        cursor.execute(
+            f"SELECT kind, object_id, ts_rank_cd(document, query) AS score "
+            f"FROM {TABLE}, to_tsquery('{self.config}', %s) AS query "
+            f"WHERE document @@ query AND kind = ANY(%s) ORDER BY score DESC LIMIT %s",
+            [self.match_expression(groups), list(kinds), limit],
+        )
+        return cursor.fetchall()
+
+
+BACKENDS = {
+    'sqlite': SQLiteBackend,
+    'postgresql': PostgreSQLBackend,
+}
+
+
+def backend(conn=None):
+    """The index backend for a connection (the default one), or None if unsupported."""
+    backend_class = BACKENDS.get((conn or connection).vendor)
+    return backend_class() if backend_class else None
+
+
+def _rows(kind, instances):
+    rows = []
+    for instance in instances:
+        doc = document(kind, instance)
+        rows.append([_row_id(kind, instance.pk), kind, instance.pk, doc['title'], doc['body'], doc['tags']])
+    return rows
+
+
+def index_instance(instance):
+    """Add, update or drop one instance's document (called from the model signals)."""
+    kind = kind_of(type(instance))
+    index = backend()
+    if kind is None or index is None:
+        return
+    indexed = all(getattr(instance, field) == value for field, value in SOURCES[kind]['indexed'].items())
+    with connection.cursor() as cursor:
+        if indexed:
+            index.upsert(cursor, _rows(kind, [instance]))
+        else:
+            index.delete(cursor, kind, instance.pk)
+
+
+def remove_instance(instance):
+    kind = kind_of(type(instance))
+    index = backend()
+    if kind is None or index is None:
+        return
+    with connection.cursor() as cursor:
+        index.delete(cursor, kind, instance.pk)
+
+
+def rebuild(batch_size=500):
+    """Re-index every searchable row; returns the number of documents written."""
+    index = backend()
+    if index is None:
+        return 0
+    written = 0
+    with connection.cursor() as cursor:
+        index.create(cursor)
+        index.clear(cursor)
+        for kind, source in SOURCES.items():
+            queryset = _model(kind)._default_manager.filter(**source['indexed']).order_by('pk')
+            fields = ('pk',) + source['title'] + source['body'] + source['tags']
+            batch = []
+            for instance in queryset.only(*fields).iterator(chunk_size=batch_size):
+                batch.append(instance)
+                if len(batch) == batch_size:
+                    index.upsert(cursor, _rows(kind, batch))
+                    written += len(batch)
+                    batch = []
+            if batch:
+                index.upsert(cursor, _rows(kind, batch))
+                written += len(batch)
+    return written
+
+
+def _filter_groups(queryset, groups):
+    for group in groups:
+        condition = Q()
+        for term, _is_prefix in group:
+            condition |= Q(search_text__contains=term)
+        queryset = queryset.filter(condition)
+    return queryset
+
+
+def filter_shadow(queryset, query):
+    """
+    Rows whose ``search_text`` shadow column contains every word of
+    ``query`` (normalized and stemmed like the column).
+    """
+    return _filter_groups(queryset, query_groups(query))
+
+
+def _ranked(kinds, groups, limit):
+    """``(kind, pk, score)`` rows, best first."""
+    index = backend()
+    if index is not None:
+        with connection.cursor() as cursor:
+            return index.search(cursor, groups, kinds, limit)
+    rows = []
+    for kind in kinds:
+        queryset = _model(kind)._default_manager.filter(**SOURCES[kind]['indexed'])
+        pks = _filter_groups(queryset, groups).values_list('pk', flat=True)[:limit]
+        rows.extend((kind, pk, 0.0) for pk in pks)
+    return rows[:limit]
+
+
+def search(query, kinds=None, limit=20):
+    """
+    Ranked hits for ``query``, best first: dicts with ``type``, ``id``,
+    ``score``, HTML-escaped ``title`` / ``snippet`` where the matched words
+    are wrapped in ``<mark>``, and the kind's link fields (``slug`` for
+    blog posts, ``price`` for services).
+    """
+    groups = query_groups(query)
+    if not groups:
+        return []
+    kinds = list(kinds or SOURCES)
+    rows = _ranked(kinds, groups, max(1, min(limit, MAX_RESULTS)))
+
+    # Highlight from the original text; also drops index rows gone stale
+    instances = {}
+    for kind in kinds:
+        pks = [pk for row_kind, pk, _score in rows if row_kind == kind]
+        if pks:
+            queryset = _model(kind)._default_manager.filter(**SOURCES[kind]['indexed'])
+            instances[kind] = queryset.in_bulk(pks)
+
+    hits = []
+    for kind, pk, score in rows:
+        instance = instances.get(kind, {}).get(pk)
+        if instance is None:
+            continue
+        source = SOURCES[kind]
+        title = ' - '.join(str(getattr(instance, field)) for field in source['title'] if getattr(instance, field))
+        body = '\n'.join(str(getattr(instance, field)) for field in source['body'] if getattr(instance, field))
+        hits.append({
+            'type': kind,
+            'id': pk,
+            'score': round(float(score), 4),
+            'title': highlight(title, groups),
+            'snippet': snippet(body, groups),
+            **source['link'](instance),
+        })
+    return hits
+
+
+def filter_ranked(queryset, kind, query, limit=1000):
+    """
+    Narrow a queryset to the rows matching ``query``, ordered by relevance
+    (the list views' ``?search=``).  Without an index the ``search_text``
+    shadow column is filtered and the queryset's ordering kept.
+    """
+    groups = query_groups(query)
+    if not groups:
+        return queryset
+    if backend() is None:
+        return _filter_groups(queryset, groups)
+    ids = [pk for _kind, pk, _score in _ranked([kind], groups, limit)]
+    if not ids:
+        return queryset.none()
+    ordering = Case(*[When(pk=pk, then=Value(position)) for position, pk in enumerate(ids)],
+                    output_field=IntegerField())
+    return queryset.filter(pk__in=ids).order_by(ordering)
@@ -1,19 +1,41 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from django.db.models import Prefetch, prefetch_related_objects
 from django.contrib.auth import get_user_model
 from rest_framework.validators import UniqueValidator
 from .models import PhoneOTP, Customer
 
 from .views.utility_views import generate_otp
 from .views.services import send_whatsapp_message
+from . import counters, image_variants, reservations
+from .catalog_cache import cached_items
 from .models import (
     Category, Service, Staff, Customer, Address, Coupon, Booking, HeroImage,
     Config, WorkingHours, DayOff, AppointmentRequest, AppointmentRescheduleHistory, PasswordResetToken,
     BlogAuthor, BlogCategory, BlogPost, BlogComment, NewsletterSubscriber,
-    Notification, NotificationSettings, AdminSlotAvailability
+    Notification, NotificationSettings, AdminSlotAvailability, Offer
 )
 
 
+def service_categories_prefetch():
+    """Prefetch for ``Service.categories`` (read by ``ServiceSerializer``)"""
+    return Prefetch('categories', queryset=Category.objects.all())
+
+
+def with_service_categories(services):
+    """Services ready for ``ServiceSerializer``: categories loaded in one query"""
+    return services.prefetch_related(service_categories_prefetch())
+
+
+def active_services_prefetch():
+    """Prefetch a category's active services into ``active_services`` (read by ``CategorySerializer``)"""
+    return Prefetch(
+        'services',
+        queryset=with_service_categories(Service.objects.filter(is_active=True)),
+        to_attr='active_services',
+    )
+
+
 class CategorySerializer(serializers.ModelSerializer):
     services_count = serializers.SerializerMethodField()
     services = serializers.SerializerMethodField()
@@ -23,18 +45,33 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'name_en', 'slug_en', 'description', 'description_en', 
                  'icon', 'image', 'primary_color', 'is_active', 'order', 'services_count', 'services']
     
+    def _active_services(self, obj):
+        """Active services, from the ``active_services`` prefetch when the view made one"""
+        if not hasattr(obj, 'active_services'):
+            obj.active_services = list(with_service_categories(obj.services.filter(is_active=True)))
+        return obj.active_services
+
     def get_services_count(self, obj):
-        return obj.services.filter(is_active=True).count()
+        return len(self._active_services(obj))
     
     def get_services(self, obj):
         """Get services for this category"""
-        services = self.context.get('services', obj.services.filter(is_active=True))
+        services = self.context.get('services')
+        if services is None:
+            services = self._active_services(obj)
         if services:
             return ServiceSerializer(services, many=True, context=self.context).data
         return []
 
 
+class ImageSrcsetField(serializers.ReadOnlyField):
+    """``srcset`` of an image field's resized variants (see image_variants.py)"""
+    def to_representation(self, value):
+        return image_variants.srcset(value, self.context.get('request'))
+
+
 class ServiceSerializer(serializers.ModelSerializer):
+    image_srcset = ImageSrcsetField(source='image')
     category_name = serializers.CharField(read_only=True)
     category = serializers.SerializerMethodField()
     category_ids = serializers.SerializerMethodField()
@@ -44,13 +81,16 @@ class ServiceSerializer(serializers.ModelSerializer):
         model = Service
         fields = ['id', 'category', 'category_name', 'category_ids', 'name', 'name_en', 
                  'description', 'description_en', 'duration', 'price', 
-                 'price_display', 'image', 'is_active', 
+                 'price_display', 'image', 'image_srcset', 'is_active', 
                  'is_featured', 'order']
     
+    # Both read obj.categories.all(), so a prefetch (see with_service_categories)
+    # serves them, and category_name, without further queries
+
     def get_category(self, obj):
         """Get the first category ID for backward compatibility"""
         try:
-            first_category = obj.categories.first()
+            first_category = obj.category
             return first_category.id if first_category else None
         except Exception as e:
             print(f"Error getting category for service {obj.id}: {e}")
@@ -59,7 +99,7 @@ class ServiceSerializer(serializers.ModelSerializer):
     def get_category_ids(self, obj):
         """Get all category IDs for this service"""
         try:
-            return list(obj.categories.values_list('id', flat=True))
+            return [category.id for category in obj.categories.all()]
         except Exception as e:
             print(f"Error getting category IDs for service {obj.id}: {e}")
             return []
@@ -74,16 +114,18 @@ class ServiceDetailSerializer(ServiceSerializer):
 
 class StaffSerializer(serializers.ModelSerializer):
     services = ServiceSerializer(many=True, read_only=True)
+    image_srcset = ImageSrcsetField(source='image')
     services_count = serializers.SerializerMethodField()
     
     class Meta:
         model = Staff
         fields = ['id', 'name', 'name_en', 'specialization', 'specialization_en',
-                 'bio', 'bio_en', 'image', 'rating', 'is_active', 'services', 
+                 'bio', 'bio_en', 'image', 'image_srcset', 'rating', 'is_active', 'services', 
                  'services_count']
     
     def get_services_count(self, obj):
-        return obj.services.filter(is_active=True).count()
+        # Counted from obj.services.all() so a prefetch serves it too
+        return sum(1 for service in obj.services.all() if service.is_active)
 
 
 
@@ -192,18 +234,26 @@ class BookingSerializer(serializers.ModelSerializer):
 
 
 class BookingCreateSerializer(serializers.ModelSerializer):
+    # Token of the slot hold taken at checkout (POST /bookings/hold/), if any
+    hold_token = serializers.UUIDField(write_only=True, required=False)
+
     class Meta:
         model = Booking
         fields = ['id', 'customer', 'service', 'staff', 'address', 'booking_date',
-                 'booking_time', 'payment_method', 'special_requests', 'price', 'final_price', 'coupon', 'status']
+                 'booking_time', 'payment_method', 'special_requests', 'price', 'final_price', 'coupon', 'status',
+                 'hold_token']
         read_only_fields = ['id', 'status']
+        # The slot constraint is enforced by the insert itself (reservations.create_booking)
+        validators = []
     
     def create(self, validated_data):
         # Set status to confirmed for all bookings
         validated_data['status'] = 'confirmed'
+        hold_token = validated_data.pop('hold_token', None)
         
-        # Let the model's save method handle discount calculations and reference generation
-        booking = Booking.objects.create(**validated_data)
+        # Let the model's save method handle discount calculations and reference generation;
+        # raises reservations.SlotUnavailable when the slot is taken
+        booking = reservations.create_booking(validated_data, hold_token)
         
         # Update coupon usage count if applicable
         if booking.coupon and booking.coupon.is_valid():
@@ -255,10 +305,117 @@ class NotificationSettingsSerializer(serializers.ModelSerializer):
 
 
 class HeroImageSerializer(serializers.ModelSerializer):
+    image_srcset = ImageSrcsetField(source='image')
+
     class Meta:
         model = HeroImage
         fields = ['id', 'title', 'title_en', 'description', 'description_en',
-                 'image', 'link_url', 'is_active', 'order']
+                 'image', 'image_srcset', 'link_url', 'is_active', 'order']
+
+
+class FloatOrNoneField(serializers.ReadOnlyField):
+    """Decimal as float; zero and empty values as null (the offers API format)"""
+    def to_representation(self, value):
+        return float(value) if value else None
+
+
+class IsoDateTimeField(serializers.ReadOnlyField):
+    """datetime.isoformat() (the offers API format)"""
+    def to_representation(self, value):
+        return value.isoformat()
+
+
+class OfferServiceSerializer(serializers.ModelSerializer):
+    price = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = Service
+        fields = ['id', 'name', 'name_en', 'price', 'duration']
+
+
+class OfferCategorySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Category
+        fields = ['id', 'name', 'name_en']
+
+
+def offer_prefetches():
+    """Related rows OfferSerializer reads; prefetched only for offers not in the fragment cache"""
+    return [
+        Prefetch('services', queryset=Service.objects.only('id', 'name', 'name_en', 'price', 'duration')),
+        Prefetch('categories', queryset=Category.objects.only('id', 'name', 'name_en', 'order')),
+    ]
+
+
+class OfferListSerializer(serializers.ListSerializer):
+    """
+    Serializes offers from per-offer cached fragments.
+
+    A fragment is keyed by the offer's ``updated_at`` (the offer signals touch
+    it when its services or categories change) and the catalog ``services``
+    and ``categories`` versions.  Only the offers missing from the cache have
+    their services and categories prefetched, two queries in total however
+    many offers there are.  ``is_valid`` depends on the clock and is always
+    computed live.
+    """
+
+    def to_representation(self, data):
+        offers = list(data.all() if hasattr(data, 'all') else data)
+
+        def build(missing):
+            prefetch_related_objects(missing, *offer_prefetches())
+            return [self.child.to_fragment(offer) for offer in missing]
+
+        fragments = cached_items(
+            'offer', ('services', 'categories'), offers,
+            lambda offer: f'{offer.pk}:{offer.updated_at.isoformat()}', build,
+        )
+        return [self.child.with_live_fields(offer, fragment) for offer, fragment in zip(offers, fragments)]
+
+
+class OfferSerializer(serializers.ModelSerializer):
+    discount_value = FloatOrNoneField()
+    original_price = FloatOrNoneField()
+    offer_price = FloatOrNoneField()
+    discount_display = serializers.ReadOnlyField(source='get_discount_display')
+    savings_amount = FloatOrNoneField(source='get_savings_amount')
+    savings_percentage = serializers.ReadOnlyField(source='get_savings_percentage')
+    valid_from = IsoDateTimeField()
+    valid_until = IsoDateTimeField()
+    is_valid = serializers.SerializerMethodField()
+    services = OfferServiceSerializer(many=True, read_only=True)
+    categories = OfferCategorySerializer(many=True, read_only=True)
+    image_srcset = ImageSrcsetField(source='image')
+    thumbnail_srcset = ImageSrcsetField(source='thumbnail')
+    created_at = IsoDateTimeField()
+    updated_at = IsoDateTimeField()
+
+    class Meta:
+        model = Offer
+        list_serializer_class = OfferListSerializer
+        fields = ['id', 'title', 'title_en', 'description', 'description_en',
+                 'short_description', 'short_description_en', 'offer_type',
+                 'discount_value', 'original_price', 'offer_price', 'discount_display',
+                 'savings_amount', 'savings_percentage', 'image', 'image_srcset', 'thumbnail', 'thumbnail_srcset',
+                 'valid_from', 'valid_until', 'is_valid', 'is_featured', 'is_new',
+                 'services', 'categories', 'terms_conditions', 'terms_conditions_en',
+                 'usage_limit', 'used_count', 'order', 'card_color', 'text_color',
+                 'created_at', 'updated_at']
+
+    def get_is_valid(self, obj):
+        return obj.is_valid()
+
+    def to_fragment(self, instance):
+        """The cacheable part: everything but the clock dependent fields"""
+        return super().to_representation(instance)
+
+    def with_live_fields(self, instance, fragment):
+        data = dict(fragment)
+        data['is_valid'] = instance.is_valid()
+        return data
+
+    def to_representation(self, instance):
+        return self.with_live_fields(instance, self.to_fragment(instance))
 
 
 class CouponValidationSerializer(serializers.Serializer):
@@ -387,6 +544,15 @@ class BlogCategorySerializer(serializers.ModelSerializer):
         return obj.posts.filter(status='published').count()
 
 
+class BlogPostCountsListSerializer(serializers.ListSerializer):
+    """Adds the buffered views/likes (salon.counters) to the whole page in one query"""
+
+    def to_representation(self, data):
+        posts = list(data.all() if hasattr(data, 'all') else data)
+        counters.apply_pending(posts)
+        return super().to_representation(posts)
+
+
 class BlogPostListSerializer(serializers.ModelSerializer):
     author = BlogAuthorSerializer(read_only=True)
     category = BlogCategorySerializer(read_only=True)
@@ -394,16 +560,23 @@ class BlogPostListSerializer(serializers.ModelSerializer):
     formatted_read_time = serializers.ReadOnlyField()
     formatted_views = serializers.ReadOnlyField()
     formatted_likes = serializers.ReadOnlyField()
+    featured_image_srcset = ImageSrcsetField(source='featured_image')
     
     class Meta:
         model = BlogPost
         fields = ['id', 'title', 'title_en', 'slug', 'excerpt', 'excerpt_en', 
-                 'author', 'category', 'featured_image', 'featured_image_alt',
+                 'author', 'category', 'featured_image', 'featured_image_srcset', 'featured_image_alt',
                  'status', 'is_featured', 'is_trending', 'read_time', 
                  'formatted_read_time', 'views', 'formatted_views', 'likes', 
                  'formatted_likes', 'comments_count', 'tags', 'tags_list',
                  'published_at', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
+        list_serializer_class = BlogPostCountsListSerializer
+
+    def to_representation(self, instance):
+        if self.parent is None:
+            counters.apply_pending([instance])
+        return super().to_representation(instance)
 
 
 class BlogPostDetailSerializer(BlogPostListSerializer):
@@ -1,15 +1,22 @@
 """
 Django signals for salon notification system
 """
-from django.db.models.signals import post_save, post_delete, pre_save
+from django.db.models.signals import post_save, post_delete, pre_save, pre_delete, m2m_changed
 from django.dispatch import receiver
 from django.utils import timezone
 from django.contrib.auth.models import User
 from django.conf import settings
 import logging
 
-from .models import Booking, Notification, NotificationSettings, Customer, Staff
+from .models import (
+    ACTIVE_BOOKING_STATUSES, Booking, Notification, NotificationSettings, Customer, Staff, Service,
+    Config, WorkingHours, DayOff, Coupon, Category, HeroImage, Offer,
+    Testimonial, ServiceCategory, ServiceItem, ContactInfo, BlogPost
+)
+from payments.models import Payment
 from .email_service import EmailNotificationService
+from .dashboard import invalidate_dashboard_stats
+from . import availability, catalog_cache, image_variants, reservations, rollups, search_index
 
 logger = logging.getLogger(__name__)
 
@@ -38,7 +45,7 @@ def booking_created_or_updated(sender, instance, created, **kwargs):
                 email_service = EmailNotificationService()
                 email_service.send_admin_notification(instance)
                 notification.mark_as_sent()
-                logger.info(f"Admin notification email sent for booking {instance.id}")
+                logger.info(f"Admin notification email queued for booking {instance.id}")
             except Exception as e:
                 logger.error(f"Failed to send admin notification email: {e}")
             
@@ -80,7 +87,7 @@ def booking_created_or_updated(sender, instance, created, **kwargs):
                                 if settings_obj.email_booking_confirmed:
                                     email_service = EmailNotificationService()
                                     # You might want to create a specific confirmation email template
-                                    email_service.send_booking_confirmation(instance)
+                                    email_service.send_booking_confirmation(instance, event='booking_confirmed')
                         except Exception as e:
                             logger.error(f"Failed to send booking confirmation email: {e}")
                     
@@ -115,10 +122,16 @@ def booking_pre_save(sender, instance, **kwargs):
         try:
             original = Booking.objects.get(pk=instance.pk)
             instance._original_status = original.status
+            instance._original_staff_id = original.staff_id
+            instance._original_service_id = original.service_id
         except Booking.DoesNotExist:
             instance._original_status = None
+            instance._original_staff_id = None
+            instance._original_service_id = None
     else:
         instance._original_status = None
+        instance._original_staff_id = None
+        instance._original_service_id = None
 
 
 @receiver(post_save, sender=User)
@@ -240,7 +253,7 @@ def payment_status_changed(sender, instance, created, **kwargs):
                     if settings_obj.email_payment_received:
                         # You might want to create a specific payment confirmation email template
                         email_service = EmailNotificationService()
-                        email_service.send_booking_confirmation(instance)
+                        email_service.send_booking_confirmation(instance, event='payment_received')
             except Exception as e:
                 logger.error(f"Failed to send payment confirmation email: {e}")
 
@@ -258,3 +271,282 @@ def booking_pre_save_payment(sender, instance, **kwargs):
             instance._original_payment_status = None
     else:
         instance._original_payment_status = None
+
+
+# Signals keeping the availability engine in sync
+@receiver(post_save, sender=Booking)
+def booking_availability_changed(sender, instance, created, **kwargs):
+    """
+    Drop the cached availability plans of the saved booking's days
+    """
+    try:
+        previous = None
+        if not created:
+            previous = (
+                getattr(instance, '_original_date', None),
+                getattr(instance, '_original_staff_id', None),
+                getattr(instance, '_original_status', None),
+            )
+        availability.apply_booking_change(instance, previous)
+    except Exception as e:
+        logger.error(f"Failed to update availability for booking {instance.id}: {e}")
+        availability.invalidate_schedules()
+
+
+@receiver(post_delete, sender=Booking)
+def booking_availability_released(sender, instance, **kwargs):
+    """
+    Drop the cached availability plans of a deleted booking's day
+    """
+    try:
+        availability.release_booking(instance)
+    except Exception as e:
+        logger.error(f"Failed to release availability for booking {instance.pk}: {e}")
+        availability.invalidate_schedules()
+
+
+# Signals giving admin-managed slot capacity back (see reservations.py)
+@receiver(post_save, sender=Booking)
+def booking_capacity_changed(sender, instance, created, **kwargs):
+    """
+    Release the place an active booking held in its old slot once it is
+    cancelled/completed or moved to another date or time
+    """
+    if created or getattr(instance, '_original_status', None) not in ACTIVE_BOOKING_STATUSES:
+        return
+    old_slot = (instance._original_service_id, instance._original_date, instance._original_time)
+    still_there = (
+        instance.status in ACTIVE_BOOKING_STATUSES
+        and old_slot == (instance.service_id, instance.booking_date, instance.booking_time)
+    )
+    if still_there:
+        return
+    try:
+        reservations.release_capacity(*old_slot)
+    except Exception as e:
+        logger.error(f"Failed to release slot capacity for booking {instance.id}: {e}")
+
+
+@receiver(post_delete, sender=Booking)
+def booking_capacity_released(sender, instance, **kwargs):
+    """
+    Release the place a deleted active booking held in its slot
+    """
+    if instance.status not in ACTIVE_BOOKING_STATUSES:
+        return
+    try:
+        reservations.release_capacity(instance.service_id, instance.booking_date, instance.booking_time)
+    except Exception as e:
+        logger.error(f"Failed to release slot capacity for booking {instance.pk}: {e}")
+
+
+# Signals keeping the DailyStats rollup in sync
+@receiver(post_save, sender=Booking)
+def booking_rollup_changed(sender, instance, created, **kwargs):
+    """
+    Recompute the DailyStats rows the booking is in (and was in before a
+    date, service or staff change)
+    """
+    try:
+        keys = [rollups.booking_key(instance)]
+        if not created:
+            keys.append((
+                getattr(instance, '_original_date', None),
+                getattr(instance, '_original_service_id', None),
+                getattr(instance, '_original_staff_id', None),
+            ))
+        rollups.refresh_cells(keys)
+    except Exception as e:
+        logger.error(f"Failed to update daily stats for booking {instance.id}: {e}")
+
+
+@receiver(post_delete, sender=Booking)
+def booking_rollup_removed(sender, instance, **kwargs):
+    """
+    Take a deleted booking out of its DailyStats row
+    """
+    try:
+        rollups.refresh_cells([rollups.booking_key(instance)])
+    except Exception as e:
+        logger.error(f"Failed to update daily stats for deleted booking {instance.pk}: {e}")
+
+
+@receiver(pre_delete, sender=Staff)
+def staff_rollup_before_delete(sender, instance, **kwargs):
+    """
+    Remember the staff member's DailyStats cells; their bookings become unassigned
+    """
+    instance._daily_stats_cells = list(instance.daily_stats.values_list('date', 'service_id'))
+
+
+@receiver(post_delete, sender=Staff)
+def staff_rollup_deleted(sender, instance, **kwargs):
+    """
+    Fold the deleted staff member's bookings into the unassigned DailyStats rows
+    """
+    try:
+        cells = getattr(instance, '_daily_stats_cells', [])
+        rollups.refresh_cells([(day, service_id, None) for day, service_id in cells])
+    except Exception as e:
+        logger.error(f"Failed to update daily stats for deleted staff {instance.pk}: {e}")
+
+
+@receiver(post_save, sender=Staff)
+@receiver(post_delete, sender=Staff)
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+@receiver(post_save, sender=Config)
+@receiver(post_save, sender=WorkingHours)
+@receiver(post_delete, sender=WorkingHours)
+@receiver(post_save, sender=DayOff)
+@receiver(post_delete, sender=DayOff)
+def schedule_changed(sender, **kwargs):
+    """
+    Working hours, days off, staff or service durations changed:
+    recompile availability plans on next use
+    """
+    availability.invalidate_schedules()
+
+
+@receiver(m2m_changed, sender=Staff.services.through)
+def staff_services_changed(sender, action, **kwargs):
+    """
+    Staff/service assignments changed: recompile availability plans
+    """
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        availability.invalidate_schedules()
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+@receiver(post_save, sender=Customer)
+@receiver(post_delete, sender=Customer)
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+@receiver(post_save, sender=Staff)
+@receiver(post_delete, sender=Staff)
+@receiver(post_save, sender=Coupon)
+@receiver(post_delete, sender=Coupon)
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+def dashboard_data_changed(sender, **kwargs):
+    """
+    Drop the cached dashboard statistics so the next request recomputes them
+    """
+    invalidate_dashboard_stats()
+
+
+# Catalog response cache sections each model (or m2m table) feeds
+CATALOG_SECTIONS = {
+    Category: ('categories', 'services', 'staff', 'offers'),
+    Service: ('services', 'categories', 'staff', 'offers'),
+    Service.categories.through: ('services', 'categories', 'staff'),
+    Staff: ('staff',),
+    Staff.services.through: ('staff',),
+    HeroImage: ('hero_images',),
+    Offer: ('offers',),
+    Offer.services.through: ('offers',),
+    Offer.categories.through: ('offers',),
+    Testimonial: ('testimonials',),
+    ServiceCategory: ('service_categories',),
+    ServiceItem: ('service_categories',),
+    ContactInfo: ('contact_info',),
+    Config: ('config',),
+}
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+@receiver(post_save, sender=Staff)
+@receiver(post_delete, sender=Staff)
+@receiver(post_save, sender=HeroImage)
+@receiver(post_delete, sender=HeroImage)
+@receiver(post_save, sender=Offer)
+@receiver(post_delete, sender=Offer)
+@receiver(post_save, sender=Testimonial)
+@receiver(post_delete, sender=Testimonial)
+@receiver(post_save, sender=ServiceCategory)
+@receiver(post_delete, sender=ServiceCategory)
+@receiver(post_save, sender=ServiceItem)
+@receiver(post_delete, sender=ServiceItem)
+@receiver(post_save, sender=ContactInfo)
+@receiver(post_delete, sender=ContactInfo)
+@receiver(post_save, sender=Config)
+@receiver(post_delete, sender=Config)
+def catalog_changed(sender, **kwargs):
+    """
+    Move the affected catalog sections to a new version so cached
+    responses (and client ETags) are replaced
+    """
+    catalog_cache.invalidate(*CATALOG_SECTIONS[sender])
+
+
+@receiver(m2m_changed, sender=Service.categories.through)
+@receiver(m2m_changed, sender=Staff.services.through)
+@receiver(m2m_changed, sender=Offer.services.through)
+@receiver(m2m_changed, sender=Offer.categories.through)
+def catalog_relations_changed(sender, action, **kwargs):
+    """
+    Service, staff or offer category/service assignments changed
+    """
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        catalog_cache.invalidate(*CATALOG_SECTIONS[sender])
+
+
+@receiver(m2m_changed, sender=Offer.services.through)
+@receiver(m2m_changed, sender=Offer.categories.through)
+def offer_relations_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Touch offers whose services or categories changed: their cached
+    OfferSerializer fragments are keyed by updated_at
+    """
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        offer_ids = [instance.pk]
+    elif pk_set:
+        offer_ids = list(pk_set)
+    else:
+        # Reverse clear (service.offer_set.clear()): find the offers before the rows go
+        related_field = f'{instance._meta.model_name}_id'
+        offer_ids = list(sender.objects.filter(**{related_field: instance.pk}).values_list('offer_id', flat=True))
+    Offer.objects.filter(pk__in=offer_ids).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=BlogPost)
+@receiver(post_save, sender=Service)
+def search_document_saved(sender, instance, raw=False, **kwargs):
+    """
+    Keep the full-text search index in sync (drafts and inactive services are dropped)
+    """
+    if not raw:
+        search_index.index_instance(instance)
+
+
+@receiver(post_delete, sender=BlogPost)
+@receiver(post_delete, sender=Service)
+def search_document_deleted(sender, instance, **kwargs):
+    search_index.remove_instance(instance)
+
+
+# Responsive image variants (see image_variants.py)
+@receiver(post_save, sender=HeroImage)
+@receiver(post_save, sender=Service)
+@receiver(post_save, sender=Staff)
+@receiver(post_save, sender=Offer)
+@receiver(post_save, sender=Testimonial)
+@receiver(post_save, sender=BlogPost)
+def image_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Generate the resized variants of the saved images in the background
+    (files whose variants exist are skipped)
+    """
+    if raw:
+        return
+    fields = image_variants.IMAGE_FIELDS[sender._meta.label]
+    if update_fields is not None:
+        fields = [field for field in fields if field in update_fields]
+    if fields:
+        image_variants.schedule(instance, fields)
@@ -1,3 +1,1514 @@
-from django.test import TestCase
+import importlib
+import json
+import os
+import shutil
+import tempfile
+from datetime import time, timedelta
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps as django_apps
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+
+from salon_backend import static_resolver
+
+from . import (
+    availability, catalog_cache, counters, export_jobs, image_variants, normalization, outbox, placeholders,
+    query_plans, reminders, reporting, reservations, rollups, search_index,
+)
+from .admin_configs.bookings import BookingAdmin
+from .admin_configs.core_services import OfferAdmin
+from .availability import get_free_slots
+from .models import (
+    Address, AdminSlotAvailability, BlogAuthor, BlogCategory, BlogPost, Booking, Category, ContactInfo, Customer,
+    DailyStats, ExportJob, NotificationSettings, Offer, OutboundMessage, PhoneOTP, Service, SlotHold, Staff,
+    Testimonial, WorkingHours,
+)
+
+
+class AvailabilityTests(TestCase):
+    """Free slots are compiled into cached bitmaps that are rebuilt when bookings or hours change."""
+
+    def setUp(self):
+        cache.clear()
+        self.service = Service.objects.create(
+            name='قص الشعر', name_en='Hair cut', description='-', description_en='-', duration='60', price=80,
+        )
+        self.staff = Staff.objects.create(name='موظف')
+        self.customer = Customer.objects.create(name='عميلة', email='client@example.com', phone='0500000000')
+        self.address = Address.objects.create(customer=self.customer, title='المنزل', address='الرياض')
+        self.day = timezone.localdate() + timedelta(days=3)
+        self.dow = (self.day.weekday() + 1) % 7
+
+    def work(self, start, end):
+        WorkingHours.objects.create(staff=self.staff, day_of_week=self.dow, start_time=start, end_time=end)
+
+    def slots(self):
+        return get_free_slots(self.day, self.service.pk, self.staff.pk)
+
+    def book(self, at):
+        return Booking.objects.create(
+            customer=self.customer, service=self.service, staff=self.staff, address=self.address,
+            booking_date=self.day, booking_time=at, status='pending', payment_method='cash', price=80,
+            final_price=80,
+        )
+
+    def test_slots_follow_working_hours_and_bookings(self):
+        self.work(time(10), time(14))
+        self.assertEqual(self.slots(), ['10:00', '11:00', '12:00', '13:00'])
+
+        booking = self.book(time(11))
+        self.assertEqual(self.slots(), ['10:00', '12:00', '13:00'])
+        booking.status = 'cancelled'
+        booking.save()
+        self.assertEqual(self.slots(), ['10:00', '11:00', '12:00', '13:00'])
+
+    def test_buffer_separates_bookings(self):
+        self.work(time(10), time(14))
+        Staff.objects.filter(pk=self.staff.pk).update(appointment_buffer_time=15)
+        availability.invalidate_schedules()
+        self.book(time(11))
+        self.assertEqual(self.slots(), ['13:00'])
+
+    def test_split_shifts_are_merged(self):
+        shifts = [
+            WorkingHours(staff=self.staff, day_of_week=self.dow, start_time=time(16, 30), end_time=time(18, 30)),
+            WorkingHours(staff=self.staff, day_of_week=self.dow, start_time=time(10), end_time=time(12)),
+        ]
+        plan = availability._build_staff_plan(self.staff, self.day, shifts, [], availability._config_snapshot())
+        free = availability._free_starts(plan, plan.open_mask, availability._ticks_for(60), 0)
+        self.assertEqual([availability._format_tick(tick) for tick in free], ['10:00', '11:00', '16:30', '17:30'])
+
+    def test_cached_plans_are_reused_until_their_day_changes(self):
+        self.work(time(10), time(14))
+        self.slots()
+        with CaptureQueriesContext(connection) as queries:
+            self.slots()
+        self.assertFalse([q for q in queries if 'salon_booking' in q['sql']])
+
+        # Another day's booking leaves this day's plans cached
+        other_day = self.day + timedelta(days=7)
+        Booking.objects.create(
+            customer=self.customer, service=self.service, staff=self.staff, address=self.address,
+            booking_date=other_day, booking_time=time(11), status='pending', payment_method='cash',
+            price=80, final_price=80,
+        )
+        with CaptureQueriesContext(connection) as queries:
+            self.slots()
+        self.assertFalse([q for q in queries if 'salon_booking' in q['sql']])
+
+    def test_evicted_day_version_does_not_revive_stale_plans(self):
+        self.work(time(10), time(14))
+        self.slots()
+        self.book(time(11))
+        self.assertNotIn('11:00', self.slots())
+        # The version key is culled; the plan cached before the booking must not match again
+        cache.delete(availability._day_version_key(self.day))
+        self.assertNotIn('11:00', self.slots())
+
+    def test_working_hours_change_rebuilds_every_day(self):
+        self.work(time(10), time(14))
+        self.slots()
+        WorkingHours.objects.update(end_time=time(12))
+        availability.invalidate_schedules()
+        self.assertEqual(self.slots(), ['10:00', '11:00'])
+
+
+class AvailabilityRangeTests(TestCase):
+    """The range endpoint returns the free slots (or a has-any-slot flag) of every day in a window."""
+
+    def setUp(self):
+        cache.clear()
+        self.service = Service.objects.create(
+            name='قص الشعر', name_en='Hair cut', description='-', description_en='-', duration='60', price=80,
+        )
+        self.staff = Staff.objects.create(name='موظف')
+        self.day = timezone.localdate() + timedelta(days=3)
+        WorkingHours.objects.create(
+            staff=self.staff, day_of_week=(self.day.weekday() + 1) % 7, start_time=time(10), end_time=time(12),
+        )
+        self.url = reverse('salon:availability-range')
+
+    def get(self, start, end, **params):
+        return self.client.get(self.url, {
+            'start': start.isoformat(), 'end': end.isoformat(),
+            'service_id': self.service.pk, 'staff_id': self.staff.pk, **params,
+        })
+
+    def test_slots_per_day(self):
+        next_day = self.day + timedelta(days=1)
+        response = self.get(self.day, next_day)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['days'], {
+            self.day.isoformat(): ['10:00', '11:00'],
+            next_day.isoformat(): [],
+        })
+
+    def test_summary_flags_days_with_a_free_slot(self):
+        next_day = self.day + timedelta(days=1)
+        response = self.get(self.day, next_day, summary='true')
+        self.assertTrue(response.json()['summary'])
+        self.assertEqual(response.json()['days'], {self.day.isoformat(): True, next_day.isoformat(): False})
+
+    def test_invalid_windows_are_rejected(self):
+        self.assertEqual(self.client.get(self.url, {'start': 'soon'}).status_code, 400)
+        self.assertEqual(self.get(self.day, self.day - timedelta(days=1)).status_code, 400)
+        self.assertEqual(self.get(self.day, self.day + timedelta(days=61)).status_code, 200)
+        self.assertEqual(self.get(self.day, self.day + timedelta(days=62)).status_code, 400)
+
+    def test_unknown_service(self):
+        response = self.client.get(self.url, {
+            'start': self.day.isoformat(), 'end': self.day.isoformat(), 'service_id': self.service.pk + 1,
+        })
+        self.assertEqual(response.status_code, 404)
+
+
+class OutboxTests(TestCase):
+    """Messages are queued once per dedup key and delivered with retries by the worker."""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        self.log = os.path.join(self.tmp, 'outbox.log')
+        overrides = self.settings(
+            OUTBOX_TRANSPORTS={'email': 'salon.outbox.FileTransport', 'whatsapp': 'salon.outbox.FileTransport'},
+            OUTBOX_FILE_PATH=self.log,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def delivered(self):
+        if not os.path.exists(self.log):
+            return []
+        with open(self.log, encoding='utf-8') as fh:
+            return [json.loads(line) for line in fh]
+
+    def test_enqueue_is_idempotent_on_the_dedup_key(self):
+        first, created = outbox.enqueue_email('client@example.com', 'مرحبا', '<p>1</p>', 'test', dedup_key='k')
+        self.assertTrue(created)
+        second, created = outbox.enqueue_email('client@example.com', 'مرحبا', '<p>2</p>', 'test', dedup_key='k')
+        self.assertFalse(created)
+        self.assertEqual(second.pk, first.pk)
+        self.assertEqual(outbox.process_batch(), (1, 0))
+        self.assertEqual(outbox.process_batch(), (0, 0))
+        self.assertEqual(len(self.delivered()), 1)
+
+    def test_failures_are_retried_with_backoff(self):
+        message, _ = outbox.enqueue_email('client@example.com', 'مرحبا', '<p>1</p>', 'test')
+        with self.settings(OUTBOX_FILE_PATH=os.path.join(self.tmp, 'missing', 'outbox.log')):
+            self.assertEqual(outbox.process_batch(), (0, 1))
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), ('pending', 1))
+        self.assertGreater(message.next_attempt_at, timezone.now())
+        self.assertIn('FileNotFoundError', message.last_error)
+
+        # Not due yet
+        self.assertEqual(outbox.process_batch(), (0, 0))
+        OutboundMessage.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(outbox.process_batch(), (1, 0))
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), ('sent', 2))
+
+    def test_message_fails_after_the_last_attempt(self):
+        with self.settings(OUTBOX_MAX_ATTEMPTS=1, OUTBOX_FILE_PATH=os.path.join(self.tmp, 'missing', 'log')):
+            message, _ = outbox.enqueue_email('client@example.com', 'مرحبا', '<p>1</p>', 'test')
+            outbox.process_batch()
+        message.refresh_from_db()
+        self.assertEqual(message.status, 'failed')
+
+    def test_otp_code_is_only_in_the_delivered_message(self):
+        response = self.client.post(reverse('salon:send_otp'), {'phone_number': '+966500000000'})
+        self.assertEqual(response.status_code, 200)
+        code = PhoneOTP.objects.get().otp_code
+        message = OutboundMessage.objects.get(event='otp')
+        self.assertEqual(message.status, 'sent')
+        self.assertNotIn(code, json.dumps(message.payload))
+        self.assertIn(code, self.delivered()[0]['payload']['body'])
+
+        # An expired code is not sent
+        PhoneOTP.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        OutboundMessage.objects.update(status='pending', next_attempt_at=timezone.now())
+        self.assertEqual(outbox.process_batch(), (0, 1))
+        self.assertEqual(OutboundMessage.objects.get().status, 'failed')
+
+    def test_send_otp_reports_a_failed_delivery(self):
+        with self.settings(OUTBOX_FILE_PATH=os.path.join(self.tmp, 'missing', 'outbox.log')):
+            response = self.client.post(reverse('salon:send_otp'), {'phone_number': '+966500000000'})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(OutboundMessage.objects.get().status, 'pending')
+
+    def test_status_email_is_sent_again_after_a_change_back(self):
+        customer = Customer.objects.create(name='عميلة', email='client@example.com', phone='0500000000')
+        booking = Booking.objects.create(
+            customer=customer, address=Address.objects.create(customer=customer, title='المنزل', address='الرياض'),
+            service=Service.objects.create(
+                name='قص الشعر', name_en='Hair cut', description='-', description_en='-', duration='60', price=80,
+            ),
+            booking_date=timezone.localdate() + timedelta(days=2), booking_time=time(10, 0),
+            payment_method='cash', price=80, final_price=80,
+        )
+        booking_admin = BookingAdmin(Booking, admin.site)
+        for status in ('confirmed', 'pending', 'confirmed'):
+            booking.status = status
+            booking.save()
+            booking_admin.send_status_update_email(booking, None)
+            booking_admin.send_status_update_email(booking, None)
+        self.assertEqual(OutboundMessage.objects.filter(event='status_confirmed').count(), 2)
+        self.assertEqual(OutboundMessage.objects.filter(event='status_pending').count(), 1)
+
+
+class ReminderTests(TestCase):
+    """Each booking gets one reminder per window, the narrowest one it falls in."""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        self.log = os.path.join(self.tmp, 'outbox.log')
+        overrides = self.settings(
+            OUTBOX_TRANSPORTS={'email': 'salon.outbox.FileTransport', 'whatsapp': 'salon.outbox.FileTransport'},
+            OUTBOX_FILE_PATH=self.log, REMINDER_WINDOWS_HOURS=(24, 2),
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        self.now = timezone.localtime().replace(hour=8, minute=0, second=0, microsecond=0) + timedelta(days=3)
+        self.service = Service.objects.create(
+            name='قص الشعر', name_en='Hair cut', description='-', description_en='-', duration='60', price=80,
+        )
+        self.customer = Customer.objects.create(name='عميلة', email='client@example.com', phone='0500000000')
+        self.address = Address.objects.create(customer=self.customer, title='المنزل', address='الرياض')
+
+    def book(self, hours_ahead, status='pending'):
+        start = self.now + timedelta(hours=hours_ahead)
+        return Booking.objects.create(
+            customer=self.customer, service=self.service, address=self.address, booking_date=start.date(),
+            booking_time=start.time(), status=status, payment_method='cash', price=80, final_price=80,
+        )
+
+    def reminders(self, booking):
+        return list(booking.outbound_messages.filter(event__startswith='reminder_').values_list('event', flat=True))
+
+    def test_bookings_get_the_reminder_of_their_window(self):
+        tomorrow = self.book(20)
+        soon = self.book(1)
+        later = self.book(30)
+        cancelled = self.book(20, status='cancelled')
+
+        result = reminders.dispatch_reminders(now=self.now)
+        self.assertEqual(result['queued'], {24: 1, 2: 1})
+        self.assertEqual(result['sent'], 2)
+        self.assertEqual(self.reminders(tomorrow), ['reminder_24h'])
+        self.assertEqual(self.reminders(soon), ['reminder_2h'])
+        self.assertEqual(self.reminders(later), [])
+        self.assertEqual(self.reminders(cancelled), [])
+
+    def test_reruns_do_not_remind_twice(self):
+        booking = self.book(20)
+        reminders.dispatch_reminders(now=self.now)
+        self.assertEqual(reminders.dispatch_reminders(now=self.now)['queued'], {24: 0, 2: 0})
+
+        # Later on the same booking enters the 2h window and gets that reminder once
+        later = self.now + timedelta(hours=19)
+        self.assertEqual(reminders.dispatch_reminders(now=later)['queued'], {24: 0, 2: 1})
+        self.assertEqual(sorted(self.reminders(booking)), ['reminder_24h', 'reminder_2h'])
+
+    def test_customers_can_opt_out(self):
+        user = User.objects.create_user('0500000000')
+        NotificationSettings.objects.update_or_create(user=user, defaults={'email_reminders': False})
+        Customer.objects.filter(pk=self.customer.pk).update(user=user)
+        booking = self.book(20)
+        self.assertEqual(reminders.dispatch_reminders(now=self.now, send=False)['queued'], {24: 0, 2: 0})
+        self.assertEqual(self.reminders(booking), [])
+
+    def test_command_queues_only(self):
+        out = StringIO()
+        with mock.patch('salon.reminders.timezone.now', return_value=self.now):
+            booking = self.book(20)
+            call_command('send_reminders', '--queue-only', stdout=out)
+        self.assertIn('24h window: 1 reminders queued', out.getvalue())
+        self.assertEqual(booking.outbound_messages.get(event='reminder_24h').status, 'pending')
+
+
+class DashboardStatsTests(TestCase):
+    """Dashboard figures come from the DailyStats rollup and are for admins only."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = reverse('salon:dashboard-stats')
+        self.service = Service.objects.create(
+            name='قص الشعر', name_en='Hair cut', description='-', description_en='-', duration='60', price=80,
+        )
+        self.customer = Customer.objects.create(name='عميلة', email='client@example.com', phone='0500000000')
+        self.address = Address.objects.create(customer=self.customer, title='المنزل', address='الرياض')
+
+    def book(self, **fields):
+        values = {
+            'customer': self.customer, 'service': self.service, 'address': self.address,
+            'booking_date': timezone.localdate(), 'booking_time': time(10, 0),
+            'payment_method': 'cash', 'price': 80, 'final_price': 80,
+        }
+        values.update(fields)
+        return Booking.objects.create(**values)
+
+    def test_requires_an_admin(self):
+        self.assertIn(self.client.get(self.url).status_code, (401, 403))
+        self.client.force_authenticate(User.objects.create_user('client', password='pass'))
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_figures_follow_bookings(self):
+        self.client.force_authenticate(User.objects.create_superuser('admin', 'admin@example.com', 'pass'))
+        self.book(status='pending', payment_status='paid')
+        self.book(booking_time=time(11, 0), booking_date=timezone.localdate() - timedelta(days=3))
+
+        data = self.client.get(self.url).json()
+        self.assertEqual(data['stats']['total_bookings'], 2)
+        self.assertEqual(data['stats']['today_bookings'], 1)
+        self.assertEqual(data['stats']['week_bookings'], 2)
+        self.assertEqual(data['status_breakdown']['pending'], 1)
+        self.assertEqual(data['payment_status_breakdown']['paid'], 1)
+        self.assertEqual(data['revenue']['total'], 80.0)
+
+        # The cached payload is dropped when a booking changes
+        self.book(booking_time=time(12, 0))
+        self.assertEqual(self.client.get(self.url).json()['stats']['total_bookings'], 3)
+
+
+class CsvExportTests(TestCase):
+    """CSV exports stream every row and are for admins only."""
+
+    def setUp(self):
+        self.client = APIClient()
+        Customer.objects.create(name='عميلة', email='client@example.com', phone='0500000000')
+        Customer.objects.create(name='عميلة أخرى', email='other@example.com', phone='0511111111')
+
+    def test_customers_csv_requires_an_admin(self):
+        url = reverse('salon:export-customers-csv')
+        self.client.force_authenticate(User.objects.create_user('client', password='pass'))
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.client.force_authenticate(User.objects.create_superuser('admin', 'admin@example.com', 'pass'))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('attachment', response['Content-Disposition'])
+        content = b''.join(response.streaming_content).decode('utf-8-sig')
+        lines = content.strip().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertIn('client@example.com', content)
+        self.assertIn('other@example.com', content)
+
+
+class ExportJobTests(TestCase):
+    """Export jobs are run by the worker, joined while live, failed when dead and purged when old."""
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, True)
+        overrides = self.settings(MEDIA_ROOT=self.media)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        Customer.objects.create(name='عميلة', email='client@example.com', phone='0500000000')
+
+    def run_worker(self):
+        call_command('process_export_jobs', '--once', stdout=StringIO())
+
+    def test_worker_runs_the_job_and_identical_requests_share_it(self):
+        job, reused = export_jobs.request_export('customers', export_format='csv')
+        self.assertEqual((job.status, reused), ('pending', False))
+        self.assertEqual(export_jobs.request_export('customers', export_format='csv'), (job, True))
+
+        self.run_worker()
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'completed')
+        self.assertIsNotNone(job.heartbeat_at)
+        with job.file.open('rb') as fh:
+            self.assertIn('client@example.com', fh.read().decode('utf-8-sig'))
+        self.assertEqual(export_jobs.request_export('customers', export_format='csv'), (job, True))
+
+    def test_dead_jobs_fail_and_are_not_joined(self):
+        job, _ = export_jobs.request_export('customers', export_format='csv')
+        silent = timezone.now() - timedelta(seconds=export_jobs.HEARTBEAT_TIMEOUT + 1)
+        ExportJob.objects.filter(pk=job.pk).update(status='running', heartbeat_at=silent)
+
+        retry, reused = export_jobs.request_export('customers', export_format='csv')
+        self.assertFalse(reused)
+        self.assertNotEqual(retry.pk, job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+
+        # Pending jobs no worker picked up fail as well
+        ExportJob.objects.filter(pk=retry.pk).update(
+            created_at=timezone.now() - timedelta(seconds=export_jobs.STALE_SECONDS + 1)
+        )
+        self.assertEqual(export_jobs.fail_dead_jobs(), 1)
+
+    def test_expired_jobs_and_their_files_are_deleted(self):
+        old, _ = export_jobs.request_export('customers', export_format='csv')
+        self.run_worker()
+        old.refresh_from_db()
+        path = old.file.path
+        ExportJob.objects.filter(pk=old.pk).update(
+            created_at=timezone.now() - timedelta(seconds=export_jobs.RETENTION_SECONDS + 1)
+        )
+        recent, _ = export_jobs.request_export('services', export_format='csv')
+
+        self.run_worker()
+        self.assertFalse(ExportJob.objects.filter(pk=old.pk).exists())
+        self.assertFalse(os.path.exists(path))
+        recent.refresh_from_db()
+        self.assertEqual(recent.status, 'completed')
+
+
+class RevenueReportTests(TestCase):
+    """Revenue reports are grouped queries over the DailyStats rollup, or over bookings when filtering by status."""
+
+    def setUp(self):
+        self.service = Service.objects.create(
+            name='قص الشعر', name_en='Hair cut', description='-', description_en='-', duration='60', price=80,
+        )
+        self.category = Category.objects.create(name='الشعر', name_en='Hair')
+        self.service.categories.add(self.category)
+        self.staff = Staff.objects.create(name='موظف')
+        self.customer = Customer.objects.create(name='عميلة', email='client@example.com', phone='0500000000')
+        self.address = Address.objects.create(customer=self.customer, title='المنزل', address='الرياض')
+        self.start = timezone.localdate() + timedelta(days=2)
+        self.end = self.start + timedelta(days=2)
+
+        self.book(staff=self.staff)
+        self.book(staff=self.staff, booking_time=time(12, 0), status='confirmed')
+        self.book(booking_date=self.end, status='cancelled')
+
+    def book(self, **fields):
+        values = {
+            'customer': self.customer, 'service': self.service, 'address': self.address,
+            'booking_date': self.start, 'booking_time': time(10, 0), 'status': 'pending',
+            'payment_method': 'cash', 'price': 80, 'final_price': 80,
+        }
+        values.update(fields)
+        return Booking.objects.create(**values)
+
+    def test_report_from_the_rollup(self):
+        with self.assertNumQueries(6):
+            report = reporting.revenue_report(self.start, self.end)
+        self.assertEqual(report['summary'], {
+            'bookings': 3, 'revenue': 240.0, 'discounts': 0.0, 'avg_booking_value': 80.0,
+        })
+        self.assertEqual(
+            [(row['name'], row['bookings'], row['revenue']) for row in report['by_staff']],
+            [('موظف', 2, 160.0), (reporting.UNASSIGNED_STAFF, 1, 80.0)],
+        )
+        self.assertEqual(
+            [(row['name'], row['revenue']) for row in report['by_category']], [('الشعر', 240.0)],
+        )
+        # Days without bookings are reported as zeros
+        self.assertEqual(
+            [(row['date'], row['bookings']) for row in report['by_day']],
+            [(self.start.isoformat(), 2), ((self.start + timedelta(days=1)).isoformat(), 0), (self.end.isoformat(), 1)],
+        )
+
+    def test_status_filter_reads_the_bookings(self):
+        self.assertIs(reporting.bookings_in_range(self.start, self.end).model, DailyStats)
+        rows = reporting.bookings_in_range(self.start, self.end, status='cancelled')
+        self.assertIs(rows.model, Booking)
+
+        report = reporting.revenue_report(self.start, self.end, ['service'], status='cancelled')
+        self.assertEqual(report['summary']['bookings'], 1)
+        self.assertEqual(report['by_service'][0]['revenue'], 80.0)
+        self.assertNotIn('by_day', report)
+
+    def test_rollup_and_bookings_agree(self):
+        from_rollup = reporting.bookings_by_status(reporting.bookings_in_range(self.start, self.end))
+        from_bookings = reporting.bookings_by_status(
+            Booking.objects.filter(booking_date__range=[self.start, self.end])
+        )
+        self.assertEqual(from_rollup, from_bookings)
+        self.assertEqual((from_rollup['pending'], from_rollup['confirmed'], from_rollup['cancelled']), (1, 1, 1))
+
+    def test_api_requires_an_admin_and_valid_groupings(self):
+        client = APIClient()
+        url = reverse('salon:revenue-report')
+        params = {'start_date': self.start.isoformat(), 'end_date': self.end.isoformat()}
+        self.assertIn(client.get(url, params).status_code, (401, 403))
+
+        client.force_authenticate(User.objects.create_superuser('admin', 'admin@example.com', 'pass'))
+        self.assertEqual(client.get(url, {**params, 'group_by': 'month'}).status_code, 400)
+        response = client.get(url, {**params, 'group_by': 'staff,week'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json()), {'date_range', 'summary', 'by_staff', 'by_week'})
+
+
+class DailyStatsTests(TestCase):
+    """The DailyStats rollup follows booking changes and can be rebuilt from the bookings."""
+
+    def setUp(self):
+        self.service = Service.objects.create(
+            name='قص الشعر', name_en='Hair cut', description='-', description_en='-', duration='60', price=80,
+        )
+        self.staff = Staff.objects.create(name='موظف')
+        self.customer = Customer.objects.create(name='عميلة', email='client@example.com', phone='0500000000')
+        self.address = Address.objects.create(customer=self.customer, title='المنزل', address='الرياض')
+        self.day = timezone.localdate() + timedelta(days=2)
+
+    def book(self, **fields):
+        values = {
+            'customer': self.customer, 'service': self.service, 'address': self.address,
+            'booking_date': self.day, 'booking_time': time(10, 0), 'status': 'pending',
+            'payment_method': 'cash', 'price': 80, 'final_price': 80,
+        }
+        values.update(fields)
+        return Booking.objects.create(**values)
+
+    def snapshot(self):
+        return sorted(
+            DailyStats.objects.values_list(
+                'date', 'service_id', 'staff_id', 'bookings_count', 'pending_count', 'cancelled_count',
+                'payment_paid_count', 'gross_revenue', 'discount_total', 'final_revenue', 'paid_revenue',
+                'pending_revenue',
+            ),
+            key=str,
+        )
+
+    def test_cells_follow_bookings(self):
+        first = self.book(staff=self.staff)
+        self.book(staff=self.staff, booking_time=time(12, 0), payment_status='paid')
+        cell = DailyStats.objects.get(date=self.day, staff=self.staff)
+        self.assertEqual(cell.bookings_count, 2)
+        self.assertEqual(cell.payment_paid_count, 1)
+        self.assertEqual(cell.final_revenue, 160)
+        self.assertEqual(cell.paid_revenue, 80)
+        self.assertEqual(cell.pending_revenue, 80)
+
+        # Moving a booking refreshes both the old and the new cell
+        first.staff = None
+        first.save()
+        self.assertEqual(DailyStats.objects.get(date=self.day, staff=self.staff).bookings_count, 1)
+        self.assertEqual(DailyStats.objects.get(date=self.day, staff__isnull=True).bookings_count, 1)
+
+        first.delete()
+        self.assertFalse(DailyStats.objects.filter(staff__isnull=True).exists())
+
+    def test_one_cell_without_staff_per_date_and_service(self):
+        self.book()
+        self.book(booking_time=time(12, 0))
+        self.assertEqual(DailyStats.objects.get(staff__isnull=True).bookings_count, 2)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            DailyStats.objects.create(date=self.day, service=self.service)
+
+    def test_rebuild_and_migration_backfill_match_the_signals(self):
+        self.book(staff=self.staff, payment_status='paid')
+        self.book(booking_time=time(12, 0), status='cancelled')
+        self.book(booking_date=self.day + timedelta(days=1))
+        expected = self.snapshot()
+
+        self.assertEqual(rollups.rebuild(), 3)
+        self.assertEqual(self.snapshot(), expected)
+
+        DailyStats.objects.all().delete()
+        migration = importlib.import_module('salon.migrations.0008_add_dailystats')
+        migration.backfill_daily_stats(django_apps, None)
+        self.assertEqual(self.snapshot(), expected)
+
+
+class CatalogQueryCountTests(TestCase):
+    """The catalog listings must not issue queries per service, staff member or category."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.created = 0
+
+    def add_catalog(self, count):
+        """Add ``count`` categories, services (two categories each) and staff members."""
+        for _ in range(count):
+            i = self.created = self.created + 1
+            first = Category.objects.create(name=f'فئة {i}', name_en=f'Category {i}', slug_en=f'category-{i}')
+            second = Category.objects.create(name=f'فئة ب {i}', name_en=f'Category B {i}', slug_en=f'category-b-{i}')
+            service = Service.objects.create(
+                name=f'خدمة {i}', name_en=f'Service {i}', description='-', description_en='-',
+                duration='30', price=100,
+            )
+            service.categories.add(first, second)
+            staff = Staff.objects.create(name=f'موظف {i}')
+            staff.services.add(service)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response.json()
+
+    def assert_constant_queries(self, url_name):
+        url = reverse(url_name)
+        self.add_catalog(2)
+        small, _ = self.count_queries(url)
+        self.add_catalog(10)
+        large, data = self.count_queries(url)
+        self.assertEqual(small, large, f'{url} issues queries per row')
+        return large, data
+
+    def test_service_list(self):
+        queries, data = self.assert_constant_queries('salon:service-list')
+        self.assertLessEqual(queries, 3)
+        service = Service.objects.get(pk=data['results'][0]['id'])
+        category_ids = [category.id for category in service.categories.all()]
+        self.assertEqual(data['results'][0]['category_ids'], category_ids)
+        self.assertEqual(data['results'][0]['category'], category_ids[0])
+        self.assertEqual(data['results'][0]['category_name'], service.categories.all()[0].name)
+
+    def test_staff_list(self):
+        queries, data = self.assert_constant_queries('salon:staff-list')
+        self.assertLessEqual(queries, 4)
+        self.assertEqual(data['results'][0]['services_count'], 1)
+        self.assertEqual(len(data['results'][0]['services'][0]['category_ids']), 2)
+
+    def test_category_list(self):
+        queries, data = self.assert_constant_queries('salon:category-list')
+        self.assertLessEqual(queries, 4)
+        self.assertEqual(data['results'][0]['services_count'], 1)
+        self.assertEqual(len(data['results'][0]['services'][0]['category_ids']), 2)
+
+    def test_service_list_category_filter(self):
+        self.add_catalog(3)
+        category = Category.objects.order_by('pk').first()
+        queries, data = self.count_queries(f"{reverse('salon:service-list')}?category={category.id}")
+        self.assertEqual(len(data['results']), 1)
+        self.assertIn(category.id, data['results'][0]['category_ids'])
+
+
+class CatalogCacheTests(TestCase):
+    """Public catalog responses are cached per section version and carry validators."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        Category.objects.create(name='شعر', name_en='Hair', slug_en='hair')
+
+    def test_cached_until_section_changes(self):
+        url = reverse('salon:category-list')
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertTrue(first['ETag'])
+        self.assertTrue(first['Last-Modified'])
+
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(url)
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second['ETag'], first['ETag'])
+
+        Category.objects.create(name='أظافر', name_en='Nails', slug_en='nails')
+        third = self.client.get(url)
+        self.assertNotEqual(third['ETag'], first['ETag'])
+        self.assertEqual(third.json()['count'], 2)
+
+    def test_conditional_get_returns_304(self):
+        url = reverse('salon:contact-info-api')
+        etag = self.client.get(url)['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 0)
+
+        ContactInfo.objects.create(phone_number='+966500000000', location='الرياض', working_hours='10-8')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['contact_info']['phone_number'], '+966500000000')
+
+    def test_query_string_is_part_of_the_key(self):
+        url = reverse('salon:service-list')
+        plain = self.client.get(url)
+        featured = self.client.get(url, {'featured': 'true'})
+        self.assertNotEqual(plain['ETag'], featured['ETag'])
+
+    def test_versions_are_shared_between_processes(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, True)
+        shared = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}}
+        with self.settings(CACHES=shared):
+            before = catalog_cache.section_versions(['offers'])['offers']
+            # Another process has its own connection to the same cache
+            other = FileBasedCache(location, {})
+            catalog_cache.invalidate('offers')
+            self.assertGreater(other.get('catalog:version:offers'), before)
+
+
+class ConditionalGetTests(TestCase):
+    """List/detail views answer If-None-Match with a 304 before serializing."""
+
+    def setUp(self):
+        cache.clear()
+        caches['counters'].clear()
+        self.client = APIClient()
+        author = BlogAuthor.objects.create(user=User.objects.create_user('author'))
+        category = BlogCategory.objects.create(name='جمال', name_en='Beauty')
+        self.post = BlogPost.objects.create(
+            title='مقال', slug='post', excerpt='-', content='-', author=author, category=category,
+            featured_image='blog/posts/post.jpg', status='published',
+        )
+
+    def revalidate(self, url):
+        etag = self.client.get(url)['ETag']
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_blog_post_list(self):
+        url = reverse('salon:blog-post-list')
+        etag = self.client.get(url)['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 1)  # the validator aggregate only
+
+        BlogPost.objects.filter(pk=self.post.pk).update(likes=5)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_blog_post_detail_counts_views_on_304(self):
+        url = reverse('salon:blog-post-detail', args=['post'])
+        self.assertEqual(self.revalidate(url).status_code, 304)
+        counters.flush()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views, 2)
+
+    def test_working_hours_detail(self):
+        hours = WorkingHours.objects.create(
+            staff=Staff.objects.create(name='موظف'), day_of_week=0, start_time=time(10), end_time=time(18),
+        )
+        url = reverse('salon:working-hours-detail', args=[hours.pk])
+        self.assertEqual(self.revalidate(url).status_code, 304)
+        etag = self.client.get(url)['ETag']
+        hours.end_time = time(20)
+        hours.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['end_time'], '20:00:00')
+
+
+class BootstrapTests(TestCase):
+    """/bootstrap/ assembles the homepage fragments from the catalog cache."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = reverse('salon:bootstrap')
+        Category.objects.create(name='شعر', name_en='Hair', slug_en='hair')
+
+    def test_all_fragments_by_default(self):
+        data = self.client.get(self.url).json()
+        self.assertEqual(
+            set(data),
+            {'hero_images', 'categories', 'services', 'offers', 'testimonials', 'contact_info', 'config'},
+        )
+        self.assertEqual(data['categories'][0]['name_en'], 'Hair')
+
+    def test_include_selector(self):
+        data = self.client.get(self.url, {'include': 'categories,testimonials'}).json()
+        self.assertEqual(set(data), {'categories', 'testimonials'})
+        response = self.client.get(self.url, {'include': 'categories,nope'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_only_changed_fragments_are_rebuilt(self):
+        self.client.get(self.url, {'include': 'categories,testimonials'})
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url, {'include': 'categories,testimonials'})
+        self.assertEqual(len(queries), 0)
+
+        Testimonial.objects.create(customer_name='سارة', testimonial_text='رائع', rating=5)
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(self.url, {'include': 'categories,testimonials'}).json()
+        self.assertEqual(len(queries), 1)  # testimonials only; categories come from their fragment
+        self.assertEqual(data['testimonials'][0]['customer_name'], 'سارة')
+
+
+class OffersApiTests(TestCase):
+    """offers_api serializes from per-offer fragments with the relations prefetched."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = reverse('salon:offers-api')
+        self.service = Service.objects.create(
+            name='قص', name_en='Cut', description='-', description_en='-', duration='30', price=80,
+        )
+        self.category = Category.objects.create(name='شعر', name_en='Hair', slug_en='hair')
+        self.created = 0
+
+    def add_offers(self, count):
+        now = timezone.now()
+        for _ in range(count):
+            self.created += 1
+            offer = Offer.objects.create(
+                title=f'عرض {self.created}', description='-', short_description='-',
+                discount_value=20, original_price=100, offer_price=80, image='offers/offer.jpg',
+                valid_from=now - timedelta(days=1), valid_until=now + timedelta(days=1),
+            )
+            offer.services.add(self.service)
+            offer.categories.add(self.category)
+
+    def count_queries(self):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(self.url).json()
+        return len(queries), data
+
+    def test_constant_queries(self):
+        self.add_offers(2)
+        small, _ = self.count_queries()
+        self.add_offers(10)
+        large, data = self.count_queries()
+        self.assertEqual(small, large)
+        self.assertEqual(large, 3)  # offers, services, categories
+        offer = data['offers'][0]
+        self.assertEqual(offer['services'][0], {'id': self.service.id, 'name': 'قص', 'name_en': 'Cut', 'price': 80.0, 'duration': '30'})
+        self.assertEqual(offer['categories'][0]['name_en'], 'Hair')
+        self.assertEqual(offer['savings_amount'], 20.0)
+        self.assertTrue(offer['is_valid'])
+
+    def test_fragments_survive_response_invalidation(self):
+        self.add_offers(3)
+        self.client.get(self.url)
+        offer = Offer.objects.first()
+        offer.title = 'عرض معدل'
+        offer.save()
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(self.url).json()
+        self.assertEqual(len(queries), 3)  # the changed offer is rebuilt, the rest come from the cache
+        self.assertIn('عرض معدل', [item['title'] for item in data['offers']])
+
+        offer.services.remove(self.service)
+        data = self.client.get(self.url).json()
+        changed = next(item for item in data['offers'] if item['id'] == offer.id)
+        self.assertEqual(changed['services'], [])
+
+    def test_admin_bulk_actions_expire_the_cache(self):
+        self.add_offers(2)
+        self.assertEqual(len(self.client.get(self.url).json()['offers']), 2)
+        offer_admin = OfferAdmin(Offer, admin.site)
+        request = RequestFactory().post('/admin/')
+        with mock.patch.object(OfferAdmin, 'message_user'):
+            offer_admin.mark_as_featured(request, Offer.objects.all())
+            self.assertTrue(all(item['is_featured'] for item in self.client.get(self.url).json()['offers']))
+            offer_admin.deactivate_offers(request, Offer.objects.filter(pk=Offer.objects.first().pk))
+        self.assertEqual(len(self.client.get(self.url).json()['offers']), 1)
+
+
+class BufferedCounterTests(TestCase):
+    """Blog views/likes are buffered in the shared cache and flushed in batched UPDATEs."""
+
+    def setUp(self):
+        cache.clear()
+        caches['counters'].clear()
+        self.client = APIClient()
+        author = BlogAuthor.objects.create(user=User.objects.create_user('author'))
+        category = BlogCategory.objects.create(name='جمال', name_en='Beauty')
+        self.posts = [
+            BlogPost.objects.create(
+                title=f'مقال {i}', slug=f'post-{i}', excerpt='-', content='-', author=author,
+                category=category, featured_image='blog/posts/post.jpg', status='published',
+            )
+            for i in range(3)
+        ]
+        # Keep the in-request flush out of the way
+        caches['counters'].add('counter:flush-lock', True, 60)
+
+    def test_likes_are_buffered_and_read_live(self):
+        post = self.posts[0]
+        url = reverse('salon:blog-post-like', args=[post.id])
+        for expected in range(1, 6):
+            self.assertEqual(self.client.post(url).json()['likes'], expected)
+        post.refresh_from_db()
+        self.assertEqual(post.likes, 0)
+
+        data = self.client.get(reverse('salon:blog-post-detail', args=[post.slug])).json()
+        self.assertEqual((data['likes'], data['views']), (5, 1))
+        listed = self.client.get(reverse('salon:blog-post-list')).json()['results']
+        self.assertEqual(next(item['likes'] for item in listed if item['id'] == post.id), 5)
+
+    def test_increment_touches_no_table(self):
+        with self.assertNumQueries(0):
+            counters.increment(BlogPost, self.posts[0].pk, 'views')
+            self.assertEqual(counters.increment(BlogPost, self.posts[0].pk, 'views', 2), 3)
+
+    def test_flush_writes_in_one_update(self):
+        for i, post in enumerate(self.posts):
+            for _ in range(i + 1):
+                counters.increment(BlogPost, post.pk, 'views')
+            counters.increment(BlogPost, post.pk, 'likes')
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(counters.flush(), 3)
+        self.assertEqual(len(queries), 1)
+        self.assertTrue(queries[0]['sql'].startswith('UPDATE "salon_blogpost"'))
+        self.assertEqual(
+            list(BlogPost.objects.order_by('pk').values_list('views', 'likes')), [(1, 1), (2, 1), (3, 1)]
+        )
+        self.assertEqual(counters.pending(BlogPost, [post.pk for post in self.posts], ['views', 'likes']), {})
+        self.assertEqual(counters.flush(), 0)
+
+    def test_only_rows_with_counts_are_flushed(self):
+        counters.increment(BlogPost, self.posts[1].pk, 'views')
+        counters.flush()
+        counters.increment(BlogPost, self.posts[2].pk, 'views')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(counters.flush(), 1)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(
+            list(BlogPost.objects.order_by('pk').values_list('views', flat=True)), [0, 1, 1]
+        )
+
+    def test_failed_flush_keeps_the_counts(self):
+        counters.increment(BlogPost, self.posts[0].pk, 'likes')
+        with mock.patch('django.db.models.query.QuerySet.update', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                counters.flush()
+        self.assertEqual(counters.pending(BlogPost, [self.posts[0].pk], ['likes']), {self.posts[0].pk: {'likes': 1}})
+
+    def test_command_flushes_the_pending_counts(self):
+        for _ in range(4):
+            counters.increment(BlogPost, self.posts[2].pk, 'views')
+        call_command('flush_counters', stdout=StringIO())
+        self.posts[2].refresh_from_db()
+        self.assertEqual(self.posts[2].views, 4)
+        self.assertEqual(counters.pending(BlogPost, [self.posts[2].pk], ['views']), {})
+
+
+class SearchTests(TestCase):
+    """The full-text index follows the models and ranks Arabic and English matches."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        author = BlogAuthor.objects.create(user=User.objects.create_user('author'))
+        category = BlogCategory.objects.create(name='جمال', name_en='Beauty')
+        self.post = BlogPost.objects.create(
+            title='أسرار الشعر الصحي', title_en='Hair care', slug='hair-care', excerpt='نصائح للشعر',
+            content='استخدمي <b>زيت</b> الأرغان للشعر الجاف', author=author, category=category,
+            featured_image='blog/posts/post.jpg', status='published',
+        )
+        self.draft = BlogPost.objects.create(
+            title='مسودة عن الشعر', slug='draft', excerpt='-', content='-', author=author,
+            category=category, featured_image='blog/posts/post.jpg',
+        )
+        self.service = Service.objects.create(
+            name='قص الشعر', name_en='Haircut', description='قص وتصفيف', description_en='Cut and style',
+            duration='30', price=80,
+        )
+        Service.objects.create(
+            name='مانيكير', name_en='Manicure', description='عناية بالأظافر', description_en='Nail care',
+            duration='30', price=60,
+        )
+
+    def search(self, **params):
+        response = self.client.get(reverse('salon:search'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    def test_ranked_highlighted_results(self):
+        results = self.search(q='الشعر')
+        self.assertEqual({(hit['type'], hit['id']) for hit in results},
+                         {('blog', self.post.id), ('services', self.service.id)})
+        post_hit = next(hit for hit in results if hit['type'] == 'blog')
+        self.assertIn('<mark>الشعر</mark>', post_hit['title'])
+        self.assertEqual(post_hit['slug'], 'hair-care')
+
+        # A title match outranks a description match
+        ranked = self.search(q='care')
+        self.assertEqual([(hit['type'], hit['id']) for hit in ranked][0], ('blog', self.post.id))
+        self.assertEqual(len(ranked), 2)
+        self.assertIn('&lt;b&gt;', self.search(q='زيت')[0]['snippet'])  # content is escaped
+
+        english = self.search(q='hairc', type='services')  # last term is a prefix
+        self.assertEqual([hit['id'] for hit in english], [self.service.id])
+        self.assertIn('<mark>Haircut</mark>', english[0]['title'])
+
+    def test_index_follows_the_models(self):
+        self.draft.status = 'published'
+        self.draft.save()
+        self.assertIn(self.draft.id, [hit['id'] for hit in self.search(q='مسودة')])
+
+        self.service.is_active = False
+        self.service.save()
+        self.assertEqual(self.search(q='Haircut'), [])
+        self.post.delete()
+        self.assertEqual(self.search(q='الأرغان'), [])
+
+    def test_list_view_search_uses_index(self):
+        data = self.client.get(reverse('salon:service-list'), {'search': 'nail'}).json()
+        self.assertEqual([item['name_en'] for item in data['results']], ['Manicure'])
+        data = self.client.get(reverse('salon:blog-post-list'), {'search': 'الجاف'}).json()
+        self.assertEqual([item['slug'] for item in data['results']], ['hair-care'])
+
+    def test_rebuild(self):
+        self.assertEqual(search_index.rebuild(), 3)
+        self.assertEqual(len(self.search(q='الشعر')), 2)
+        response = self.client.get(reverse('salon:search'), {'q': ''})
+        self.assertEqual(response.status_code, 400)
+
+
+class NormalizationTests(TestCase):
+    """Arabic spelling variants meet in the shadow columns and the search index."""
+
+    def test_normalize_and_stem(self):
+        self.assertEqual(normalization.normalize('إِزالةُ الشّعرِ ٣'), 'ازاله الشعر 3')
+        self.assertEqual(normalization.search_text('بالشعر', 'وشعرها', 'الأظافر'), 'شعر شعر اظافر')
+        self.assertEqual(normalization.search_text('Hair CARE'), 'hair care')
+
+    def test_shadow_column_follows_saves(self):
+        testimonial = Testimonial.objects.create(customer_name='سارة', testimonial_text='خدمة رائعة للأظافر')
+        self.assertEqual(testimonial.search_text, 'سار خدم رايع اظافر')
+        testimonial.testimonial_text = 'تسريحة جميلة'
+        testimonial.save(update_fields=['testimonial_text'])
+        testimonial.refresh_from_db()
+        self.assertEqual(testimonial.search_text, 'سار تسريح جميل')
+
+    def test_variants_match(self):
+        Testimonial.objects.create(customer_name='نورة', testimonial_text='أفضل صالون للعناية بالأظافر')
+        Service.objects.create(
+            name='إزالة الشعر بالليزر', name_en='Laser hair removal', description='جلسة', description_en='-',
+            duration='60', price=300,
+        )
+        client = APIClient()
+        data = client.get(reverse('salon:testimonials-api'), {'search': 'الاظافر'}).json()
+        self.assertEqual(len(data['testimonials']), 1)
+
+        results = client.get(reverse('salon:search'), {'q': 'ازالة شعر'}).json()['results']
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]['title'], '<mark>إزالة</mark> <mark>الشعر</mark> بالليزر - Laser hair removal')
+
+        services = Service.objects.filter(pk__in=[results[0]['id']])
+        self.assertEqual(search_index.filter_shadow(services, 'الإزالة').count(), 1)
+
+
+class AutocompleteTests(TestCase):
+    """/services/autocomplete/ answers from the in-process prefix index."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = reverse('salon:service-autocomplete')
+        self.hair = Category.objects.create(name='الشعر', name_en='Hair', slug_en='hair')
+        self.cut = Service.objects.create(
+            name='قص الشعر', name_en='Hair cut', description='-', description_en='-', duration='30', price=80,
+        )
+        Service.objects.create(
+            name='صبغة', name_en='Hair colour', description='-', description_en='-', duration='90', price=250,
+        )
+        Service.objects.create(
+            name='مانيكير', name_en='Manicure', description='-', description_en='-', duration='30', price=60,
+            is_active=False,
+        )
+
+    def lookup(self, query):
+        return [(item['type'], item['name_en']) for item in self.client.get(self.url, {'q': query}).json()['results']]
+
+    def test_prefix_matching(self):
+        self.assertEqual(self.lookup('hair'), [('category', 'Hair'), ('service', 'Hair cut'), ('service', 'Hair colour')])
+        self.assertEqual(self.lookup('HAIR CO'), [('service', 'Hair colour')])
+        self.assertEqual(self.lookup('cu'), [('service', 'Hair cut')])  # any word of the name
+        self.assertEqual(self.lookup('شعر'), [('category', 'Hair'), ('service', 'Hair cut')])  # without the article
+        self.assertEqual(self.lookup('صبغه'), [('service', 'Hair colour')])  # ta marbuta folded
+        self.assertEqual(self.lookup('mani'), [])  # inactive
+        self.assertEqual(self.lookup(''), [])
+
+    def test_no_queries_once_built(self):
+        self.lookup('hair')
+        with CaptureQueriesContext(connection) as queries:
+            self.lookup('قص')
+        self.assertEqual(len(queries), 0)
+
+    def test_rebuilt_on_change(self):
+        self.assertEqual(self.lookup('bl'), [])
+        self.cut.name_en = 'Blow dry'
+        self.cut.save()
+        self.assertEqual(self.lookup('bl'), [('service', 'Blow dry')])
+        self.hair.is_active = False
+        self.hair.save()
+        self.assertEqual(self.lookup('hair'), [('service', 'Hair colour')])
+
+    def test_rebuilt_on_change_in_another_process(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, True)
+        shared = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}}
+        with self.settings(CACHES=shared):
+            self.assertEqual(self.lookup('bl'), [])
+            Service.objects.filter(pk=self.cut.pk).update(name_en='Blow dry')
+            # The other process's signal bumps the version in the shared cache
+            other = FileBasedCache(location, {})
+            other.set('catalog:version:services', other.get('catalog:version:services') + 1, None)
+            self.assertEqual(self.lookup('bl'), [('service', 'Blow dry')])
+
+
+class QueryPlanTests(TestCase):
+    """The Booking hot queries are served by indexes."""
+
+    def test_no_full_scans(self):
+        out = StringIO()
+        call_command('check_query_plans', stdout=out)
+        self.assertIn('hot queries use an index', out.getvalue())
+
+    def test_detects_full_scans(self):
+        plan = query_plans.explain(Booking.objects.filter(special_requests='x').order_by())
+        self.assertEqual(query_plans.FULL_SCAN_PATTERNS['sqlite'].findall(plan), ['salon_booking'])
+
+
+class SlotReservationTests(TestCase):
+    """Double bookings are refused by the database; slot holds and admin capacity."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = reverse('salon:booking-list-create')
+        self.service = Service.objects.create(
+            name='قص الشعر', name_en='Hair cut', description='-', description_en='-', duration='60', price=80,
+        )
+        self.staff = Staff.objects.create(name='موظف')
+        self.other_staff = Staff.objects.create(name='موظف آخر')
+        self.customer = Customer.objects.create(name='عميلة', email='client@example.com', phone='0500000000')
+        self.address = Address.objects.create(customer=self.customer, title='المنزل', address='الرياض')
+        self.day = timezone.localdate() + timedelta(days=3)
+        self.user = User.objects.create_user('client', password='pass')
+        self.client.force_authenticate(self.user)
+
+    def book(self, staff=None, unassigned=False, **extra):
+        return self.client.post(self.url, {
+            'customer': self.customer.pk,
+            'service': self.service.pk,
+            'staff': None if unassigned else (staff or self.staff).pk,
+            'address': self.address.pk,
+            'booking_date': self.day.isoformat(),
+            'booking_time': '10:00',
+            'payment_method': 'cash',
+            'price': '80.00',
+            'final_price': '80.00',
+            **extra,
+        }, format='json')
+
+    def hold(self, staff=None, at='10:00'):
+        return self.client.post(reverse('salon:slot-hold'), {
+            'service_id': self.service.pk,
+            'staff_id': (staff or self.staff).pk,
+            'date': self.day.isoformat(),
+            'time': at,
+        }, format='json')
+
+    def test_second_booking_of_a_slot_is_refused(self):
+        self.assertEqual(self.book().status_code, 201)
+        response = self.book()
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['error'], reservations.SLOT_TAKEN)
+        self.assertEqual(self.book(staff=self.other_staff).status_code, 201)
+        self.assertEqual(Booking.objects.count(), 2)
+
+    def test_cancelled_booking_frees_the_slot(self):
+        self.book()
+        Booking.objects.update(status='cancelled')
+        self.assertEqual(self.book().status_code, 201)
+
+    def test_constraint_is_enforced_by_the_database(self):
+        self.book()
+        booking = Booking.objects.get()
+        booking.pk, booking.reference = None, ''
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            booking.save()
+
+    def test_hold_blocks_other_customers_until_used(self):
+        response = self.hold()
+        self.assertEqual(response.status_code, 201)
+        token = response.data['hold_token']
+
+        self.assertEqual(self.hold().status_code, 409)
+        self.assertEqual(self.book().status_code, 409)
+        self.assertEqual(self.book(hold_token=token).status_code, 201)
+        self.assertFalse(SlotHold.objects.exists())
+        self.assertEqual(self.hold().status_code, 409)
+
+    def test_expired_hold_does_not_block(self):
+        token = self.hold().data['hold_token']
+        SlotHold.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.book(hold_token=token).data['error'], reservations.HOLD_EXPIRED)
+        self.assertEqual(self.hold().status_code, 201)
+
+    def test_released_hold(self):
+        token = self.hold().data['hold_token']
+        release = reverse('salon:slot-hold-release', args=[token])
+        self.assertEqual(self.client.delete(release).status_code, 204)
+        self.assertEqual(self.client.delete(release).status_code, 404)
+        self.assertEqual(self.book().status_code, 201)
+
+    def test_overlapping_slots_are_refused(self):
+        self.assertEqual(self.book().status_code, 201)
+        self.assertEqual(self.book(booking_time='10:30').status_code, 409)
+        self.assertEqual(self.hold(at='09:30').status_code, 409)
+        self.assertEqual(self.hold(at='11:00').status_code, 201)
+        self.assertEqual(self.book(booking_time='11:30').status_code, 409)
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_unassigned_slots_are_checked(self):
+        # The checkout sends no staff member
+        self.assertEqual(self.book(unassigned=True).status_code, 201)
+        self.assertEqual(self.book(unassigned=True).status_code, 409)
+        self.assertEqual(self.book(unassigned=True, booking_time='10:30').status_code, 409)
+        # An unassigned booking blocks every staff calendar, like availability.py shows it
+        self.assertEqual(self.book().status_code, 409)
+        self.assertEqual(self.book(unassigned=True, booking_time='11:00').status_code, 201)
+
+    def test_unassigned_booking_needs_a_free_staff_member(self):
+        self.staff.services.add(self.service)
+        self.other_staff.services.add(self.service)
+        self.assertEqual(self.book().status_code, 201)
+        self.assertEqual(self.book(unassigned=True, booking_time='10:30').status_code, 201)
+
+        Booking.objects.filter(staff__isnull=True).update(status='cancelled')
+        self.assertEqual(self.book(staff=self.other_staff).status_code, 201)
+        self.assertEqual(self.book(unassigned=True, booking_time='10:30').status_code, 409)
+
+    def test_unassigned_constraint_is_enforced_by_the_database(self):
+        self.book(unassigned=True)
+        booking = Booking.objects.get()
+        booking.pk, booking.reference = None, ''
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            booking.save()
+
+    def test_unassigned_hold_is_validated_and_consumed(self):
+        response = self.client.post(reverse('salon:slot-hold'), {
+            'service_id': self.service.pk, 'date': self.day.isoformat(), 'time': '10:00',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        token = response.data['hold_token']
+        self.assertIsNone(SlotHold.objects.get().staff_id)
+
+        self.assertEqual(self.book(unassigned=True).status_code, 409)
+        self.assertEqual(self.book().status_code, 409)
+        other_slot = self.book(unassigned=True, booking_time='12:00', hold_token=token)
+        self.assertEqual(other_slot.data['error'], reservations.HOLD_EXPIRED)
+        self.assertEqual(self.book(unassigned=True, hold_token=token).status_code, 201)
+        self.assertFalse(SlotHold.objects.exists())
+
+    def test_holds_need_a_user_and_are_capped_per_user(self):
+        anonymous = APIClient()
+        self.assertIn(anonymous.post(reverse('salon:slot-hold'), {}, format='json').status_code, (401, 403))
+
+        token = self.hold().data['hold_token']
+        self.assertEqual(self.hold(at='12:00').status_code, 201)
+        response = self.hold(at='14:00')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.data['error'], reservations.TOO_MANY_HOLDS)
+
+        # Only the user who took a hold can release it
+        release = reverse('salon:slot-hold-release', args=[token])
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user('other', password='pass'))
+        self.assertEqual(other.delete(release).status_code, 404)
+        self.assertEqual(self.client.delete(release).status_code, 204)
+        self.assertEqual(self.hold(at='14:00').status_code, 201)
+
+    def test_availability_skips_held_slots(self):
+        WorkingHours.objects.create(
+            staff=self.staff, day_of_week=(self.day.weekday() + 1) % 7, start_time=time(9), end_time=time(18),
+        )
+        self.assertIn('10:00', get_free_slots(self.day, self.service.pk, self.staff.pk))
+        self.hold()
+        free = get_free_slots(self.day, self.service.pk, self.staff.pk)
+        self.assertNotIn('10:00', free)
+        self.assertIn('11:00', free)
+
+        SlotHold.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertIn('10:00', get_free_slots(self.day, self.service.pk, self.staff.pk))
+
+    def test_admin_slot_capacity(self):
+        slot = AdminSlotAvailability.objects.create(
+            service=self.service, date=self.day, time=time(10), max_bookings=1,
+        )
+        self.assertEqual(self.book().status_code, 201)
+        response = self.book(staff=self.other_staff)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['error'], reservations.SLOT_FULL)
+        slot.refresh_from_db()
+        self.assertEqual(slot.current_bookings, 1)
+
+        booking = Booking.objects.get()
+        booking.status = 'cancelled'
+        booking.save()
+        slot.refresh_from_db()
+        self.assertEqual(slot.current_bookings, 0)
+        self.assertEqual(self.book(staff=self.other_staff).status_code, 201)
+
+
+class PlaceholderImageTests(TestCase):
+    """/placeholder/ images are bounded, negotiated and cached."""
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir, ignore_errors=True)
+        overrides = self.settings(PLACEHOLDER_CACHE_DIR=self.cache_dir)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        placeholders._memory.clear()
+        self.url = reverse('salon:placeholder-image', args=[100, 60])
+
+    def test_dimensions_are_clamped_and_bucketed(self):
+        self.assertEqual(placeholders.bucket(20000), placeholders.MAX_SIZE)
+        self.assertEqual(placeholders.bucket(1), placeholders.MIN_SIZE)
+        self.assertEqual(placeholders.bucket(61), 60)
+        response = self.client.get(reverse('salon:placeholder-image', args=[20000, 20000]))
+        with Image.open(BytesIO(response.content)) as image:
+            self.assertEqual(image.size, (placeholders.MAX_SIZE, placeholders.MAX_SIZE))
+
+    def test_format_follows_accept(self):
+        self.assertEqual(self.client.get(self.url)['Content-Type'], 'image/png')
+        response = self.client.get(self.url, HTTP_ACCEPT='image/webp,*/*')
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertIn('Accept', response['Vary'])
+
+    def test_cached_in_memory_and_on_disk(self):
+        with mock.patch.object(placeholders, 'render', wraps=placeholders.render) as render:
+            first = self.client.get(self.url)
+            self.client.get(self.url)
+            self.assertEqual(render.call_count, 1)
+            self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+
+            placeholders._memory.clear()
+            self.assertEqual(self.client.get(self.url).content, first.content)
+            self.assertEqual(render.call_count, 1)
+
+    def test_disk_cache_is_bounded(self):
+        self.client.get(self.url, {'text': 'Hello'})
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+        with mock.patch.object(placeholders, 'DISK_ITEMS', 2):
+            for width in (100, 120, 140):
+                self.client.get(reverse('salon:placeholder-image', args=[width, 60]))
+                # Distinct modification times on coarse filesystems
+                for name in os.listdir(self.cache_dir):
+                    path = os.path.join(self.cache_dir, name)
+                    os.utime(path, (os.path.getmtime(path) - 10,) * 2)
+        self.assertEqual(sorted(name.split('-')[0] for name in os.listdir(self.cache_dir)), ['120x60', '140x60'])
+
+    def test_etag_revalidation(self):
+        etag = self.client.get(self.url)['ETag']
+        self.assertFalse(etag.startswith('W/'))
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertNotEqual(self.client.get(self.url, {'text': 'Hello'})['ETag'], etag)
+
+
+class ImageVariantTests(TestCase):
+    """Uploaded images get resized WebP variants and a srcset."""
+
+    def setUp(self):
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        overrides = self.settings(MEDIA_ROOT=media_root, IMAGE_VARIANTS_ASYNC=False)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def upload(self, size, name='photo.jpg'):
+        output = BytesIO()
+        Image.new('RGB', size, color='#c08080').save(output, format='JPEG')
+        return SimpleUploadedFile(name, output.getvalue(), content_type='image/jpeg')
+
+    def create_service(self, image):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Service.objects.create(
+                name='تنظيف البشرة', name_en='Facial', description='-', description_en='-', duration='60',
+                price=150, image=image,
+            )
+
+    def test_variants_generated_on_upload(self):
+        service = self.create_service(self.upload((1000, 500)))
+        storage = service.image.storage
+        for width in (320, 640, 960):
+            name = image_variants.variant_name(service.image.name, width)
+            with storage.open(name) as variant, Image.open(variant) as image:
+                self.assertEqual((image.format, image.width), ('WEBP', width))
+        self.assertFalse(storage.exists(image_variants.variant_name(service.image.name, 1280)))
+
+        data = self.client.get(reverse('salon:service-detail', args=[service.pk])).json()
+        candidates = [entry.rsplit(' ', 1) for entry in data['image_srcset'].split(', ')]
+        self.assertEqual([width for _url, width in candidates], ['320w', '640w', '960w', '1000w'])
+        self.assertTrue(candidates[0][0].endswith('.w320.webp'))
+
+    def test_small_images_only_list_the_original(self):
+        service = self.create_service(self.upload((200, 200)))
+        self.assertEqual(image_variants.srcset(service.image), f'{service.image.url} 200w')
+
+    def test_backfill_command(self):
+        # Stored before variants existed: no signal ran
+        service = self.create_service(None)
+        Service.objects.filter(pk=service.pk).update(image=default_storage.save('services/old.jpg', self.upload((700, 700))))
+        service.refresh_from_db()
+        out = StringIO()
+        call_command('generate_image_variants', '--model', 'salon.Service', stdout=out)
+        self.assertIn('salon.Service: 1 rows, 2 variants written', out.getvalue())
+        self.assertTrue(service.image.storage.exists(image_variants.variant_name(service.image.name, 640)))
+
+        call_command('generate_image_variants', '--model', 'salon.Service', stdout=out)
+        self.assertIn('salon.Service: 1 rows, 0 variants written', out.getvalue())
+
+
+class StaticResolverTests(TestCase):
+    """Development static files come from an in-memory manifest."""
+
+    def setUp(self):
+        self.static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.static_root, ignore_errors=True)
+        os.makedirs(os.path.join(self.static_root, 'salon', 'css'))
+        self.write('salon/css/site.css', b'body { color: red; }')
+        overrides = self.settings(DEBUG=True, STATIC_ROOT=self.static_root, STATICFILES_DIRS=[])
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        static_resolver.manifest.signature = None
+        self.middleware = static_resolver.StaticFilesMiddleware(lambda request: HttpResponse(status=404))
+        self.factory = RequestFactory()
+
+    def write(self, name, content):
+        with open(os.path.join(self.static_root, name), 'wb') as f:
+            f.write(content)
+
+    def get(self, path, **headers):
+        return self.middleware(self.factory.get(path, **headers))
+
+    def test_serves_with_mime_type_from_table(self):
+        response = self.get('/static/salon/css/site.css')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(b''.join(response.streaming_content), b'body { color: red; }')
+        self.assertEqual(self.get('/static/salon/css/missing.css').status_code, 404)
+        self.assertEqual(self.get('/static/../settings.py').status_code, 404)
+
+    def test_app_static_files_and_misrouted_admin_paths(self):
+        self.assertEqual(self.get('/static/admin/css/base.css').status_code, 200)
+        self.assertEqual(self.get('/admin/css/site.css')['Content-Type'], 'text/css')
+
+    def test_precompressed_variant(self):
+        self.write('salon/css/site.css.br', b'brotli')
+        static_resolver.manifest.signature = None
+        response = self.get('/static/salon/css/site.css', HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertNotIn('Content-Encoding', self.get('/static/salon/css/site.css', HTTP_ACCEPT_ENCODING='gzip'))
+
+    def test_not_modified(self):
+        last_modified = self.get('/static/salon/css/site.css')['Last-Modified']
+        response = self.get('/static/salon/css/site.css', HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_manifest_follows_new_files(self):
+        self.get('/static/salon/css/site.css')
+        self.write('salon/css/new.css', b'')
+        static_resolver.manifest.checked_at = 0
+        self.assertEqual(self.get('/static/salon/css/new.css').status_code, 200)
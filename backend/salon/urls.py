@@ -16,6 +16,7 @@ urlpatterns = [
     # Services
     path('services/', views.ServiceListView.as_view(), name='service-list'),
     path('services/<int:pk>/', views.ServiceDetailView.as_view(), name='service-detail'),
+    path('services/autocomplete/', views.service_autocomplete, name='service-autocomplete'),
     
     # Staff
     path('staff/', views.StaffListView.as_view(), name='staff-list'),
@@ -23,6 +24,12 @@ urlpatterns = [
     # Hero Images
     path('hero-images/', views.HeroImageListView.as_view(), name='hero-image-list'),
     
+    # Homepage bootstrap (hero images, categories, services, offers, testimonials, contact info, config)
+    path('bootstrap/', views.bootstrap_api, name='bootstrap'),
+    
+    # Full-text search (blog posts and services)
+    path('search/', views.search_api, name='search'),
+    
     # Customers
     path('customers/', views.CustomerCreateView.as_view(), name='customer-create'),
     path('customers/<int:pk>/', views.CustomerDetailView.as_view(), name='customer-detail'),
@@ -36,8 +43,11 @@ urlpatterns = [
     path('bookings/<int:pk>/', views.BookingDetailView.as_view(), name='booking-detail'),
     path('bookings/<int:booking_id>/verify-payment/', booking_views.verify_payment, name='verify-payment'),
     path('bookings/<int:booking_id>/confirm/', booking_views.confirm_booking, name='confirm-booking'),
+    path('bookings/hold/', booking_views.hold_slot, name='slot-hold'),
+    path('bookings/hold/<uuid:token>/', booking_views.release_slot_hold, name='slot-hold-release'),
     path('booking-time-slots/', views.booking_time_slots, name='booking-time-slots'),
     path('availability/', views.availability, name='availability'),
+    path('availability/range/', views.availability_range, name='availability-range'),
     
     # Coupons
     path('validate-coupon/', views.validate_coupon, name='validate-coupon'),
@@ -113,12 +123,19 @@ urlpatterns = [
     # Privacy Policy page
     path('privacy/', views.privacy_policy_view, name='privacy-policy'),
     
-    # Export endpoints (Excel only - PDF removed)
+    # Export endpoints (Excel + streamed CSV - PDF removed)
     path('export/bookings/excel/', export_views.export_bookings_excel, name='export-bookings-excel'),
+    path('export/bookings/csv/', export_views.export_bookings_csv, name='export-bookings-csv'),
     path('export/customers/excel/', export_views.export_customers_excel, name='export-customers-excel'),
+    path('export/customers/csv/', export_views.export_customers_csv, name='export-customers-csv'),
     path('export/services/excel/', export_views.export_services_excel, name='export-services-excel'),
+    path('export/services/csv/', export_views.export_services_csv, name='export-services-csv'),
     path('export/revenue/excel/', export_views.export_revenue_report_excel, name='export-revenue-excel'),
     path('export/dashboard-data/', export_views.export_dashboard_data, name='export-dashboard-data'),
+    path('reports/revenue/', export_views.revenue_report_api, name='revenue-report'),
+    path('export/jobs/', export_views.export_job_create, name='export-job-create'),
+    path('export/jobs/<int:job_id>/', export_views.export_job_detail, name='export-job-detail'),
+    path('export/jobs/<int:job_id>/download/', export_views.export_job_download, name='export-job-download'),
     
     # Blog API endpoints
     path('blog/categories/', views.BlogCategoryListView.as_view(), name='blog-category-list'),
@@ -15,7 +15,7 @@ from .base_views import (
 # Booking views
 from .booking_views import (
     BookingListCreateView, BookingDetailView, booking_time_slots,
-    availability, send_booking_emails_api, reschedule_booking,
+    availability, availability_range, send_booking_emails_api, reschedule_booking,
     get_booking_reschedule_history , TestWhatsAppView
 )
 
@@ -45,6 +45,15 @@ from .offers_views import (
     offers_api, offer_detail_api
 )
 
+# Homepage bootstrap
+from .bootstrap_views import bootstrap_api
+
+# Site search
+from .search_views import search_api
+
+# Service/category type-ahead
+from .autocomplete_views import service_autocomplete
+
 
 # Import other existing views
 from .. import export_views
@@ -449,17 +449,12 @@ User = get_user_model()
 # ----------------------------
 # accounts/auth_view.py
 
-from twilio.rest import Client
-from django.conf import settings
+from ..outbox import deliver_now, enqueue_otp, enqueue_sms
 
 def send_sms(phone_number, message):
-    client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
+    # Delivered by the process_outbox worker
     try:
-        client.messages.create(
-            body=message,
-            from_=settings.TWILIO_PHONE_NUMBER,
-            to=phone_number
-        )
+        enqueue_sms(phone_number, message, event='sms')
         return True
     except Exception as e:
         print("Twilio SMS Error:", e)
@@ -473,8 +468,6 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 from random import randint
-from django.conf import settings
-from twilio.rest import Client
 from ..models import Customer, PhoneOTP
 
 
@@ -486,14 +479,12 @@ from rest_framework.permissions import AllowAny
 from random import randint
 
 from ..models import PhoneOTP
-from ..utils import send_whatsapp_message
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 from random import randint
 
 from ..models import PhoneOTP
-from ..utils import send_whatsapp_message
 
 
 class SendOTPView(APIView):
@@ -506,13 +497,15 @@ class SendOTPView(APIView):
 
         otp_code = str(randint(100000, 999999))
 
-        PhoneOTP.objects.create(
+        otp = PhoneOTP.objects.create(
             phone_number=phone,
             otp_code=otp_code
         )
 
         try:
-            sid = send_whatsapp_message(phone, f"رمز التحقق الخاص بك: {otp_code}")
+            message, _ = enqueue_otp(otp)
+            # Sent right away: the customer is waiting for the code
+            message = deliver_now(message)
         except Exception as e:
             # رجّع سبب الخطأ الحقيقي للفرونت (وقت التطوير)
             return Response({
@@ -520,7 +513,15 @@ class SendOTPView(APIView):
                 "details": str(e),
             }, status=500)
 
-        return Response({"message": "تم إرسال رمز التحقق بنجاح", "sid": sid})
+        if message.status != 'sent':
+            # Left to the process_outbox worker to retry
+            return Response({
+                "error": "فشل إرسال رسالة WhatsApp",
+                "details": message.last_error,
+                "message_id": message.id,
+            }, status=503)
+
+        return Response({"message": "تم إرسال رمز التحقق بنجاح", "message_id": message.id})
 
 # ----------------------------
 class VerifyOTPView(APIView):
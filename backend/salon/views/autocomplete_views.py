@@ -0,0 +1,29 @@
+"""
+Type-ahead over service and category names, served from an in-process index
+"""
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+
+from .. import autocomplete
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def service_autocomplete(request):
+    """
+    Services and categories whose Arabic or English names contain a word
+    starting with ``?q=``, best first; ``?limit=`` (default 10, at most 20).
+    """
+    query = request.query_params.get('q', '')
+    try:
+        limit = int(request.query_params.get('limit', 10))
+    except ValueError:
+        return Response({'error': 'قيمة limit غير صحيحة'}, status=status.HTTP_400_BAD_REQUEST)
+
+    results = autocomplete.lookup(query, limit)
+    return Response({
+        'query': query,
+        'results': results,
+    })
@@ -4,18 +4,14 @@ Base views for salon app - Core functionality
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
 from django.shortcuts import get_object_or_404
-from django.db.models import Q
-from django.utils import timezone
-from datetime import timedelta
-from payments.models import Payment
-from payments.serializers import PaymentSerializer
+from django.db.models import Prefetch
 
 
 
 from ..models import (
-    Category, Service, Staff, Customer, Address, Coupon, Booking, HeroImage,
+    Category, Service, Staff, Customer, Address, HeroImage,
     Config, WorkingHours, DayOff, AppointmentRequest, AppointmentRescheduleHistory,
     ServiceCategory, ServiceItem, Testimonial, ContactInfo, Contact, Offer
 )
@@ -25,24 +21,31 @@ from ..serializers import (
     CouponSerializer, BookingSerializer, BookingCreateSerializer,
     HeroImageSerializer, CouponValidationSerializer, UserSerializer,
     ConfigSerializer, WorkingHoursSerializer, DayOffSerializer,
-    AppointmentRequestSerializer, AppointmentRescheduleHistorySerializer
+    AppointmentRequestSerializer, AppointmentRescheduleHistorySerializer,
+    active_services_prefetch, with_service_categories,
 )
 from ..email_service import send_booking_emails, EmailNotificationService
+from ..dashboard import get_dashboard_stats
+from ..catalog_cache import CatalogCacheMixin
+from ..conditional import ConditionalGetMixin
+from .. import search_index
 
 
-class CategoryListView(generics.ListAPIView):
+class CategoryListView(CatalogCacheMixin, generics.ListAPIView):
     """List all active categories"""
     serializer_class = CategorySerializer
     permission_classes = [AllowAny]
+    catalog_sections = ('categories',)
     
     def get_queryset(self):
-        return Category.objects.filter(is_active=True).distinct()
+        return Category.objects.filter(is_active=True).distinct().prefetch_related(active_services_prefetch())
 
 
-class CategoryBySlugView(generics.RetrieveAPIView):
+class CategoryBySlugView(ConditionalGetMixin, generics.RetrieveAPIView):
     """Get a single category by slug with its services"""
     serializer_class = CategorySerializer
     permission_classes = [AllowAny]
+    etag_sections = ('categories',)
     
     def get_queryset(self):
         return Category.objects.filter(is_active=True)
@@ -119,10 +122,11 @@ class CategoryBySlugView(generics.RetrieveAPIView):
         return context
 
 
-class ServiceListView(generics.ListAPIView):
+class ServiceListView(CatalogCacheMixin, generics.ListAPIView):
     """List all active services with optional category filtering"""
     serializer_class = ServiceSerializer
     permission_classes = [AllowAny]
+    catalog_sections = ('services',)
     
     def get_queryset(self):
         queryset = Service.objects.filter(is_active=True).distinct()
@@ -141,26 +145,25 @@ class ServiceListView(generics.ListAPIView):
             queryset = queryset.filter(is_featured=True)
         
         if search:
-            queryset = queryset.filter(
-                Q(name__icontains=search) | 
-                Q(name_en__icontains=search) |
-                Q(description__icontains=search)
-            )
+            # Full-text index (normalized Arabic/English), best matches first
+            queryset = search_index.filter_ranked(queryset, 'services', search)
         
-        return queryset
+        return with_service_categories(queryset)
 
 
-class ServiceDetailView(generics.RetrieveAPIView):
+class ServiceDetailView(ConditionalGetMixin, generics.RetrieveAPIView):
     """Get service details"""
-    queryset = Service.objects.filter(is_active=True)
+    queryset = with_service_categories(Service.objects.filter(is_active=True))
     serializer_class = ServiceDetailSerializer
     permission_classes = [AllowAny]
+    etag_sections = ('services',)
 
 
-class StaffListView(generics.ListAPIView):
+class StaffListView(ConditionalGetMixin, generics.ListAPIView):
     """List all active staff members"""
     serializer_class = StaffSerializer
     permission_classes = [AllowAny]
+    etag_sections = ('staff',)
     
     def get_queryset(self):
         queryset = Staff.objects.filter(is_active=True)
@@ -169,13 +172,16 @@ class StaffListView(generics.ListAPIView):
         if service_id:
             queryset = queryset.filter(services__id=service_id)
         
-        return queryset.distinct()
+        return queryset.distinct().prefetch_related(
+            Prefetch('services', queryset=with_service_categories(Service.objects.all()))
+        )
 
 
-class HeroImageListView(generics.ListAPIView):
+class HeroImageListView(CatalogCacheMixin, generics.ListAPIView):
     """List all active hero images"""
     serializer_class = HeroImageSerializer
     permission_classes = [AllowAny]
+    catalog_sections = ('hero_images',)
     
     def get_queryset(self):
         return HeroImage.objects.filter(is_active=True)
@@ -227,31 +233,10 @@ class AddressDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 
 @api_view(['GET'])
-@permission_classes([AllowAny])
+@permission_classes([IsAdminUser])
 def dashboard_stats(request):
-    """Get dashboard statistics"""
-    today = timezone.now().date()
-    week_ago = today - timedelta(days=7)
-    month_ago = today - timedelta(days=30)
-    
-    stats = {
-        'total_bookings': Booking.objects.count(),
-        'pending_bookings': Booking.objects.filter(status='pending').count(),
-        'today_bookings': Booking.objects.filter(booking_date=today).count(),
-        'week_bookings': Booking.objects.filter(booking_date__gte=week_ago).count(),
-        'month_bookings': Booking.objects.filter(booking_date__gte=month_ago).count(),
-        'total_customers': Customer.objects.count(),
-        'active_services': Service.objects.filter(is_active=True).count(),
-        'active_staff': Staff.objects.filter(is_active=True).count(),
-        'active_coupons': Coupon.objects.filter(is_active=True).count(),
-    }
-
-    latest_payments = Payment.objects.order_by('-created_at')[:5]
-    payments_data = PaymentSerializer(latest_payments, many=True).data
-    return Response({
-    'stats': stats,
-    'latest_payments': payments_data
-    })
+    """Get dashboard statistics (cached, see salon/dashboard.py)"""
+    return Response(get_dashboard_stats())
 
 
 
@@ -280,7 +265,7 @@ def config_view(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class WorkingHoursListCreateView(generics.ListCreateAPIView):
+class WorkingHoursListCreateView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List or create working hours"""
     serializer_class = WorkingHoursSerializer
     permission_classes = [AllowAny]
@@ -292,7 +277,7 @@ class WorkingHoursListCreateView(generics.ListCreateAPIView):
         return WorkingHours.objects.all()
 
 
-class WorkingHoursDetailView(generics.RetrieveUpdateDestroyAPIView):
+class WorkingHoursDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Get, update, or delete working hours"""
     queryset = WorkingHours.objects.all()
     serializer_class = WorkingHoursSerializer
@@ -6,7 +6,9 @@ from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from django.shortcuts import get_object_or_404
-from django.db.models import Q
+
+from .. import counters, search_index
+from ..conditional import ConditionalGetMixin
 
 from ..models import (
     BlogAuthor, BlogCategory, BlogPost, BlogComment, NewsletterSubscriber
@@ -27,10 +29,11 @@ class BlogCategoryListView(generics.ListAPIView):
         return BlogCategory.objects.filter(is_active=True).order_by('order', 'name')
 
 
-class BlogPostListView(generics.ListAPIView):
+class BlogPostListView(ConditionalGetMixin, generics.ListAPIView):
     """List all published blog posts with filtering"""
     serializer_class = BlogPostListSerializer
     permission_classes = [AllowAny]
+    etag_counters = ('views', 'likes')
     
     def get_queryset(self):
         queryset = BlogPost.objects.filter(status='published').select_related('author', 'category')
@@ -59,40 +62,48 @@ class BlogPostListView(generics.ListAPIView):
         if is_trending and is_trending.lower() == 'true':
             queryset = queryset.filter(is_trending=True)
         
-        # Search
+        queryset = queryset.order_by('-published_at', '-created_at')
+        
+        # Search: full-text index (normalized Arabic/English), best matches first
         search = self.request.query_params.get('search', None)
         if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search) | 
-                Q(excerpt__icontains=search) | 
-                Q(content__icontains=search) |
-                Q(tags__icontains=search)
-            )
+            queryset = search_index.filter_ranked(queryset, 'blog', search)
         
-        return queryset.order_by('-published_at', '-created_at')
+        return queryset
 
 
-class BlogPostDetailView(generics.RetrieveAPIView):
+class BlogPostDetailView(ConditionalGetMixin, generics.RetrieveAPIView):
     """Get a single blog post by slug"""
     serializer_class = BlogPostDetailSerializer
     permission_classes = [AllowAny]
     lookup_field = 'slug'
+    # Not views: every visit bumps them, which would defeat the ETag
+    etag_counters = ('likes',)
     
     def get_queryset(self):
         return BlogPost.objects.filter(status='published').select_related('author', 'category')
     
-    def retrieve(self, request, *args, **kwargs):
-        instance = self.get_object()
+    def get_object(self):
+        instance = super().get_object()
         # Increment view count
         instance.increment_views()
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+        return instance
+    
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        if response.status_code == 304:
+            # The client's copy is current, but the visit still counts
+            post_id = self.get_queryset().filter(slug=self.kwargs['slug']).values_list('pk', flat=True).first()
+            if post_id:
+                counters.increment(BlogPost, post_id, 'views')
+        return response
 
 
-class BlogPostFeaturedView(generics.ListAPIView):
+class BlogPostFeaturedView(ConditionalGetMixin, generics.ListAPIView):
     """Get featured blog posts"""
     serializer_class = BlogPostListSerializer
     permission_classes = [AllowAny]
+    etag_counters = ('views', 'likes')
     
     def get_queryset(self):
         return BlogPost.objects.filter(
@@ -101,10 +112,11 @@ class BlogPostFeaturedView(generics.ListAPIView):
         ).select_related('author', 'category').order_by('-published_at')[:5]
 
 
-class BlogPostTrendingView(generics.ListAPIView):
+class BlogPostTrendingView(ConditionalGetMixin, generics.ListAPIView):
     """Get trending blog posts"""
     serializer_class = BlogPostListSerializer
     permission_classes = [AllowAny]
+    etag_counters = ('views', 'likes')
     
     def get_queryset(self):
         return BlogPost.objects.filter(
@@ -183,12 +195,11 @@ def blog_post_like(request, post_id):
         post = get_object_or_404(BlogPost, id=post_id, status='published')
         
         # For now, just increment likes (in a real app, you'd track user likes)
-        post.likes += 1
-        post.save(update_fields=['likes'])
+        pending_likes = counters.increment(BlogPost, post.id, 'likes')
         
         return Response({
             'message': 'تم تسجيل الإعجاب بنجاح!',
-            'likes': post.likes
+            'likes': post.likes + pending_likes
         }, status=status.HTTP_200_OK)
         
     except Exception as e:
@@ -3,14 +3,16 @@ Booking related views
 """
 from rest_framework import generics, status
 from rest_framework.response import Response
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.throttling import UserRateThrottle
 from django.shortcuts import get_object_or_404
-from django.utils import timezone as dj_timezone
 import datetime
-from zoneinfo import ZoneInfo
 
-from ..models import Booking, BookingRescheduleHistory
+from .. import reservations
+from ..availability import get_free_slots, get_free_slots_range
+from ..models import Booking, BookingRescheduleHistory, Service, Staff
+from ..reservations import SlotUnavailable, TooManyHolds
 from ..serializers import BookingSerializer, BookingCreateSerializer
 from ..email_service import EmailNotificationService
 
@@ -73,7 +75,10 @@ class BookingListCreateView(generics.ListCreateAPIView):
         
         # Call parent create method
         print(f"💾 Saving booking to database...")
-        response = super().create(request, *args, **kwargs)
+        try:
+            response = super().create(request, *args, **kwargs)
+        except SlotUnavailable as e:
+            return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
         print(f"✅ Booking saved with status code: {response.status_code}")
         
         # If booking was created successfully, send confirmation email
@@ -162,36 +167,33 @@ def verify_payment(request, booking_id):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def _parse_slot_query(params):
+    """Validate the date/service/staff parameters of the slot endpoints"""
+    date_str = params.get('date')
+    if not date_str:
+        raise ValueError('date is required (YYYY-MM-DD)')
+    target_date = datetime.datetime.strptime(str(date_str), '%Y-%m-%d').date()
+
+    service_id = params.get('service_id') or params.get('service')
+    staff_id = params.get('staff_id') or params.get('staff')
+    service_id = int(service_id) if service_id else None
+    staff_id = int(staff_id) if staff_id else None
+    return target_date, service_id, staff_id
+
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def booking_time_slots(request):
     """Get available time slots for a specific date"""
-    date = request.query_params.get('date')
-    service_id = request.query_params.get('service')
-    
-    if not date:
-        return Response({'error': 'Date parameter is required'}, 
-                       status=status.HTTP_400_BAD_REQUEST)
-    
-    # Default time slots
-    time_slots = [
-        '09:00', '10:00', '11:00', '12:00', '13:00', 
-        '14:00', '15:00', '16:00', '17:00', '18:00', '19:00'
-    ]
-    
-    # Get booked slots for the date
-    booked_times = Booking.objects.filter(
-        booking_date=date,
-        status__in=['pending', 'confirmed', 'in_progress']
-    ).values_list('booking_time', flat=True)
-    
-    # Remove booked slots
-    available_slots = []
-    for slot in time_slots:
-        slot_time = slot + ':00'  # Convert to HH:MM:SS format
-        if slot_time not in [str(time) for time in booked_times]:
-            available_slots.append(slot)
-    
+    try:
+        target_date, service_id, staff_id = _parse_slot_query(request.query_params)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    available_slots = get_free_slots(target_date, service_id=service_id, staff_id=staff_id)
+    if available_slots is None:
+        return Response({'error': 'Service not found'}, status=status.HTTP_404_NOT_FOUND)
+
     return Response({'available_slots': available_slots})
 
 
@@ -200,48 +202,115 @@ def booking_time_slots(request):
 def availability(request):
     """Return available time slots for a given date/service"""
     try:
-        date_str = request.data.get('date')
-        service_id = request.data.get('service_id')
-        if not date_str:
-            return Response({'error': 'date is required (YYYY-MM-DD)'}, status=status.HTTP_400_BAD_REQUEST)
-
-        # Parse date in Asia/Riyadh using stdlib ZoneInfo
-        tz = ZoneInfo('Asia/Riyadh')
-        target_date = datetime.datetime.strptime(date_str, '%Y-%m-%d').date()
-
-        # Build default slot list 10:00..22:00 each 60 min
-        start_dt = datetime.datetime.combine(target_date, datetime.time(hour=10, minute=0), tzinfo=tz)
-        end_dt = datetime.datetime.combine(target_date, datetime.time(hour=22, minute=0), tzinfo=tz)
-        slot_minutes = 60
-
-        slots = []
-        cur = start_dt
-        while cur < end_dt:
-            slots.append(cur)
-            cur = cur + datetime.timedelta(minutes=slot_minutes)
-
-        # Remove booked/blocked: use Booking model on same date
-        booked = Booking.objects.filter(
-            booking_date=target_date,
-            status__in=['pending', 'confirmed', 'in_progress']
-        ).values_list('booking_time', flat=True)
-        booked_times = set(str(t) for t in booked)  # HH:MM:SS
-
-        available = []
-        now_riyadh = dj_timezone.now().astimezone(tz)
-        for s in slots:
-            # Skip past times today
-            if target_date == now_riyadh.date() and s <= now_riyadh:
-                continue
-            hhmmss = s.strftime('%H:%M:%S')
-            if hhmmss not in booked_times:
-                available.append(s.strftime('%H:%M'))
+        target_date, service_id, staff_id = _parse_slot_query(request.data)
+    except (ValueError, TypeError) as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+    try:
+        available = get_free_slots(target_date, service_id=service_id, staff_id=staff_id)
+        if available is None:
+            return Response({'error': 'Service not found'}, status=status.HTTP_404_NOT_FOUND)
         return Response({'available_slots': available})
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+# Longest window availability_range will compute in one request
+MAX_AVAILABILITY_RANGE_DAYS = 62
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def availability_range(request):
+    """
+    Return free time slots for every day between start and end (inclusive).
+    Pass summary=true to only get a per-day "has any slot" flag for month views.
+    """
+    params = request.query_params
+    try:
+        start_date = datetime.datetime.strptime(params.get('start', ''), '%Y-%m-%d').date()
+        end_date = datetime.datetime.strptime(params.get('end', ''), '%Y-%m-%d').date()
+        service_id = params.get('service_id') or params.get('service')
+        staff_id = params.get('staff_id') or params.get('staff')
+        service_id = int(service_id) if service_id else None
+        staff_id = int(staff_id) if staff_id else None
+    except ValueError:
+        return Response({
+            'error': 'start and end are required (YYYY-MM-DD); service_id and staff_id must be integers'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    if end_date < start_date:
+        return Response({'error': 'end must not be before start'}, status=status.HTTP_400_BAD_REQUEST)
+    if (end_date - start_date).days + 1 > MAX_AVAILABILITY_RANGE_DAYS:
+        return Response({
+            'error': f'Date range cannot exceed {MAX_AVAILABILITY_RANGE_DAYS} days'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    summary = str(params.get('summary', '')).lower() in ('1', 'true', 'yes')
+    days = get_free_slots_range(start_date, end_date, service_id=service_id,
+                                staff_id=staff_id, summary=summary)
+    if days is None:
+        return Response({'error': 'Service not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    return Response({
+        'start': start_date.isoformat(),
+        'end': end_date.isoformat(),
+        'service_id': service_id,
+        'staff_id': staff_id,
+        'summary': summary,
+        'days': {day.isoformat(): value for day, value in days.items()},
+    })
+
+
+class SlotHoldThrottle(UserRateThrottle):
+    """Rate of slot hold requests per user (settings: REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'])"""
+    scope = 'slot_holds'
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@throttle_classes([SlotHoldThrottle])
+def hold_slot(request):
+    """
+    Hold a slot (of a staff member, or unassigned without staff_id) while the
+    customer checks out. Pass the returned token as hold_token when creating
+    the booking.
+    """
+    try:
+        target_date, service_id, staff_id = _parse_slot_query(request.data)
+        slot_time = datetime.datetime.strptime(str(request.data.get('time', '')), '%H:%M').time()
+    except (ValueError, TypeError):
+        return Response({
+            'error': 'date (YYYY-MM-DD), time (HH:MM) and service_id are required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    if not service_id:
+        return Response({'error': 'service_id is required'}, status=status.HTTP_400_BAD_REQUEST)
+    if not Service.objects.filter(pk=service_id, is_active=True).exists():
+        return Response({'error': 'Service not found'}, status=status.HTTP_404_NOT_FOUND)
+    if staff_id and not Staff.objects.filter(pk=staff_id).exists():
+        return Response({'error': 'Staff not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    try:
+        hold = reservations.hold_slot(service_id, staff_id, target_date, slot_time, user=request.user)
+    except SlotUnavailable as e:
+        return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+    except TooManyHolds as e:
+        return Response({'error': str(e)}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+    return Response({
+        'hold_token': str(hold.token),
+        'expires_at': hold.expires_at,
+    }, status=status.HTTP_201_CREATED)
+
+
+@api_view(['DELETE'])
+@permission_classes([IsAuthenticated])
+def release_slot_hold(request, token):
+    """Give a held slot back (checkout abandoned)"""
+    if not reservations.release_hold(token, user=request.user):
+        return Response({'error': 'Hold not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def send_booking_emails_api(request):
@@ -321,11 +390,12 @@ def reschedule_booking(request):
         old_date = booking.booking_date
         old_time = booking.booking_time
         
-        # Update booking
-        booking.booking_date = new_date
-        booking.booking_time = new_time
+        # Update booking; the slot must be free like for a new booking
         booking.reschedule_count += 1
-        booking.save()
+        try:
+            reservations.move_booking(booking, new_date, new_time)
+        except SlotUnavailable as e:
+            return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
         
         # Create reschedule history
         BookingRescheduleHistory.objects.create(
@@ -399,7 +469,7 @@ def get_booking_reschedule_history(request, booking_id):
 
 from rest_framework.views import APIView
 from rest_framework.response import Response
-# from . import send_whatsapp_message
+from ..outbox import enqueue_whatsapp
 
 class TestWhatsAppView(APIView):
     permission_classes = []  # لأي شخص يمكنه التجربة
@@ -410,6 +480,6 @@ class TestWhatsAppView(APIView):
             return Response({"error": "يرجى إدخال رقم الهاتف"}, status=400)
 
         # نرسل رسالة WhatsApp
-        send_whatsapp_message(phone, "هذه رسالة اختبار من Django + Twilio ✅")
+        enqueue_whatsapp(phone, "هذه رسالة اختبار من Django + Twilio ✅", event='test')
 
         return Response({"message": "تم إرسال الرسالة بنجاح"})
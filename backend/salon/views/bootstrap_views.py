@@ -0,0 +1,89 @@
+"""
+Homepage bootstrap - everything the React app loads on first render in one request
+"""
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+
+from ..catalog_cache import cached_fragment, cached_response
+from ..models import Category, Config, HeroImage, Offer, Service
+from ..serializers import (
+    CategorySerializer, ConfigSerializer, HeroImageSerializer, OfferSerializer,
+    ServiceSerializer, active_services_prefetch, with_service_categories,
+)
+from .utility_views import contact_info_data, testimonials_data
+
+
+def _hero_images(request):
+    hero_images = HeroImage.objects.filter(is_active=True)
+    return HeroImageSerializer(hero_images, many=True, context={'request': request}).data
+
+
+def _categories(request):
+    categories = Category.objects.filter(is_active=True).prefetch_related(active_services_prefetch())
+    return CategorySerializer(categories, many=True, context={'request': request}).data
+
+
+def _services(request):
+    services = with_service_categories(Service.objects.filter(is_active=True))
+    return ServiceSerializer(services, many=True, context={'request': request}).data
+
+
+def _offers(request):
+    offers = Offer.objects.filter(is_active=True).order_by('-is_featured', 'order', '-created_at')
+    return OfferSerializer(offers, many=True).data
+
+
+def _config(request):
+    return ConfigSerializer(Config.get_instance()).data
+
+
+# Fragment name -> builder; each fragment is cached under the catalog
+# section of the same name (see catalog_cache.py)
+BOOTSTRAP_FRAGMENTS = {
+    'hero_images': _hero_images,
+    'categories': _categories,
+    'services': _services,
+    'offers': _offers,
+    'testimonials': lambda request: testimonials_data(),
+    'contact_info': lambda request: contact_info_data(),
+    'config': _config,
+}
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def bootstrap_api(request):
+    """
+    Hero images, categories, services, offers, testimonials, contact info and
+    config in one response. ``?include=categories,services`` limits it to the
+    listed fragments (default: all of them).
+    """
+    requested = request.query_params.get('include')
+    if requested:
+        names = {name.strip() for name in requested.split(',') if name.strip()}
+        unknown = sorted(names - set(BOOTSTRAP_FRAGMENTS))
+        if unknown:
+            return Response({
+                'error': f"أجزاء غير معروفة: {', '.join(unknown)}",
+                'available': list(BOOTSTRAP_FRAGMENTS),
+            }, status=status.HTTP_400_BAD_REQUEST)
+        include = [name for name in BOOTSTRAP_FRAGMENTS if name in names]
+    else:
+        include = list(BOOTSTRAP_FRAGMENTS)
+
+    # Serialized image fields are absolute, so fragments are kept per site root
+    site_root = request.build_absolute_uri('/')
+
+    def build():
+        return Response({
+            name: cached_fragment(
+                name, (name,), lambda: BOOTSTRAP_FRAGMENTS[name](request), variant=site_root
+            )
+            for name in include
+        })
+
+    # The assembled payload is cached as a whole too, keyed by the versions
+    # of the included sections and the query string
+    return cached_response(request, include, build)
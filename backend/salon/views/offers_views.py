@@ -8,9 +8,14 @@ from rest_framework.response import Response
 from rest_framework import status
 from django.shortcuts import get_object_or_404
 
+from .. import image_variants
+from ..catalog_cache import catalog_cached
+from ..serializers import OfferSerializer
+
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@catalog_cached('offers')
 def offers_api(request):
     """API endpoint to get all active offers"""
     try:
@@ -45,62 +50,9 @@ def offers_api(request):
             except ValueError:
                 pass
         
-        offers_data = []
-        for offer in queryset:
-            # Get related services and categories
-            services_data = []
-            for service in offer.services.all():
-                services_data.append({
-                    'id': service.id,
-                    'name': service.name,
-                    'name_en': service.name_en,
-                    'price': float(service.price),
-                    'duration': service.duration
-                })
-            
-            categories_data = []
-            for category in offer.categories.all():
-                categories_data.append({
-                    'id': category.id,
-                    'name': category.name,
-                    'name_en': category.name_en
-                })
-            
-            offer_data = {
-                'id': offer.id,
-                'title': offer.title,
-                'title_en': offer.title_en,
-                'description': offer.description,
-                'description_en': offer.description_en,
-                'short_description': offer.short_description,
-                'short_description_en': offer.short_description_en,
-                'offer_type': offer.offer_type,
-                'discount_value': float(offer.discount_value) if offer.discount_value else None,
-                'original_price': float(offer.original_price) if offer.original_price else None,
-                'offer_price': float(offer.offer_price) if offer.offer_price else None,
-                'discount_display': offer.get_discount_display(),
-                'savings_amount': float(offer.get_savings_amount()) if offer.get_savings_amount() else None,
-                'savings_percentage': offer.get_savings_percentage(),
-                'image': offer.image.url if offer.image else None,
-                'thumbnail': offer.thumbnail.url if offer.thumbnail else None,
-                'valid_from': offer.valid_from.isoformat(),
-                'valid_until': offer.valid_until.isoformat(),
-                'is_valid': offer.is_valid(),
-                'is_featured': offer.is_featured,
-                'is_new': offer.is_new,
-                'services': services_data,
-                'categories': categories_data,
-                'terms_conditions': offer.terms_conditions,
-                'terms_conditions_en': offer.terms_conditions_en,
-                'usage_limit': offer.usage_limit,
-                'used_count': offer.used_count,
-                'order': offer.order,
-                'card_color': offer.card_color,
-                'text_color': offer.text_color,
-                'created_at': offer.created_at.isoformat(),
-                'updated_at': offer.updated_at.isoformat()
-            }
-            offers_data.append(offer_data)
+        # Per-offer fragments come from the cache; services and categories
+        # are prefetched for the rest (see OfferListSerializer)
+        offers_data = OfferSerializer(queryset, many=True).data
         
         return Response({
             'success': True,
@@ -117,6 +69,7 @@ def offers_api(request):
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@catalog_cached('offers')
 def offer_detail_api(request, offer_id):
     """API endpoint to get a specific offer by ID"""
     try:
@@ -165,7 +118,9 @@ def offer_detail_api(request, offer_id):
             'savings_amount': float(offer.get_savings_amount()) if offer.get_savings_amount() else None,
             'savings_percentage': offer.get_savings_percentage(),
             'image': offer.image.url if offer.image else None,
+            'image_srcset': image_variants.srcset(offer.image),
             'thumbnail': offer.thumbnail.url if offer.thumbnail else None,
+            'thumbnail_srcset': image_variants.srcset(offer.thumbnail),
             'valid_from': offer.valid_from.isoformat(),
             'valid_until': offer.valid_until.isoformat(),
             'is_valid': offer.is_valid(),
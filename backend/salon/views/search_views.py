@@ -0,0 +1,45 @@
+"""
+Site search - ranked full-text results over blog posts and services
+"""
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+
+from .. import search_index
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def search_api(request):
+    """
+    ``?q=`` searched in blog posts and services (Arabic and English), best
+    matches first.  ``?type=blog`` or ``?type=services`` narrows the search,
+    ``?limit=`` caps the results (default 20, at most 50).  Titles and
+    snippets are HTML with the matches wrapped in ``<mark>``; blog hits
+    carry their ``slug``, services their ``price``.
+    """
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response({'error': 'يرجى إدخال كلمة البحث'}, status=status.HTTP_400_BAD_REQUEST)
+
+    kinds = [kind.strip() for kind in request.query_params.get('type', '').split(',') if kind.strip()]
+    unknown = sorted(set(kinds) - set(search_index.SOURCES))
+    if unknown:
+        return Response({
+            'error': f"أنواع غير معروفة: {', '.join(unknown)}",
+            'available': list(search_index.SOURCES),
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        limit = int(request.query_params.get('limit', 20))
+    except ValueError:
+        return Response({'error': 'قيمة limit غير صحيحة'}, status=status.HTTP_400_BAD_REQUEST)
+
+    results = search_index.search(query, kinds or None, limit)
+
+    return Response({
+        'query': query,
+        'results': results,
+        'count': len(results),
+    })
@@ -7,14 +7,21 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from django.shortcuts import render
 from django.http import HttpResponse
-from PIL import Image, ImageDraw, ImageFont
-import io
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.views.decorators.http import require_safe
+
+from .. import image_variants, search_index
+from ..catalog_cache import catalog_cached
+from ..placeholders import get_placeholder
 
 from ..models import (
     Coupon, ServiceCategory, ServiceItem, Testimonial, ContactInfo, Contact, Offer
 )
 # from ..serializers import CouponValidationSerializer
 
+# Browser/CDN lifetime of placeholder images (they only change with the code)
+PLACEHOLDER_MAX_AGE = 86400
+
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
@@ -44,55 +51,22 @@ def validate_coupon(request):
     }, status=status.HTTP_400_BAD_REQUEST)
 
 
-@api_view(['GET'])
-@permission_classes([AllowAny])
+@require_safe
 def placeholder_image(request, width, height):
-    """Generate a placeholder image"""
-    try:
-        # Parse dimensions
-        width = int(width)
-        height = int(height)
-        
-        # Create image
-        img = Image.new('RGB', (width, height), color='#f3e5d1')
-        draw = ImageDraw.Draw(img)
-        
-        # Try to use a default font, fallback to basic if not available
-        try:
-            font = ImageFont.truetype("arial.ttf", min(width, height) // 8)
-        except:
-            font = ImageFont.load_default()
-        
-        # Add text
-        text = "خدمة جميلة"
-        bbox = draw.textbbox((0, 0), text, font=font)
-        text_width = bbox[2] - bbox[0]
-        text_height = bbox[3] - bbox[1]
-        
-        x = (width - text_width) // 2
-        y = (height - text_height) // 2
-        
-        draw.text((x, y), text, fill='#8a724c', font=font)
-        
-        # Convert to bytes
-        img_io = io.BytesIO()
-        img.save(img_io, format='PNG')
-        img_io.seek(0)
-        
-        response = HttpResponse(img_io.getvalue(), content_type='image/png')
-        response['Cache-Control'] = 'public, max-age=3600'  # Cache for 1 hour
-        return response
-        
-    except Exception as e:
-        # Fallback: return a simple colored rectangle
-        img = Image.new('RGB', (width, height), color='#f3e5d1')
-        img_io = io.BytesIO()
-        img.save(img_io, format='PNG')
-        img_io.seek(0)
-        
-        response = HttpResponse(img_io.getvalue(), content_type='image/png')
-        response['Cache-Control'] = 'public, max-age=3600'
-        return response
+    """
+    Serve a placeholder image (see salon.placeholders). A plain Django view:
+    DRF content negotiation would refuse image-only Accept headers.
+    """
+    data, content_type, etag = get_placeholder(
+        width, height, request.GET.get('text'), request.headers.get('Accept', '')
+    )
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(data, content_type=content_type)
+    response['ETag'] = etag
+    response['Cache-Control'] = f'public, max-age={PLACEHOLDER_MAX_AGE}'
+    patch_vary_headers(response, ['Accept'])
+    return response
 
 
 def services_view(request):
@@ -113,6 +87,7 @@ def privacy_policy_view(request):
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@catalog_cached('service_categories')
 def service_categories_api(request):
     """API endpoint to get all active service categories with their items"""
     try:
@@ -149,34 +124,43 @@ def service_categories_api(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def testimonials_data(search=None):
+    """Active testimonials as returned by testimonials_api (and the bootstrap payload)"""
+    testimonials = Testimonial.objects.filter(is_active=True).order_by('order', '-created_at')
+    if search:
+        # Normalized shadow column: matches regardless of diacritics and letter forms
+        testimonials = search_index.filter_shadow(testimonials, search)
+    
+    testimonials_data = []
+    for testimonial in testimonials:
+        testimonial_data = {
+            'id': testimonial.id,
+            'customer_name': testimonial.customer_name,
+            'customer_name_en': testimonial.customer_name_en,
+            'testimonial_text': testimonial.testimonial_text,
+            'testimonial_text_en': testimonial.testimonial_text_en,
+            'rating': testimonial.rating,
+            'rating_display': testimonial.get_rating_display(),
+            'customer_image': testimonial.customer_image.url if testimonial.customer_image else None,
+            'customer_image_srcset': image_variants.srcset(testimonial.customer_image),
+            'service_used': testimonial.service_used,
+            'is_featured': testimonial.is_featured,
+            'order': testimonial.order,
+            'created_at': testimonial.created_at.isoformat()
+        }
+        testimonials_data.append(testimonial_data)
+    return testimonials_data
+
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@catalog_cached('testimonials')
 def testimonials_api(request):
-    """API endpoint to get all active testimonials"""
+    """API endpoint to get all active testimonials (?search= filters them)"""
     try:
-        testimonials = Testimonial.objects.filter(is_active=True).order_by('order', '-created_at')
-        
-        testimonials_data = []
-        for testimonial in testimonials:
-            testimonial_data = {
-                'id': testimonial.id,
-                'customer_name': testimonial.customer_name,
-                'customer_name_en': testimonial.customer_name_en,
-                'testimonial_text': testimonial.testimonial_text,
-                'testimonial_text_en': testimonial.testimonial_text_en,
-                'rating': testimonial.rating,
-                'rating_display': testimonial.get_rating_display(),
-                'customer_image': testimonial.customer_image.url if testimonial.customer_image else None,
-                'service_used': testimonial.service_used,
-                'is_featured': testimonial.is_featured,
-                'order': testimonial.order,
-                'created_at': testimonial.created_at.isoformat()
-            }
-            testimonials_data.append(testimonial_data)
-        
         return Response({
             'success': True,
-            'testimonials': testimonials_data
+            'testimonials': testimonials_data(request.query_params.get('search'))
         })
         
     except Exception as e:
@@ -186,42 +170,45 @@ def testimonials_api(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def contact_info_data():
+    """Active contact information as returned by contact_info_api (and the bootstrap payload)"""
+    contact_info = ContactInfo.objects.filter(is_active=True).first()
+    
+    if not contact_info:
+        # Return default values if no contact info exists
+        return {
+            'phone_number': '+966 55 123 4567',
+            'phone_number_en': '+966 55 123 4567',
+            'location': 'الرياض، المملكة العربية السعودية',
+            'location_en': 'Riyadh, Kingdom of Saudi Arabia',
+            'working_hours': 'الأحد - الخميس: 10ص - 8م',
+            'working_hours_en': 'Sunday - Thursday: 10 AM - 8 PM',
+            'is_active': True,
+            'created_at': None,
+            'updated_at': None
+        }
+    return {
+        'phone_number': contact_info.phone_number,
+        'phone_number_en': contact_info.phone_number_en or contact_info.phone_number,
+        'location': contact_info.location,
+        'location_en': contact_info.location_en or contact_info.location,
+        'working_hours': contact_info.working_hours,
+        'working_hours_en': contact_info.working_hours_en or contact_info.working_hours,
+        'is_active': contact_info.is_active,
+        'created_at': contact_info.created_at.isoformat() if contact_info.created_at else None,
+        'updated_at': contact_info.updated_at.isoformat() if contact_info.updated_at else None
+    }
+
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@catalog_cached('contact_info')
 def contact_info_api(request):
     """API endpoint to get active contact information"""
     try:
-        contact_info = ContactInfo.objects.filter(is_active=True).first()
-        
-        if not contact_info:
-            # Return default values if no contact info exists
-            contact_data = {
-                'phone_number': '+966 55 123 4567',
-                'phone_number_en': '+966 55 123 4567',
-                'location': 'الرياض، المملكة العربية السعودية',
-                'location_en': 'Riyadh, Kingdom of Saudi Arabia',
-                'working_hours': 'الأحد - الخميس: 10ص - 8م',
-                'working_hours_en': 'Sunday - Thursday: 10 AM - 8 PM',
-                'is_active': True,
-                'created_at': None,
-                'updated_at': None
-            }
-        else:
-            contact_data = {
-                'phone_number': contact_info.phone_number,
-                'phone_number_en': contact_info.phone_number_en or contact_info.phone_number,
-                'location': contact_info.location,
-                'location_en': contact_info.location_en or contact_info.location,
-                'working_hours': contact_info.working_hours,
-                'working_hours_en': contact_info.working_hours_en or contact_info.working_hours,
-                'is_active': contact_info.is_active,
-                'created_at': contact_info.created_at.isoformat() if contact_info.created_at else None,
-                'updated_at': contact_info.updated_at.isoformat() if contact_info.updated_at else None
-            }
-        
         return Response({
             'success': True,
-            'contact_info': contact_data
+            'contact_info': contact_info_data()
         })
         
     except Exception as e:
@@ -0,0 +1,297 @@
+"""
+Outbound HTTP clients of the payment gateway (HyperPay) and Twilio.
+
+Creating a ``requests`` connection or a ``twilio.rest.Client`` per call pays
+a TCP + TLS handshake every time.  Instead each gateway gets one
+process-wide ``requests.Session`` (``session(name)``; Twilio's client is
+built on top of it by ``twilio_client()``) with:
+
+* keep-alive connections, at most ``pool_size`` kept per gateway (bursts
+  beyond that open extra connections that are not kept);
+* a default ``(connect, read)`` timeout for every request;
+* retries with backoff on connection errors, and for idempotent methods on
+  429/5xx answers; a POST is never resent once it reached the gateway;
+* latency metrics per gateway (``metrics.snapshot()``), slow calls logged.
+
+Defaults per gateway are in ``DEFAULTS`` and can be overridden with
+``settings.GATEWAY_CLIENTS``.  With ``settings.GATEWAY_BACKEND = 'fake'``
+no request leaves the process: ``fake_gateway`` answers HyperPay checkouts
+and payment results and Twilio messages locally (tests, offline development)
+and keeps the calls it received.
+"""
+import itertools
+import json
+import logging
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from urllib.parse import parse_qs
+
+import requests
+from django.conf import settings
+from django.dispatch import receiver
+from django.test.signals import setting_changed
+from django.utils import timezone
+from requests.adapters import BaseAdapter, HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG = {'timeout': (5, 30), 'pool_size': 10, 'retries': 2, 'backoff': 0.3}
+DEFAULTS = {
+    'hyperpay': {'timeout': (5, 30)},
+    'twilio': {'timeout': (5, 15)},
+}
+
+# Answers retried for idempotent methods
+RETRY_STATUSES = (429, 502, 503, 504)
+RETRY_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS'})
+
+# Latencies kept per gateway for the percentiles
+SAMPLES = 500
+SLOW_MS = getattr(settings, 'GATEWAY_SLOW_MS', 2000)
+
+
+def backend():
+    return getattr(settings, 'GATEWAY_BACKEND', 'live')
+
+
+def config(name):
+    return {**DEFAULT_CONFIG, **DEFAULTS.get(name, {}), **getattr(settings, 'GATEWAY_CLIENTS', {}).get(name, {})}
+
+
+# ---------------------------------------------------------------------------
+# Metrics
+# ---------------------------------------------------------------------------
+
+class LatencyMetrics:
+    """Request counts, errors and latency percentiles per gateway (this process only)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.gateways = {}
+
+    def record(self, name, seconds, ok):
+        with self.lock:
+            entry = self.gateways.setdefault(
+                name, {'requests': 0, 'errors': 0, 'total': 0.0, 'max': 0.0, 'samples': deque(maxlen=SAMPLES)}
+            )
+            entry['requests'] += 1
+            entry['errors'] += 0 if ok else 1
+            entry['total'] += seconds
+            entry['max'] = max(entry['max'], seconds)
+            entry['samples'].append(seconds)
+
+    def snapshot(self):
+        """``{gateway: {requests, errors, avg_ms, p50_ms, p95_ms, max_ms}}``."""
+        with self.lock:
+            entries = {name: (dict(entry), sorted(entry['samples'])) for name, entry in self.gateways.items()}
+        snapshot = {}
+        for name, (entry, samples) in entries.items():
+            def percentile(fraction):
+                return round(samples[min(len(samples) - 1, int(len(samples) * fraction))] * 1000, 1)
+            snapshot[name] = {
+                'requests': entry['requests'],
+                'errors': entry['errors'],
+                'avg_ms': round(entry['total'] / entry['requests'] * 1000, 1),
+                'p50_ms': percentile(0.5),
+                'p95_ms': percentile(0.95),
+                'max_ms': round(entry['max'] * 1000, 1),
+            }
+        return snapshot
+
+    def reset(self):
+        with self.lock:
+            self.gateways.clear()
+
+
+metrics = LatencyMetrics()
+
+
+# ---------------------------------------------------------------------------
+# Sessions
+# ---------------------------------------------------------------------------
+
+class GatewaySession(requests.Session):
+    """A session that applies the gateway's default timeout and times every request."""
+
+    def __init__(self, name, timeout):
+        super().__init__()
+        self.name = name
+        self.timeout = timeout
+
+    def send(self, request, **kwargs):
+        # Session.request() and the Twilio client both end up here
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        started = time.perf_counter()
+        ok = False
+        try:
+            response = super().send(request, **kwargs)
+            ok = response.status_code < 500
+            return response
+        finally:
+            elapsed = time.perf_counter() - started
+            metrics.record(self.name, elapsed, ok)
+            if elapsed * 1000 >= SLOW_MS:
+                logger.warning(f'{self.name} {request.method} {request.url} took {elapsed * 1000:.0f} ms')
+
+
+def _adapter(conf):
+    retry = Retry(
+        total=conf['retries'],
+        allowed_methods=RETRY_METHODS,
+        status_forcelist=RETRY_STATUSES,
+        backoff_factor=conf['backoff'],
+        raise_on_status=False,
+    )
+    return HTTPAdapter(pool_connections=1, pool_maxsize=conf['pool_size'], max_retries=retry)
+
+
+_lock = threading.RLock()
+_sessions = {}
+_twilio = None
+
+
+def session(name):
+    """The process-wide session of a gateway."""
+    with _lock:
+        client = _sessions.get(name)
+        if client is None:
+            conf = config(name)
+            client = _sessions[name] = GatewaySession(name, conf['timeout'])
+            adapter = fake_gateway if backend() == 'fake' else _adapter(conf)
+            client.mount('https://', adapter)
+            client.mount('http://', adapter)
+        return client
+
+
+def twilio_client():
+    """The process-wide ``twilio.rest.Client``, sending through ``session('twilio')``."""
+    global _twilio
+    with _lock:
+        if _twilio is None:
+            from twilio.http.http_client import TwilioHttpClient
+            from twilio.rest import Client
+
+            http_client = TwilioHttpClient()
+            http_client.session = session('twilio')
+            account_sid, auth_token = settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN
+            if backend() == 'fake':
+                account_sid, auth_token = account_sid or 'ACfake', auth_token or 'fake'
+            _twilio = Client(account_sid, auth_token, http_client=http_client)
+        return _twilio
+
+
+def reset():
+    """Drop the sessions and clients (they are rebuilt from the settings on next use)."""
+    global _twilio
+    with _lock:
+        for client in _sessions.values():
+            client.close()
+        _sessions.clear()
+        _twilio = None
+
+
+@receiver(setting_changed)
+def _gateway_setting_changed(setting, **kwargs):
+    if setting in ('GATEWAY_BACKEND', 'GATEWAY_CLIENTS', 'TWILIO_ACCOUNT_SID', 'TWILIO_AUTH_TOKEN'):
+        reset()
+
+
+# ---------------------------------------------------------------------------
+# Fake backend
+# ---------------------------------------------------------------------------
+
+def _hyperpay_checkout(fake, request, match):
+    return 200, {
+        'id': f'fake-checkout-{fake.next_id()}',
+        'result': {'code': '000.200.100', 'description': 'successfully created checkout'},
+    }
+
+
+def _hyperpay_payment(fake, request, match):
+    return 200, {
+        'id': f'fake-transaction-{fake.next_id()}',
+        'ndc': match.group('checkout_id'),
+        'timestamp': timezone.now().strftime('%Y-%m-%d %H:%M:%S+0000'),
+        'result': {'code': '000.100.110', 'description': 'Request successfully processed'},
+    }
+
+
+def _twilio_message(fake, request, match):
+    body = request.body or ''
+    if isinstance(body, bytes):
+        body = body.decode('utf-8')
+    params = {key: values[0] for key, values in parse_qs(body).items()}
+    return 201, {
+        'sid': f'SM{uuid.uuid4().hex}',
+        'status': 'queued',
+        'to': params.get('To'),
+        'from': params.get('From'),
+        'body': params.get('Body'),
+    }
+
+
+class FakeGateway(BaseAdapter):
+    """
+    Transport adapter answering gateway requests in-process.  Routes are
+    ``(method, URL regex, handler)``, the most recently added matching first;
+    a handler gets ``(fake, request, match)`` and returns ``(status, JSON body)``.
+    Every request received is appended to ``calls``.
+    """
+
+    DEFAULT_ROUTES = [
+        ('POST', r'/v1/checkouts/?$', _hyperpay_checkout),
+        ('GET', r'/v1/checkouts/(?P<checkout_id>[^/?]+)/payment', _hyperpay_payment),
+        ('POST', r'/Messages\.json$', _twilio_message),
+    ]
+
+    def __init__(self):
+        super().__init__()
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.routes = [(method, re.compile(pattern), handler) for method, pattern, handler in self.DEFAULT_ROUTES]
+            self.calls = []
+            self.ids = itertools.count(1)
+
+    def next_id(self):
+        return next(self.ids)
+
+    def add(self, method, pattern, status=200, body=None, handler=None):
+        """Answer ``method`` requests to URLs matching ``pattern`` with ``status``/``body`` (or ``handler``)."""
+        handler = handler or (lambda fake, request, match: (status, body or {}))
+        with self.lock:
+            self.routes.insert(0, (method.upper(), re.compile(pattern), handler))
+
+    def send(self, request, **kwargs):
+        with self.lock:
+            self.calls.append(request)
+            routes = list(self.routes)
+        for method, pattern, handler in routes:
+            match = pattern.search(request.url)
+            if method == request.method and match:
+                status, body = handler(self, request, match)
+                break
+        else:
+            status, body = 404, {'error': f'No fake route for {request.method} {request.url}'}
+
+        response = requests.Response()
+        response.status_code = status
+        response._content = json.dumps(body).encode('utf-8')
+        response.headers['Content-Type'] = 'application/json'
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+fake_gateway = FakeGateway()
@@ -1,51 +1,8 @@
 """
-Custom middleware for handling static files and MIME types
+Custom middleware (static files are served by static_resolver.py)
 """
 
-from django.http import HttpResponse
 from django.conf import settings
-import mimetypes
-import os
-
-
-class StaticFilesMimeMiddleware:
-    """
-    Middleware to ensure proper MIME types for static files
-    """
-    
-    def __init__(self, get_response):
-        self.get_response = get_response
-        
-        # Add common MIME types
-        mimetypes.add_type("text/css", ".css", True)
-        mimetypes.add_type("application/javascript", ".js", True)
-        mimetypes.add_type("image/png", ".png", True)
-        mimetypes.add_type("image/jpeg", ".jpg", True)
-        mimetypes.add_type("image/jpeg", ".jpeg", True)
-        mimetypes.add_type("image/gif", ".gif", True)
-        mimetypes.add_type("image/svg+xml", ".svg", True)
-        mimetypes.add_type("font/woff", ".woff", True)
-        mimetypes.add_type("font/woff2", ".woff2", True)
-        
-    def __call__(self, request):
-        response = self.get_response(request)
-        
-        # Fix MIME types for static files
-        if request.path.startswith(settings.STATIC_URL):
-            file_ext = os.path.splitext(request.path)[1].lower()
-            
-            if file_ext == '.css':
-                response['Content-Type'] = 'text/css'
-            elif file_ext == '.js':
-                response['Content-Type'] = 'application/javascript'
-            elif file_ext in ['.png', '.jpg', '.jpeg', '.gif']:
-                response['Content-Type'] = f'image/{file_ext[1:]}'
-            elif file_ext == '.svg':
-                response['Content-Type'] = 'image/svg+xml'
-            elif file_ext in ['.woff', '.woff2']:
-                response['Content-Type'] = f'font/{file_ext[1:]}'
-                
-        return response
 
 
 class CSPMiddleware:
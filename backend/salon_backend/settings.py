@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+import sys
 from dotenv import load_dotenv
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -40,6 +41,7 @@ HYPERPAY_ACCESS_TOKEN = os.getenv("HYPERPAY_ACCESS_TOKEN")
 STRIPE_PUBLISHABLE_KEY = os.getenv("STRIPE_PUBLISHABLE_KEY")
 STRIPE_SECRET_KEY = os.getenv("STRIPE_SECRET_KEY")
 STRIPE_CURRENCY = os.getenv("STRIPE_CURRENCY", "sar")
+STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET")
 
 # 🔹 إعداد كائن HYPERPAY حتى يتعرف عليه الكود
 HYPERPAY = {
@@ -71,6 +73,7 @@ LOGGING = {
 TWILIO_ACCOUNT_SID = os.getenv('TWILIO_ACCOUNT_SID')
 TWILIO_AUTH_TOKEN = os.getenv('TWILIO_AUTH_TOKEN')
 TWILIO_WHATSAPP_NUMBER = os.getenv('TWILIO_WHATSAPP_NUMBER')
+TWILIO_PHONE_NUMBER = os.getenv('TWILIO_PHONE_NUMBER')
 
 
 
@@ -133,6 +136,7 @@ JAZZMIN_SETTINGS = {
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'salon_backend.static_resolver.StaticFilesMiddleware',  # DEBUG only; see static_resolver.py
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -141,7 +145,6 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
-    'salon_backend.mime_type_fix.MimeTypeFixMiddleware',  # Fix MIME type issues
 ]
 
 ROOT_URLCONF = 'salon_backend.urls'
@@ -181,6 +184,48 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Shared by every process (web workers, the outbox/export/payment workers): catalog
+# versions, availability plans and the buffered counters must be the same for all of them.
+# Set REDIS_URL when the processes run on several hosts (needs the redis package; its
+# incr is atomic); otherwise a file cache shared by the processes of this host. The
+# buffered counters (salon.counters) have their own cache, so evicting responses never
+# drops pending counts. Tests get their own.
+
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        },
+        'counters': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+            'KEY_PREFIX': 'counters',
+        },
+    }
+else:
+    CACHE_DIR = Path(os.getenv('CACHE_DIR', BASE_DIR / 'cache'))
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': str(CACHE_DIR),
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        },
+        'counters': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': str(CACHE_DIR / 'counters'),
+            'OPTIONS': {'MAX_ENTRIES': 100000},
+        },
+    }
+if 'test' in sys.argv:
+    CACHES = {
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'counters': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'counters'},
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -276,6 +321,70 @@ DEFAULT_FROM_EMAIL = 'info@takweensoft.com'
 SALON_WEBSITE_NAME = 'صالون الجمال'
 ADMIN_EMAIL = 'info@takweensoft.com'
 
+# Outbound notification queue (salon.outbox), delivered by `manage.py process_outbox`
+# Use 'salon.outbox.ConsoleTransport' or 'salon.outbox.FileTransport' in development.
+OUTBOX_TRANSPORTS = {
+    'email': os.getenv('OUTBOX_EMAIL_TRANSPORT', 'salon.outbox.EmailTransport'),
+    'whatsapp': os.getenv('OUTBOX_WHATSAPP_TRANSPORT', 'salon.outbox.TwilioWhatsAppTransport'),
+    'sms': os.getenv('OUTBOX_SMS_TRANSPORT', 'salon.outbox.TwilioSMSTransport'),
+}
+OUTBOX_FILE_PATH = BASE_DIR / 'outbox.log'
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_RETRY_BASE_SECONDS = 30
+OUTBOX_RETRY_MAX_SECONDS = 3600
+OUTBOX_LOCK_TIMEOUT = 300
+OUTBOX_EMAIL_CHUNK_SIZE = 25  # emails sent per SMTP connection
+
+# Appointment reminders (`manage.py send_reminders`), hours before the appointment
+REMINDER_WINDOWS_HOURS = [24, 2]
+
+# Seconds the /dashboard-stats/ payload is cached (also invalidated by model signals)
+DASHBOARD_STATS_CACHE_TIMEOUT = 60
+
+# Public catalog responses (salon.catalog_cache): server-side TTL, and browser/CDN
+# max-age (0 = always revalidate, answered with a 304 while nothing changed)
+CATALOG_CACHE_TIMEOUT = 3600
+CATALOG_MAX_AGE = 0
+
+# Buffered blog view/like counters (salon.counters): seconds between flushes to the
+# database; `manage.py flush_counters` writes out whatever is pending
+COUNTER_FLUSH_INTERVAL = 60
+COUNTER_CACHE = 'counters'  # CACHES alias holding the pending counts
+
+# Minutes a slot stays held for a customer in checkout (salon.reservations)
+SLOT_HOLD_MINUTES = 10
+# Slots one user may hold at the same time
+SLOT_HOLDS_PER_USER = 2
+
+# Rendered /placeholder/ images (salon.placeholders) are kept here across restarts;
+# set PLACEHOLDER_FONT to a .ttf path for a specific font
+PLACEHOLDER_CACHE_DIR = MEDIA_ROOT / 'placeholders'
+PLACEHOLDER_CACHE_MAX_FILES = 500  # least recently used images beyond this are deleted
+
+# Resized WebP variants of uploaded images (salon.image_variants), generated in the
+# background after upload; `manage.py generate_image_variants` backfills existing media
+IMAGE_VARIANT_WIDTHS = [320, 640, 960, 1280, 1920]
+IMAGE_VARIANT_QUALITY = 80
+IMAGE_VARIANT_WORKERS = 2
+
+# Outbound HyperPay/Twilio clients (salon_backend.gateways): pooled keep-alive sessions
+# with timeouts and retries; per gateway overrides, e.g. {'hyperpay': {'timeout': (5, 30),
+# 'pool_size': 10, 'retries': 2}}. GATEWAY_BACKEND = 'fake' answers them in-process
+GATEWAY_BACKEND = os.getenv('GATEWAY_BACKEND', 'live')
+GATEWAY_CLIENTS = {}
+GATEWAY_SLOW_MS = 2000  # slower calls are logged
+
+# Provider payment events (payments.webhooks): stored by the webhook views, applied in
+# the background; `manage.py process_payment_events` drains events that are due
+PAYMENT_EVENT_MAX_ATTEMPTS = 5
+
+# Background export jobs (salon.export_jobs), run by `manage.py process_export_jobs`;
+# files are stored under MEDIA_ROOT/exports/
+EXPORT_JOB_FRESHNESS_SECONDS = 600  # identical exports within this window reuse the file
+EXPORT_JOB_STALE_SECONDS = 900  # pending jobs not started by then are failed
+EXPORT_JOB_HEARTBEAT_TIMEOUT = 120  # running jobs silent for this long are failed
+EXPORT_JOB_RETENTION_SECONDS = 24 * 3600  # jobs and their files (customer data) are deleted after this
+
 
 # Frontend URL for redirects
 FRONTEND_URL = 'http://localhost:5173'
@@ -335,6 +444,10 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
+    'DEFAULT_THROTTLE_RATES': {
+        # POST /bookings/hold/ (salon.views.booking_views.SlotHoldThrottle)
+        'slot_holds': '30/hour',
+    },
 }
 
 # Unfold Admin Theme Configuration - Simple White & Black
@@ -0,0 +1,205 @@
+"""
+Development static file serving.
+
+One middleware replaces the stack of static "fix" middlewares, which probed
+up to a dozen ``os.path.exists`` candidates per request and fell back to
+walking ``STATIC_ROOT``.  ``StaticManifest`` indexes every static file once
+(``STATIC_ROOT`` first, then the staticfiles finders, first match wins) into
+a dict of URL path -> ``(file path, MIME type)``, so a lookup is one dict
+access.  The index is rebuilt when a directory it covers, or the
+collectstatic manifest (``staticfiles.json``), changes mtime; that is
+checked at most every ``STATIC_RESOLVER_RECHECK_SECONDS``.
+
+Files are served with ``FileResponse`` (``wsgi.file_wrapper``, i.e.
+sendfile where the server supports it), with ``Last-Modified`` / 304s, and
+as their precompressed ``.br`` / ``.gz`` sibling when the client accepts it.
+Requests under ``/admin/`` for a file of the salon app's static directory
+(``/admin/css/x.css`` -> ``salon/css/x.css``), which some admin templates
+produce, are resolved too.
+
+Only active with ``DEBUG``; production static files go through WhiteNoise.
+"""
+import mimetypes
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.staticfiles.finders import get_finders
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+# Extensions served with an explicit type, whatever the platform's mimetypes say
+MIME_TYPES = {
+    '.css': 'text/css',
+    '.js': 'application/javascript',
+    '.mjs': 'application/javascript',
+    '.map': 'application/json',
+    '.json': 'application/json',
+    '.html': 'text/html',
+    '.txt': 'text/plain',
+    '.xml': 'text/xml',
+    '.png': 'image/png',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.gif': 'image/gif',
+    '.svg': 'image/svg+xml',
+    '.webp': 'image/webp',
+    '.avif': 'image/avif',
+    '.ico': 'image/x-icon',
+    '.woff': 'font/woff',
+    '.woff2': 'font/woff2',
+    '.ttf': 'font/ttf',
+    '.otf': 'font/otf',
+    '.pdf': 'application/pdf',
+}
+
+# Precompressed siblings, preferred first: (suffix, Content-Encoding)
+ENCODINGS = (('.br', 'br'), ('.gz', 'gzip'))
+
+COLLECTSTATIC_MANIFEST = 'staticfiles.json'
+RECHECK_SECONDS = getattr(settings, 'STATIC_RESOLVER_RECHECK_SECONDS', 2)
+MAX_AGE = 3600
+
+
+def content_type(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension in MIME_TYPES:
+        return MIME_TYPES[extension]
+    guessed, _encoding = mimetypes.guess_type(path)
+    return guessed or 'application/octet-stream'
+
+
+def _roots():
+    """``(location, URL prefix)`` of every place static files come from, by precedence."""
+    roots = []
+    if settings.STATIC_ROOT:
+        roots.append((str(settings.STATIC_ROOT), ''))
+    for finder in get_finders():
+        storages = getattr(finder, 'storages', None)
+        if storages is None:
+            continue
+        for storage in storages.values():
+            location = getattr(storage, 'location', None)
+            if location:
+                roots.append((str(location), getattr(storage, 'prefix', None) or ''))
+    return roots
+
+
+class StaticManifest:
+    """URL path (relative to ``STATIC_URL``) -> ``(file path, MIME type)``."""
+
+    def __init__(self):
+        self.files = {}
+        self.directories = []
+        self.signature = None
+        self.checked_at = 0.0
+        self.lock = threading.Lock()
+
+    def _directory_mtimes(self, directories):
+        mtimes = []
+        for directory in directories:
+            try:
+                mtimes.append(os.stat(directory).st_mtime_ns)
+            except OSError:
+                mtimes.append(None)
+        return tuple(mtimes)
+
+    def _current_signature(self):
+        watched = list(self.directories)
+        if settings.STATIC_ROOT:
+            watched.append(os.path.join(settings.STATIC_ROOT, COLLECTSTATIC_MANIFEST))
+        return (tuple(_roots()), self._directory_mtimes(watched))
+
+    def build(self):
+        roots = _roots()
+        # The roots themselves are watched even while missing (before collectstatic)
+        files, directories = {}, [location for location, _prefix in roots]
+        for location, prefix in roots:
+            for directory, _subdirectories, names in os.walk(location):
+                if directory != location:
+                    directories.append(directory)
+                relative = os.path.relpath(directory, location)
+                relative = '' if relative == '.' else relative.replace(os.sep, '/') + '/'
+                for name in names:
+                    url_path = f'{prefix}/{relative}{name}' if prefix else f'{relative}{name}'
+                    if url_path not in files:
+                        path = os.path.join(directory, name)
+                        files[url_path] = (path, content_type(name))
+        self.files, self.directories = files, directories
+        self.signature = self._current_signature()
+
+    def refresh(self):
+        """Rebuild when a directory or the collectstatic manifest changed (checked every RECHECK_SECONDS)."""
+        now = time.monotonic()
+        if self.signature is not None and now - self.checked_at < RECHECK_SECONDS:
+            return
+        with self.lock:
+            if self.signature is None or self._current_signature() != self.signature:
+                self.build()
+            self.checked_at = now
+
+    def resolve(self, url_path):
+        """``(file path, MIME type)`` for a path below ``STATIC_URL``, or None."""
+        self.refresh()
+        return self.files.get(url_path)
+
+    def encoded(self, url_path, accept_encoding):
+        """``(file path, Content-Encoding)`` of the best precompressed sibling the client accepts, or None."""
+        accepted = {value.split(';')[0].strip() for value in accept_encoding.lower().split(',')}
+        for suffix, encoding in ENCODINGS:
+            if encoding in accepted:
+                entry = self.files.get(url_path + suffix)
+                if entry is not None:
+                    return entry[0], encoding
+        return None
+
+
+manifest = StaticManifest()
+
+
+def serve(request, url_path):
+    """A response for a static file, or None when there is no such file."""
+    entry = manifest.resolve(url_path)
+    if entry is None:
+        return None
+    path, mime = entry
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+
+    response = get_conditional_response(request, last_modified=int(stat.st_mtime))
+    if response is None:
+        encoded = manifest.encoded(url_path, request.headers.get('Accept-Encoding', ''))
+        served = encoded[0] if encoded else path
+        response = FileResponse(open(served, 'rb'), content_type=mime)
+        if encoded:
+            response['Content-Encoding'] = encoded[1]
+        response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Cache-Control'] = f'public, max-age={MAX_AGE}'
+    patch_vary_headers(response, ['Accept-Encoding'])
+    return response
+
+
+class StaticFilesMiddleware:
+    """Serve ``STATIC_URL`` (and misrouted ``/admin/`` asset) requests from the manifest, DEBUG only."""
+
+    def __init__(self, get_response):
+        if not settings.DEBUG:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.static_url = settings.STATIC_URL if settings.STATIC_URL.startswith('/') else f'/{settings.STATIC_URL}'
+
+    def __call__(self, request):
+        if request.method in ('GET', 'HEAD'):
+            response = None
+            if request.path.startswith(self.static_url):
+                response = serve(request, request.path[len(self.static_url):])
+            elif request.path.startswith('/admin/') and os.path.splitext(request.path)[1].lower() in MIME_TYPES:
+                response = serve(request, 'salon/' + request.path[len('/admin/'):])
+            if response is not None:
+                return response
+        return self.get_response(request)
@@ -53,9 +53,13 @@ async function apiRequest(endpoint, options = {}) {
         const errorData = await response.json().catch(() => ({}));
         throw new Error(errorData.error || `HTTP error! status: ${response.status}`);
       }
-      
+
+      if (response.status === 204) {
+        return null;
+      }
+
       const data = await response.json();
-      
+
       // Handle Django REST Framework pagination
       if (data && typeof data === 'object' && data.results) {
         return data.results;
@@ -117,6 +121,10 @@ export const servicesAPI = {
   getById: (id) => apiRequest(`/services/${id}/`),
   getByCategory: (categoryId) => apiRequest(`/services/?category=${categoryId}`),
   getFeatured: () => apiRequest('/services/?featured=true'),
+  // Type-ahead over service and category names (answered from memory)
+  autocomplete: (query, limit = 10) => apiRequest(
+    `/services/autocomplete/?${new URLSearchParams({ q: query, limit }).toString()}`
+  ),
 };
 
 // Staff API
@@ -130,6 +138,22 @@ export const heroImagesAPI = {
   getAll: () => apiRequest('/hero-images/'),
 };
 
+// Homepage bootstrap API: hero images, categories, services, offers,
+// testimonials, contact info and config in one request.
+// Pass a list of fragment names to fetch only those.
+export const bootstrapAPI = {
+  get: (include = []) => apiRequest(
+    include.length ? `/bootstrap/?include=${include.join(',')}` : '/bootstrap/'
+  ),
+};
+
+// Search API - ranked blog posts and services; titles/snippets contain <mark> tags
+export const searchAPI = {
+  search: (query, params = {}) => apiRequest(
+    `/search/?${new URLSearchParams({ q: query, ...params }).toString()}`
+  ),
+};
+
 // Customers API
 export const customersAPI = {
   create: (customerData) => apiRequest('/customers/', {
@@ -180,6 +204,14 @@ export const bookingsAPI = {
     if (serviceId) params.append('service', serviceId);
     return apiRequest(`/booking-time-slots/?${params}`);
   },
+  // Hold a slot during checkout; send the returned hold_token with create()
+  holdSlot: ({ serviceId, staffId, date, time }) => apiRequest('/bookings/hold/', {
+    method: 'POST',
+    body: JSON.stringify({ service_id: serviceId, staff_id: staffId, date, time }),
+  }),
+  releaseHold: (token) => apiRequest(`/bookings/hold/${token}/`, {
+    method: 'DELETE',
+  }),
 };
 
 // Availability API
@@ -188,6 +220,13 @@ export const availabilityAPI = {
     method: 'POST',
     body: JSON.stringify({ service_id, date, lat, lng })
   }),
+  getRange: ({ start, end, service_id, staff_id, summary = false }) => {
+    const params = new URLSearchParams({ start, end });
+    if (service_id) params.append('service_id', service_id);
+    if (staff_id) params.append('staff_id', staff_id);
+    if (summary) params.append('summary', 'true');
+    return apiRequest(`/availability/range/?${params}`);
+  },
 };
 
 // Admin Slot Availability API
@@ -563,6 +602,8 @@ export default {
   servicesAPI,
   staffAPI,
   heroImagesAPI,
+  bootstrapAPI,
+  searchAPI,
   customersAPI,
   addressesAPI,
   bookingsAPI,